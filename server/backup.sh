@@ -269,7 +269,7 @@ backup_configurations() {
     log_step "Backup configurations..."
     
     # Copy config files
-    local config_files=("docker-compose.yml" "docker-compose.prod.yml" "Dockerfile" "requirements.txt" ".env.example" "alembic.ini")
+    local config_files=("docker-compose.yml" "docker-compose.prod.yml" "Dockerfile" "requirements.txt" "requirements-dev.txt" ".env.example" "alembic.ini")
     local copied=0
     
     for file in "${config_files[@]}"; do
@@ -0,0 +1,57 @@
+import os
+import math
+import logging
+from typing import Optional
+from config.settings import settings
+
+def available_cpus() -> int:
+    """
+    Số CPU process thực sự được dùng: tính cả CPU affinity và giới hạn cgroup
+    (docker --cpus / deploy.resources.limits.cpus), không phải số core của máy
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        # cgroup v2: "<quota> <period>" hoặc "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+def worker_count() -> int:
+    """SERVER_WORKERS nếu được đặt, nếu không thì SERVER_WORKERS_PER_CPU x số CPU, tối đa SERVER_MAX_WORKERS"""
+    if settings.SERVER_WORKERS > 0:
+        return settings.SERVER_WORKERS
+    workers = max(1, round(available_cpus() * settings.SERVER_WORKERS_PER_CPU))
+    return min(workers, settings.SERVER_MAX_WORKERS)
+
+_scheduler_lock_file = None
+
+def acquire_scheduler_lock(path: Optional[str] = None) -> bool:
+    """
+    Chỉ một worker trong máy chạy các job định kỳ: worker nào giữ được file lock thì chạy.
+    Lock tự nhả khi worker đó thoát (kể cả khi bị recycle), worker thay thế sẽ nhận lại
+    """
+    global _scheduler_lock_file
+    if _scheduler_lock_file is not None:
+        return True
+    try:
+        import fcntl
+    except ImportError:
+        # Windows: không có fcntl, giữ hành vi cũ (mọi process đều chạy job)
+        return True
+    path = path or settings.SCHEDULER_LOCK_FILE
+    lock_file = open(path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _scheduler_lock_file = lock_file
+    logging.info(f"Worker {os.getpid()} chạy các job định kỳ (lock {path})")
+    return True
@@ -12,11 +12,78 @@ class Settings(BaseSettings):
     DATABASE_HOST: str = os.getenv("DATABASE_HOST", "localhost")
     DATABASE_PORT: str = os.getenv("DATABASE_PORT", "5432")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "phulong")
+    # Server production (gunicorn + uvicorn worker, xem gunicorn.conf.py); SERVER_WORKERS=0: tự tính theo số CPU
+    SERVER_BIND: str = os.getenv("SERVER_BIND", "0.0.0.0:8000")
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", "0"))
+    SERVER_WORKERS_PER_CPU: float = float(os.getenv("SERVER_WORKERS_PER_CPU", "1"))
+    SERVER_MAX_WORKERS: int = int(os.getenv("SERVER_MAX_WORKERS", "8"))
+    SERVER_PRELOAD: bool = os.getenv("SERVER_PRELOAD", "true").lower() == "true"
+    SERVER_MAX_REQUESTS: int = int(os.getenv("SERVER_MAX_REQUESTS", "5000"))  # Tái tạo worker sau n request (0: tắt)
+    SERVER_MAX_REQUESTS_JITTER: int = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "500"))
+    SERVER_TIMEOUT: int = int(os.getenv("SERVER_TIMEOUT", "60"))
+    SERVER_GRACEFUL_TIMEOUT: int = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+    SERVER_KEEPALIVE: int = int(os.getenv("SERVER_KEEPALIVE", "5"))
+    SERVER_FORWARDED_ALLOW_IPS: str = os.getenv("SERVER_FORWARDED_ALLOW_IPS", "127.0.0.1")
+    SERVER_RELOAD: bool = os.getenv("SERVER_RELOAD", "false").lower() == "true"  # Chỉ dùng khi dev (python main.py)
+    SCHEDULER_LOCK_FILE: str = os.getenv("SCHEDULER_LOCK_FILE", "/tmp/phulong-scheduler.lock")
+    
+    # Nén response (Brotli / gzip): ngưỡng kích thước, mức nén, dung lượng cache bản nén của response public
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+    COMPRESSION_CACHE_MAX_BYTES: int = int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    COMPRESSION_EXCLUDED_PATHS: str = os.getenv("COMPRESSION_EXCLUDED_PATHS", "/static")
+    
+    # CORS: danh sách origin cách nhau bởi dấu phẩy ("*" cho mọi origin), thời gian trình duyệt cache preflight (giây)
+    CORS_ALLOW_ORIGINS: str = os.getenv("CORS_ALLOW_ORIGINS", "*")
+    CORS_MAX_AGE: int = int(os.getenv("CORS_MAX_AGE", "7200"))
+    
+    # Profiling (pyinstrument): root gửi X-Profile để profile một request; SAMPLE_EVERY=N tự lấy mẫu 1/N request mỗi route
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_SAMPLE_EVERY: int = int(os.getenv("PROFILING_SAMPLE_EVERY", "0"))
+    PROFILING_INTERVAL: float = float(os.getenv("PROFILING_INTERVAL", "0.001"))
+    PROFILING_DIR: str = os.getenv("PROFILING_DIR", "logs/profiles")
+    PROFILING_MAX_PROFILES: int = int(os.getenv("PROFILING_MAX_PROFILES", "200"))
+    
+    # Slow-query log: câu SQL chậm hơn ngưỡng được gom nhóm theo fingerprint, EXPLAIN lần đầu + mỗi EXPLAIN_EVERY lần (0 = tắt)
+    SLOW_QUERY_ENABLED: bool = os.getenv("SLOW_QUERY_ENABLED", "false").lower() == "true"
+    SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+    SLOW_QUERY_EXPLAIN_EVERY: int = int(os.getenv("SLOW_QUERY_EXPLAIN_EVERY", "20"))
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS: int = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "5000"))
+    SLOW_QUERY_MAX_FINGERPRINTS: int = int(os.getenv("SLOW_QUERY_MAX_FINGERPRINTS", "500"))
+    
+    # Schema do Alembic / create_database.py quản lý; bật để tự create_all khi khởi động (chỉ dùng khi dev)
+    DB_AUTO_CREATE_TABLES: bool = os.getenv("DB_AUTO_CREATE_TABLES", "false").lower() == "true"
+    # Chạy các job định kỳ (GC ảnh, outbox email, dọn log...) trong process này
+    SCHEDULED_TASKS_ENABLED: bool = os.getenv("SCHEDULED_TASKS_ENABLED", "true").lower() == "true"
     
     # JWT settings
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+    AUTH_PRINCIPAL_CACHE_SECONDS: int = int(os.getenv("AUTH_PRINCIPAL_CACHE_SECONDS", "30"))  # Cache user đã xác thực (0: tắt); cũng là độ trễ tối đa thu hồi token giữa các worker
+    
+    # Log truy cập admin: thời gian lưu, số partition tháng tạo trước, chu kỳ dọn và cỡ lô khi DELETE
+    ACCESS_LOG_RETENTION_DAYS: int = int(os.getenv("ACCESS_LOG_RETENTION_DAYS", "90"))
+    ACCESS_LOG_PARTITION_MONTHS_AHEAD: int = int(os.getenv("ACCESS_LOG_PARTITION_MONTHS_AHEAD", "2"))
+    ACCESS_LOG_CLEANUP_INTERVAL_SECONDS: int = int(os.getenv("ACCESS_LOG_CLEANUP_INTERVAL_SECONDS", "86400"))
+    ACCESS_LOG_DELETE_BATCH_SIZE: int = int(os.getenv("ACCESS_LOG_DELETE_BATCH_SIZE", "5000"))
+    
+    # Mật khẩu: cost bcrypt và số thread hash/verify (ngoài event loop)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    
+    # Giới hạn đăng nhập (token bucket theo IP / username, khóa tạm khi sai nhiều lần)
+    LOGIN_THROTTLE_ENABLED: bool = os.getenv("LOGIN_THROTTLE_ENABLED", "true").lower() == "true"
+    LOGIN_IP_BURST: int = int(os.getenv("LOGIN_IP_BURST", "20"))
+    LOGIN_IP_PER_MINUTE: float = float(os.getenv("LOGIN_IP_PER_MINUTE", "10"))
+    LOGIN_USER_BURST: int = int(os.getenv("LOGIN_USER_BURST", "5"))
+    LOGIN_USER_PER_MINUTE: float = float(os.getenv("LOGIN_USER_PER_MINUTE", "3"))
+    LOGIN_LOCKOUT_THRESHOLD: int = int(os.getenv("LOGIN_LOCKOUT_THRESHOLD", "5"))  # Số lần sai liên tiếp trước khi khóa
+    LOGIN_LOCKOUT_BASE_SECONDS: int = int(os.getenv("LOGIN_LOCKOUT_BASE_SECONDS", "30"))
+    LOGIN_LOCKOUT_MAX_SECONDS: int = int(os.getenv("LOGIN_LOCKOUT_MAX_SECONDS", "900"))
     
     # Email settings
     SMTP_SERVER: str = os.getenv("SMTP_SERVER", "smtp.gmail.com")
@@ -24,11 +91,94 @@ class Settings(BaseSettings):
     SMTP_USERNAME: str = os.getenv("SMTP_USERNAME", "your-email@gmail.com")
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "your-password")
     EMAIL_FROM: str = os.getenv("EMAIL_FROM", "Phú Long <no-reply@phulong.com>")
-    ADMIN_EMAIL: str = os.getenv("ADMIN_EMAIL", "inphulong@gmail.com")
+    ADMIN_EMAIL: str = os.getenv("ADMIN_EMAIL", "inphulong@gmail.com")  # Người nhận mọi thông báo cho admin
+    SMTP_USE_TLS: bool = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+    SMTP_TIMEOUT: int = int(os.getenv("SMTP_TIMEOUT", "30"))
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", "2"))  # Số kết nối SMTP giữ sẵn tối đa
+    SMTP_POOL_IDLE_SECONDS: int = int(os.getenv("SMTP_POOL_IDLE_SECONDS", "60"))  # Nghỉ lâu hơn thì NOOP kiểm tra lại
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
     
     # Upload settings
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "static/uploads")
     
+    # Image GC settings (dọn ảnh/file không còn được tham chiếu)
+    IMAGE_GC_ENABLED: bool = os.getenv("IMAGE_GC_ENABLED", "true").lower() == "true"
+    IMAGE_GC_DRY_RUN: bool = os.getenv("IMAGE_GC_DRY_RUN", "true").lower() == "true"
+    IMAGE_GC_INTERVAL_SECONDS: int = int(os.getenv("IMAGE_GC_INTERVAL_SECONDS", "86400"))
+    IMAGE_GC_GRACE_HOURS: int = int(os.getenv("IMAGE_GC_GRACE_HOURS", "24"))
+    IMAGE_GC_CATEGORIES: str = os.getenv("IMAGE_GC_CATEGORIES", "service,banner,printing")
+    EXPORT_FILE_TTL_HOURS: int = int(os.getenv("EXPORT_FILE_TTL_HOURS", "1"))
+    
+    # Email outbox: worker gửi nền, thử lại với exponential backoff
+    EMAIL_OUTBOX_ENABLED: bool = os.getenv("EMAIL_OUTBOX_ENABLED", "true").lower() == "true"
+    EMAIL_OUTBOX_POLL_SECONDS: int = int(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "15"))
+    EMAIL_OUTBOX_WORKERS: int = int(os.getenv("EMAIL_OUTBOX_WORKERS", "2"))
+    EMAIL_OUTBOX_BATCH_SIZE: int = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+    EMAIL_OUTBOX_BACKOFF_SECONDS: int = int(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "30"))
+    EMAIL_OUTBOX_MAX_BACKOFF_SECONDS: int = int(os.getenv("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", "21600"))
+    EMAIL_OUTBOX_LOCK_TIMEOUT_SECONDS: int = int(os.getenv("EMAIL_OUTBOX_LOCK_TIMEOUT_SECONDS", "600"))
+    EMAIL_OUTBOX_RETENTION_DAYS: int = int(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", "30"))
+    
+    # Thông báo admin: gom đơn hàng / liên hệ mới vào email tổng hợp (digest)
+    ADMIN_DIGEST_ENABLED: bool = os.getenv("ADMIN_DIGEST_ENABLED", "true").lower() == "true"
+    ADMIN_DIGEST_WINDOW_SECONDS: int = int(os.getenv("ADMIN_DIGEST_WINDOW_SECONDS", "300"))  # Gửi khi thông báo cũ nhất chờ quá thời gian này
+    ADMIN_DIGEST_MAX_EVENTS: int = int(os.getenv("ADMIN_DIGEST_MAX_EVENTS", "20"))  # Hoặc khi đủ số thông báo này
+    ADMIN_DIGEST_CHECK_SECONDS: int = int(os.getenv("ADMIN_DIGEST_CHECK_SECONDS", "30"))
+    # Thông báo ưu tiên cao (gửi email riêng ngay): theo loại, số lượng đặt hoặc từ khóa
+    ADMIN_NOTIFY_IMMEDIATE_KINDS: str = os.getenv("ADMIN_NOTIFY_IMMEDIATE_KINDS", "")  # VD: "order,contact"
+    ADMIN_NOTIFY_IMMEDIATE_MIN_QUANTITY: int = int(os.getenv("ADMIN_NOTIFY_IMMEDIATE_MIN_QUANTITY", "0"))  # 0: tắt
+    ADMIN_NOTIFY_IMMEDIATE_KEYWORDS: str = os.getenv("ADMIN_NOTIFY_IMMEDIATE_KEYWORDS", "gấp,khẩn,urgent")
+    
+    # Rate limit cho endpoint public (dạng "số lượt/second|minute|hour|day", "0" để tắt)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | redis (dùng chung giữa các worker)
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    RATE_LIMIT_ORDERS: str = os.getenv("RATE_LIMIT_ORDERS", "5/minute")
+    RATE_LIMIT_ORDERS_GLOBAL: str = os.getenv("RATE_LIMIT_ORDERS_GLOBAL", "120/minute")
+    RATE_LIMIT_CONTACT: str = os.getenv("RATE_LIMIT_CONTACT", "3/minute")
+    RATE_LIMIT_CONTACT_GLOBAL: str = os.getenv("RATE_LIMIT_CONTACT_GLOBAL", "60/minute")
+    RATE_LIMIT_REVIEWS: str = os.getenv("RATE_LIMIT_REVIEWS", "5/minute")
+    RATE_LIMIT_REVIEWS_GLOBAL: str = os.getenv("RATE_LIMIT_REVIEWS_GLOBAL", "120/minute")
+    RATE_LIMIT_PARSE_CONTENT: str = os.getenv("RATE_LIMIT_PARSE_CONTENT", "30/minute")
+    RATE_LIMIT_PARSE_CONTENT_GLOBAL: str = os.getenv("RATE_LIMIT_PARSE_CONTENT_GLOBAL", "600/minute")
+    # Upload file thiết kế: một file lớn gồm nhiều chunk nên giới hạn chunk rộng hơn
+    RATE_LIMIT_UPLOAD_CREATE: str = os.getenv("RATE_LIMIT_UPLOAD_CREATE", "10/minute")
+    RATE_LIMIT_UPLOAD_CREATE_GLOBAL: str = os.getenv("RATE_LIMIT_UPLOAD_CREATE_GLOBAL", "300/minute")
+    RATE_LIMIT_UPLOAD_CHUNK: str = os.getenv("RATE_LIMIT_UPLOAD_CHUNK", "120/minute")
+    RATE_LIMIT_UPLOAD_CHUNK_GLOBAL: str = os.getenv("RATE_LIMIT_UPLOAD_CHUNK_GLOBAL", "3000/minute")
+    RATE_LIMIT_PRESIGN_DESIGN: str = os.getenv("RATE_LIMIT_PRESIGN_DESIGN", "10/minute")
+    RATE_LIMIT_PRESIGN_DESIGN_GLOBAL: str = os.getenv("RATE_LIMIT_PRESIGN_DESIGN_GLOBAL", "300/minute")
+    RATE_LIMIT_STORAGE_PUT: str = os.getenv("RATE_LIMIT_STORAGE_PUT", "10/minute")
+    RATE_LIMIT_STORAGE_PUT_GLOBAL: str = os.getenv("RATE_LIMIT_STORAGE_PUT_GLOBAL", "300/minute")
+    
+    # Bulk upload ảnh: số file tối đa mỗi request và số worker xử lý song song
+    IMAGE_BULK_MAX_FILES: int = int(os.getenv("IMAGE_BULK_MAX_FILES", "50"))
+    IMAGE_BULK_WORKERS: int = int(os.getenv("IMAGE_BULK_WORKERS", "4"))
+    
+    # Static files cache (giây)
+    STATIC_IMMUTABLE_MAX_AGE: int = int(os.getenv("STATIC_IMMUTABLE_MAX_AGE", "31536000"))
+    STATIC_DEFAULT_MAX_AGE: int = int(os.getenv("STATIC_DEFAULT_MAX_AGE", "3600"))
+    IMAGE_DOWNLOAD_MAX_AGE: int = int(os.getenv("IMAGE_DOWNLOAD_MAX_AGE", "86400"))
+    
+    # Storage settings (local | s3)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    STORAGE_LOCAL_ROOT: str = os.getenv("STORAGE_LOCAL_ROOT", "static")
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "phulong")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")  # VD: http://minio:9000
+    S3_REGION: str = os.getenv("S3_REGION", "ap-southeast-1")
+    S3_ACCESS_KEY: str = os.getenv("S3_ACCESS_KEY", "")
+    S3_SECRET_KEY: str = os.getenv("S3_SECRET_KEY", "")
+    S3_PUBLIC_URL: str = os.getenv("S3_PUBLIC_URL", "")  # URL CDN/public của bucket
+    PRESIGN_EXPIRE_SECONDS: int = int(os.getenv("PRESIGN_EXPIRE_SECONDS", "900"))
+    DESIGN_FILE_MAX_SIZE: int = int(os.getenv("DESIGN_FILE_MAX_SIZE", str(500 * 1024 * 1024)))
+    
+    # Resumable upload settings (upload file thiết kế theo chunk)
+    RESUMABLE_UPLOAD_TMP_DIR: str = os.getenv("RESUMABLE_UPLOAD_TMP_DIR", "data/resumable_uploads")
+    RESUMABLE_UPLOAD_EXPIRE_HOURS: int = int(os.getenv("RESUMABLE_UPLOAD_EXPIRE_HOURS", "24"))
+    RESUMABLE_CHUNK_SIZE: int = int(os.getenv("RESUMABLE_CHUNK_SIZE", str(5 * 1024 * 1024)))
+    RESUMABLE_UPLOAD_CLEANUP_INTERVAL_SECONDS: int = int(os.getenv("RESUMABLE_UPLOAD_CLEANUP_INTERVAL_SECONDS", "3600"))
+    
     # Backend URL for absolute paths
     BACKEND_URL: str = os.getenv("BACKEND_URL", "")
     
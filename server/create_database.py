@@ -1,15 +1,50 @@
+import os
+import sys
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
 from config.database import engine
 from models.models import Base
 
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+# Migration partition admin_access_logs (f9b1c3d5e7a9) và revision ngay trước nó:
+# create_all không tạo được bảng partition nên database PostgreSQL mới vẫn phải chạy migration này
+PARTITION_REVISION = "f9b1c3d5e7a9"
+PARTITION_DOWN_REVISION = "e8a0b2c4d6f8"
+
 def create_database():
+    """
+    Chuẩn bị schema trước khi worker khởi động (entrypoint của container)
+    - Database trống: create_all, chạy migration partition admin_access_logs rồi `alembic stamp head`
+      (các bảng / index khác tạo từ models đã ở phiên bản mới nhất)
+    - Database đã có alembic_version: `alembic upgrade head` (partition, index CONCURRENTLY...
+      mà create_all không thêm vào bảng đã tồn tại)
+    - Database cũ tạo bằng create_all nhưng chưa có alembic_version: không đoán được revision,
+      cần chạy tay `alembic stamp <revision đúng với schema>` rồi khởi động lại
+    """
     try:
-        # Tạo tất cả các bảng
-        Base.metadata.create_all(bind=engine)
-        print("Tất cả các bảng đã được tạo thành công!")
+        tables = set(inspect(engine).get_table_names())
+        config = Config(ALEMBIC_INI)
+        if not tables:
+            Base.metadata.create_all(bind=engine)
+            if engine.dialect.name == "postgresql":
+                command.stamp(config, PARTITION_DOWN_REVISION)
+                command.upgrade(config, PARTITION_REVISION)
+            command.stamp(config, "head")
+            print("Tất cả các bảng đã được tạo thành công!")
+        elif "alembic_version" in tables:
+            command.upgrade(config, "head")
+            print("Đã chạy migration tới phiên bản mới nhất!")
+        else:
+            print("Database chưa có alembic_version: chạy `alembic stamp <revision>` đúng với schema hiện tại "
+                  "rồi khởi động lại để áp dụng migration")
+            return False
         return True
     except Exception as e:
-        print(f"Lỗi khi tạo bảng: {str(e)}")
+        print(f"Lỗi khi tạo bảng / chạy migration: {str(e)}")
         return False
 
 if __name__ == "__main__":
-    create_database() 
\ No newline at end of file
+    if not create_database():
+        sys.exit(1)
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import sessionmaker
-from passlib.context import CryptContext
+from utils.passwords import hash_password
 from models.models import User, UserRole
 from config.database import engine
 
@@ -7,12 +7,6 @@ from config.database import engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 db = SessionLocal()
 
-# Mã hóa mật khẩu
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 # Kiểm tra xem người dùng root đã tồn tại chưa
 existing_user = db.query(User).filter(User.username == "root").first()
 
@@ -20,7 +14,7 @@ if existing_user:
     print("Tài khoản root đã tồn tại!")
 else:
     # Tạo người dùng root
-    hashed_password = get_password_hash("inphulong0977007763")
+    hashed_password = hash_password("inphulong0977007763")
     root_user = User(
         username="root",
         email="root@phulong.com",
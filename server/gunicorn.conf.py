@@ -0,0 +1,39 @@
+"""
+Cấu hình gunicorn cho production: nhiều uvicorn worker, giá trị lấy từ config/settings (.env)
+
+Chạy: gunicorn -c gunicorn.conf.py main:app
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config.settings import settings
+from config.server import worker_count
+
+bind = settings.SERVER_BIND
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = worker_count()
+
+# Import app một lần ở master rồi fork: các worker dùng chung trang bộ nhớ (copy-on-write)
+preload_app = settings.SERVER_PRELOAD
+
+# Tái tạo worker sau một số request (jitter để các worker không restart cùng lúc) để chặn rò rỉ bộ nhớ
+max_requests = settings.SERVER_MAX_REQUESTS
+max_requests_jitter = settings.SERVER_MAX_REQUESTS_JITTER
+
+timeout = settings.SERVER_TIMEOUT
+graceful_timeout = settings.SERVER_GRACEFUL_TIMEOUT
+keepalive = settings.SERVER_KEEPALIVE
+forwarded_allow_ips = settings.SERVER_FORWARDED_ALLOW_IPS
+
+accesslog = "-"
+errorlog = "-"
+
+def post_fork(server, worker):
+    # Kết nối DB không được dùng chung giữa các process sau khi fork
+    from config.database import engine
+    engine.dispose(close=False)
+
+def when_ready(server):
+    server.log.info(f"Phú Long API: {workers} worker (preload={preload_app}, max_requests={max_requests})")
@@ -0,0 +1 @@
+"""Bộ đo tải: sinh dữ liệu có seed (seed), chạy kịch bản tải (runner), báo cáo / so sánh kết quả (report)"""
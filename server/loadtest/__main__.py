@@ -0,0 +1,109 @@
+"""
+Bộ đo tải Phú Long API
+
+Chạy từ thư mục server/:
+  python -m loadtest seed --scale large [--seed 42] [--database-url postgresql://...]
+  python -m loadtest run --base-url http://localhost:8000 --scenario catalog,orders,dashboard,exports \\
+      [--users 50] [--duration 60] [--warmup 5]
+  python -m loadtest compare loadtest/results/<cũ>.json loadtest/results/<mới>.json
+
+Khi đo tải nên tắt rate limit trên server (RATE_LIMIT_ENABLED=false), nếu không các request
+POST /api/orders/ bị trả 429 và được tính là lỗi trong báo cáo.
+Mỗi lần run ghi <thời gian>-<commit>.json và .md vào loadtest/results/ để so sánh giữa các commit.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from config.database import Base, DATABASE_URL
+from loadtest.report import build_report, compare, load_report, to_markdown, write_report
+from loadtest.runner import SCENARIOS, run_load
+from loadtest.seed import LOADTEST_PASSWORD, LOADTEST_USERNAME, SCALES, seed_database
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def seed_command(args):
+    engine = create_engine(args.database_url or DATABASE_URL)
+    if args.create_tables:
+        Base.metadata.create_all(bind=engine)
+    counts = dict(SCALES[args.scale])
+    for override in args.count or []:
+        table, _, value = override.partition("=")
+        counts[table] = int(value)
+    now = datetime.strptime(args.now, "%Y-%m-%d") if args.now else None
+    db = sessionmaker(bind=engine)()
+    try:
+        inserted = seed_database(db, counts, seed=args.seed, now=now,
+                                 progress=lambda table, count: print(f"{table:<20} {count:>9}"))
+    finally:
+        db.close()
+    print(f"Tổng cộng {sum(inserted.values())} bản ghi")
+
+def run_command(args):
+    scenarios = [name.strip() for name in args.scenario.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Kịch bản không tồn tại: {', '.join(unknown)} (có: {', '.join(SCENARIOS)})")
+    result = asyncio.run(run_load(
+        args.base_url, scenarios, users=args.users, duration=args.duration, warmup=args.warmup,
+        seed=args.seed, username=args.username, password=args.password
+    ))
+    config = {"base_url": args.base_url, "scenarios": ",".join(scenarios), "users": args.users,
+              "duration": args.duration, "warmup": args.warmup, "seed": args.seed, "label": args.label}
+    report = build_report(result, config)
+    print(to_markdown(report))
+    print(f"Đã ghi báo cáo: {write_report(report, args.output)}")
+
+def compare_command(args):
+    rows = compare(load_report(args.baseline), load_report(args.current), threshold=args.threshold)
+    print(f"{'endpoint':<40} {'p95 trước':>10} {'p95 sau':>10} {'Δp95':>8} {'req/s trước':>12} {'req/s sau':>10} {'Δreq/s':>8}")
+    for row in rows:
+        flag = "  <-- chậm hơn" if row["regression"] else ""
+        print(f"{row['endpoint']:<40} {row['p95_before']:10.1f} {row['p95_after']:10.1f} {row['p95_change'] * 100:7.1f}% "
+              f"{row['rps_before']:12.1f} {row['rps_after']:10.1f} {row['rps_change'] * 100:7.1f}%{flag}")
+    if any(row["regression"] for row in rows):
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed = commands.add_parser("seed", help="Sinh dữ liệu giả lập có seed cố định")
+    seed.add_argument("--scale", choices=sorted(SCALES), default="small")
+    seed.add_argument("--count", action="append", metavar="BẢNG=SỐ", help="Ghi đè số lượng, ví dụ --count orders=250000")
+    seed.add_argument("--seed", type=int, default=42)
+    seed.add_argument("--now", help="Mốc thời gian YYYY-MM-DD (mặc định hôm nay), cố định để tái lập dữ liệu")
+    seed.add_argument("--database-url", help="Mặc định DATABASE_URL của ứng dụng")
+    seed.add_argument("--create-tables", action="store_true", help="create_all trước khi seed (DB trống, không dùng Alembic)")
+    seed.set_defaults(func=seed_command)
+
+    run = commands.add_parser("run", help="Chạy kịch bản tải vào server đang chạy")
+    run.add_argument("--base-url", default="http://localhost:8000")
+    run.add_argument("--scenario", default="catalog,orders,dashboard,exports")
+    run.add_argument("--users", type=int, default=20)
+    run.add_argument("--duration", type=float, default=30)
+    run.add_argument("--warmup", type=float, default=3)
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--username", default=LOADTEST_USERNAME)
+    run.add_argument("--password", default=LOADTEST_PASSWORD)
+    run.add_argument("--label", default="", help="Ghi chú cho lần chạy (lưu trong báo cáo)")
+    run.add_argument("--output", default=RESULTS_DIR)
+    run.set_defaults(func=run_command)
+
+    diff = commands.add_parser("compare", help="So sánh hai báo cáo, exit 1 nếu có endpoint chậm đi")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+    diff.add_argument("--threshold", type=float, default=0.10)
+    diff.set_defaults(func=compare_command)
+
+    logging.basicConfig(level=logging.WARNING)
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Báo cáo kết quả tải: throughput và phân vị độ trễ theo endpoint, lưu JSON (so sánh giữa các commit)
+kèm bảng Markdown để đọc nhanh
+"""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+PERCENTILES = (50, 90, 95, 99)
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Phân vị theo nội suy tuyến tính giữa hai điểm gần nhất (giá trị đầu vào đã sắp xếp)"""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+def summarize(latencies: Sequence[float], elapsed: float, errors: int = 0) -> dict:
+    """Tóm tắt một endpoint: số request, req/s, tỷ lệ lỗi, độ trễ (ms) trung bình / max / các phân vị"""
+    values = sorted(latencies)
+    count = len(values)
+    summary = {
+        "requests": count,
+        "rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "mean_ms": round(sum(values) / count * 1000, 2) if count else 0.0,
+        "max_ms": round(values[-1] * 1000, 2) if count else 0.0,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = round(percentile(values, pct) * 1000, 2)
+    return summary
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_report(result: dict, config: dict) -> dict:
+    elapsed = result["elapsed"]
+    endpoints = {}
+    all_latencies: List[float] = []
+    total_errors = 0
+    for name, stats in sorted(result["stats"].items()):
+        endpoints[name] = summarize(stats.latencies, elapsed, stats.errors)
+        endpoints[name]["statuses"] = {str(status): count for status, count in sorted(stats.statuses.items())}
+        endpoints[name]["bytes"] = stats.bytes
+        all_latencies.extend(stats.latencies)
+        total_errors += stats.errors
+    return {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "config": config,
+        "elapsed_seconds": round(elapsed, 2),
+        "total": summarize(all_latencies, elapsed, total_errors),
+        "endpoints": endpoints,
+    }
+
+def to_markdown(report: dict) -> str:
+    header = "| endpoint | req | req/s | err % | mean | p50 | p90 | p95 | p99 | max |"
+    lines = [
+        f"# Load test {report['created_at']} ({report.get('git_revision') or 'no git'})",
+        "",
+        "Cấu hình: " + ", ".join(f"{key}={value}" for key, value in report["config"].items()),
+        "",
+        header,
+        "|" + "---|" * 10,
+    ]
+    rows = list(report["endpoints"].items()) + [("**TOTAL**", report["total"])]
+    for name, stats in rows:
+        lines.append(
+            f"| {name} | {stats['requests']} | {stats['rps']:.1f} | {stats['error_rate'] * 100:.1f} | "
+            f"{stats['mean_ms']:.1f} | {stats['p50_ms']:.1f} | {stats['p90_ms']:.1f} | {stats['p95_ms']:.1f} | "
+            f"{stats['p99_ms']:.1f} | {stats['max_ms']:.1f} |"
+        )
+    return "\n".join(lines) + "\n"
+
+def write_report(report: dict, output_dir: str) -> str:
+    """Ghi <thời gian>-<commit>.json và .md vào output_dir, trả về đường dẫn file JSON"""
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    base = os.path.join(output_dir, f"{stamp}-{report.get('git_revision') or 'local'}")
+    with open(f"{base}.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    with open(f"{base}.md", "w", encoding="utf-8") as f:
+        f.write(to_markdown(report))
+    return f"{base}.json"
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> List[dict]:
+    """
+    So sánh hai báo cáo theo endpoint chung: thay đổi req/s và p95
+    regression=True khi p95 tăng hoặc req/s giảm quá threshold (mặc định 10%)
+    """
+    rows = []
+    for name in sorted(set(baseline["endpoints"]) & set(current["endpoints"])):
+        before, after = baseline["endpoints"][name], current["endpoints"][name]
+        p95_change = (after["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        rps_change = (after["rps"] - before["rps"]) / before["rps"] if before["rps"] else 0.0
+        rows.append({
+            "endpoint": name,
+            "p95_before": before["p95_ms"], "p95_after": after["p95_ms"], "p95_change": round(p95_change, 4),
+            "rps_before": before["rps"], "rps_after": after["rps"], "rps_change": round(rps_change, 4),
+            "regression": p95_change > threshold or rps_change < -threshold,
+        })
+    return rows
+
+def load_report(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
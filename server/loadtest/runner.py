@@ -0,0 +1,164 @@
+"""
+Driver tải bằng asyncio + httpx: N người dùng ảo chạy song song trong một khoảng thời gian,
+mỗi lượt chọn một request theo trọng số của kịch bản và ghi lại độ trễ theo endpoint
+"""
+import asyncio
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import httpx
+from loadtest.seed import LOADTEST_PASSWORD, LOADTEST_USERNAME
+from utils.slug import create_slug
+
+@dataclass
+class Target:
+    """Dữ liệu lấy từ API lúc khởi động (slug, id) để các request trỏ tới bản ghi có thật"""
+    service_slugs: List[str] = field(default_factory=list)
+    service_ids: List[int] = field(default_factory=list)
+    printing_slugs: List[str] = field(default_factory=list)
+    printing_total: int = 0
+    token: Optional[str] = None
+
+@dataclass
+class Step:
+    name: str  # Tên endpoint trong báo cáo (path dạng mẫu, ví dụ GET /api/services/{slug})
+    weight: int
+    build: Callable[[random.Random, Target], dict]  # Trả về tham số cho httpx.AsyncClient.request
+    admin: bool = False
+
+def _auth(target: Target) -> dict:
+    return {"Authorization": f"Bearer {target.token}"}
+
+SCENARIOS: Dict[str, List[Step]] = {
+    "catalog": [
+        Step("GET /api/services/", 20, lambda rng, t: {"method": "GET", "url": "/api/services/",
+                                                       "params": {"is_active": "true", "limit": 24}}),
+        Step("GET /api/services/{slug}", 25, lambda rng, t: {"method": "GET", "url": f"/api/services/{rng.choice(t.service_slugs)}"}),
+        Step("GET /api/services/{slug}/reviews", 10, lambda rng, t: {
+            "method": "GET", "url": f"/api/services/{rng.choice(t.service_slugs)}/reviews"}),
+        Step("GET /api/services/suggested", 5, lambda rng, t: {
+            "method": "GET", "url": "/api/services/suggested", "params": {"current_id": rng.choice(t.service_ids)}}),
+        Step("GET /api/printing/", 15, lambda rng, t: {
+            "method": "GET", "url": "/api/printing/",
+            "params": {"is_visible": "true", "limit": 12, "skip": rng.randrange(0, max(1, min(t.printing_total, 600)), 12)}}),
+        Step("GET /api/printing/{slug}", 20, lambda rng, t: {"method": "GET", "url": f"/api/printing/{rng.choice(t.printing_slugs)}"}),
+        Step("GET /api/banners/active", 5, lambda rng, t: {"method": "GET", "url": "/api/banners/active"}),
+    ],
+    "orders": [
+        Step("POST /api/orders/", 1, lambda rng, t: {
+            "method": "POST", "url": "/api/orders/",
+            "data": {
+                "customer_name": "Khách tải thử", "customer_email": f"load{rng.randrange(10 ** 6)}@example.com",
+                "customer_phone": "0901234567", "service_id": str(rng.choice(t.service_ids)),
+                "quantity": str(rng.choice([100, 500, 1000])), "size": "A4", "material": "Couche 300",
+            }}),
+    ],
+    "dashboard": [
+        Step("GET /api/dashboard/summary", 20, lambda rng, t: {"method": "GET", "url": "/api/dashboard/summary", "headers": _auth(t)}, True),
+        Step("GET /api/dashboard/revenue-by-date", 15, lambda rng, t: {
+            "method": "GET", "url": "/api/dashboard/revenue-by-date", "headers": _auth(t)}, True),
+        Step("GET /api/dashboard/orders-by-service", 15, lambda rng, t: {
+            "method": "GET", "url": "/api/dashboard/orders-by-service", "headers": _auth(t)}, True),
+        Step("GET /api/orders/", 30, lambda rng, t: {
+            "method": "GET", "url": "/api/orders/", "headers": _auth(t),
+            "params": {"skip": rng.randrange(0, 2000, 20), "limit": 20,
+                       "status": rng.choice(["pending", "processing", "completed"])}}, True),
+        Step("GET /api/users/access-logs/admin", 10, lambda rng, t: {
+            "method": "GET", "url": "/api/users/access-logs/admin", "headers": _auth(t), "params": {"limit": 50}}, True),
+        Step("GET /api/auth/login-history", 10, lambda rng, t: {
+            "method": "GET", "url": "/api/auth/login-history", "headers": _auth(t), "params": {"limit": 50}}, True),
+    ],
+    "exports": [
+        Step("GET /api/orders/export/csv", 1, lambda rng, t: {
+            "method": "GET", "url": "/api/orders/export/csv", "headers": _auth(t),
+            "params": {"status": rng.choice(["completed", "pending", "processing"])}}, True),
+    ],
+}
+
+# Tỷ lệ lượt request giữa các kịch bản khi chạy chung (trọng số Step chỉ so sánh trong một kịch bản)
+SCENARIO_WEIGHTS = {"catalog": 70, "orders": 10, "dashboard": 15, "exports": 5}
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)  # giây
+    errors: int = 0
+    statuses: Dict[int, int] = field(default_factory=lambda: defaultdict(int))
+    bytes: int = 0
+
+async def discover(client: httpx.AsyncClient, login: bool, username: str, password: str) -> Target:
+    """Lấy slug / id thật từ API và đăng nhập (nếu kịch bản cần quyền admin)"""
+    target = Target()
+    services = (await client.get("/api/services/", params={"is_active": "true", "limit": 500})).json()
+    target.service_slugs = [create_slug(service["name"]) for service in services]
+    target.service_ids = [service["id"] for service in services]
+    printings = (await client.get("/api/printing/", params={"is_visible": "true", "limit": 200})).json()
+    target.printing_slugs = [create_slug(printing["title"]) for printing in printings["items"]]
+    target.printing_total = printings["total"]
+    if not target.service_slugs or not target.printing_slugs:
+        raise RuntimeError("Database chưa có dữ liệu, chạy 'python -m loadtest seed' trước")
+    if login:
+        response = await client.post("/api/auth/login-json", json={"username": username, "password": password})
+        response.raise_for_status()
+        target.token = response.json()["access_token"]
+    return target
+
+async def run_load(
+    base_url: str,
+    scenarios: List[str],
+    users: int = 20,
+    duration: float = 30.0,
+    warmup: float = 3.0,
+    seed: int = 42,
+    username: str = LOADTEST_USERNAME,
+    password: str = LOADTEST_PASSWORD,
+    timeout: float = 30.0,
+) -> dict:
+    """
+    Chạy tải và trả về kết quả thô: {"elapsed": giây đo, "stats": {endpoint: EndpointStats}}
+    Request trong thời gian warmup không được tính vào kết quả
+    """
+    steps: List[Step] = []
+    weights: List[float] = []
+    for name in scenarios:
+        scenario_total = sum(step.weight for step in SCENARIOS[name])
+        for step in SCENARIOS[name]:
+            steps.append(step)
+            weights.append(SCENARIO_WEIGHTS[name] * step.weight / scenario_total)
+    stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        target = await discover(client, any(step.admin for step in steps), username, password)
+        started = time.perf_counter()
+        measure_from = started + warmup
+        deadline = measure_from + duration
+
+        async def user(index: int):
+            rng = random.Random(seed * 1000 + index)
+            while True:
+                if time.perf_counter() >= deadline:
+                    return
+                step = rng.choices(steps, weights=weights)[0]
+                request = step.build(rng, target)
+                begin = time.perf_counter()
+                try:
+                    response = await client.request(**request)
+                    status, size = response.status_code, len(response.content)
+                except httpx.HTTPError:
+                    status, size = 0, 0
+                end = time.perf_counter()
+                if begin < measure_from:
+                    continue
+                endpoint = stats[step.name]
+                endpoint.latencies.append(end - begin)
+                endpoint.statuses[status] += 1
+                endpoint.bytes += size
+                if status == 0 or status >= 400:
+                    endpoint.errors += 1
+
+        await asyncio.gather(*(user(i) for i in range(users)))
+        elapsed = time.perf_counter() - measure_from
+
+    return {"elapsed": elapsed, "stats": dict(stats)}
@@ -0,0 +1,273 @@
+"""
+Sinh dữ liệu giả lập có seed cố định để đo tải / hiệu năng
+
+Cùng seed và cùng mốc thời gian (now) luôn sinh ra đúng một bộ dữ liệu; các mốc thời gian được
+tính lùi từ now (mặc định là 0h UTC hôm nay) để dashboard "7 ngày gần nhất" vẫn có dữ liệu.
+Bản ghi được chèn theo lô bằng INSERT nhiều dòng, id tính tiếp từ id lớn nhất đang có.
+"""
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+from sqlalchemy import func, insert, text
+from sqlalchemy.orm import Session
+from models.models import (
+    AdminAccessLog, Contact, Image, ImageReference, LoginHistory, Order, Printing, PrintingImage,
+    Service, ServiceReview, User, UserRole
+)
+from utils.image_refs import REF_PRINTING, REF_PRINTING_CONTENT, REF_SERVICE
+from utils.passwords import hash_password
+from utils.tasks import ensure_access_log_partitions, is_access_log_partitioned
+
+logger = logging.getLogger("phulong-api")
+
+# Quy mô dữ liệu: tiny cho test hiệu năng trong CI, large cho đo tải thật
+SCALES: Dict[str, Dict[str, int]] = {
+    "tiny": {"admins": 3, "services": 40, "printings": 60, "orders": 2000, "reviews": 200,
+             "contacts": 100, "login_history": 500, "access_logs": 5000},
+    "small": {"admins": 5, "services": 500, "printings": 1000, "orders": 10000, "reviews": 2000,
+              "contacts": 1000, "login_history": 5000, "access_logs": 100000},
+    "large": {"admins": 10, "services": 5000, "printings": 10000, "orders": 100000, "reviews": 20000,
+              "contacts": 10000, "login_history": 50000, "access_logs": 1000000},
+}
+
+LOADTEST_USERNAME = "loadtest"
+LOADTEST_PASSWORD = "loadtest-password"
+BATCH_SIZE = 5000
+
+CATEGORIES = ["in-an", "bao-bi", "quang-cao", "van-phong-pham", "qua-tang"]
+PRODUCTS = ["Name card", "Tờ rơi", "Catalogue", "Hộp giấy", "Túi giấy", "Standee", "Tem nhãn", "Lịch tết", "Phong bì", "Menu"]
+MATERIALS = ["Couche 150", "Couche 300", "Ivory 350", "Kraft", "Decal giấy", "Decal nhựa"]
+SIZES = ["A3", "A4", "A5", "9x5.5cm", "10x15cm", "60x160cm"]
+ORDER_STATUSES = ["pending", "processing", "completed", "cancelled"]
+ORDER_STATUS_WEIGHTS = [20, 15, 55, 10]
+FIRST_NAMES = ["An", "Bình", "Chi", "Dũng", "Giang", "Hà", "Hùng", "Lan", "Minh", "Ngọc", "Phúc", "Quân", "Thảo", "Trang", "Vy"]
+LAST_NAMES = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Võ", "Đặng", "Bùi"]
+ADMIN_ENDPOINTS = [
+    ("/api/orders/", "GET"), ("/api/dashboard/summary", "GET"), ("/api/services/", "POST"),
+    ("/api/orders/{id}", "PUT"), ("/api/users/", "GET"), ("/api/blogs/", "POST"), ("/api/orders/export/csv", "GET"),
+]
+PARAGRAPH = (
+    "Phú Long nhận in ấn số lượng lớn với máy in offset hiện đại, màu sắc chuẩn và thời gian giao hàng nhanh. "
+    "Khách hàng được tư vấn miễn phí chất liệu, kích thước và cách hoàn thiện phù hợp với ngân sách. "
+)
+
+def service_name(index: int) -> str:
+    return f"{PRODUCTS[index % len(PRODUCTS)]} {CATEGORIES[index % len(CATEGORIES)]} mẫu {index + 1}"
+
+def printing_title(index: int) -> str:
+    return f"Bài đăng in {PRODUCTS[index % len(PRODUCTS)].lower()} số {index + 1}"
+
+def _next_id(db: Session, model) -> int:
+    return (db.query(func.max(model.id)).scalar() or 0) + 1
+
+def _insert_batches(db: Session, model, rows: Iterator[dict]) -> int:
+    """Chèn theo lô BATCH_SIZE dòng (commit mỗi lô để không giữ transaction quá dài)"""
+    total = 0
+    batch: List[dict] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.execute(insert(model), batch)
+            db.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert(model), batch)
+        db.commit()
+        total += len(batch)
+    return total
+
+def _reset_sequences(db: Session, models: List):
+    """Sau khi chèn id tường minh, đồng bộ sequence của PostgreSQL với id lớn nhất"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__tablename__
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        ))
+    db.commit()
+
+def _random_time(rng: random.Random, now: datetime, days: int) -> datetime:
+    return now - timedelta(seconds=rng.randrange(days * 86400))
+
+def _person(rng: random.Random):
+    name = f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}"
+    handle = f"khach{rng.randrange(10 ** 6):06d}"
+    return name, f"{handle}@example.com", f"09{rng.randrange(10 ** 8):08d}"
+
+def _ensure_users(db: Session, admins: int, password: str) -> List[int]:
+    """User root 'loadtest' (đăng nhập trong kịch bản tải) và các admin sinh log truy cập"""
+    hashed = hash_password(password)
+    wanted = [(LOADTEST_USERNAME, UserRole.ROOT)] + [(f"loadtest-admin-{i + 1}", UserRole.ADMIN) for i in range(admins)]
+    ids = []
+    for username, role in wanted:
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            user = User(username=username, email=f"{username}@phulong.vn", hashed_password=hashed, role=role, is_active=True)
+            db.add(user)
+            db.flush()
+        ids.append(user.id)
+    db.commit()
+    return ids
+
+def seed_database(
+    db: Session,
+    counts: Dict[str, int],
+    seed: int = 42,
+    now: Optional[datetime] = None,
+    password: str = LOADTEST_PASSWORD,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> Dict[str, int]:
+    """
+    Sinh dữ liệu theo counts (xem SCALES) vào database của session, trả về số bản ghi đã chèn theo bảng
+    """
+    rng = random.Random(seed)
+    now = now or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    progress = progress or (lambda table, count: logger.info(f"Seed {table}: {count} bản ghi"))
+    inserted: Dict[str, int] = {}
+
+    def record(table: str, count: int):
+        inserted[table] = count
+        progress(table, count)
+
+    user_ids = _ensure_users(db, counts["admins"], password)
+    root_id, admin_ids = user_ids[0], user_ids[1:] or user_ids
+
+    # Ảnh: một ảnh cho mỗi dịch vụ và mỗi bài đăng in ấn
+    image_start = _next_id(db, Image)
+    image_count = counts["services"] + counts["printings"]
+
+    def image_rows():
+        for i in range(image_count):
+            image_id = image_start + i
+            created = _random_time(rng, now, 365)
+            yield {
+                "id": image_id, "filename": f"seed-{image_id}.jpg", "file_path": f"static/images/uploads/seed-{image_id}.jpg",
+                "url": f"/static/images/uploads/seed-{image_id}.jpg", "alt_text": f"Ảnh mẫu {image_id}",
+                "file_size": rng.randrange(40_000, 900_000), "mime_type": "image/jpeg", "width": 1200, "height": 800,
+                "is_visible": True, "category": "service" if i < counts["services"] else "printing",
+                "uploaded_by": root_id, "created_at": created, "updated_at": created,
+            }
+    record("images", _insert_batches(db, Image, image_rows()))
+
+    service_start = _next_id(db, Service)
+
+    def service_rows():
+        for i in range(counts["services"]):
+            created = _random_time(rng, now, 365)
+            yield {
+                "id": service_start + i, "name": service_name(service_start + i - 1),
+                "description": PARAGRAPH * rng.randint(2, 8), "price": float(rng.randrange(50, 5000) * 1000),
+                "image_id": image_start + i, "category": CATEGORIES[i % len(CATEGORIES)],
+                "is_active": rng.random() < 0.9, "featured": rng.random() < 0.1,
+                "created_at": created, "updated_at": created,
+            }
+    record("services", _insert_batches(db, Service, service_rows()))
+
+    printing_start = _next_id(db, Printing)
+    printing_image_start = image_start + counts["services"]
+    printing_image_ids = range(printing_image_start, printing_image_start + counts["printings"])
+    attachments: List[dict] = []
+    content_refs: List[dict] = []
+
+    def printing_rows():
+        for i in range(counts["printings"]):
+            printing_id = printing_start + i
+            shortcodes = rng.sample(printing_image_ids, min(3, len(printing_image_ids)))
+            parts = [PARAGRAPH * rng.randint(1, 4) + f"[image:{image_id}|Ảnh minh họa]\n" for image_id in shortcodes]
+            created = _random_time(rng, now, 365)
+            for order, image_id in enumerate(rng.sample(printing_image_ids, min(3, len(printing_image_ids))), start=1):
+                attachments.append({"printing_id": printing_id, "image_id": image_id, "order": order, "created_at": created})
+            content_refs.extend(
+                {"image_id": image_id, "ref_type": REF_PRINTING_CONTENT, "ref_id": printing_id, "created_at": created}
+                for image_id in set(shortcodes)
+            )
+            yield {
+                "id": printing_id, "title": printing_title(printing_id - 1), "time": f"{rng.randint(1, 3)}-{rng.randint(4, 7)} ngày",
+                "content": "".join(parts), "is_visible": rng.random() < 0.95, "created_by": root_id,
+                "created_at": created, "updated_at": created,
+            }
+    record("printings", _insert_batches(db, Printing, printing_rows()))
+    record("printing_images", _insert_batches(db, PrintingImage, iter(attachments)))
+
+    # Chỉ mục tham chiếu ảnh, để GC ảnh không coi ảnh seed là ảnh mồ côi
+    def reference_rows():
+        for i in range(counts["services"]):
+            yield {"image_id": image_start + i, "ref_type": REF_SERVICE, "ref_id": service_start + i, "created_at": now}
+        for attachment in attachments:
+            yield {"image_id": attachment["image_id"], "ref_type": REF_PRINTING,
+                   "ref_id": attachment["printing_id"], "created_at": now}
+        yield from content_refs
+    record("image_references", _insert_batches(db, ImageReference, reference_rows()))
+
+    # Đơn hàng dồn vào một số dịch vụ phổ biến (phân bố lệch như thực tế)
+    service_ids = list(range(service_start, service_start + counts["services"]))
+    service_weights = [1 / (rank + 1) for rank in range(len(service_ids))]
+
+    def order_rows():
+        order_start = _next_id(db, Order)
+        chosen = rng.choices(service_ids, weights=service_weights, k=counts["orders"]) if service_ids else []
+        for i, service_id in enumerate(chosen):
+            name, email, phone = _person(rng)
+            created = _random_time(rng, now, 365)
+            yield {
+                "id": order_start + i, "customer_name": name, "customer_email": email, "customer_phone": phone,
+                "service_id": service_id, "quantity": rng.choice([100, 200, 500, 1000, 2000, 5000]),
+                "size": rng.choice(SIZES), "material": rng.choice(MATERIALS),
+                "notes": "Giao hàng giờ hành chính" if rng.random() < 0.3 else None,
+                "total_price": float(rng.randrange(200, 20000) * 1000),
+                "status": rng.choices(ORDER_STATUSES, weights=ORDER_STATUS_WEIGHTS)[0],
+                "created_at": created, "updated_at": created,
+            }
+    record("orders", _insert_batches(db, Order, order_rows()))
+
+    def review_rows():
+        for _ in range(counts["reviews"] if service_ids else 0):
+            name, _, _ = _person(rng)
+            yield {
+                "service_id": rng.choices(service_ids, weights=service_weights)[0], "author_name": name,
+                "is_anonymous": rng.random() < 0.2, "rating": rng.choices([1, 2, 3, 4, 5], weights=[2, 3, 10, 35, 50])[0],
+                "content": "Chất lượng in tốt, giao hàng đúng hẹn.", "created_at": _random_time(rng, now, 365),
+            }
+    record("service_reviews", _insert_batches(db, ServiceReview, review_rows()))
+
+    def contact_rows():
+        for _ in range(counts["contacts"]):
+            name, email, phone = _person(rng)
+            yield {
+                "name": name, "email": email, "phone": phone, "subject": f"Báo giá {rng.choice(PRODUCTS).lower()}",
+                "message": "Cho tôi xin báo giá và thời gian hoàn thành.", "status": rng.choice(["new", "read"]),
+                "created_at": _random_time(rng, now, 180),
+            }
+    record("contacts", _insert_batches(db, Contact, contact_rows()))
+
+    def login_rows():
+        for _ in range(counts["login_history"]):
+            yield {
+                "user_id": rng.choice(user_ids), "login_time": _random_time(rng, now, 90),
+                "ip_address": f"10.0.{rng.randrange(256)}.{rng.randrange(256)}", "user_agent": "Mozilla/5.0 (loadtest)",
+            }
+    record("login_history", _insert_batches(db, LoginHistory, login_rows()))
+
+    # Log truy cập admin trải đều trong thời gian lưu; bảng partition cần partition cho các tháng cũ
+    retention_days = 90
+    if is_access_log_partitioned(db):
+        ensure_access_log_partitions(db, now=now - timedelta(days=retention_days), months_ahead=4)
+        db.commit()
+
+    def access_log_rows():
+        for _ in range(counts["access_logs"]):
+            endpoint, method = rng.choice(ADMIN_ENDPOINTS)
+            timestamp = _random_time(rng, now, retention_days)
+            yield {
+                "user_id": rng.choice(admin_ids), "endpoint": endpoint.replace("{id}", str(rng.randrange(1, 10 ** 5))),
+                "method": method, "status_code": rng.choices([200, 201, 400, 404, 500], weights=[85, 8, 4, 2, 1])[0],
+                "ip_address": f"10.1.{rng.randrange(256)}.{rng.randrange(256)}", "timestamp": timestamp,
+                "expires_at": timestamp + timedelta(days=retention_days),
+            }
+    record("admin_access_logs", _insert_batches(db, AdminAccessLog, access_log_rows()))
+
+    _reset_sequences(db, [Image, Service, Printing, Order])
+    return inserted
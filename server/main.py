@@ -1,21 +1,36 @@
 from fastapi import FastAPI, Request, status
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, ORJSONResponse
 import logging
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
 import uvicorn
-from routers import services, blogs, orders, users, auth, dashboard, contact, config, images, printing, banners
+from routers import services, blogs, orders, users, auth, dashboard, contact, config, images, printing, banners, storage, uploads, email_outbox, rate_limits, profiles, slow_queries
 from middlewares.auth_middleware import get_current_user, get_admin_user, get_root_user
+from middlewares.cors_middleware import CORSMiddleware
 from middlewares.logging_middleware import AdminLoggingMiddleware
-from fastapi.staticfiles import StaticFiles
+from middlewares.rate_limit_middleware import RateLimitMiddleware
+from middlewares.compression_middleware import CompressionMiddleware
+from middlewares.profiling_middleware import ProfilingMiddleware
+from middlewares.slow_query_middleware import SlowQueryContextMiddleware
+from utils.static_files import CachedStaticFiles
 from config.database import engine, Base
 from models import models
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
 from fastapi_utils.tasks import repeat_every
 from utils.tasks import cleanup_expired_access_logs
+from utils.image_gc import run_image_gc
+from utils.resumable_upload import run_upload_cleanup
+from utils.email_outbox import run_email_outbox
+from utils.admin_notifications import run_admin_digest
+from utils.sessions import run_session_cleanup
+from utils.smtp_pool import get_smtp_pool
+from utils.passwords import shutdown_password_pool
+from utils.email_templates import load_email_templates
+from utils.slow_queries import get_slow_query_log
 from config.settings import settings
+from config.server import acquire_scheduler_lock, worker_count
 import json
 from dotenv import load_dotenv
 
@@ -40,10 +55,77 @@ logging.basicConfig(
 
 logger = logging.getLogger("phulong-api")
 
-# Tạo database tables
-Base.metadata.create_all(bind=engine)
+# Các job định kỳ: khởi chạy trong lifespan, không chạy lúc import module
+# GC ảnh mồ côi và file lạc chạy định kỳ
+@repeat_every(seconds=settings.IMAGE_GC_INTERVAL_SECONDS, wait_first=True, logger=logger)
+def scheduled_image_gc():
+    if settings.IMAGE_GC_ENABLED:
+        run_image_gc()
+
+# Dọn các phiên upload theo chunk bị bỏ dở / không được gắn vào đơn hàng
+@repeat_every(seconds=settings.RESUMABLE_UPLOAD_CLEANUP_INTERVAL_SECONDS, wait_first=True, logger=logger)
+def scheduled_upload_cleanup():
+    run_upload_cleanup()
+
+# Worker gửi email từ outbox (thử lại với backoff khi SMTP lỗi)
+@repeat_every(seconds=settings.EMAIL_OUTBOX_POLL_SECONDS, wait_first=True, logger=logger)
+def scheduled_email_outbox():
+    if settings.EMAIL_OUTBOX_ENABLED:
+        run_email_outbox()
+
+# Gom thông báo đơn hàng / liên hệ mới cho admin thành email tổng hợp
+@repeat_every(seconds=settings.ADMIN_DIGEST_CHECK_SECONDS, wait_first=True, logger=logger)
+def scheduled_admin_digest():
+    if settings.ADMIN_DIGEST_ENABLED:
+        run_admin_digest()
+
+# Tạo trước partition tháng tới và drop partition log admin hết hạn
+@repeat_every(seconds=settings.ACCESS_LOG_CLEANUP_INTERVAL_SECONDS, logger=logger)
+def scheduled_access_log_cleanup():
+    cleanup_expired_access_logs()
+
+# Dọn phiên đăng nhập (refresh token) hết hạn mỗi ngày
+@repeat_every(seconds=86400, wait_first=True, logger=logger)
+def scheduled_session_cleanup():
+    run_session_cleanup()
+
+SCHEDULED_TASKS = [
+    scheduled_image_gc,
+    scheduled_upload_cleanup,
+    scheduled_email_outbox,
+    scheduled_admin_digest,
+    scheduled_access_log_cleanup,
+    scheduled_session_cleanup,
+]
+
+def ensure_upload_dirs():
+    for directory in {images.UPLOAD_DIR, banners.UPLOAD_DIR, printing.UPLOAD_DIR, services.UPLOAD_DIR, settings.UPLOAD_DIR}:
+        os.makedirs(directory, exist_ok=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Khởi tạo một lần cho mỗi worker khi server bắt đầu nhận request
+    Schema database do Alembic quản lý: entrypoint container (create_database.py) chạy alembic upgrade head
+    trước khi worker khởi động; DB_AUTO_CREATE_TABLES chỉ dùng khi dev
+    """
+    if settings.DB_AUTO_CREATE_TABLES:
+        Base.metadata.create_all(bind=engine)
+    ensure_upload_dirs()
+    # Build sẵn template email (inline CSS + compile Jinja2)
+    load_email_templates()
+    # Nhiều worker: chỉ worker giữ scheduler lock chạy job định kỳ
+    if settings.SCHEDULED_TASKS_ENABLED and acquire_scheduler_lock():
+        for task in SCHEDULED_TASKS:
+            await task()
+    yield
+    get_smtp_pool().close()
+    shutdown_password_pool()
 
 app = FastAPI(
+    lifespan=lifespan,
+    # Response mặc định serialize bằng orjson (nhanh hơn json.dumps của thư viện chuẩn)
+    default_response_class=ORJSONResponse,
     title="Phú Long - API Backend",
     description="API Backend cho website giới thiệu sản phẩm in ấn",
     version="1.0.0",
@@ -52,59 +134,38 @@ app = FastAPI(
     openapi_url=None  # Tắt endpoint OpenAPI mặc định
 )
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=False,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "HEAD", "PATCH"],
-    allow_headers=[
-        "*",
-        "Accept",
-        "Accept-Language", 
-        "Content-Type",
-        "Authorization",
-        "X-Requested-With",
-        "Origin",
-        "Cache-Control",
-        "Content-Language",
-        "Last-Event-ID",
-        "User-Agent",
-        "X-CSRF-Token"
-    ],
-    expose_headers=[
-        "Content-Length",
-        "Content-Range",
-        "Content-Type",
-        "Access-Control-Allow-Origin",
-        "Access-Control-Allow-Headers",
-        "Access-Control-Allow-Methods"
-    ]
-)
+# Middleware thêm sau nằm ngoài, thứ tự từ ngoài vào trong:
+# SlowQueryContext > Profiling > AdminLogging > CORS > RateLimit > Compression > route
 
-# Thêm middleware xử lý OPTIONS requests
-@app.middleware("https")
-async def cors_handler(request: Request, call_next):
-    if request.method == "OPTIONS":
-        response = JSONResponse(content={})
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, HEAD, PATCH"
-        response.headers["Access-Control-Allow-Headers"] = "*"
-        response.headers["Access-Control-Max-Age"] = "3600"
-        return response
-    
-    response = await call_next(request)
-    return response
+# Nén response JSON / text (Brotli, gzip), middleware trong cùng nên nén body cuối cùng của route
+app.add_middleware(CompressionMiddleware)
+
+# Rate limit cho endpoint public (thêm trước CORS để response 429 vẫn có header CORS)
+app.add_middleware(RateLimitMiddleware)
 
-# Đăng ký Admin Logging Middleware
+# CORS: preflight trả ngay ở middleware, trình duyệt cache theo CORS_MAX_AGE
+app.add_middleware(CORSMiddleware)
+
+# Ghi log truy cập admin + đo thời gian xử lý (ngoài CORS / rate limit / nén)
 app.add_middleware(AdminLoggingMiddleware)
 
+# Profiling theo yêu cầu của root / lấy mẫu theo route (ngoài AdminLogging để đo cả các middleware bên trong)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Slow-query log: nghe event của engine, middleware gắn route cho từng câu SQL
+# (ngoài cùng, để câu SQL phát sinh trong mọi middleware khác cũng được gắn route)
+if settings.SLOW_QUERY_ENABLED:
+    get_slow_query_log().install(engine)
+    app.add_middleware(SlowQueryContextMiddleware)
+
 # Static files
 static_dir = "static"
 if not os.path.exists(static_dir):
     os.makedirs(static_dir)
 
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+# Static files: cache dài hạn cho file upload, ETag/304, Range và file nén sẵn
+app.mount("/static", CachedStaticFiles(directory=static_dir), name="static")
 
 @app.get("/")
 async def read_root():
@@ -132,6 +193,12 @@ app.include_router(config.router, prefix="/api/config", tags=["Configuration"])
 app.include_router(images.router, tags=["Images"])
 app.include_router(printing.router, tags=["Printing"])
 app.include_router(banners.router, tags=["Banners"])
+app.include_router(storage.router, tags=["Storage"])
+app.include_router(uploads.router, tags=["Uploads"])
+app.include_router(email_outbox.router, tags=["Email Outbox"])
+app.include_router(rate_limits.router, tags=["Rate Limits"])
+app.include_router(profiles.router, tags=["Profiles"])
+app.include_router(slow_queries.router, tags=["Slow Queries"])
 
 def custom_openapi():
     if app.openapi_schema:
@@ -186,4 +253,15 @@ async def favicon():
     return FileResponse("static/images/favicon.ico")
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    # Production nên chạy qua gunicorn (gunicorn -c gunicorn.conf.py main:app); reload chỉ dùng khi dev
+    host, _, port = settings.SERVER_BIND.rpartition(":")
+    uvicorn.run(
+        "main:app",
+        host=host or "0.0.0.0",
+        port=int(port),
+        reload=settings.SERVER_RELOAD,
+        workers=None if settings.SERVER_RELOAD else worker_count(),
+        timeout_keep_alive=settings.SERVER_KEEPALIVE,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        limit_max_requests=settings.SERVER_MAX_REQUESTS or None
+    )
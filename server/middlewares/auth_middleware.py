@@ -1,16 +1,53 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from config.database import get_db
-from utils.jwt import verify_token
+from utils.jwt import decode_token, credentials_exception
+from utils.principal_cache import principal_cache
 from models.models import User, UserRole
 from typing import Optional
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    token_data = verify_token(token)
-    user = db.query(User).filter(User.username == token_data.username).first()
+def get_bearer_token(request: Request) -> Optional[str]:
+    auth_header = request.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        return auth_header[7:]
+    return None
+
+def get_token_payload(request: Request, token: Optional[str] = None) -> dict:
+    """
+    Giải mã JWT của request một lần duy nhất, kết quả lưu ở request.state.token_payload
+    (middleware ghi log admin và get_current_user dùng chung); 401 nếu token không hợp lệ
+    """
+    token = token or get_bearer_token(request)
+    if not token:
+        raise credentials_exception()
+    cached = getattr(request.state, "token_payload", None)
+    if cached is not None and getattr(request.state, "token", None) == token:
+        return cached
+    payload = decode_token(token)
+    request.state.token = token
+    request.state.token_payload = payload
+    return payload
+
+def load_principal(db: Session, username: str, version: int = 0) -> Optional[User]:
+    """
+    Lấy user theo username, qua cache ngắn hạn (không query DB nếu còn trong cache)
+    Key cache là (username, ver trong token) và cache riêng từng worker: khi token_version bị tăng
+    (đăng xuất toàn bộ, đổi mật khẩu, khóa user) ở worker khác, worker này vẫn chấp nhận token cũ
+    tối đa AUTH_PRINCIPAL_CACHE_SECONDS giây; đặt 0 để tắt cache nếu cần thu hồi tức thì
+    """
+    user = principal_cache.get(username, version)
+    if user is None:
+        user = db.query(User).filter(User.username == username).first()
+        if user is not None:
+            principal_cache.set(user, version)
+    return user
+
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    payload = get_token_payload(request, token)
+    user = load_principal(db, payload["sub"], payload.get("ver", 0))
     
     if not user:
         raise HTTPException(
@@ -18,12 +55,17 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             detail="User not found"
         )
     
+    # Token cấp trước lần đăng xuất toàn bộ / đổi mật khẩu không còn hiệu lực
+    if (user.token_version or 0) != payload.get("ver", 0):
+        raise credentials_exception()
+    
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User is inactive"
         )
     
+    request.state.user = user
     return user
 
 def get_admin_user(current_user: User = Depends(get_current_user)):
@@ -40,4 +82,4 @@ def get_root_user(current_user: User = Depends(get_current_user)):
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized. Root role required."
         )
-    return current_user 
\ No newline at end of file
+    return current_user 
@@ -0,0 +1,218 @@
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config.settings import settings
+from utils.static_files import is_compressible
+
+try:
+    import brotli
+except ImportError:  # brotli là tùy chọn, không có thì chỉ dùng gzip
+    brotli = None
+
+# Kiểu text nhưng không được nén (stream sự kiện cần gửi từng phần ngay)
+EXCLUDED_TYPES = {"text/event-stream"}
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Chọn encoding theo Accept-Encoding: ưu tiên br (nếu có thư viện brotli) rồi gzip"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(token.strip().lower())
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+def add_vary_accept_encoding(headers: MutableHeaders):
+    """Thêm Accept-Encoding vào Vary nếu chưa có (tránh "Accept-Encoding, Accept-Encoding")"""
+    vary = {token.strip().lower() for token in headers.get("vary", "").split(",")}
+    if "accept-encoding" not in vary and "*" not in vary:
+        headers.add_vary_header("Accept-Encoding")
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+class CompressedBodyCache:
+    """
+    LRU bản nén theo (hash nội dung gốc, encoding), giới hạn theo tổng số byte
+    Response public giống hệt nhau (danh sách dịch vụ, bài đăng...) chỉ bị nén một lần
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[bytes, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(body: bytes, encoding: str) -> Tuple[bytes, str]:
+        return hashlib.blake2b(body, digest_size=16).digest(), encoding
+
+    def get(self, key: Tuple[bytes, str]) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Tuple[bytes, str], value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+class _StreamCompressor:
+    """Nén response nhiều phần (StreamingResponse) theo từng chunk"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish() if self.encoding == "br" else self._compressor.flush()
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI nén response (Brotli / gzip theo Accept-Encoding)
+    - Chỉ nén kiểu nội dung dạng text/JSON, bỏ qua body nhỏ hơn COMPRESSION_MIN_SIZE
+    - Response public (GET, không Authorization, không private/no-store/Set-Cookie) được cache bản nén
+    - Bỏ qua /static (đã có file nén sẵn .br/.gz, Range, ETag), response đã có Content-Encoding
+      và response file có ETag / Accept-Ranges (build_file_response): ETag và Range tính trên bytes gốc
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None, cache: Optional[CompressedBodyCache] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.cache = cache or CompressedBodyCache(settings.COMPRESSION_CACHE_MAX_BYTES)
+        self.excluded_paths = tuple(path.strip() for path in settings.COMPRESSION_EXCLUDED_PATHS.split(",") if path.strip())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED or scope["path"].startswith(self.excluded_paths):
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        public_request = scope["method"] == "GET" and "authorization" not in request_headers
+        await _CompressionResponder(self, encoding, public_request, send).run(scope, receive)
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, public_request: bool, send: Send):
+        self.middleware = middleware
+        self.app = middleware.app
+        self.encoding = encoding
+        self.public_request = public_request
+        self.send = send
+        self.start_message: Optional[Message] = None
+        self.active = False
+        self.streamer: Optional[_StreamCompressor] = None
+
+    async def run(self, scope: Scope, receive: Receive):
+        await self.app(scope, receive, self.send_wrapper)
+
+    def _should_compress(self, message: Message) -> bool:
+        headers = Headers(raw=message["headers"])
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return (
+            message["status"] == 200
+            and "content-encoding" not in headers
+            and "etag" not in headers
+            and "accept-ranges" not in headers
+            and media_type not in EXCLUDED_TYPES
+            and bool(media_type) and is_compressible(media_type)
+        )
+
+    def _cacheable(self) -> bool:
+        headers = Headers(raw=self.start_message["headers"])
+        cache_control = headers.get("cache-control", "").lower()
+        return (
+            self.public_request
+            and "set-cookie" not in headers
+            and "private" not in cache_control
+            and "no-store" not in cache_control
+        )
+
+    async def send_wrapper(self, message: Message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.start_message = message
+            self.active = self._should_compress(message)
+            if not self.active:
+                await self.send(message)
+            return
+
+        if message_type != "http.response.body" or not self.active:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(scope=self.start_message)
+
+        if self.streamer is None and not more_body:
+            # Response một phần (JSON thông thường): nén cả body, có cache
+            if len(body) < self.middleware.minimum_size:
+                add_vary_accept_encoding(headers)
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            compressed = None
+            key = None
+            if self._cacheable():
+                key = CompressedBodyCache.key(body, self.encoding)
+                compressed = self.middleware.cache.get(key)
+            if compressed is None:
+                compressed = compress(body, self.encoding)
+                if key is not None:
+                    self.middleware.cache.set(key, compressed)
+            headers["Content-Encoding"] = self.encoding
+            headers["Content-Length"] = str(len(compressed))
+            add_vary_accept_encoding(headers)
+            await self.send(self.start_message)
+            await self.send({"type": "http.response.body", "body": compressed})
+            return
+
+        # Response nhiều phần (streaming): nén từng chunk, không biết trước độ dài
+        if self.streamer is None:
+            self.streamer = _StreamCompressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            add_vary_accept_encoding(headers)
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self.send(self.start_message)
+        data = self.streamer.compress(body) if body else b""
+        if not more_body:
+            data += self.streamer.finish()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -0,0 +1,104 @@
+import json
+from typing import List, Optional, Sequence, Tuple
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config.settings import settings
+
+ALLOW_METHODS = ["GET", "POST", "PUT", "DELETE", "OPTIONS", "HEAD", "PATCH"]
+EXPOSE_HEADERS = [
+    "Content-Length", "Content-Range", "Content-Type", "Retry-After",
+    "X-Next-Cursor", "X-Process-Time", "X-Profile-Id", "X-RateLimit-Limit", "X-RateLimit-Remaining"
+]
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+class CORSMiddleware:
+    """
+    Middleware ASGI xử lý CORS (thay cho CORSMiddleware của Starlette + handler OPTIONS riêng)
+    - Preflight (OPTIONS) trả 200 ngay, không đi qua route; header dựng sẵn một lần khi khởi tạo
+    - Access-Control-Max-Age để trình duyệt cache kết quả preflight (CORS_MAX_AGE giây)
+    - CORS_ALLOW_ORIGINS="*" hoặc danh sách origin cách nhau bởi dấu phẩy
+    """
+
+    def __init__(self, app: ASGIApp, allow_origins: Optional[Sequence[str]] = None, max_age: Optional[int] = None):
+        self.app = app
+        if allow_origins is None:
+            allow_origins = [origin.strip() for origin in settings.CORS_ALLOW_ORIGINS.split(",") if origin.strip()]
+        self.allow_all_origins = "*" in allow_origins
+        self.allow_origins = {origin.encode("latin-1") for origin in allow_origins}
+        max_age = settings.CORS_MAX_AGE if max_age is None else max_age
+
+        self.preflight_headers: RawHeaders = [
+            (b"access-control-allow-methods", ", ".join(ALLOW_METHODS).encode()),
+            (b"access-control-max-age", str(max_age).encode()),
+            (b"content-type", b"application/json"),
+            (b"content-length", b"2"),
+        ]
+        self.simple_headers: RawHeaders = [
+            (b"access-control-expose-headers", ", ".join(EXPOSE_HEADERS).encode()),
+        ]
+        if self.allow_all_origins:
+            self.preflight_headers.append((b"access-control-allow-origin", b"*"))
+            self.simple_headers.append((b"access-control-allow-origin", b"*"))
+
+    def _allowed_origin(self, origin: Optional[bytes]) -> Optional[bytes]:
+        if origin is None:
+            return None
+        if self.allow_all_origins:
+            return b"*"
+        return origin if origin in self.allow_origins else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        requested_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-headers":
+                requested_headers = value
+
+        if scope["method"] == "OPTIONS":
+            await self.preflight(origin, requested_headers, send)
+            return
+
+        allowed_origin = self._allowed_origin(origin)
+        if allowed_origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cors(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.raw.extend(self.simple_headers)
+                if not self.allow_all_origins:
+                    headers.raw.append((b"access-control-allow-origin", allowed_origin))
+                    headers.add_vary_header("Origin")
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    async def preflight(self, origin: Optional[bytes], requested_headers: Optional[bytes], send: Send):
+        allowed_origin = self._allowed_origin(origin)
+        if origin is not None and allowed_origin is None:
+            body = json.dumps({"detail": "Origin không được phép"}, ensure_ascii=False).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 400,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        headers = list(self.preflight_headers)
+        if not self.allow_all_origins:
+            if allowed_origin is not None:
+                headers.append((b"access-control-allow-origin", allowed_origin))
+            headers.append((b"vary", b"Origin"))
+        # Cho phép mọi header: trả lại đúng danh sách trình duyệt hỏi ("*" không bao gồm Authorization)
+        headers.append((b"access-control-allow-headers", requested_headers or b"*"))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b"{}"})
@@ -1,85 +1,92 @@
 import time
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy.orm import Session
-from config.database import get_db
-from models.models import AdminAccessLog, User, UserRole
-from fastapi import Depends, HTTPException, status
-from middlewares.auth_middleware import oauth2_scheme
-from jose import jwt
-from datetime import datetime, timezone, timedelta
-from config.settings import settings
-from jose import JWTError
 import logging
+from datetime import datetime
+from typing import Callable, Optional
+from fastapi import HTTPException, Request
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config.database import SessionLocal
+from models.models import AdminAccessLog, access_log_expiry
+from middlewares.auth_middleware import get_bearer_token, get_token_payload, load_principal
+
+# Các request API cần ghi log truy cập admin (path chứa một trong các từ khóa)
+LOGGED_PATH_KEYWORDS = ("/admin", "users", "services", "orders", "blogs", "dashboard")
+LOGGED_ROLES = ("admin", "root")
+
+def should_log_path(path: str) -> bool:
+    return path.startswith("/api/") and any(keyword in path for keyword in LOGGED_PATH_KEYWORDS)
+
+def extract_token_payload(scope: Scope) -> Optional[dict]:
+    """
+    Giải mã JWT của request (nếu có) một lần, lưu vào request.state để get_current_user dùng lại
+    Token không hợp lệ trả về None (route sẽ tự trả 401)
+    """
+    request = Request(scope)
+    token = get_bearer_token(request)
+    if not token:
+        return None
+    try:
+        return get_token_payload(request, token)
+    except HTTPException:
+        return None
 
-class AdminLoggingMiddleware(BaseHTTPMiddleware):
+class AdminLoggingMiddleware:
     """
-    Middleware để ghi lại lịch sử truy cập của admin vào hệ thống.
-    Chỉ ghi lại các truy cập của người dùng có role là admin hoặc root.
+    Middleware ASGI ghi lại lịch sử truy cập của admin vào hệ thống (một lượt qua request):
+    - Đo thời gian xử lý, trả về header X-Process-Time (ms) cho mọi request
+    - Lấy principal từ JWT cho các path admin, chỉ ghi log khi role là admin hoặc root
+    - Ghi log sau khi response đã gửi xong, trong threadpool (không chặn event loop)
     """
-    
-    async def dispatch(self, request: Request, call_next):
-        # Thời gian bắt đầu xử lý request
-        start_time = time.time()
-        
-        # Lấy path của request
-        path = request.url.path
-        
-        # Chỉ log các request API cho admin
-        if path.startswith("/api/") and ("/admin" in path or "users" in path or "services" in path or "orders" in path or "blogs" in path or "dashboard" in path):
-            try:
-                # Lấy token từ header
-                auth_header = request.headers.get("Authorization", "")
-                if auth_header and auth_header.startswith("Bearer "):
-                    token = auth_header.replace("Bearer ", "")
-                    
-                    # Giải mã token
-                    try:
-                        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-                        username = payload.get("sub")  # username từ token
-                        user_role = payload.get("role")
-                        
-                        # Chỉ ghi log cho admin và root
-                        if user_role in ["admin", "root"]:
-                            # Xử lý request
-                            response = await call_next(request)
-                            
-                            # Thời gian xử lý
-                            process_time = time.time() - start_time
-                            
-                            # Tạo session database
-                            db = next(get_db())
-                            
-                            # Lấy user_id từ database
-                            user = db.query(User).filter(User.username == username).first()
-                            if user:
-                                # Tính thời gian hết hạn (3 tháng sau)
-                                now = datetime.utcnow()
-                                expires_at = now + timedelta(days=90)  # Khoảng 3 tháng
-                                
-                                # Tạo log access
-                                access_log = AdminAccessLog(
-                                    user_id=user.id,  # Sử dụng ID từ database
-                                    endpoint=path,
-                                    method=request.method,
-                                    status_code=response.status_code,
-                                    ip_address=request.client.host,
-                                    timestamp=now,
-                                    expires_at=expires_at
-                                )
-                                
-                                # Lưu vào database
-                                db.add(access_log)
-                                db.commit()
-                            
-                            return response
-                    except JWTError:
-                        # Token không hợp lệ, không ghi log
-                        pass
-            except Exception as e:
-                # Log lỗi
-                logging.error(f"Lỗi khi ghi log admin: {str(e)}")
-        
-        # Xử lý request bình thường nếu không ghi log
-        response = await call_next(request)
-        return response 
\ No newline at end of file
+
+    def __init__(self, app: ASGIApp, session_factory: Optional[Callable[[], Session]] = None):
+        self.app = app
+        self.session_factory = session_factory or SessionLocal
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        payload = extract_token_payload(scope) if should_log_path(scope["path"]) else None
+        status_code = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Process-Time"] = f"{(time.perf_counter() - start_time) * 1000:.1f}"
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+
+        if payload and payload.get("role") in LOGGED_ROLES:
+            await run_in_threadpool(self.write_log, scope, payload, status_code)
+
+    def write_log(self, scope: Scope, payload: dict, status_code: int):
+        db = self.session_factory()
+        try:
+            # Lấy user qua request.state (get_current_user đã nạp) hoặc cache principal
+            user = scope.get("state", {}).get("user") or \
+                load_principal(db, payload["sub"], payload.get("ver", 0))
+            if user:
+                client = scope.get("client")
+                db.add(AdminAccessLog(
+                    user_id=user.id,
+                    endpoint=scope["path"],
+                    method=scope["method"],
+                    status_code=status_code,
+                    ip_address=client[0] if client else None,
+                    timestamp=datetime.utcnow(),
+                    expires_at=access_log_expiry()
+                ))
+                db.commit()
+        except Exception as e:
+            # Request đã xử lý xong, lỗi ghi log không ảnh hưởng tới response
+            db.rollback()
+            logging.error(f"Lỗi khi ghi log admin: {str(e)}")
+        finally:
+            db.close()
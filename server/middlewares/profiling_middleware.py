@@ -0,0 +1,179 @@
+import logging
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qs
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from sqlalchemy.orm import Session
+from config.database import SessionLocal
+from config.settings import settings
+from middlewares.auth_middleware import load_principal
+from middlewares.logging_middleware import extract_token_payload
+from models.models import UserRole
+from utils.profiles import ProfileStore, get_profile_store
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pyinstrument là tùy chọn, không có thì middleware không làm gì
+    Profiler = None
+
+logger = logging.getLogger("phulong-api")
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAM = "__profile"
+
+def requested_profile_mode(scope: Scope) -> Optional[str]:
+    """
+    Chế độ profiling client yêu cầu qua header X-Profile hoặc query ?__profile=:
+    "html" trả thẳng báo cáo HTML thay cho response, giá trị khác: lưu lại và trả header X-Profile-Id
+    """
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value.decode("latin-1").strip().lower() or "store"
+    query_string = scope.get("query_string", b"")
+    if PROFILE_QUERY_PARAM.encode() in query_string:
+        values = parse_qs(query_string.decode("latin-1")).get(PROFILE_QUERY_PARAM)
+        if values:
+            return values[0].strip().lower() or "store"
+    return None
+
+def route_template(scope: Scope) -> str:
+    """Path mẫu của route (ví dụ /api/services/{slug}) để lấy mẫu theo route thay vì theo URL"""
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return scope["path"]
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI chạy request dưới sampling profiler (pyinstrument) theo yêu cầu
+    - Root gửi header X-Profile: 1 (hoặc ?__profile=1): profile được lưu, response có header X-Profile-Id
+      (user được nạp qua load_principal: phải là root, còn active và token_version khớp token)
+      X-Profile: html (hoặc ?__profile=html): trả thẳng flame graph HTML thay cho response
+    - PROFILING_SAMPLE_EVERY=N > 0: tự lấy mẫu 1/N request của mỗi route (mỗi worker đếm riêng)
+    - Chỉ được thêm vào app khi PROFILING_ENABLED, nên khi tắt không tốn gì
+    Profile lưu trong PROFILING_DIR, xem qua /api/admin/profiles
+    """
+
+    def __init__(self, app: ASGIApp, store: Optional[ProfileStore] = None, sample_every: Optional[int] = None,
+                 session_factory: Optional[Callable[[], Session]] = None):
+        self.app = app
+        self._store = store
+        self.session_factory = session_factory or SessionLocal
+        self.sample_every = settings.PROFILING_SAMPLE_EVERY if sample_every is None else sample_every
+        self.route_counters: Dict[str, int] = defaultdict(int)
+        if Profiler is None:
+            logger.warning("PROFILING_ENABLED nhưng chưa cài pyinstrument, bỏ qua profiling")
+
+    @property
+    def store(self) -> ProfileStore:
+        if self._store is None:
+            self._store = get_profile_store()
+        return self._store
+
+    def _is_root(self, payload: dict) -> bool:
+        """Kiểm tra như get_current_user: token bị thu hồi (token_version) hoặc user bị khóa thì không được profile"""
+        db = self.session_factory()
+        try:
+            user = load_principal(db, payload["sub"], payload.get("ver", 0))
+        finally:
+            db.close()
+        return (
+            user is not None
+            and (user.token_version or 0) == payload.get("ver", 0)
+            and user.is_active
+            and user.role == UserRole.ROOT
+        )
+
+    def _should_sample(self, scope: Scope) -> Optional[str]:
+        if self.sample_every <= 0:
+            return None
+        route = f"{scope['method']} {route_template(scope)}"
+        self.route_counters[route] += 1
+        return route if self.route_counters[route] % self.sample_every == 0 else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or Profiler is None:
+            await self.app(scope, receive, send)
+            return
+
+        mode = requested_profile_mode(scope)
+        if mode is not None:
+            payload = extract_token_payload(scope)
+            # Lọc nhanh theo role trong token, sau đó mới nạp user (có cache) để kiểm tra đầy đủ
+            if not payload or payload.get("role") != "root" or not await run_in_threadpool(self._is_root, payload):
+                mode = None
+        sampled_route = self._should_sample(scope) if mode is None else None
+        if mode is None and sampled_route is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.profile(scope, receive, send, mode, sampled_route)
+
+    async def profile(self, scope: Scope, receive: Receive, send: Send, mode: Optional[str], sampled_route: Optional[str]):
+        status_code = 500
+        inline_html = mode == "html"
+        held_start: Optional[Message] = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, held_start
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if mode is not None:
+                    # html: bỏ response gốc; lưu: giữ header tới khi có X-Profile-Id (lúc body đầu tiên đến)
+                    held_start = message
+                    return
+            elif inline_html:
+                return
+            elif held_start is not None:
+                profile_id = await self._save(profiler, scope, status_code, started, sampled_route)
+                MutableHeaders(scope=held_start)["X-Profile-Id"] = profile_id
+                await send(held_start)
+                held_start = None
+            await send(message)
+
+        profiler = Profiler(interval=settings.PROFILING_INTERVAL, async_mode="enabled")
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler.is_running:
+                profiler.stop()
+
+        if inline_html:
+            body = profiler.output_html().encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/html; charset=utf-8"), (b"content-length", str(len(body)).encode()),
+                            (b"x-profile-status", str(status_code).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+        elif sampled_route is not None:
+            await self._save(profiler, scope, status_code, started, sampled_route)
+
+    async def _save(self, profiler, scope: Scope, status_code: int, started: float, sampled_route: Optional[str]) -> str:
+        if profiler.is_running:
+            profiler.stop()
+        meta = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "query_string": scope.get("query_string", b"").decode("latin-1"),
+            "route": sampled_route or f"{scope['method']} {route_template(scope)}",
+            "status_code": status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "trigger": "sampled" if sampled_route else "requested",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        html = profiler.output_html()
+        try:
+            return await run_in_threadpool(self.store.save, meta, html)
+        except OSError as e:
+            logger.error(f"Lỗi khi lưu profile: {str(e)}")
+            return ""
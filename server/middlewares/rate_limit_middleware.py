@@ -0,0 +1,71 @@
+import json
+import math
+from typing import Optional
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config.settings import settings
+from utils.rate_limit import RateLimiter, get_rate_limiter
+
+def get_client_ip(scope: Scope) -> str:
+    """
+    IP client lấy từ scope["client"]: sau reverse proxy, gunicorn / uvicorn đã thay bằng IP thật theo
+    X-Forwarded-For, chỉ khi proxy nằm trong SERVER_FORWARDED_ALLOW_IPS (client không tự giả được)
+    """
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI giới hạn tần suất cho các route public có ghi dữ liệu
+    - Vượt giới hạn: 429 kèm Retry-After, request không chạm tới DB / SMTP
+    - Request được phép có thêm header X-RateLimit-Limit / X-RateLimit-Remaining
+    """
+
+    def __init__(self, app: ASGIApp, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self._limiter = limiter
+
+    @property
+    def limiter(self) -> RateLimiter:
+        if self._limiter is None:
+            self._limiter = get_rate_limiter()
+        return self._limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        policy = self.limiter.match(scope["method"], scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        result, limit = await self.limiter.check(policy, get_client_ip(scope))
+        if not result.allowed:
+            retry_after = str(max(1, math.ceil(result.retry_after)))
+            body = json.dumps(
+                {"detail": "Bạn đã gửi quá nhiều yêu cầu, vui lòng thử lại sau"}, ensure_ascii=False
+            ).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", retry_after.encode()),
+                    (b"x-ratelimit-limit", str(limit).encode()),
+                    (b"x-ratelimit-remaining", b"0"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(limit)
+                headers["X-RateLimit-Remaining"] = str(result.remaining)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,23 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+from middlewares.profiling_middleware import route_template
+from utils.slow_queries import current_route
+
+class SlowQueryContextMiddleware:
+    """
+    Middleware ASGI gắn route của request vào contextvar để slow-query log biết câu SQL chậm
+    đến từ endpoint nào (route mẫu chỉ được tính khi thật sự có câu chậm)
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = current_route.set(lambda: f"{scope['method']} {route_template(scope)}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_route.reset(token)
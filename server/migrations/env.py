@@ -10,11 +10,15 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from models.models import Base
+from config.database import DATABASE_URL
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
+# Kết nối theo biến môi trường DATABASE_* (giống app), không dùng URL cố định trong alembic.ini
+config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
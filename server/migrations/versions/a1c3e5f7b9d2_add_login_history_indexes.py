@@ -0,0 +1,30 @@
+"""add login_history indexes for keyset pagination and filters
+
+Revision ID: a1c3e5f7b9d2
+Revises: f9b1c3d5e7a9
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c3e5f7b9d2'
+down_revision: Union[str, None] = 'f9b1c3d5e7a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_login_history_time_id', 'login_history', ['login_time', 'id'], unique=False)
+    op.create_index('ix_login_history_user_time', 'login_history', ['user_id', 'login_time'], unique=False)
+    op.create_index('ix_login_history_ip_time', 'login_history', ['ip_address', 'login_time'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_login_history_ip_time', table_name='login_history')
+    op.drop_index('ix_login_history_user_time', table_name='login_history')
+    op.drop_index('ix_login_history_time_id', table_name='login_history')
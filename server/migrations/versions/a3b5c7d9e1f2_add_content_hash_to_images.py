@@ -0,0 +1,28 @@
+"""add content_hash to images
+
+Revision ID: a3b5c7d9e1f2
+Revises: f2a8c9d1e3b4
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3b5c7d9e1f2'
+down_revision: Union[str, None] = 'f2a8c9d1e3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('images', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_images_content_hash', 'images', ['content_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_images_content_hash', table_name='images')
+    op.drop_column('images', 'content_hash')
@@ -0,0 +1,71 @@
+"""add composite / partial indexes for hot query shapes (built concurrently)
+
+Revision ID: b2d4f6a8c0e3
+Revises: a1c3e5f7b9d2
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d4f6a8c0e3'
+down_revision: Union[str, None] = 'a1c3e5f7b9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tên index, bảng, cột, điều kiện partial index) - giữ đồng bộ với __table_args__ trong models
+INDEXES = [
+    # Danh sách đơn: lọc status / service_id / khoảng created_at, sắp created_at desc; dashboard đếm theo ngày
+    ('ix_orders_created_at', 'orders', ['created_at'], None),
+    ('ix_orders_status_created_at', 'orders', ['status', 'created_at'], None),
+    ('ix_orders_service_created_at', 'orders', ['service_id', 'created_at'], None),
+    # COUNT(DISTINCT customer_email) của dashboard chạy index-only scan
+    ('ix_orders_customer_email', 'orders', ['customer_email'], None),
+    # Review của trang chi tiết dịch vụ, mới nhất trước
+    ('ix_service_reviews_service_created', 'service_reviews', ['service_id', 'created_at'], None),
+    # Ảnh đính kèm bài printing (selectinload theo printing_id)
+    ('ix_printing_images_printing_order', 'printing_images', ['printing_id', 'order'], None),
+    # Danh sách printing public: chỉ bài hiển thị, mới nhất trước
+    ('ix_printings_visible_created', 'printings', ['created_at'], 'is_visible'),
+    # Banner đang bật theo thứ tự hiển thị
+    ('ix_banners_active_order', 'banners', ['order'], 'is_active'),
+    # Thư viện ảnh: lọc category, sắp created_at desc; GC lọc category + created_at < cutoff
+    ('ix_images_category_created', 'images', ['category', 'created_at'], None),
+    ('ix_images_created_at', 'images', ['created_at'], None),
+    # Danh sách dịch vụ lọc category / is_active; gợi ý dịch vụ featured đang bật
+    ('ix_services_category_active', 'services', ['category', 'is_active'], None),
+    ('ix_services_featured_active', 'services', ['id'], 'is_active AND featured'),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, table, columns, where in INDEXES:
+            op.create_index(name, table, columns, unique=False)
+        return
+
+    # CREATE INDEX CONCURRENTLY không chạy được trong transaction và không khóa ghi bảng;
+    # index build dở (INVALID) từ lần chạy lỗi trước được xóa rồi tạo lại
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(name, table_name=table)
+        return
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
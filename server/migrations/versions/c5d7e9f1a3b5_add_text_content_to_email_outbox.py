@@ -0,0 +1,26 @@
+"""add text_content to email_outbox
+
+Revision ID: c5d7e9f1a3b5
+Revises: b4c6d8e0f2a4
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d7e9f1a3b5'
+down_revision: Union[str, None] = 'b4c6d8e0f2a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('email_outbox', sa.Column('text_content', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('email_outbox', 'text_content')
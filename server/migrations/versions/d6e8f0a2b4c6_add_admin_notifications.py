@@ -0,0 +1,44 @@
+"""add admin_notifications table
+
+Revision ID: d6e8f0a2b4c6
+Revises: c5d7e9f1a3b5
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6e8f0a2b4c6'
+down_revision: Union[str, None] = 'c5d7e9f1a3b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'admin_notifications',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('priority', sa.String(), nullable=True),
+        sa.Column('order_id', sa.Integer(), nullable=True),
+        sa.Column('contact_id', sa.Integer(), nullable=True),
+        sa.Column('email_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('notified_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['contact_id'], ['contacts.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['email_id'], ['email_outbox.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_admin_notifications_id'), 'admin_notifications', ['id'], unique=False)
+    op.create_index('ix_admin_notifications_pending', 'admin_notifications', ['notified_at', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_admin_notifications_pending', table_name='admin_notifications')
+    op.drop_index(op.f('ix_admin_notifications_id'), table_name='admin_notifications')
+    op.drop_table('admin_notifications')
@@ -0,0 +1,67 @@
+"""add image_references index table
+
+Revision ID: e7f1a2b3c4d5
+Revises: d6e9f8b53c1a
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7f1a2b3c4d5'
+down_revision: Union[str, None] = 'd6e9f8b53c1a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'image_references',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('image_id', sa.Integer(), nullable=False),
+        sa.Column('ref_type', sa.String(), nullable=False),
+        sa.Column('ref_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['image_id'], ['images.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_image_references_id', 'image_references', ['id'])
+    op.create_index('ix_image_references_image_id', 'image_references', ['image_id'])
+    op.create_index('ix_image_references_ref', 'image_references', ['ref_type', 'ref_id'])
+
+    # Backfill chỉ mục từ dữ liệu hiện có
+    op.execute("""
+        INSERT INTO image_references (image_id, ref_type, ref_id, created_at)
+        SELECT image_id, 'service', id, NOW() FROM services WHERE image_id IS NOT NULL
+    """)
+    op.execute("""
+        INSERT INTO image_references (image_id, ref_type, ref_id, created_at)
+        SELECT image_id, 'banner', id, NOW() FROM banners WHERE image_id IS NOT NULL
+    """)
+    op.execute("""
+        INSERT INTO image_references (image_id, ref_type, ref_id, created_at)
+        SELECT DISTINCT image_id, 'printing', printing_id, NOW()
+        FROM printing_images WHERE image_id IS NOT NULL AND printing_id IS NOT NULL
+    """)
+    # Shortcode [image:N] hoặc [image:N|alt] trong content
+    op.execute(r"""
+        INSERT INTO image_references (image_id, ref_type, ref_id, created_at)
+        SELECT DISTINCT m.image_id, 'printing_content', m.printing_id, NOW()
+        FROM (
+            SELECT p.id AS printing_id, (match[1])::integer AS image_id
+            FROM printings p,
+                 regexp_matches(p.content, '\[image:(\d+)(?:\|[^\]]*)?\]', 'g') AS match
+        ) m
+        JOIN images i ON i.id = m.image_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_image_references_ref', table_name='image_references')
+    op.drop_index('ix_image_references_image_id', table_name='image_references')
+    op.drop_index('ix_image_references_id', table_name='image_references')
+    op.drop_table('image_references')
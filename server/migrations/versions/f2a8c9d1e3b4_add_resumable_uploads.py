@@ -0,0 +1,43 @@
+"""add resumable_uploads table
+
+Revision ID: f2a8c9d1e3b4
+Revises: e7f1a2b3c4d5
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a8c9d1e3b4'
+down_revision: Union[str, None] = 'e7f1a2b3c4d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'resumable_uploads',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('filename', sa.String(), nullable=False),
+        sa.Column('content_type', sa.String(), nullable=True),
+        sa.Column('total_size', sa.BigInteger(), nullable=False),
+        sa.Column('chunk_size', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('storage_key', sa.String(), nullable=True),
+        sa.Column('order_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_resumable_uploads_expires_at', 'resumable_uploads', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_resumable_uploads_expires_at', table_name='resumable_uploads')
+    op.drop_table('resumable_uploads')
@@ -0,0 +1,116 @@
+"""partition admin_access_logs by month
+
+Revision ID: f9b1c3d5e7a9
+Revises: e8a0b2c4d6f8
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f9b1c3d5e7a9'
+down_revision: Union[str, None] = 'e8a0b2c4d6f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Số tháng tạo trước partition (job dọn log định kỳ sẽ tạo tiếp các tháng sau)
+MONTHS_AHEAD = 2
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    month = value.month - 1 + months
+    return datetime(value.year + month // 12, month % 12 + 1, 1)
+
+
+def _create_indexes() -> None:
+    op.create_index('ix_admin_access_logs_id', 'admin_access_logs', ['id'], unique=False)
+    op.create_index('ix_admin_access_logs_user_id', 'admin_access_logs', ['user_id'], unique=False)
+    op.create_index('ix_admin_access_logs_timestamp', 'admin_access_logs', ['timestamp'], unique=False)
+    op.create_index('ix_admin_access_logs_expires_at', 'admin_access_logs', ['expires_at'], unique=False)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        # DB khác không hỗ trợ partition: chỉ thêm index, việc dọn log dùng DELETE theo lô
+        op.create_index('ix_admin_access_logs_user_id', 'admin_access_logs', ['user_id'], unique=False)
+        op.create_index('ix_admin_access_logs_timestamp', 'admin_access_logs', ['timestamp'], unique=False)
+        op.create_index('ix_admin_access_logs_expires_at', 'admin_access_logs', ['expires_at'], unique=False)
+        return
+
+    # Bảng partition RANGE theo timestamp, khóa chính phải chứa cột partition: (id, timestamp)
+    op.execute("""
+        CREATE TABLE admin_access_logs_new (
+            id INTEGER NOT NULL DEFAULT nextval('admin_access_logs_id_seq'),
+            user_id INTEGER REFERENCES users (id),
+            endpoint VARCHAR,
+            method VARCHAR,
+            status_code INTEGER,
+            ip_address VARCHAR,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            expires_at TIMESTAMP WITHOUT TIME ZONE,
+            CONSTRAINT admin_access_logs_part_pkey PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+
+    # Partition theo tháng từ bản ghi cũ nhất tới MONTHS_AHEAD tháng sau, cộng partition default
+    oldest = op.get_bind().execute(sa.text("SELECT min(timestamp) FROM admin_access_logs")).scalar()
+    now = datetime.utcnow()
+    month = datetime((oldest or now).year, (oldest or now).month, 1)
+    last = _add_months(datetime(now.year, now.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        next_month = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE admin_access_logs_p{month.year:04d}{month.month:02d} PARTITION OF admin_access_logs_new "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+        month = next_month
+    op.execute("CREATE TABLE admin_access_logs_default PARTITION OF admin_access_logs_new DEFAULT")
+
+    op.execute("""
+        INSERT INTO admin_access_logs_new (id, user_id, endpoint, method, status_code, ip_address, timestamp, expires_at)
+        SELECT id, user_id, endpoint, method, status_code, ip_address,
+               COALESCE(timestamp, now() AT TIME ZONE 'utc'),
+               COALESCE(expires_at, COALESCE(timestamp, now() AT TIME ZONE 'utc') + INTERVAL '90 days')
+        FROM admin_access_logs
+    """)
+
+    # Giữ sequence id khi xóa bảng cũ rồi gắn nó cho bảng mới
+    op.execute("ALTER SEQUENCE admin_access_logs_id_seq OWNED BY NONE")
+    op.drop_table('admin_access_logs')
+    op.execute("ALTER TABLE admin_access_logs_new RENAME TO admin_access_logs")
+    op.execute("ALTER SEQUENCE admin_access_logs_id_seq OWNED BY admin_access_logs.id")
+    _create_indexes()
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ix_admin_access_logs_expires_at', table_name='admin_access_logs')
+        op.drop_index('ix_admin_access_logs_timestamp', table_name='admin_access_logs')
+        op.drop_index('ix_admin_access_logs_user_id', table_name='admin_access_logs')
+        return
+
+    op.execute("ALTER TABLE admin_access_logs RENAME TO admin_access_logs_part")
+    for name in ('id', 'user_id', 'timestamp', 'expires_at'):
+        op.execute(f"ALTER INDEX ix_admin_access_logs_{name} RENAME TO ix_admin_access_logs_part_{name}")
+    op.execute("""
+        CREATE TABLE admin_access_logs (
+            id INTEGER NOT NULL DEFAULT nextval('admin_access_logs_id_seq') PRIMARY KEY,
+            user_id INTEGER REFERENCES users (id),
+            endpoint VARCHAR,
+            method VARCHAR,
+            status_code INTEGER,
+            ip_address VARCHAR,
+            timestamp TIMESTAMP WITHOUT TIME ZONE,
+            expires_at TIMESTAMP WITHOUT TIME ZONE
+        )
+    """)
+    op.execute("INSERT INTO admin_access_logs SELECT id, user_id, endpoint, method, status_code, ip_address, timestamp, expires_at FROM admin_access_logs_part")
+    op.execute("ALTER SEQUENCE admin_access_logs_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE admin_access_logs_part CASCADE")
+    op.execute("ALTER SEQUENCE admin_access_logs_id_seq OWNED BY admin_access_logs.id")
+    op.create_index('ix_admin_access_logs_id', 'admin_access_logs', ['id'], unique=False)
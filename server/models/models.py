@@ -1,8 +1,9 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, DateTime, Float, Enum
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, DateTime, Float, Enum, Index, BigInteger, text
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import datetime, timedelta
 import enum
 from config.database import Base
+from config.settings import settings
 
 class UserRole(str, enum.Enum):
     ROOT = "root"
@@ -17,15 +18,23 @@ class User(Base):
     hashed_password = Column(String)
     role = Column(String, default=UserRole.ADMIN)
     is_active = Column(Boolean, default=True)
+    token_version = Column(Integer, default=0, nullable=False)  # Tăng lên để vô hiệu hóa mọi token đã cấp
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship
     login_history = relationship("LoginHistory", back_populates="user")
     access_logs = relationship("AdminAccessLog", back_populates="user")
+    sessions = relationship("UserSession", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
 
 class LoginHistory(Base):
     __tablename__ = "login_history"
+    __table_args__ = (
+        # Phân trang keyset (login_time, id) và lọc theo user / IP
+        Index("ix_login_history_time_id", "login_time", "id"),
+        Index("ix_login_history_user_time", "user_id", "login_time"),
+        Index("ix_login_history_ip_time", "ip_address", "login_time"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -36,23 +45,58 @@ class LoginHistory(Base):
     # Relationship
     user = relationship("User", back_populates="login_history")
 
+class UserSession(Base):
+    """
+    Phiên đăng nhập: mỗi lần đăng nhập bằng mật khẩu tạo một phiên với refresh token xoay vòng
+    Chỉ lưu hash của refresh token; dùng lại token cũ (đã xoay) sẽ thu hồi cả phiên
+    """
+    __tablename__ = "user_sessions"
+    
+    id = Column(String, primary_key=True)  # uuid4 hex, là phần đầu của refresh token
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    refresh_token_hash = Column(String, nullable=False)  # sha256 phần bí mật của refresh token hiện tại
+    rotation_count = Column(Integer, default=0)
+    ip_address = Column(String, nullable=True)
+    user_agent = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=True)
+    revoked_reason = Column(String, nullable=True)  # logout, reuse_detected, logout_all, password_changed
+    
+    # Relationship
+    user = relationship("User", back_populates="sessions")
+
+def access_log_expiry() -> datetime:
+    """Thời điểm hết hạn mặc định của access log: sau ACCESS_LOG_RETENTION_DAYS ngày"""
+    return datetime.utcnow() + timedelta(days=settings.ACCESS_LOG_RETENTION_DAYS)
+
 class AdminAccessLog(Base):
+    """
+    Trên PostgreSQL bảng được partition theo tháng (RANGE theo timestamp, xem migration f9b1c3d5e7a9),
+    khóa chính trong DB là (id, timestamp); ORM vẫn định danh bản ghi theo id
+    """
     __tablename__ = "admin_access_logs"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     endpoint = Column(String)  # API endpoint được truy cập
     method = Column(String)    # HTTP method (GET, POST, etc.)
     status_code = Column(Integer)  # HTTP status code
     ip_address = Column(String)
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime, default=lambda: datetime.utcnow().replace(month=datetime.utcnow().month + 3 if datetime.utcnow().month <= 9 else datetime.utcnow().month - 9, year=datetime.utcnow().year if datetime.utcnow().month <= 9 else datetime.utcnow().year + 1))
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    expires_at = Column(DateTime, default=access_log_expiry, index=True)
     
     # Relationship
     user = relationship("User", back_populates="access_logs")
 
 class Service(Base):
     __tablename__ = "services"
+    __table_args__ = (
+        # Lọc category / is_active; partial index cho gợi ý dịch vụ featured đang bật
+        Index("ix_services_category_active", "category", "is_active"),
+        Index("ix_services_featured_active", "id", postgresql_where=text("is_active AND featured")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -90,6 +134,13 @@ class Blog(Base):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Danh sách đơn lọc status / service_id / khoảng created_at, sắp created_at desc; đếm của dashboard
+        Index("ix_orders_created_at", "created_at"),
+        Index("ix_orders_status_created_at", "status", "created_at"),
+        Index("ix_orders_service_created_at", "service_id", "created_at"),
+        Index("ix_orders_customer_email", "customer_email"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     customer_name = Column(String)
@@ -111,6 +162,9 @@ class Order(Base):
 
 class ServiceReview(Base):
     __tablename__ = "service_reviews"
+    __table_args__ = (
+        Index("ix_service_reviews_service_created", "service_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     service_id = Column(Integer, ForeignKey("services.id"))
@@ -137,6 +191,11 @@ class Contact(Base):
 
 class Image(Base):
     __tablename__ = "images"
+    __table_args__ = (
+        # Thư viện ảnh lọc category, sắp created_at desc; GC ảnh lọc category + created_at
+        Index("ix_images_category_created", "category", "created_at"),
+        Index("ix_images_created_at", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False)  # Tên file gốc
@@ -147,6 +206,7 @@ class Image(Base):
     mime_type = Column(String, nullable=True)  # Loại file (image/jpeg, image/png, etc.)
     width = Column(Integer, nullable=True)  # Chiều rộng ảnh
     height = Column(Integer, nullable=True)  # Chiều cao ảnh
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 nội dung file (chống upload trùng)
     is_visible = Column(Boolean, default=True)  # Có hiển thị hay không
     category = Column(String, nullable=True)  # Danh mục ảnh (portfolio, blog, service, etc.)
     uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=True)  # Người upload
@@ -158,6 +218,10 @@ class Image(Base):
 
 class Printing(Base):
     __tablename__ = "printings"
+    __table_args__ = (
+        # Danh sách public: chỉ bài hiển thị, mới nhất trước
+        Index("ix_printings_visible_created", "created_at", postgresql_where=text("is_visible")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False, index=True)  # Tiêu đề bài đăng
@@ -174,6 +238,9 @@ class Printing(Base):
 
 class PrintingImage(Base):
     __tablename__ = "printing_images"
+    __table_args__ = (
+        Index("ix_printing_images_printing_order", "printing_id", "order"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     printing_id = Column(Integer, ForeignKey("printings.id"))
@@ -187,6 +254,10 @@ class PrintingImage(Base):
 
 class Banner(Base):
     __tablename__ = "banners"
+    __table_args__ = (
+        # Banner đang bật theo thứ tự hiển thị
+        Index("ix_banners_active_order", "order", postgresql_where=text("is_active")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False, index=True)  # Tiêu đề banner
@@ -201,4 +272,87 @@ class Banner(Base):
     
     # Relationship
     image = relationship("Image", backref="banners")
-    creator = relationship("User", backref="banners") 
\ No newline at end of file
+    creator = relationship("User", backref="banners")
+
+class ImageReference(Base):
+    """
+    Chỉ mục tham chiếu ảnh: ghi lại ảnh nào đang được dùng ở đâu
+    (service, banner, ảnh đính kèm printing, shortcode [image:N] trong content).
+    Được cập nhật mỗi khi ghi các bảng liên quan, dùng cho GC ảnh mồ côi.
+    """
+    __tablename__ = "image_references"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    image_id = Column(Integer, ForeignKey("images.id", ondelete="CASCADE"), nullable=False, index=True)
+    ref_type = Column(String, nullable=False)  # service, banner, printing, printing_content
+    ref_id = Column(Integer, nullable=False)  # ID của bản ghi tham chiếu
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_image_references_ref", "ref_type", "ref_id"),
+    )
+
+class ResumableUpload(Base):
+    """
+    Phiên upload file thiết kế theo từng chunk (có thể tiếp tục khi mất kết nối)
+    Các chunk được lưu riêng trong thư mục tạm, ghép lại khi nhận đủ
+    """
+    __tablename__ = "resumable_uploads"
+    
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    filename = Column(String, nullable=False)  # Tên file gốc
+    content_type = Column(String, nullable=True)
+    total_size = Column(BigInteger, nullable=False)  # Tổng kích thước (bytes)
+    chunk_size = Column(Integer, nullable=False)  # Kích thước mỗi chunk (chunk cuối có thể nhỏ hơn)
+    status = Column(String, default="uploading")  # uploading, completed, attached, expired
+    storage_key = Column(String, nullable=True)  # Key file hoàn chỉnh trong storage
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=True)  # Đơn hàng đã gắn file
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)  # Hết hạn nếu chưa hoàn tất
+
+class EmailOutbox(Base):
+    """
+    Hàng đợi email (outbox): email được ghi cùng transaction với đơn hàng / liên hệ,
+    sau đó worker nền gửi đi và thử lại với backoff khi lỗi
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html_content = Column(Text, nullable=False)
+    text_content = Column(Text, nullable=True)  # Bản text thuần (multipart/alternative)
+    kind = Column(String, nullable=True)  # order_confirmation, order_admin, contact_admin, ...
+    status = Column(String, default="pending")  # pending, sending, sent, dead
+    attempts = Column(Integer, default=0)  # Số lần đã thử gửi
+    max_attempts = Column(Integer, default=8)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)  # Thời điểm được gửi (lại)
+    locked_at = Column(DateTime, nullable=True)  # Thời điểm worker nhận xử lý
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+class AdminNotification(Base):
+    """
+    Thông báo cho admin về đơn hàng / liên hệ mới
+    Thông báo thường được gom vào email tổng hợp (digest) theo chu kỳ hoặc khi đủ số lượng,
+    thông báo ưu tiên cao được gửi email riêng ngay lập tức
+    """
+    __tablename__ = "admin_notifications"
+    __table_args__ = (
+        Index("ix_admin_notifications_pending", "notified_at", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # order, contact
+    priority = Column(String, default="normal")  # normal, high
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=True)
+    contact_id = Column(Integer, ForeignKey("contacts.id", ondelete="CASCADE"), nullable=True)
+    email_id = Column(Integer, ForeignKey("email_outbox.id", ondelete="SET NULL"), nullable=True)  # Email đã chứa thông báo
+    created_at = Column(DateTime, default=datetime.utcnow)
+    notified_at = Column(DateTime, nullable=True)  # NULL: đang chờ vào bản tổng hợp
+
@@ -1,22 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Form, Query
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, distinct, func, or_
 from sqlalchemy.orm import Session
-from datetime import timedelta
+from datetime import datetime, timedelta
+from typing import List, Optional
+import logging
 from config.database import get_db
-from utils.jwt import create_access_token
-from passlib.context import CryptContext
-from schemas.schemas import UserLogin, Token, UserCreate, UserOut
-from models.models import User, LoginHistory, UserRole
-from middlewares.auth_middleware import get_root_user
+from utils.passwords import hash_password_async, verify_and_update_async
+from utils.login_throttle import throttle_login, login_throttle
+from utils.sessions import (
+    create_session, rotate_session, issue_tokens, revoke_session, revoke_all_sessions,
+    find_session_from_refresh_token
+)
+from schemas.schemas import (
+    UserLogin, Token, UserCreate, UserOut, RefreshTokenRequest, UserSessionOut,
+    LoginHistoryOut, LoginHistorySummary
+)
+from utils.pagination import encode_cursor, decode_cursor
+from models.models import User, LoginHistory, UserRole, UserSession
+from middlewares.auth_middleware import get_current_user, get_root_user
+from utils.principal_cache import principal_cache
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
 
 @router.post("/register", response_model=UserOut)
 async def register(user: UserCreate, db: Session = Depends(get_db), current_user: User = Depends(get_root_user)):
@@ -36,7 +43,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db), current_user
         )
     
     # Tạo người dùng mới
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password_async(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -49,35 +56,38 @@ async def register(user: UserCreate, db: Session = Depends(get_db), current_user
     db.refresh(db_user)
     return db_user
 
-# Endpoint đăng nhập với OAuth2PasswordRequestForm cho Swagger UI
-@router.post("/login", response_model=Token)
-async def login_for_access_token(
-    request: Request,
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
-):
-    # Kiểm tra thông tin đăng nhập
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Thông tin đăng nhập không chính xác",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    if not verify_password(form_data.password, user.hashed_password):
+async def authenticate_user(request: Request, db: Session, username: str, password: str,
+                            headers: Optional[dict] = None) -> User:
+    """
+    Kiểm tra thông tin đăng nhập
+    - Giới hạn số lần thử theo IP / username trước khi chạy bcrypt (429 + Retry-After)
+    - bcrypt chạy trong pool riêng, không chặn event loop
+    - Hash cũ (cost bcrypt khác cấu hình) được hash lại khi đăng nhập thành công
+    """
+    throttle_login(request, username)
+
+    user = db.query(User).filter(User.username == username).first()
+    valid, new_hash = await verify_and_update_async(password, user.hashed_password if user else None)
+    if not user or not valid:
+        login_throttle.record_failure(username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Thông tin đăng nhập không chính xác",
-            headers={"WWW-Authenticate": "Bearer"},
+            headers=headers,
         )
-    
-    # Tạo JWT token
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": user.username, "role": user.role},
-        expires_delta=access_token_expires
-    )
+
+    login_throttle.record_success(username)
+    if new_hash:
+        user.hashed_password = new_hash
+        logging.info(f"Đã cập nhật hash mật khẩu của {user.username} theo cấu hình bcrypt mới")
+    return user
+
+def issue_access_token(request: Request, db: Session, user: User) -> dict:
+    """
+    Tạo phiên đăng nhập (refresh token) và access token, lưu lịch sử đăng nhập
+    (commit cùng hash mật khẩu mới nếu có)
+    """
+    session, refresh_token = create_session(db, user, request)
     
     # Lưu lịch sử đăng nhập
     client_host = request.client.host
@@ -92,48 +102,181 @@ async def login_for_access_token(
     db.add(login_history)
     db.commit()
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    return issue_tokens(user, session, refresh_token)
+
+# Endpoint đăng nhập với OAuth2PasswordRequestForm cho Swagger UI
+@router.post("/login", response_model=Token)
+async def login_for_access_token(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db)
+):
+    user = await authenticate_user(
+        request, db, form_data.username, form_data.password,
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+    return issue_access_token(request, db, user)
 
 # Thêm endpoint mới để hỗ trợ đăng nhập bằng JSON
 @router.post("/login-json", response_model=Token)
 async def login_json(request: Request, user_credentials: UserLogin, db: Session = Depends(get_db)):
-    # Kiểm tra thông tin đăng nhập
-    user = db.query(User).filter(User.username == user_credentials.username).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Thông tin đăng nhập không chính xác"
-        )
-    
-    if not verify_password(user_credentials.password, user.hashed_password):
+    user = await authenticate_user(request, db, user_credentials.username, user_credentials.password)
+    return issue_access_token(request, db, user)
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(request: Request, body: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    Đổi refresh token lấy access token mới (không cần mật khẩu, không chạy bcrypt)
+    - Refresh token được xoay vòng: token cũ hết hiệu lực, client phải lưu token mới trả về
+    - Dùng lại refresh token cũ sẽ thu hồi cả phiên
+    """
+    user, session, refresh_token = rotate_session(db, body.refresh_token, request)
+    return issue_tokens(user, session, refresh_token)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(body: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """Đăng xuất: thu hồi phiên của refresh token"""
+    session = find_session_from_refresh_token(db, body.refresh_token)
+    if session:
+        revoke_session(db, session)
+        db.commit()
+    return None
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_all(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Đăng xuất khỏi mọi thiết bị: thu hồi mọi phiên, access token đã cấp mất hiệu lực ngay"""
+    user = db.query(User).filter(User.id == current_user.id).first()
+    revoke_all_sessions(db, user)
+    db.commit()
+    principal_cache.invalidate(user_id=user.id)
+    return None
+
+@router.get("/sessions", response_model=List[UserSessionOut])
+async def get_my_sessions(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Danh sách phiên đăng nhập đang hoạt động của tài khoản hiện tại"""
+    current_sid = request.state.token_payload.get("sid")
+    sessions = db.query(UserSession).filter(
+        UserSession.user_id == current_user.id,
+        UserSession.revoked_at.is_(None),
+        UserSession.expires_at > datetime.utcnow()
+    ).order_by(UserSession.last_used_at.desc()).all()
+    return [
+        UserSessionOut.model_validate(session).model_copy(update={"current": session.id == current_sid})
+        for session in sessions
+    ]
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_my_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Thu hồi một phiên đăng nhập của tài khoản hiện tại"""
+    session = db.query(UserSession).filter(
+        UserSession.id == session_id,
+        UserSession.user_id == current_user.id
+    ).first()
+    if not session:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Thông tin đăng nhập không chính xác"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Không tìm thấy phiên đăng nhập"
         )
+    revoke_session(db, session)
+    db.commit()
+    return None
+
+@router.get("/login-history", response_model=List[LoginHistoryOut])
+async def get_login_history(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_root_user),
+    user_id: Optional[int] = None,
+    ip_address: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cursor: Optional[str] = Query(None, description="Giá trị header X-Next-Cursor của trang trước"),
+    limit: int = Query(50, ge=1, le=200)
+):
+    """
+    Lịch sử đăng nhập, mới nhất trước, phân trang keyset theo (login_time, id).
+    Trang tiếp theo: gọi lại với cursor = header X-Next-Cursor (không có header là hết dữ liệu).
+    Chỉ ROOT có quyền truy cập.
+    """
+    query = db.query(LoginHistory)
+    if user_id:
+        query = query.filter(LoginHistory.user_id == user_id)
+    if ip_address:
+        query = query.filter(LoginHistory.ip_address == ip_address)
+    if start_date:
+        query = query.filter(LoginHistory.login_time >= start_date)
+    if end_date:
+        query = query.filter(LoginHistory.login_time <= end_date)
+    if cursor:
+        cursor_time, cursor_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            LoginHistory.login_time < cursor_time,
+            and_(LoginHistory.login_time == cursor_time, LoginHistory.id < cursor_id)
+        ))
     
-    # Tạo JWT token
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": user.username, "role": user.role},
-        expires_delta=access_token_expires
-    )
+    # Lấy thêm một bản ghi để biết còn trang sau hay không
+    rows = query.order_by(LoginHistory.login_time.desc(), LoginHistory.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     
-    # Lưu lịch sử đăng nhập
-    client_host = request.client.host
-    user_agent = request.headers.get("user-agent", "")
+    response = JSONResponse(content=jsonable_encoder([LoginHistoryOut.model_validate(row) for row in rows]))
+    if has_more:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].login_time, rows[-1].id)
+    return response
+
+@router.get("/login-history/summary", response_model=LoginHistorySummary)
+async def get_login_history_summary(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_root_user),
+    user_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+):
+    """
+    Thống kê đăng nhập (mặc định 30 ngày gần nhất): số lần đăng nhập và số IP khác nhau
+    theo user và theo user / ngày, tính bằng GROUP BY trong DB.
+    Chỉ ROOT có quyền truy cập.
+    """
+    end_date = end_date or datetime.utcnow()
+    start_date = start_date or end_date - timedelta(days=30)
+    conditions = [LoginHistory.login_time >= start_date, LoginHistory.login_time <= end_date]
+    if user_id:
+        conditions.append(LoginHistory.user_id == user_id)
     
-    login_history = LoginHistory(
-        user_id=user.id,
-        ip_address=client_host,
-        user_agent=user_agent
-    )
+    logins = func.count(LoginHistory.id)
+    distinct_ips = func.count(distinct(LoginHistory.ip_address))
+    day = func.date(LoginHistory.login_time)
     
-    db.add(login_history)
-    db.commit()
+    total_logins, total_ips = db.query(logins, distinct_ips).filter(*conditions).one()
+    users = db.query(
+        LoginHistory.user_id, User.username, logins, distinct_ips, func.max(LoginHistory.login_time)
+    ).outerjoin(User, User.id == LoginHistory.user_id).filter(*conditions).group_by(
+        LoginHistory.user_id, User.username
+    ).order_by(logins.desc()).all()
+    per_user_day = db.query(
+        LoginHistory.user_id, User.username, day, logins, distinct_ips
+    ).outerjoin(User, User.id == LoginHistory.user_id).filter(*conditions).group_by(
+        LoginHistory.user_id, User.username, day
+    ).order_by(day.desc(), LoginHistory.user_id).all()
     
-    return {"access_token": access_token, "token_type": "bearer"}
-
-@router.get("/login-history")
-async def get_login_history(db: Session = Depends(get_db), current_user: User = Depends(get_root_user)):
-    login_history = db.query(LoginHistory).order_by(LoginHistory.login_time.desc()).all()
-    return login_history 
\ No newline at end of file
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "total_logins": total_logins,
+        "distinct_ips": total_ips,
+        "users": [
+            {"user_id": row[0], "username": row[1], "logins": row[2], "distinct_ips": row[3], "last_login": row[4]}
+            for row in users
+        ],
+        "per_user_day": [
+            {"user_id": row[0], "username": row[1], "day": str(row[2]), "logins": row[3], "distinct_ips": row[4]}
+            for row in per_user_day
+        ]
+    }
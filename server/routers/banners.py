@@ -1,29 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Form
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import os
+import io
 import uuid
 from datetime import datetime
-import shutil
-from PIL import Image as PILImage
 from pathlib import Path
 
 from config.database import get_db
 from schemas.schemas import BannerOut, BannerCreate, BannerUpdate, ImageUploadResponse
 from models.models import Banner, Image, User
 from middlewares.auth_middleware import get_current_user, get_admin_user
-from config.settings import settings
+from starlette.concurrency import run_in_threadpool
+from utils.storage import get_storage, delete_stored_file
+from utils.image_refs import sync_banner_references, clear_references, get_image_references, REF_BANNER
 
 router = APIRouter(prefix="/api/banners", tags=["Banners"])
 
 # Cấu hình upload ảnh banner
 UPLOAD_DIR = "static/images/banners"
+UPLOAD_KEY_PREFIX = "images/banners"  # Key tương ứng trong storage
 MAX_FILE_SIZE = 15 * 1024 * 1024  # 15MB cho banner
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}
 ALLOWED_MIME_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp", "image/bmp"}
 
-# Tạo thư mục upload nếu chưa tồn tại
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 def validate_image_file(file: UploadFile) -> bool:
     """Kiểm tra file ảnh hợp lệ"""
@@ -38,8 +37,9 @@ def validate_image_file(file: UploadFile) -> bool:
         
     return True
 
-def get_image_info(file_path: str) -> dict:
-    """Lấy thông tin ảnh (width, height)"""
+def get_image_info(file_path) -> dict:
+    """Lấy thông tin ảnh (width, height) từ đường dẫn hoặc file object"""
+    from PIL import Image as PILImage
     try:
         with PILImage.open(file_path) as img:
             return {
@@ -88,33 +88,23 @@ async def upload_image_and_create_banner(
             detail=f"File quá lớn. Kích thước tối đa là {MAX_FILE_SIZE // (1024*1024)}MB"
         )
     
-    # Tạo tên file unique
+    # Tạo key unique
     file_ext = Path(file.filename).suffix.lower()
-    unique_filename = f"banner_{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
+    storage = get_storage()
+    file_key = f"{UPLOAD_KEY_PREFIX}/banner_{uuid.uuid4()}{file_ext}"
     
-    # Lưu file
+    # Lưu file qua storage backend (local hoặc S3)
     try:
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
+        await run_in_threadpool(storage.save_bytes, file_key, file_content, file.content_type)
         
         # Lấy thông tin ảnh
-        image_info = get_image_info(file_path)
-        
-        # Tạo URL cho ảnh
-        if hasattr(settings, 'BACKEND_URL') and settings.BACKEND_URL:
-            backend_url = settings.BACKEND_URL
-            if not backend_url.startswith("http"):
-                backend_url = f"https://{backend_url}"
-            file_url = f"{backend_url}/static/images/banners/{unique_filename}"
-        else:
-            file_url = f"https://demoapi.andyanh.id.vn/static/images/banners/{unique_filename}"
+        image_info = get_image_info(io.BytesIO(file_content))
         
         # Lưu ảnh vào database
         new_image = Image(
             filename=file.filename,
-            file_path=file_path,
-            url=file_url,
+            file_path=storage.path_for(file_key),
+            url=storage.url(file_key),
             alt_text=f"Banner: {title}",
             file_size=len(file_content),
             mime_type=file.content_type,
@@ -141,6 +131,8 @@ async def upload_image_and_create_banner(
         )
         
         db.add(new_banner)
+        db.flush()  # Để lấy ID
+        sync_banner_references(db, new_banner)
         db.commit()
         db.refresh(new_banner)
         
@@ -148,8 +140,7 @@ async def upload_image_and_create_banner(
         
     except Exception as e:
         # Xóa file nếu có lỗi
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        delete_stored_file(storage.path_for(file_key))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Lỗi khi upload và tạo banner: {str(e)}"
@@ -180,6 +171,8 @@ async def create_banner(
     )
     
     db.add(new_banner)
+    db.flush()  # Để lấy ID
+    sync_banner_references(db, new_banner)
     db.commit()
     db.refresh(new_banner)
     
@@ -262,6 +255,7 @@ async def update_banner(
         setattr(db_banner, field, value)
     
     db_banner.updated_at = datetime.utcnow()
+    sync_banner_references(db, db_banner)
     db.commit()
     db.refresh(db_banner)
     
@@ -317,17 +311,18 @@ async def delete_banner(
     if delete_image:
         banner_image = db.query(Image).filter(Image.id == db_banner.image_id).first()
     
-    # Xóa banner
+    # Xóa banner và tham chiếu ảnh của banner
+    clear_references(db, REF_BANNER, db_banner.id)
     db.delete(db_banner)
     
+    # Không xóa ảnh nếu ảnh vẫn đang được sử dụng ở nơi khác
+    if banner_image and get_image_references(db, banner_image.id):
+        delete_image = False
+    
     # Xóa ảnh nếu được yêu cầu
     if delete_image and banner_image:
-        # Xóa file vật lý
-        if os.path.exists(banner_image.file_path):
-            try:
-                os.remove(banner_image.file_path)
-            except Exception as e:
-                print(f"Không thể xóa file: {e}")
+        # Xóa file (local hoặc S3)
+        delete_stored_file(banner_image.file_path)
         
         # Xóa record trong database
         db.delete(banner_image)
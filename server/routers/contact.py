@@ -4,7 +4,7 @@ from typing import List, Optional
 from datetime import datetime
 
 from config.database import get_db
-from utils.email import send_email
+from utils.admin_notifications import notify_new_contact, kick_admin_notifications
 from models.models import Contact
 import schemas.contact
 from middlewares.auth_middleware import get_admin_user
@@ -31,53 +31,15 @@ async def submit_contact(
     )
     
     db.add(db_contact)
+    db.flush()
+    
+    # Thông báo cho admin được ghi cùng transaction, gửi qua email tổng hợp
+    # (hoặc gửi ngay nếu liên hệ ưu tiên cao)
+    notify_new_contact(db, db_contact)
     db.commit()
     db.refresh(db_contact)
     
-    # Gửi email thông báo trong background
-    email_subject = f"Liên hệ mới từ: {contact.name}"
-    email_body = f"""
-    <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; }}
-                .container {{ width: 100%; max-width: 600px; margin: 0 auto; }}
-                .header {{ background-color: #f8f9fa; padding: 20px; text-align: center; }}
-                .content {{ padding: 20px; }}
-                .info-item {{ margin-bottom: 10px; }}
-                .message-box {{ background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin-top: 20px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h2>Thông tin liên hệ mới</h2>
-                </div>
-                <div class="content">
-                    <div class="info-item"><strong>Họ tên:</strong> {contact.name}</div>
-                    <div class="info-item"><strong>Email:</strong> {contact.email}</div>
-                    <div class="info-item"><strong>Số điện thoại:</strong> {contact.phone}</div>
-                    <div class="info-item"><strong>Tiêu đề:</strong> {contact.subject}</div>
-                    <div class="info-item"><strong>Thời gian:</strong> {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}</div>
-                    
-                    <div class="message-box">
-                        <h3>Nội dung tin nhắn:</h3>
-                        <p>{contact.message}</p>
-                    </div>
-                </div>
-            </div>
-        </body>
-    </html>
-    """
-    
-    # Thực hiện gửi email trong background
-    admin_email = "admin@phulong.com"  # Thay email người nhận thực tế vào đây
-    background_tasks.add_task(
-        send_email,
-        admin_email,  # to_email
-        email_subject,  # subject
-        email_body  # html_content
-    )
+    background_tasks.add_task(kick_admin_notifications)
     
     return {
         "id": db_contact.id,
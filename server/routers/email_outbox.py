@@ -0,0 +1,143 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+
+from config.database import get_db
+from schemas.schemas import EmailOutboxOut, EmailOutboxDetail, EmailOutboxStats, PaginatedResponse
+from models.models import EmailOutbox, User
+from middlewares.auth_middleware import get_admin_user
+from utils.smtp_pool import get_smtp_pool
+from utils.email_outbox import STATUS_PENDING, STATUS_SENDING, STATUS_DEAD, get_outbox_stats, kick_email_outbox
+from utils.admin_notifications import flush_admin_digest
+
+router = APIRouter(prefix="/api/email-outbox", tags=["Email Outbox"])
+
+@router.get("/", response_model=PaginatedResponse)
+async def get_outbox_emails(
+    status_filter: Optional[str] = Query(None, alias="status", description="pending, sending, sent, dead"),
+    kind: Optional[str] = Query(None, description="Loại email: order_confirmation, order_admin, contact_admin"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Danh sách email trong outbox (Chỉ ADMIN mới có quyền)
+    - Mặc định sắp xếp email mới nhất trước
+    """
+    query = db.query(EmailOutbox)
+    if status_filter:
+        query = query.filter(EmailOutbox.status == status_filter)
+    if kind:
+        query = query.filter(EmailOutbox.kind == kind)
+
+    total = query.count()
+    emails = query.order_by(EmailOutbox.id.desc()).offset(skip).limit(limit).all()
+
+    return {
+        "items": [EmailOutboxOut.model_validate(email) for email in emails],
+        "total": total
+    }
+
+@router.get("/stats", response_model=EmailOutboxStats)
+async def get_outbox_statistics(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """Thống kê số email theo trạng thái (Chỉ ADMIN mới có quyền)"""
+    return get_outbox_stats(db)
+
+@router.get("/metrics")
+async def get_smtp_metrics(current_user: User = Depends(get_admin_user)):
+    """
+    Thống kê của pool kết nối SMTP trong process hiện tại (Chỉ ADMIN mới có quyền)
+    - Số email đã gửi / lỗi, số kết nối đã mở / kết nối lại
+    - Độ trễ gửi (avg, p50, p95, max) và số email gửi trong 60 giây gần nhất
+    """
+    return get_smtp_pool().get_metrics()
+
+@router.post("/digest", response_model=Optional[EmailOutboxOut])
+async def send_admin_digest_now(
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Gửi ngay email tổng hợp các thông báo đơn hàng / liên hệ đang chờ (Chỉ ADMIN mới có quyền)
+    - Trả về null nếu không có thông báo nào đang chờ
+    """
+    email = flush_admin_digest(db, force=True)
+    if email:
+        background_tasks.add_task(kick_email_outbox)
+    return email
+
+@router.get("/{email_id}", response_model=EmailOutboxDetail)
+async def get_outbox_email(
+    email_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """Chi tiết một email trong outbox, gồm nội dung HTML (Chỉ ADMIN mới có quyền)"""
+    email = db.query(EmailOutbox).filter(EmailOutbox.id == email_id).first()
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Không tìm thấy email"
+        )
+    return email
+
+@router.post("/{email_id}/retry", response_model=EmailOutboxOut)
+async def retry_outbox_email(
+    email_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Đưa email lỗi (dead) hoặc đang chờ thử lại về hàng đợi để gửi ngay (Chỉ ADMIN mới có quyền)
+    - Số lần thử được đặt lại từ đầu
+    """
+    email = db.query(EmailOutbox).filter(EmailOutbox.id == email_id).with_for_update().first()
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Không tìm thấy email"
+        )
+    if email.status not in (STATUS_DEAD, STATUS_PENDING):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Chỉ có thể gửi lại email đang chờ hoặc đã thất bại"
+        )
+
+    email.status = STATUS_PENDING
+    email.attempts = 0
+    email.next_attempt_at = datetime.utcnow()
+    db.commit()
+    db.refresh(email)
+
+    background_tasks.add_task(kick_email_outbox)
+    return email
+
+@router.delete("/{email_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_outbox_email(
+    email_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """Xóa email khỏi outbox, ví dụ email dead không cần gửi lại (Chỉ ADMIN mới có quyền)"""
+    email = db.query(EmailOutbox).filter(EmailOutbox.id == email_id).first()
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Không tìm thấy email"
+        )
+    if email.status == STATUS_SENDING:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Email đang được gửi, vui lòng thử lại sau"
+        )
+
+    db.delete(email)
+    db.commit()
+    return None
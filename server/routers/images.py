@@ -1,30 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Form, Request
+from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 import os
+import io
 import uuid
+import asyncio
+import hashlib
+import logging
 from datetime import datetime
 import shutil
-from PIL import Image as PILImage
 from pathlib import Path
 
 from config.database import get_db
-from schemas.schemas import ImageOut, ImageCreate, ImageUpdate, ImageUploadResponse
+from schemas.schemas import (
+    ImageOut, ImageCreate, ImageUpdate, ImageUploadResponse, ImageReferenceOut, ImageGCReport,
+    BulkImageResult, BulkImageUploadResponse,
+    PresignUploadRequest, PresignUploadResponse, ImageFinalize
+)
 from models.models import Image, User
-from middlewares.auth_middleware import get_current_user, get_admin_user
+from middlewares.auth_middleware import get_current_user, get_admin_user, get_root_user
 from config.settings import settings
+from utils.image_refs import get_image_references
+from utils.image_gc import collect_garbage
+from utils.static_files import build_file_response
+from utils.storage import get_storage, delete_stored_file
 
 router = APIRouter(prefix="/api/images", tags=["Images"])
 
 # Cấu hình thư mục upload
 UPLOAD_DIR = "static/images/uploads"
+UPLOAD_KEY_PREFIX = "images/uploads"  # Key tương ứng trong storage
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}
 ALLOWED_MIME_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp", "image/bmp"}
 
-# Tạo thư mục upload nếu chưa tồn tại
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 def validate_image_file(file: UploadFile) -> bool:
     """Kiểm tra file ảnh hợp lệ"""
@@ -39,8 +50,9 @@ def validate_image_file(file: UploadFile) -> bool:
         
     return True
 
-def get_image_info(file_path: str) -> dict:
-    """Lấy thông tin ảnh (width, height)"""
+def get_image_info(file_path) -> dict:
+    """Lấy thông tin ảnh (width, height) từ đường dẫn hoặc file object"""
+    from PIL import Image as PILImage
     try:
         with PILImage.open(file_path) as img:
             return {
@@ -50,6 +62,28 @@ def get_image_info(file_path: str) -> dict:
     except Exception:
         return {"width": None, "height": None}
 
+def compute_content_hash(content: bytes) -> str:
+    """SHA-256 của nội dung file, dùng để phát hiện ảnh upload trùng"""
+    return hashlib.sha256(content).hexdigest()
+
+def inspect_image_bytes(content: bytes) -> Optional[dict]:
+    """
+    Kiểm tra nội dung ảnh và lấy thông tin (chạy trong thread pool khi bulk upload)
+    Trả về None nếu PIL không đọc được file
+    """
+    from PIL import Image as PILImage
+    try:
+        with PILImage.open(io.BytesIO(content)) as img:
+            width, height = img.width, img.height
+            img.verify()
+    except Exception:
+        return None
+    return {
+        "width": width,
+        "height": height,
+        "content_hash": compute_content_hash(content)
+    }
+
 @router.post("/upload", response_model=ImageUploadResponse)
 async def upload_image(
     file: UploadFile = File(...),
@@ -90,35 +124,27 @@ async def upload_image(
     # Tạo tên file unique
     file_ext = Path(file.filename).suffix.lower()
     unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
+    storage = get_storage()
+    file_key = f"{UPLOAD_KEY_PREFIX}/{unique_filename}"
     
-    # Lưu file
+    # Lưu file qua storage backend (local hoặc S3)
     try:
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
+        await run_in_threadpool(storage.save_bytes, file_key, file_content, file.content_type)
         
         # Lấy thông tin ảnh
-        image_info = get_image_info(file_path)
-        
-        # Tạo URL cho ảnh - sử dụng absolute HTTPS URL
-        if hasattr(settings, 'BACKEND_URL') and settings.BACKEND_URL:
-            backend_url = settings.BACKEND_URL
-            if not backend_url.startswith("http"):
-                backend_url = f"https://{backend_url}"
-            file_url = f"{backend_url}/static/images/uploads/{unique_filename}"
-        else:
-            file_url = f"https://demoapi.andyanh.id.vn/static/images/uploads/{unique_filename}"
+        image_info = get_image_info(io.BytesIO(file_content))
         
         # Lưu thông tin vào database
         new_image = Image(
             filename=file.filename,
-            file_path=file_path,
-            url=file_url,
+            file_path=storage.path_for(file_key),
+            url=storage.url(file_key),
             alt_text=alt_text,
             file_size=len(file_content),
             mime_type=file.content_type,
             width=image_info["width"],
             height=image_info["height"],
+            content_hash=compute_content_hash(file_content),
             is_visible=is_visible,
             category=category,
             uploaded_by=current_user.id
@@ -135,13 +161,274 @@ async def upload_image(
         
     except Exception as e:
         # Xóa file nếu có lỗi
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        await run_in_threadpool(delete_stored_file, storage.path_for(file_key))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Lỗi khi upload file: {str(e)}"
         )
 
+@router.post("/bulk-upload", response_model=BulkImageUploadResponse)
+async def bulk_upload_images(
+    files: List[UploadFile] = File(...),
+    alt_text: Optional[str] = Form(None),
+    category: Optional[str] = Form(None),
+    is_visible: bool = Form(True),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Upload nhiều ảnh trong một request (Chỉ ADMIN mới có quyền)
+    - Các file được kiểm tra và lưu song song, tối đa IMAGE_BULK_WORKERS file cùng lúc
+    - Ảnh trùng nội dung (SHA-256) với ảnh đã có cùng category hoặc trong cùng lần upload không được lưu lại
+    - Toàn bộ record Image được ghi trong một transaction
+    - Trả về kết quả cho từng file: created, duplicate hoặc rejected (kèm lý do)
+    """
+    if len(files) > settings.IMAGE_BULK_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Chỉ được upload tối đa {settings.IMAGE_BULK_MAX_FILES} ảnh mỗi lần"
+        )
+    
+    storage = get_storage()
+    semaphore = asyncio.Semaphore(max(1, settings.IMAGE_BULK_WORKERS))
+    results: List[Optional[BulkImageResult]] = [None] * len(files)
+    
+    def reject(index: int, reason: str):
+        results[index] = BulkImageResult(
+            filename=files[index].filename or "", status="rejected", reason=reason
+        )
+    
+    async def inspect(index: int, file: UploadFile):
+        if not file.filename or not validate_image_file(file):
+            reject(index, "File không hợp lệ. Chỉ chấp nhận file ảnh (jpg, png, gif, webp, bmp)")
+            return None
+        async with semaphore:
+            if file.size is not None and file.size > MAX_FILE_SIZE:
+                content = None
+            else:
+                content = await file.read()
+            if content is None or len(content) > MAX_FILE_SIZE:
+                reject(index, f"File quá lớn. Kích thước tối đa là {MAX_FILE_SIZE // (1024*1024)}MB")
+                return None
+            info = await run_in_threadpool(inspect_image_bytes, content)
+        if info is None:
+            reject(index, "Không đọc được nội dung ảnh")
+            return None
+        return content, info
+    
+    # Bước 1: kiểm tra, lấy kích thước và hash song song
+    inspected = await asyncio.gather(*(inspect(index, file) for index, file in enumerate(files)))
+    
+    # Bước 2: tìm ảnh trùng bằng một truy vấn, chỉ trong cùng category
+    # (ảnh category khác, ví dụ ảnh service/banner được GC dọn khi mồ côi, không được dùng lại)
+    hashes = {item[1]["content_hash"] for item in inspected if item}
+    existing = {}
+    if hashes:
+        same_category = Image.category == category if category is not None else Image.category.is_(None)
+        existing = {
+            image.content_hash: image
+            for image in db.query(Image).filter(Image.content_hash.in_(hashes), same_category).all()
+        }
+    
+    pending = []  # (index, content, info, file_key)
+    first_in_batch = {}  # content_hash -> index của file đầu tiên
+    batch_duplicates = []  # (index, index của file gốc)
+    for index, item in enumerate(inspected):
+        if item is None:
+            continue
+        content, info = item
+        content_hash = info["content_hash"]
+        if content_hash in existing:
+            results[index] = BulkImageResult(
+                filename=files[index].filename,
+                status="duplicate",
+                reason="Ảnh đã tồn tại trong thư viện",
+                image=ImageOut.model_validate(existing[content_hash])
+            )
+        elif content_hash in first_in_batch:
+            batch_duplicates.append((index, first_in_batch[content_hash]))
+        else:
+            first_in_batch[content_hash] = index
+            file_key = f"{UPLOAD_KEY_PREFIX}/{uuid.uuid4()}{Path(files[index].filename).suffix.lower()}"
+            pending.append((index, content, info, file_key))
+    
+    # Bước 3: lưu file mới lên storage song song
+    async def save(index: int, content: bytes, file_key: str):
+        async with semaphore:
+            await run_in_threadpool(storage.save_bytes, file_key, content, files[index].content_type)
+    
+    save_errors = await asyncio.gather(
+        *(save(index, content, file_key) for index, content, _, file_key in pending),
+        return_exceptions=True
+    )
+    
+    saved = []
+    for (index, content, info, file_key), error in zip(pending, save_errors):
+        if isinstance(error, Exception):
+            logging.error(f"Lỗi khi lưu ảnh {files[index].filename}: {str(error)}")
+            reject(index, f"Lỗi khi lưu file: {str(error)}")
+            continue
+        saved.append((index, Image(
+            filename=files[index].filename,
+            file_path=storage.path_for(file_key),
+            url=storage.url(file_key),
+            alt_text=alt_text,
+            file_size=len(content),
+            mime_type=files[index].content_type,
+            width=info["width"],
+            height=info["height"],
+            content_hash=info["content_hash"],
+            is_visible=is_visible,
+            category=category,
+            uploaded_by=current_user.id
+        )))
+    
+    # Bước 4: ghi toàn bộ record trong một transaction
+    created = {}
+    if saved:
+        try:
+            db.add_all([image for _, image in saved])
+            db.flush()
+            for index, image in saved:
+                created[index] = ImageOut.model_validate(image)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for _, image in saved:
+                delete_stored_file(image.file_path)
+            logging.error(f"Lỗi khi lưu thông tin ảnh bulk upload: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Lỗi khi lưu thông tin ảnh: {str(e)}"
+            )
+    
+    for index, image_out in created.items():
+        results[index] = BulkImageResult(filename=files[index].filename, status="created", image=image_out)
+    for index, original_index in batch_duplicates:
+        if original_index not in created:
+            reject(index, results[original_index].reason)
+            continue
+        results[index] = BulkImageResult(
+            filename=files[index].filename,
+            status="duplicate",
+            reason=f"Trùng nội dung với file {files[original_index].filename} trong cùng lần upload",
+            image=created[original_index]
+        )
+    
+    counts = {"created": 0, "duplicate": 0, "rejected": 0}
+    for result in results:
+        counts[result.status] += 1
+    
+    return BulkImageUploadResponse(
+        message=f"Đã upload {counts['created']} ảnh, {counts['duplicate']} ảnh trùng, {counts['rejected']} ảnh bị từ chối",
+        created=counts["created"],
+        duplicates=counts["duplicate"],
+        rejected=counts["rejected"],
+        results=results
+    )
+
+@router.post("/presign", response_model=PresignUploadResponse)
+async def presign_image_upload(
+    upload: PresignUploadRequest,
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Tạo URL upload trực tiếp lên storage (Chỉ ADMIN mới có quyền)
+    - Trình duyệt PUT file thẳng lên URL trả về, không đi qua API
+    - Sau khi upload xong gọi POST /api/images/finalize với key nhận được
+    """
+    file_ext = Path(upload.filename).suffix.lower()
+    if upload.content_type not in ALLOWED_MIME_TYPES or file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File không hợp lệ. Chỉ chấp nhận file ảnh (jpg, png, gif, webp, bmp)"
+        )
+    
+    if upload.size is not None and upload.size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File quá lớn. Kích thước tối đa là {MAX_FILE_SIZE // (1024*1024)}MB"
+        )
+    
+    file_key = f"{UPLOAD_KEY_PREFIX}/{uuid.uuid4()}{file_ext}"
+    presigned = get_storage().presign_put(
+        file_key, upload.content_type, settings.PRESIGN_EXPIRE_SECONDS, max_size=MAX_FILE_SIZE
+    )
+    
+    return PresignUploadResponse(
+        key=file_key,
+        upload_url=presigned["url"],
+        method=presigned["method"],
+        headers=presigned["headers"],
+        expires_in=settings.PRESIGN_EXPIRE_SECONDS
+    )
+
+@router.post("/finalize", response_model=ImageUploadResponse)
+async def finalize_image_upload(
+    data: ImageFinalize,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Ghi nhận ảnh đã được upload trực tiếp lên storage (Chỉ ADMIN mới có quyền)
+    - Kiểm tra file tồn tại và kích thước hợp lệ, sau đó tạo record Image
+    """
+    if not data.key.startswith(f"{UPLOAD_KEY_PREFIX}/") or ".." in data.key:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Key không hợp lệ"
+        )
+    
+    storage = get_storage()
+    file_path = storage.path_for(data.key)
+    
+    if db.query(Image).filter(Image.file_path == file_path).first():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ảnh này đã được ghi nhận"
+        )
+    
+    file_size = await run_in_threadpool(storage.size, data.key)
+    if file_size is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Không tìm thấy file trên storage. Vui lòng upload lại"
+        )
+    
+    if file_size > MAX_FILE_SIZE:
+        await run_in_threadpool(storage.delete, data.key)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File quá lớn. Kích thước tối đa là {MAX_FILE_SIZE // (1024*1024)}MB"
+        )
+    
+    # Chỉ đọc phần đầu file để lấy kích thước ảnh
+    head = await run_in_threadpool(storage.read_head, data.key, 256 * 1024)
+    image_info = get_image_info(io.BytesIO(head))
+    
+    new_image = Image(
+        filename=data.filename,
+        file_path=file_path,
+        url=storage.url(data.key),
+        alt_text=data.alt_text,
+        file_size=file_size,
+        mime_type=data.content_type,
+        width=image_info["width"],
+        height=image_info["height"],
+        is_visible=data.is_visible,
+        category=data.category,
+        uploaded_by=current_user.id
+    )
+    
+    db.add(new_image)
+    db.commit()
+    db.refresh(new_image)
+    
+    return ImageUploadResponse(
+        message="Upload ảnh thành công",
+        image=new_image
+    )
+
 @router.get("/", response_model=List[ImageOut])
 async def get_images(
     skip: int = 0,
@@ -213,15 +500,40 @@ async def update_image(
     
     return db_image
 
+@router.post("/gc", response_model=ImageGCReport)
+async def collect_image_garbage(
+    dry_run: bool = Query(True, description="Chỉ báo cáo, không xóa"),
+    grace_hours: Optional[int] = Query(None, ge=0, description="Bỏ qua ảnh/file mới hơn số giờ này"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_root_user)
+):
+    """
+    Chạy GC ảnh mồ côi và file lạc (Chỉ ROOT mới có quyền)
+    - dry_run=true (mặc định): chỉ liệt kê ảnh/file sẽ bị xóa
+    - dry_run=false: xóa thật
+    """
+    return collect_garbage(db, dry_run=dry_run, grace_hours=grace_hours)
+
+@router.get("/{image_id}/references", response_model=List[ImageReferenceOut])
+async def get_image_reference_list(
+    image_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """Lấy danh sách nơi đang sử dụng ảnh (service, banner, printing, shortcode trong content)"""
+    return get_image_references(db, image_id)
+
 @router.delete("/{image_id}")
 async def delete_image(
     image_id: int,
+    force: bool = Query(False, description="Xóa kể cả khi ảnh đang được sử dụng"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
     """
     Xóa ảnh (Chỉ ADMIN mới có quyền)
     - Xóa cả file vật lý và record trong database
+    - Từ chối xóa nếu ảnh đang được sử dụng (trừ khi force=true)
     """
     db_image = db.query(Image).filter(Image.id == image_id).first()
     
@@ -231,12 +543,17 @@ async def delete_image(
             detail=f"Ảnh với ID {image_id} không tồn tại"
         )
     
-    # Xóa file vật lý
-    try:
-        if os.path.exists(db_image.file_path):
-            os.remove(db_image.file_path)
-    except Exception as e:
-        print(f"Lỗi khi xóa file: {e}")
+    # Kiểm tra ảnh có đang được sử dụng không
+    references = get_image_references(db, image_id)
+    if references and not force:
+        used_by = ", ".join(f"{ref.ref_type}#{ref.ref_id}" for ref in references)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Ảnh với ID {image_id} đang được sử dụng bởi: {used_by}"
+        )
+    
+    # Xóa file vật lý (local hoặc S3)
+    delete_stored_file(db_image.file_path)
     
     # Xóa record trong database
     db.delete(db_image)
@@ -251,8 +568,11 @@ async def get_image_categories(db: Session = Depends(get_db)):
     return [cat[0] for cat in categories if cat[0]]
 
 @router.get("/download/{image_id}")
-async def download_image(image_id: int, db: Session = Depends(get_db)):
-    """Download ảnh trực tiếp"""
+async def download_image(image_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Download ảnh trực tiếp
+    - Hỗ trợ ETag/Last-Modified (304), Range request và cache phía client
+    """
     image = db.query(Image).filter(Image.id == image_id).first()
     
     if not image:
@@ -261,14 +581,24 @@ async def download_image(image_id: int, db: Session = Depends(get_db)):
             detail=f"Ảnh với ID {image_id} không tồn tại"
         )
     
-    if not os.path.exists(image.file_path):
+    # File nằm trên object storage: chuyển hướng tới URL công khai
+    if image.file_path.startswith("s3://"):
+        return RedirectResponse(image.url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    
+    try:
+        stat_result = os.stat(image.file_path)
+    except OSError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File ảnh không tìm thấy trên server"
         )
     
-    return FileResponse(
-        path=image.file_path,
-        filename=image.filename,
-        media_type=image.mime_type
-    ) 
\ No newline at end of file
+    return build_file_response(
+        image.file_path,
+        stat_result,
+        request.headers,
+        method=request.method,
+        media_type=image.mime_type,
+        cache_control=f"public, max-age={settings.IMAGE_DOWNLOAD_MAX_AGE}",
+        filename=image.filename
+    )
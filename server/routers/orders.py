@@ -1,17 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, BackgroundTasks
 from fastapi.responses import FileResponse, StreamingResponse
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
-import pandas as pd
 import os
 import shutil
 from datetime import datetime, date
 from config.database import get_db
-from schemas.schemas import OrderCreate, OrderOut, OrderUpdate, PaginatedResponse
-from models.models import Order, Service, User
+from schemas.schemas import OrderCreate, OrderOut, OrderUpdate, OrderListResponse, PaginatedResponse, PresignUploadRequest, PresignUploadResponse
+from models.models import Order, Service, User, Image
 from middlewares.auth_middleware import get_current_user, get_admin_user
-from utils.email import send_order_confirmation
+from utils.email_outbox import enqueue_order_confirmation
+from utils.admin_notifications import notify_new_order, kick_admin_notifications
 from config.settings import settings
+from utils.storage import get_storage, upload_key_prefix, make_design_file_key
+from utils.resumable_upload import get_active_upload, STATUS_COMPLETED, STATUS_ATTACHED
+from utils.serialization import json_response
 import logging
 from sqlalchemy import and_, or_
 import uuid
@@ -19,11 +23,11 @@ import io
 
 router = APIRouter(prefix="/api/orders", tags=["Orders"])
 
-# Đảm bảo thư mục upload tồn tại
-os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+# Thư mục upload được tạo khi khởi động (lifespan trong main.py)
 
 @router.post("/", response_model=OrderOut)
 async def create_order(
+    background_tasks: BackgroundTasks,
     customer_name: str = Form(...),
     customer_email: str = Form(...),
     customer_phone: str = Form(...),
@@ -33,6 +37,8 @@ async def create_order(
     material: Optional[str] = Form(None),
     notes: Optional[str] = Form(None),
     design_file: Optional[UploadFile] = File(None),
+    design_file_key: Optional[str] = Form(None, description="Key file thiết kế đã upload trực tiếp qua /api/orders/presign-design"),
+    upload_id: Optional[str] = Form(None, description="ID phiên upload theo chunk đã hoàn tất (/api/uploads)"),
     db: Session = Depends(get_db)
 ):
     # Thiết lập logging
@@ -51,21 +57,59 @@ async def create_order(
         
         logging.info(f"Đã tìm thấy dịch vụ: {service.name} (ID: {service.id})")
         
+        # Mỗi đơn hàng chỉ nhận một nguồn file thiết kế
+        design_sources = [bool(design_file and design_file.filename), bool(design_file_key), bool(upload_id)]
+        if sum(design_sources) > 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Chỉ được gửi một trong design_file, design_file_key hoặc upload_id"
+            )
+        
         # Lưu file thiết kế nếu có
+        storage = get_storage()
         design_file_url = None
-        if design_file:
-            # Tạo tên file duy nhất
-            filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{design_file.filename}"
-            file_path = os.path.join(settings.UPLOAD_DIR, filename)
+        resumable_upload = None
+        if design_file and design_file.filename:
+            file_key = make_design_file_key(design_file.filename)
             
-            logging.info(f"Lưu file thiết kế: {filename}")
+            logging.info(f"Lưu file thiết kế: {file_key}")
             
-            # Lưu file
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(design_file.file, buffer)
+            # Lưu file qua storage backend (local hoặc S3)
+            await run_in_threadpool(storage.save, file_key, design_file.file, design_file.content_type)
             
-            design_file_url = f"{settings.BACKEND_URL}/static/uploads/{filename}" if settings.BACKEND_URL else f"/static/uploads/{filename}"
+            design_file_url = storage.url(file_key)
             logging.info(f"Đã lưu file thiết kế thành công: {design_file_url}")
+        elif design_file_key:
+            # File đã được trình duyệt upload thẳng lên storage
+            if not design_file_key.startswith(f"{upload_key_prefix()}/") or ".." in design_file_key:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Key file thiết kế không hợp lệ"
+                )
+            
+            file_size = await run_in_threadpool(storage.size, design_file_key)
+            if file_size is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Không tìm thấy file thiết kế. Vui lòng upload lại"
+                )
+            if file_size > settings.DESIGN_FILE_MAX_SIZE:
+                await run_in_threadpool(storage.delete, design_file_key)
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"File thiết kế quá lớn. Kích thước tối đa là {settings.DESIGN_FILE_MAX_SIZE // (1024*1024)}MB"
+                )
+            
+            design_file_url = storage.url(design_file_key)
+        elif upload_id:
+            # File đã được upload theo chunk qua /api/uploads
+            resumable_upload = get_active_upload(db, upload_id, lock=True)
+            if resumable_upload.status != STATUS_COMPLETED:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="File thiết kế chưa upload xong hoặc đã được gắn vào đơn hàng khác"
+                )
+            design_file_url = storage.url(resumable_upload.storage_key)
         
         # Tạo đơn hàng mới
         new_order = Order(
@@ -82,20 +126,20 @@ async def create_order(
         
         logging.info(f"Lưu đơn hàng mới vào database")
         db.add(new_order)
+        db.flush()
+        if resumable_upload is not None:
+            resumable_upload.order_id = new_order.id
+            resumable_upload.status = STATUS_ATTACHED
+        
+        # Email xác nhận được ghi vào outbox cùng transaction với đơn hàng,
+        # worker nền sẽ gửi và thử lại nếu SMTP lỗi; admin nhận thông báo qua email tổng hợp
+        enqueue_order_confirmation(db, new_order, service)
+        notify_new_order(db, new_order, service)
         db.commit()
         db.refresh(new_order)
         logging.info(f"Đã tạo đơn hàng mới thành công, ID: {new_order.id}")
         
-        # Gửi email xác nhận đơn hàng
-        logging.info(f"Bắt đầu gửi email xác nhận đơn hàng #{new_order.id}")
-        try:
-            email_sent = send_order_confirmation(new_order, service)
-            if not email_sent:
-                logging.warning(f"Không thể gửi email xác nhận cho đơn hàng #{new_order.id}")
-            else:
-                logging.info(f"Đã gửi email xác nhận đơn hàng #{new_order.id} thành công")
-        except Exception as e:
-            logging.error(f"Lỗi khi gửi email xác nhận đơn hàng #{new_order.id}: {str(e)}")
+        background_tasks.add_task(kick_admin_notifications)
         
         return new_order
     except HTTPException:
@@ -110,7 +154,32 @@ async def create_order(
             detail=error_msg
         )
 
-@router.get("/")
+@router.post("/presign-design", response_model=PresignUploadResponse)
+async def presign_design_upload(upload: PresignUploadRequest):
+    """
+    Tạo URL để khách hàng upload file thiết kế thẳng lên storage
+    - Sau khi upload xong, gửi design_file_key khi tạo đơn hàng (POST /api/orders/)
+    """
+    if upload.size is not None and upload.size > settings.DESIGN_FILE_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File thiết kế quá lớn. Kích thước tối đa là {settings.DESIGN_FILE_MAX_SIZE // (1024*1024)}MB"
+        )
+    
+    file_key = make_design_file_key(upload.filename)
+    presigned = get_storage().presign_put(
+        file_key, upload.content_type, settings.PRESIGN_EXPIRE_SECONDS, max_size=settings.DESIGN_FILE_MAX_SIZE
+    )
+    
+    return PresignUploadResponse(
+        key=file_key,
+        upload_url=presigned["url"],
+        method=presigned["method"],
+        headers=presigned["headers"],
+        expires_in=settings.PRESIGN_EXPIRE_SECONDS
+    )
+
+@router.get("/", response_model=OrderListResponse)
 async def get_orders(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_admin_user),
@@ -144,7 +213,9 @@ async def get_orders(
     
     # Thực hiện query
     total = query.count()
-    orders = query.order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
+    orders = query.options(
+        selectinload(Order.service).selectinload(Service.image).selectinload(Image.uploader)
+    ).order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
     
     # Xử lý các đơn hàng không có service hoặc service đã bị xóa
     valid_orders = []
@@ -153,10 +224,10 @@ async def get_orders(
             valid_orders.append(order)
     
     # Trả về dữ liệu với pagination
-    return {
+    return json_response(OrderListResponse, {
         "items": valid_orders,
         "total": total
-    }
+    })
 
 @router.get("/{order_id}", response_model=OrderOut)
 async def get_order(
@@ -216,8 +287,8 @@ async def export_orders_csv(
     end_date: Optional[date] = None,
     token: Optional[str] = Query(None, description="Token cho phép tải file mà không cần xác thực header")
 ):
-    # Xây dựng query
-    query = db.query(Order).join(Service, Order.service_id == Service.id, isouter=True)
+    # Xây dựng query (lấy luôn tên dịch vụ qua join, không query lại từng đơn hàng)
+    query = db.query(Order, Service.name).join(Service, Order.service_id == Service.id, isouter=True)
     
     # Áp dụng các bộ lọc
     if customer_name:
@@ -241,16 +312,13 @@ async def export_orders_csv(
     
     # Tạo DataFrame từ đơn hàng
     data = []
-    for order in orders:
-        service = db.query(Service).filter(Service.id == order.service_id).first()
-        service_name = service.name if service else "Unknown"
-        
+    for order, service_name in orders:
         data.append({
             "ID": order.id,
             "Tên khách hàng": order.customer_name,
             "Email": order.customer_email,
             "Số điện thoại": order.customer_phone,
-            "Dịch vụ": service_name,
+            "Dịch vụ": service_name or "Unknown",
             "Số lượng": order.quantity,
             "Kích thước": order.size,
             "Chất liệu": order.material,
@@ -259,7 +327,8 @@ async def export_orders_csv(
             "Ngày tạo": order.created_at.strftime("%Y-%m-%d %H:%M:%S")
         })
     
-    # Tạo DataFrame và xuất ra file CSV
+    # Tạo DataFrame và xuất ra file CSV (pandas nặng, chỉ import khi có người xuất CSV)
+    import pandas as pd
     df = pd.DataFrame(data)
     
     # Tạo tên file duy nhất
@@ -1,11 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
-import os
+import io
 import uuid
 from datetime import datetime
-import shutil
-from PIL import Image as PILImage
 from pathlib import Path
 from config.database import get_db
 from schemas.printing import (
@@ -14,8 +12,11 @@ from schemas.printing import (
 )
 from models.models import Printing, PrintingImage, User, Image
 from middlewares.auth_middleware import get_current_user, get_admin_user
-from config.settings import settings
+from starlette.concurrency import run_in_threadpool
+from utils.storage import get_storage, delete_stored_file
 from utils.slug import create_slug, get_model_by_slug
+from utils.image_refs import sync_printing_references, clear_printing_references
+from utils.serialization import json_response
 import logging
 import re
 
@@ -23,12 +24,11 @@ router = APIRouter(prefix="/api/printing", tags=["Printing"])
 
 # Cấu hình upload ảnh
 UPLOAD_DIR = "static/images/uploads"
+UPLOAD_KEY_PREFIX = "images/uploads"  # Key tương ứng trong storage
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}
 ALLOWED_MIME_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp", "image/bmp"}
 
-# Tạo thư mục upload nếu chưa tồn tại
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 def validate_image_file(file: UploadFile) -> bool:
     """Kiểm tra file ảnh hợp lệ"""
@@ -44,8 +44,9 @@ def validate_image_file(file: UploadFile) -> bool:
         
     return True
 
-def get_image_info(file_path: str) -> dict:
-    """Lấy thông tin ảnh (width, height)"""
+def get_image_info(file_path) -> dict:
+    """Lấy thông tin ảnh (width, height) từ đường dẫn hoặc file object"""
+    from PIL import Image as PILImage
     try:
         with PILImage.open(file_path) as img:
             return {
@@ -70,32 +71,20 @@ async def save_uploaded_image(file: UploadFile, user_id: int, db: Session) -> Im
             detail=f"File quá lớn. Kích thước tối đa là {MAX_FILE_SIZE // (1024*1024)}MB"
         )
     
-    # Tạo tên file unique
+    # Tạo key unique và lưu qua storage backend (local hoặc S3)
     file_ext = Path(file.filename).suffix.lower()
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-    
-    # Lưu file
-    with open(file_path, "wb") as buffer:
-        buffer.write(file_content)
+    storage = get_storage()
+    file_key = f"{UPLOAD_KEY_PREFIX}/{uuid.uuid4()}{file_ext}"
+    await run_in_threadpool(storage.save_bytes, file_key, file_content, file.content_type)
     
     # Lấy thông tin ảnh
-    image_info = get_image_info(file_path)
-    
-    # Tạo URL cho ảnh
-    if hasattr(settings, 'BACKEND_URL') and settings.BACKEND_URL:
-        backend_url = settings.BACKEND_URL
-        if not backend_url.startswith("http"):
-            backend_url = f"https://{backend_url}"
-        file_url = f"{backend_url}/static/images/uploads/{unique_filename}"
-    else:
-        file_url = f"/static/images/uploads/{unique_filename}"
+    image_info = get_image_info(io.BytesIO(file_content))
     
     # Tạo record trong database
     new_image = Image(
         filename=file.filename,
-        file_path=file_path,
-        url=file_url,
+        file_path=storage.path_for(file_key),
+        url=storage.url(file_key),
         alt_text=None,  # Có thể thêm tham số alt_text sau
         file_size=len(file_content),
         mime_type=file.content_type,
@@ -143,29 +132,18 @@ async def get_printings(
     # Đếm tổng số bản ghi
     total = query.count()
     
-    # Lấy danh sách với phân trang
-    printings = query.order_by(Printing.created_at.desc()).offset(skip).limit(limit).all()
+    # Lấy danh sách với phân trang, nạp sẵn người tạo và ảnh cho cả trang
+    printings = query.options(
+        selectinload(Printing.creator),
+        selectinload(Printing.images).selectinload(PrintingImage.image).selectinload(Image.uploader)
+    ).order_by(Printing.created_at.desc()).offset(skip).limit(limit).all()
     
-    # Parse content cho từng bài đăng
-    parsed_printings = []
+    # Parse content cho từng bài đăng (ảnh trong shortcode lấy bằng một query)
+    content_images = load_content_images([printing.content for printing in printings], db)
     for printing in printings:
-        content_html = parse_content_images(printing.content, db)
-        printing_dict = {
-            "id": printing.id,
-            "title": printing.title,
-            "time": printing.time,
-            "content": printing.content,
-            "content_html": content_html,
-            "is_visible": printing.is_visible,
-            "created_at": printing.created_at,
-            "updated_at": printing.updated_at,
-            "created_by": printing.created_by,
-            "creator": printing.creator,
-            "images": printing.images
-        }
-        parsed_printings.append(printing_dict)
+        printing.content_html = parse_content_images(printing.content, db, content_images)
     
-    return PrintingListResponse(items=parsed_printings, total=total)
+    return json_response(PrintingListResponse, {"items": printings, "total": total})
 
 @router.get("/{slug}", response_model=PrintingOut)
 async def get_printing(slug: str, db: Session = Depends(get_db)):
@@ -265,13 +243,15 @@ async def create_printing(
                 except Exception as e:
                     # Nếu có lỗi upload ảnh, xóa các file đã upload
                     for img in uploaded_images:
-                        if os.path.exists(img.file_path):
-                            os.remove(img.file_path)
+                        delete_stored_file(img.file_path)
                     raise HTTPException(
                         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                         detail=f"Lỗi khi upload ảnh {file.filename}: {str(e)}"
                     )
         
+        # Cập nhật chỉ mục tham chiếu ảnh (ảnh đính kèm + shortcode trong content)
+        sync_printing_references(db, new_printing)
+        
         db.commit()
         db.refresh(new_printing)
         
@@ -355,19 +335,10 @@ async def update_printing(
                     detail=f"Tổng số ảnh không được quá 3. Hiện tại: {current_image_count}, thêm mới: {new_image_count}"
                 )
             
-            # Nếu không giữ ảnh cũ, xóa tất cả ảnh cũ
+            # Nếu không giữ ảnh cũ, gỡ liên kết với tất cả ảnh cũ
+            # File ảnh không bị xóa ngay vì có thể vẫn được dùng qua shortcode,
+            # GC ảnh (utils/image_gc.py) sẽ dọn khi ảnh không còn tham chiếu nào
             if not keep_existing_images:
-                old_images = db.query(PrintingImage).filter(PrintingImage.printing_id == db_printing.id).all()
-                for old_img_relation in old_images:
-                    # Xóa file vật lý (tùy chọn, có thể comment nếu muốn giữ file)
-                    old_img = db.query(Image).filter(Image.id == old_img_relation.image_id).first()
-                    if old_img and os.path.exists(old_img.file_path):
-                        try:
-                            os.remove(old_img.file_path)
-                        except:
-                            pass  # Không quan trọng nếu không xóa được file
-                
-                # Xóa các record
                 db.query(PrintingImage).filter(PrintingImage.printing_id == db_printing.id).delete()
             
             # Upload ảnh mới
@@ -389,13 +360,15 @@ async def update_printing(
                     except Exception as e:
                         # Cleanup nếu có lỗi
                         for img in uploaded_images:
-                            if os.path.exists(img.file_path):
-                                os.remove(img.file_path)
+                            delete_stored_file(img.file_path)
                         raise HTTPException(
                             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=f"Lỗi khi upload ảnh {file.filename}: {str(e)}"
                         )
         
+        # Cập nhật chỉ mục tham chiếu ảnh
+        sync_printing_references(db, db_printing)
+        
         db.commit()
         db.refresh(db_printing)
         
@@ -434,6 +407,7 @@ async def delete_printing(
     
     try:
         # Xóa bài đăng (cascade sẽ tự động xóa các ảnh liên quan)
+        clear_printing_references(db, db_printing.id)
         db.delete(db_printing)
         db.commit()
         
@@ -484,10 +458,25 @@ async def toggle_printing_visibility(
             detail=f"Lỗi khi thay đổi trạng thái hiển thị: {str(e)}"
         )
 
-def parse_content_images(content: str, db: Session) -> str:
+SHORTCODE_PATTERN = re.compile(r'\[image:([^\]]+)\]')
+
+def load_content_images(contents: List[str], db: Session) -> dict:
+    """Lấy một lần mọi ảnh được nhắc tới trong shortcode của nhiều bài đăng: {image_id: Image}"""
+    image_ids = set()
+    for content in contents:
+        for match in SHORTCODE_PATTERN.finditer(content or ""):
+            image_id = match.group(1).split('|', 1)[0]
+            if image_id.strip().isdigit():
+                image_ids.add(int(image_id))
+    if not image_ids:
+        return {}
+    return {image.id: image for image in db.query(Image).filter(Image.id.in_(image_ids)).all()}
+
+def parse_content_images(content: str, db: Session, images: Optional[dict] = None) -> str:
     """
     Parse content để thay thế shortcode ảnh bằng HTML
     Shortcode format: [image:123] hoặc [image:123|alt_text]
+    images: ảnh đã nạp sẵn bằng load_content_images (nếu không có thì query từng ảnh)
     """
     def replace_image(match):
         image_id_part = match.group(1)
@@ -501,7 +490,10 @@ def parse_content_images(content: str, db: Session) -> str:
         
         try:
             image_id = int(image_id)
-            image = db.query(Image).filter(Image.id == image_id).first()
+            if images is not None:
+                image = images.get(image_id)
+            else:
+                image = db.query(Image).filter(Image.id == image_id).first()
             
             if image:
                 alt_attr = f'alt="{alt_text}"' if alt_text else f'alt="{image.alt_text or ""}"'
@@ -511,9 +503,8 @@ def parse_content_images(content: str, db: Session) -> str:
         except ValueError:
             return match.group(0)  # Trả về shortcode gốc nếu không parse được
     
-    # Regex để tìm shortcode [image:123] hoặc [image:123|alt_text]
-    pattern = r'\[image:([^\]]+)\]'
-    return re.sub(pattern, replace_image, content)
+    # Tìm shortcode [image:123] hoặc [image:123|alt_text]
+    return SHORTCODE_PATTERN.sub(replace_image, content)
 
 @router.post("/upload-content-image", response_model=dict)
 async def upload_content_image(
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import HTMLResponse
+from starlette.concurrency import run_in_threadpool
+from models.models import User
+from middlewares.auth_middleware import get_root_user
+from utils.profiles import get_profile_store
+
+router = APIRouter(prefix="/api/admin/profiles", tags=["Profiles"])
+
+@router.get("/")
+async def list_profiles(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_root_user)
+):
+    """
+    Danh sách profile đã lưu, mới nhất trước (Chỉ ROOT mới có quyền)
+    - trigger: "requested" (gửi header X-Profile) hoặc "sampled" (lấy mẫu theo PROFILING_SAMPLE_EVERY)
+    """
+    return await run_in_threadpool(get_profile_store().list, limit)
+
+@router.get("/{profile_id}", response_class=HTMLResponse)
+async def get_profile(profile_id: str, current_user: User = Depends(get_root_user)):
+    """
+    Flame graph HTML của một profile (Chỉ ROOT mới có quyền)
+    """
+    html = await run_in_threadpool(get_profile_store().get_html, profile_id)
+    if html is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Không tìm thấy profile"
+        )
+    return HTMLResponse(html)
+
+@router.delete("/")
+async def clear_profiles(current_user: User = Depends(get_root_user)):
+    """
+    Xóa toàn bộ profile đã lưu (Chỉ ROOT mới có quyền)
+    """
+    deleted = await run_in_threadpool(get_profile_store().clear)
+    return {"deleted": deleted}
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends
+from models.models import User
+from middlewares.auth_middleware import get_admin_user
+from utils.rate_limit import get_rate_limiter
+
+router = APIRouter(prefix="/api/rate-limits", tags=["Rate Limits"])
+
+@router.get("/metrics")
+async def get_rate_limit_metrics(current_user: User = Depends(get_admin_user)):
+    """
+    Thống kê rate limit theo từng chính sách (Chỉ ADMIN mới có quyền)
+    - allowed: số request được phép, limited_ip / limited_global: số request bị chặn
+    - Với backend memory, số liệu là của process hiện tại; với redis là của mọi worker
+    """
+    return await get_rate_limiter().get_metrics()
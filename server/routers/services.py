@@ -1,28 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Form
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
-import os
+import io
 import uuid
 from datetime import datetime
-from PIL import Image as PILImage
 from pathlib import Path
 from config.database import get_db
 from schemas.schemas import ServiceCreate, ServiceOut, ServiceUpdate, ServiceReviewCreate, ServiceReviewOut
 from models.models import Service, User, ServiceReview, Image
 from middlewares.auth_middleware import get_current_user, get_admin_user
-from config.settings import settings
+from starlette.concurrency import run_in_threadpool
+from utils.storage import get_storage
 from utils.slug import create_slug, get_model_by_slug
+from utils.image_refs import sync_service_references, clear_references, REF_SERVICE
+from utils.serialization import json_response
 
 router = APIRouter(prefix="/api/services", tags=["Services"])
 
 # Cấu hình upload ảnh cho services
 UPLOAD_DIR = "static/images/uploads"
+UPLOAD_KEY_PREFIX = "images/uploads"  # Key tương ứng trong storage
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}
 ALLOWED_MIME_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp", "image/bmp"}
 
-# Tạo thư mục upload nếu chưa tồn tại
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 def validate_image_file(file: UploadFile) -> bool:
     """Kiểm tra file ảnh hợp lệ"""
@@ -38,8 +40,9 @@ def validate_image_file(file: UploadFile) -> bool:
         
     return True
 
-def get_image_info(file_path: str) -> dict:
-    """Lấy thông tin ảnh (width, height)"""
+def get_image_info(file_path) -> dict:
+    """Lấy thông tin ảnh (width, height) từ đường dẫn hoặc file object"""
+    from PIL import Image as PILImage
     try:
         with PILImage.open(file_path) as img:
             return {
@@ -61,32 +64,20 @@ async def save_uploaded_image(file: UploadFile, user_id: int, db: Session) -> Im
             detail=f"File quá lớn. Kích thước tối đa là {MAX_FILE_SIZE // (1024*1024)}MB"
         )
     
-    # Tạo tên file unique
+    # Tạo key unique và lưu qua storage backend (local hoặc S3)
     file_ext = Path(file.filename).suffix.lower()
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-    
-    # Lưu file
-    with open(file_path, "wb") as buffer:
-        buffer.write(file_content)
+    storage = get_storage()
+    file_key = f"{UPLOAD_KEY_PREFIX}/{uuid.uuid4()}{file_ext}"
+    await run_in_threadpool(storage.save_bytes, file_key, file_content, file.content_type)
     
     # Lấy thông tin ảnh
-    image_info = get_image_info(file_path)
-    
-    # Tạo URL cho ảnh
-    if hasattr(settings, 'BACKEND_URL') and settings.BACKEND_URL:
-        backend_url = settings.BACKEND_URL
-        if not backend_url.startswith("http"):
-            backend_url = f"https://{backend_url}"
-        file_url = f"{backend_url}/static/images/uploads/{unique_filename}"
-    else:
-        file_url = f"/static/images/uploads/{unique_filename}"
+    image_info = get_image_info(io.BytesIO(file_content))
     
     # Tạo record trong database
     new_image = Image(
         filename=file.filename,
-        file_path=file_path,
-        url=file_url,
+        file_path=storage.path_for(file_key),
+        url=storage.url(file_key),
         alt_text=None,
         file_size=len(file_content),
         mime_type=file.content_type,
@@ -132,8 +123,11 @@ async def get_services(
     if category is not None:
         query = query.filter(Service.category == category)
     
-    services = query.order_by(Service.id).offset(skip).limit(limit).all()
-    return services
+    # Nạp sẵn ảnh (và người upload) bằng một query cho cả trang thay vì lazy load từng dịch vụ
+    services = query.options(
+        selectinload(Service.image).selectinload(Image.uploader)
+    ).order_by(Service.id).offset(skip).limit(limit).all()
+    return json_response(List[ServiceOut], services)
 
 @router.get("/suggested", response_model=List[ServiceOut])
 async def get_suggested_services(current_id: int = Query(...), db: Session = Depends(get_db)):
@@ -223,6 +217,8 @@ async def create_service(
         )
         
         db.add(new_service)
+        db.flush()  # Để lấy ID
+        sync_service_references(db, new_service)
         db.commit()
         db.refresh(new_service)
         
@@ -273,25 +269,14 @@ async def update_service(
                     detail=f"File {image.filename} không hợp lệ. Chỉ chấp nhận file ảnh (jpg, png, gif, webp, bmp)"
                 )
             
-            # Xóa ảnh cũ nếu có
-            if db_service.image_id:
-                old_image = db.query(Image).filter(Image.id == db_service.image_id).first()
-                if old_image and os.path.exists(old_image.file_path):
-                    os.remove(old_image.file_path)
-                    db.delete(old_image)
-            
-            # Upload ảnh mới
+            # Upload ảnh mới thay thế ảnh cũ
+            # Ảnh cũ không bị xóa ngay, GC ảnh sẽ dọn khi không còn tham chiếu nào
             uploaded_image = await save_uploaded_image(image, current_user.id, db)
             db_service.image_id = uploaded_image.id
         
-        # Xóa ảnh nếu được yêu cầu
+        # Gỡ ảnh nếu được yêu cầu
         elif remove_image and db_service.image_id:
-            old_image = db.query(Image).filter(Image.id == db_service.image_id).first()
-            if old_image:
-                if os.path.exists(old_image.file_path):
-                    os.remove(old_image.file_path)
-                db.delete(old_image)
-                db_service.image_id = None
+            db_service.image_id = None
         
         # Cập nhật các trường khác nếu được cung cấp
         if name is not None:
@@ -307,6 +292,7 @@ async def update_service(
         if featured is not None:
             db_service.featured = featured
         
+        sync_service_references(db, db_service)
         db.commit()
         db.refresh(db_service)
         
@@ -334,15 +320,8 @@ async def delete_service(slug: str, db: Session = Depends(get_db), current_user:
             detail=f"Dịch vụ với slug '{slug}' không tồn tại"
         )
     
-    # Xóa ảnh liên quan nếu có
-    if db_service.image_id:
-        image = db.query(Image).filter(Image.id == db_service.image_id).first()
-        if image:
-            # Xóa file ảnh từ disk
-            if os.path.exists(image.file_path):
-                os.remove(image.file_path)
-            # Xóa record từ database
-            db.delete(image)
+    # Gỡ tham chiếu ảnh, GC ảnh sẽ dọn ảnh nếu không còn nơi nào sử dụng
+    clear_references(db, REF_SERVICE, db_service.id)
     
     db.delete(db_service)
     db.commit()
@@ -360,7 +339,14 @@ async def get_service_reviews(slug: str, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Dịch vụ với slug '{slug}' không tồn tại"
         )
-    return db.query(ServiceReview).filter(ServiceReview.service_id == service.id).order_by(ServiceReview.created_at.desc()).all()
+    # Schema phẳng: select theo cột rồi serialize thẳng từ Row, không dựng object ORM
+    rows = db.execute(
+        select(
+            ServiceReview.id, ServiceReview.rating, ServiceReview.content, ServiceReview.author_name,
+            ServiceReview.is_anonymous, ServiceReview.created_at
+        ).where(ServiceReview.service_id == service.id).order_by(ServiceReview.created_at.desc())
+    ).all()
+    return json_response(List[ServiceReviewOut], rows)
 
 @router.post("/{slug}/reviews", response_model=ServiceReviewOut)
 async def create_service_review(slug: str, review: ServiceReviewCreate, db: Session = Depends(get_db)):
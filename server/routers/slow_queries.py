@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from models.models import User
+from middlewares.auth_middleware import get_root_user
+from utils.slow_queries import SORT_KEYS, get_slow_query_log
+
+router = APIRouter(prefix="/api/admin/slow-queries", tags=["Slow Queries"])
+
+@router.get("/")
+async def list_slow_queries(
+    limit: int = Query(20, ge=1, le=200),
+    sort: str = Query("total_ms"),
+    current_user: User = Depends(get_root_user)
+):
+    """
+    Các câu SQL chậm hơn SLOW_QUERY_THRESHOLD_MS, gom theo fingerprint (Chỉ ROOT mới có quyền)
+    - sort: total_ms (mặc định), max_ms, avg_ms hoặc count
+    - explain: kết quả EXPLAIN (ANALYZE, BUFFERS) lấy mẫu gần nhất (chỉ PostgreSQL, câu SELECT)
+    - Số liệu là của process hiện tại
+    """
+    if sort not in SORT_KEYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sort phải là một trong: {', '.join(SORT_KEYS)}"
+        )
+    log = get_slow_query_log()
+    return {
+        "threshold_ms": log.threshold_ms,
+        "queries": log.top(limit, sort),
+    }
+
+@router.delete("/")
+async def reset_slow_queries(current_user: User = Depends(get_root_user)):
+    """
+    Xóa số liệu câu SQL chậm đã ghi (Chỉ ROOT mới có quyền)
+    """
+    return {"deleted": get_slow_query_log().reset()}
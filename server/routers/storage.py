@@ -0,0 +1,80 @@
+from fastapi import APIRouter, HTTPException, status, Request, Query
+import os
+import logging
+import tempfile
+
+from utils.storage import get_storage, LocalStorage
+
+router = APIRouter(prefix="/api/storage", tags=["Storage"])
+
+@router.put("/upload/{key:path}")
+async def direct_upload(
+    key: str,
+    request: Request,
+    expires: int = Query(...),
+    max_size: int = Query(0),
+    signature: str = Query(...)
+):
+    """
+    Nhận file upload trực tiếp qua URL đã ký (chỉ dùng với STORAGE_BACKEND=local)
+    - URL được tạo bởi /api/images/presign hoặc /api/orders/presign-design
+    - Với S3, trình duyệt PUT thẳng lên bucket nên endpoint này không được dùng
+    """
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Storage hiện tại không hỗ trợ upload qua API"
+        )
+    
+    content_type = request.headers.get("content-type", "")
+    if not storage.verify_signature(key, expires, content_type, max_size, signature):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="URL upload không hợp lệ hoặc đã hết hạn"
+        )
+    
+    try:
+        path = storage.path_for(key)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Key không hợp lệ"
+        )
+    
+    if os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="File đã tồn tại"
+        )
+    
+    # Ghi stream vào file tạm rồi rename, không giữ toàn bộ file trong RAM
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            async for chunk in request.stream():
+                written += len(chunk)
+                if max_size and written > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="File vượt quá kích thước cho phép"
+                    )
+                buffer.write(chunk)
+        os.replace(tmp_path, path)
+    except HTTPException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        logging.error(f"Lỗi khi nhận file upload trực tiếp {key}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi khi lưu file: {str(e)}"
+        )
+    
+    return {"key": key, "size": written}
@@ -0,0 +1,152 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Header
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Optional
+import logging
+
+from config.database import get_db
+from config.settings import settings
+from schemas.schemas import ResumableUploadCreate, ResumableUploadOut
+from models.models import ResumableUpload
+from utils.storage import get_storage
+from utils.resumable_upload import (
+    STATUS_UPLOADING, STATUS_COMPLETED, STATUS_EXPIRED,
+    create_upload, get_active_upload, write_chunk, assemble_upload,
+    received_chunks, missing_chunks, current_offset, parse_checksum, remove_upload_files
+)
+
+router = APIRouter(prefix="/api/uploads", tags=["Uploads"])
+
+def _upload_headers(upload: ResumableUpload, offset: int) -> dict:
+    """Header theo giao thức tus: tiến độ và hạn của phiên upload"""
+    return {
+        "Upload-Offset": str(offset),
+        "Upload-Length": str(upload.total_size),
+        "Upload-Expires": format_datetime(upload.expires_at.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True),
+        "Cache-Control": "no-store",
+    }
+
+def _upload_out(upload: ResumableUpload) -> ResumableUploadOut:
+    received = received_chunks(upload) if upload.status == STATUS_UPLOADING else set()
+    return ResumableUploadOut(
+        id=upload.id,
+        filename=upload.filename,
+        content_type=upload.content_type,
+        total_size=upload.total_size,
+        chunk_size=upload.chunk_size,
+        status=upload.status,
+        offset=current_offset(upload, received),
+        missing_chunks=missing_chunks(upload, received) if upload.status == STATUS_UPLOADING else [],
+        expires_at=upload.expires_at,
+        file_url=get_storage().url(upload.storage_key) if upload.storage_key else None
+    )
+
+@router.post("/", response_model=ResumableUploadOut, status_code=status.HTTP_201_CREATED)
+async def create_resumable_upload(
+    upload_in: ResumableUploadCreate,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """
+    Tạo phiên upload file thiết kế theo chunk (public, dùng khi đặt hàng)
+    - Client gửi từng chunk bằng PATCH /api/uploads/{id} với header Upload-Offset
+    - Mỗi chunk (trừ chunk cuối) phải đúng chunk_size trả về; có thể gửi song song
+    - Khi đủ chunk, file được ghép lại và id dùng làm upload_id khi tạo đơn hàng
+    """
+    upload = create_upload(
+        db,
+        filename=upload_in.filename,
+        total_size=upload_in.size,
+        content_type=upload_in.content_type,
+        chunk_size=upload_in.chunk_size
+    )
+    db.commit()
+    db.refresh(upload)
+    logging.info(f"Tạo phiên upload {upload.id}: {upload.filename} ({upload.total_size} bytes)")
+
+    response.headers["Location"] = f"/api/uploads/{upload.id}"
+    response.headers.update(_upload_headers(upload, 0))
+    return _upload_out(upload)
+
+@router.head("/{upload_id}")
+async def get_upload_offset(upload_id: str, db: Session = Depends(get_db)):
+    """Lấy offset hiện tại để tiếp tục upload (header Upload-Offset)"""
+    upload = get_active_upload(db, upload_id)
+    return Response(status_code=status.HTTP_200_OK, headers=_upload_headers(upload, current_offset(upload)))
+
+@router.get("/{upload_id}", response_model=ResumableUploadOut)
+async def get_upload_status(upload_id: str, response: Response, db: Session = Depends(get_db)):
+    """Lấy trạng thái phiên upload và danh sách chunk còn thiếu"""
+    upload = get_active_upload(db, upload_id)
+    result = _upload_out(upload)
+    response.headers.update(_upload_headers(upload, result.offset))
+    return result
+
+@router.patch("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    upload_checksum: Optional[str] = Header(None, alias="Upload-Checksum"),
+    db: Session = Depends(get_db)
+):
+    """
+    Nhận một chunk của file
+    - Upload-Offset: vị trí bắt đầu của chunk (bội của chunk_size)
+    - Upload-Checksum (tùy chọn): "sha256 <base64>", sai checksum trả về 460
+    Gửi lại chunk đã nhận là an toàn (ghi đè bằng nội dung giống hệt)
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type and content_type != "application/offset+octet-stream":
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Content-Type phải là application/offset+octet-stream"
+        )
+
+    upload = get_active_upload(db, upload_id)
+    checksum = parse_checksum(upload_checksum)
+    # Tách object khỏi session và kết thúc transaction (chỉ đọc) để không giữ
+    # connection DB trong lúc nhận dữ liệu chunk
+    db.expunge(upload)
+    db.rollback()
+
+    index = await write_chunk(upload, upload_offset, request.stream(), checksum)
+
+    # Khóa phiên upload để chỉ một request ghép file khi nhận chunk cuối
+    upload = get_active_upload(db, upload_id, lock=True)
+    if upload.status == STATUS_UPLOADING:
+        upload.expires_at = datetime.utcnow() + timedelta(hours=settings.RESUMABLE_UPLOAD_EXPIRE_HOURS)
+        try:
+            # Ghép file (copy / upload S3 tới DESIGN_FILE_MAX_SIZE) chạy ở thread pool để không chặn event loop
+            assembled = await run_in_threadpool(assemble_upload, db, upload)
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            logging.error(f"Lỗi khi ghép file upload {upload_id}: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Lỗi khi ghép file: {str(e)}"
+            )
+        if not assembled:
+            db.commit()
+
+    logging.debug(f"Upload {upload_id}: nhận chunk {index}")
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_upload_headers(upload, current_offset(upload)))
+
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def terminate_upload(upload_id: str, db: Session = Depends(get_db)):
+    """Hủy phiên upload, xóa các chunk và file đã ghép (nếu chưa gắn vào đơn hàng)"""
+    upload = get_active_upload(db, upload_id, lock=True)
+    if upload.status not in (STATUS_UPLOADING, STATUS_COMPLETED):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="File đã được gắn vào đơn hàng, không thể hủy"
+        )
+    remove_upload_files(upload)
+    upload.status = STATUS_EXPIRED
+    db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -5,17 +5,15 @@ from config.database import get_db
 from schemas.schemas import UserOut, UserUpdate, UserCreate, AdminAccessLogOut
 from models.models import User, AdminAccessLog
 from middlewares.auth_middleware import get_current_user, get_root_user
-from passlib.context import CryptContext
+from utils.passwords import hash_password_async
+from utils.principal_cache import principal_cache
+from utils.sessions import revoke_all_sessions, REVOKED_PASSWORD_CHANGED, REVOKED_LOGOUT_ALL
+from utils.tasks import purge_expired_access_logs
 from datetime import datetime, timedelta
 from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
 
 router = APIRouter(prefix="/api/users", tags=["Users"])
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 @router.post("/", response_model=UserOut)
 async def create_user(user: UserCreate, db: Session = Depends(get_db), current_user: User = Depends(get_root_user)):
     # Kiểm tra xem người dùng đã tồn tại chưa
@@ -34,7 +32,7 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db), current_u
         )
     
     # Tạo người dùng mới
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password_async(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -166,9 +164,15 @@ async def update_user(
         
     # Kiểm tra xem có cập nhật mật khẩu không
     if hasattr(user, 'password') and user.password:
-        db_user.hashed_password = get_password_hash(user.password)
+        db_user.hashed_password = await hash_password_async(user.password)
+        
+    # Đổi mật khẩu hoặc khóa tài khoản: thu hồi mọi phiên và token đã cấp
+    if (hasattr(user, 'password') and user.password) or user.is_active is False:
+        revoke_all_sessions(db, db_user, reason=REVOKED_PASSWORD_CHANGED if user.password else REVOKED_LOGOUT_ALL)
     
     db.commit()
+    # Bỏ user khỏi cache xác thực để role / trạng thái mới có hiệu lực ngay
+    principal_cache.invalidate(user_id=user_id)
     db.refresh(db_user)
     
     return db_user
@@ -190,6 +194,7 @@ async def delete_user(
     # Xóa user
     db.delete(db_user)
     db.commit()
+    principal_cache.invalidate(user_id=user_id)
     
     return db_user
 
@@ -210,6 +215,7 @@ async def delete_user_by_username(
     # Xóa user
     db.delete(db_user)
     db.commit()
+    principal_cache.invalidate(username=username)
     
     return db_user
 
@@ -219,20 +225,10 @@ async def cleanup_expired_access_logs(
     current_user: User = Depends(get_root_user)
 ):
     """
-    Xóa các bản ghi log đã quá hạn (sau 3 tháng).
+    Xóa các bản ghi log đã quá hạn (sau ACCESS_LOG_RETENTION_DAYS ngày).
+    Bảng partition theo tháng thì drop partition hết hạn, nếu không thì DELETE theo lô.
     Chỉ ROOT có quyền thực hiện thao tác này.
     """
-    # Lấy thời gian hiện tại
-    now = datetime.utcnow()
-    
-    # Tìm các bản ghi đã hết hạn
-    expired_logs = db.query(AdminAccessLog).filter(AdminAccessLog.expires_at < now).all()
-    
-    # Xóa các bản ghi đã hết hạn
-    for log in expired_logs:
-        db.delete(log)
-    
-    # Lưu thay đổi
-    db.commit()
+    purge_expired_access_logs(db)
     
     return None
\ No newline at end of file
@@ -28,6 +28,8 @@ class UserLogin(BaseModel):
     password: str
 
 class UserOut(UserBase):
+    # Email đã được kiểm tra khi ghi vào DB; kiểm tra lại (email_validator) khi trả response rất tốn thời gian
+    email: str
     id: int
     is_active: bool
     created_at: datetime
@@ -42,6 +44,23 @@ class TokenData(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    expires_in: Optional[int] = None  # Số giây access token còn hiệu lực
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class UserSessionOut(BaseModel):
+    id: str
+    ip_address: Optional[str] = None
+    user_agent: Optional[str] = None
+    created_at: datetime
+    last_used_at: Optional[datetime] = None
+    expires_at: datetime
+    current: bool = False
+    
+    class Config:
+        from_attributes = True
 
 # Login History Schemas
 class LoginHistoryBase(BaseModel):
@@ -59,6 +78,28 @@ class LoginHistoryOut(LoginHistoryBase):
     class Config:
         from_attributes = True
 
+class LoginSummaryDay(BaseModel):
+    user_id: int
+    username: Optional[str] = None
+    day: str
+    logins: int
+    distinct_ips: int
+
+class LoginSummaryUser(BaseModel):
+    user_id: int
+    username: Optional[str] = None
+    logins: int
+    distinct_ips: int
+    last_login: Optional[datetime] = None
+
+class LoginHistorySummary(BaseModel):
+    start_date: datetime
+    end_date: datetime
+    total_logins: int
+    distinct_ips: int
+    users: List[LoginSummaryUser]
+    per_user_day: List[LoginSummaryDay]
+
 # Admin Access Log Schemas
 class AdminAccessLogBase(BaseModel):
     user_id: int
@@ -116,6 +157,76 @@ class ImageUploadResponse(BaseModel):
     message: str
     image: ImageOut
 
+class BulkImageResult(BaseModel):
+    filename: str
+    status: str  # created, duplicate, rejected
+    reason: Optional[str] = None
+    image: Optional[ImageOut] = None
+
+class BulkImageUploadResponse(BaseModel):
+    message: str
+    created: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    results: List[BulkImageResult] = []
+
+class PresignUploadRequest(BaseModel):
+    filename: str
+    content_type: str
+    size: Optional[int] = None
+
+class PresignUploadResponse(BaseModel):
+    key: str
+    upload_url: str
+    method: str = "PUT"
+    headers: Dict[str, str] = {}
+    expires_in: int
+
+class ImageFinalize(BaseModel):
+    key: str
+    filename: str
+    content_type: Optional[str] = None
+    alt_text: Optional[str] = None
+    category: Optional[str] = None
+    is_visible: bool = True
+
+class ImageReferenceOut(BaseModel):
+    id: int
+    image_id: int
+    ref_type: str
+    ref_id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class ImageGCReport(BaseModel):
+    dry_run: bool
+    orphan_images: List[int] = []
+    stray_files: List[str] = []
+    deleted_images: int = 0
+    deleted_files: int = 0
+    freed_bytes: int = 0
+
+# Resumable Upload Schemas
+class ResumableUploadCreate(BaseModel):
+    filename: str
+    size: int
+    content_type: Optional[str] = None
+    chunk_size: Optional[int] = None
+
+class ResumableUploadOut(BaseModel):
+    id: str
+    filename: str
+    content_type: Optional[str] = None
+    total_size: int
+    chunk_size: int
+    status: str
+    offset: int = 0
+    missing_chunks: List[int] = []
+    expires_at: datetime
+    file_url: Optional[str] = None
+
 # Service Schemas
 class ServiceBase(BaseModel):
     name: str
@@ -215,6 +326,7 @@ class OrderUpdate(BaseModel):
     status: OrderStatus
 
 class OrderOut(OrderBase):
+    customer_email: str
     id: int
     design_file_url: Optional[str] = None
     total_price: Optional[float] = None
@@ -226,6 +338,10 @@ class OrderOut(OrderBase):
     class Config:
         from_attributes = True
 
+class OrderListResponse(BaseModel):
+    items: List[OrderOut]
+    total: int
+
 # Service Review Schemas
 class ServiceReviewBase(BaseModel):
     rating: int = Field(..., ge=1, le=5)
@@ -257,6 +373,7 @@ class ContactUpdate(BaseModel):
     status: Optional[str] = None
 
 class ContactOut(ContactBase):
+    email: str
     id: int
     status: str
     created_at: datetime
@@ -293,4 +410,33 @@ class BannerOut(BannerBase):
     creator: Optional[UserOut] = None
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+# Email Outbox Schemas
+class EmailOutboxOut(BaseModel):
+    id: int
+    to_email: str
+    subject: str
+    kind: Optional[str] = None
+    status: str
+    attempts: int
+    max_attempts: int
+    last_error: Optional[str] = None
+    next_attempt_at: Optional[datetime] = None
+    created_at: datetime
+    sent_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class EmailOutboxDetail(EmailOutboxOut):
+    html_content: str
+    text_content: Optional[str] = None
+
+class EmailOutboxStats(BaseModel):
+    pending: int = 0
+    sending: int = 0
+    sent: int = 0
+    dead: int = 0
+    oldest_pending_at: Optional[datetime] = None
+
@@ -0,0 +1,176 @@
+"""
+Benchmark requests/giây của stack middleware: trước (BaseHTTPMiddleware) và sau (ASGI thuần)
+
+Chạy: python scripts/bench_middleware.py [--requests 3000] [--concurrency 20]
+Gọi thẳng ứng dụng ASGI trong process (không qua socket) để chỉ đo chi phí middleware + route:
+- before: CORSMiddleware của Starlette + handler OPTIONS @app.middleware + AdminLoggingMiddleware
+          dạng BaseHTTPMiddleware (bản cũ, dựng lại trong script để so sánh)
+- after: CORSMiddleware + AdminLoggingMiddleware ASGI thuần trong middlewares/
+Các kịch bản: GET public có Origin, preflight OPTIONS, GET admin có JWT (ghi log truy cập vào SQLite)
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware as StarletteCORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.middleware.base import BaseHTTPMiddleware
+from config.database import Base, get_db
+from models.models import AdminAccessLog, User, UserRole, access_log_expiry
+from middlewares.auth_middleware import get_admin_user, get_bearer_token, get_token_payload, load_principal
+from middlewares.cors_middleware import CORSMiddleware
+from middlewares.logging_middleware import AdminLoggingMiddleware, should_log_path
+from utils.jwt import create_access_token
+
+def make_legacy_logging(Session):
+    class LegacyAdminLoggingMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            if should_log_path(request.url.path):
+                token = get_bearer_token(request)
+                if token:
+                    try:
+                        payload = get_token_payload(request, token)
+                    except HTTPException:
+                        payload = None
+                    if payload and payload.get("role") in ["admin", "root"]:
+                        response = await call_next(request)
+                        db = Session()
+                        try:
+                            user = getattr(request.state, "user", None) or \
+                                load_principal(db, payload["sub"], payload.get("ver", 0))
+                            db.add(AdminAccessLog(user_id=user.id, endpoint=request.url.path, method=request.method,
+                                                  status_code=response.status_code, ip_address=request.client.host,
+                                                  timestamp=datetime.utcnow(), expires_at=access_log_expiry()))
+                            db.commit()
+                        finally:
+                            db.close()
+                        return response
+            return await call_next(request)
+    return LegacyAdminLoggingMiddleware
+
+async def legacy_cors_handler(request: Request, call_next):
+    if request.method == "OPTIONS":
+        response = JSONResponse(content={})
+        response.headers["Access-Control-Allow-Origin"] = "*"
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, HEAD, PATCH"
+        response.headers["Access-Control-Allow-Headers"] = "*"
+        response.headers["Access-Control-Max-Age"] = "3600"
+        return response
+    return await call_next(request)
+
+def build_app(stack: str, Session) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/config/public")
+    def public_config():
+        return {"site_name": "Phú Long", "hotline": "0901234567"}
+
+    @app.get("/api/dashboard/stats")
+    def stats(user: User = Depends(get_admin_user)):
+        return {"orders": 12, "user": user.username}
+
+    def override_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+    app.dependency_overrides[get_db] = override_db
+
+    if stack == "before":
+        app.add_middleware(StarletteCORSMiddleware, allow_origins=["*"], allow_credentials=False,
+                           allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "HEAD", "PATCH"],
+                           allow_headers=["*"])
+        app.add_middleware(BaseHTTPMiddleware, dispatch=legacy_cors_handler)
+        app.add_middleware(make_legacy_logging(Session))
+    else:
+        app.add_middleware(CORSMiddleware, allow_origins=["*"])
+        app.add_middleware(AdminLoggingMiddleware, session_factory=Session)
+    return app
+
+async def call(app, method: str, path: str, headers: list) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": headers, "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    status = 0
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+async def run_scenario(app, method, path, headers, requests: int, concurrency: int) -> float:
+    assert await call(app, method, path, headers) == 200
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await call(app, method, path, headers)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+async def main_async(args):
+    # SQLite file tạm (mỗi thread một connection, như DB thật); log ghi từ threadpool
+    workdir = tempfile.mkdtemp(prefix="bench-middleware-")
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[User.__table__, AdminAccessLog.__table__])
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add(User(username="admin", email="admin@phulong.vn", hashed_password="x", role=UserRole.ADMIN, is_active=True))
+    db.commit()
+    db.close()
+    token = create_access_token({"sub": "admin", "role": "admin", "ver": 0})
+
+    origin = (b"origin", b"https://phulong.vn")
+    scenarios = [
+        ("GET public", "GET", "/api/config/public", [origin]),
+        ("OPTIONS preflight", "OPTIONS", "/api/orders/",
+         [origin, (b"access-control-request-method", b"POST"),
+          (b"access-control-request-headers", b"authorization,content-type")]),
+        ("GET admin + log", "GET", "/api/dashboard/stats", [origin, (b"authorization", f"Bearer {token}".encode())]),
+    ]
+    apps = {stack: build_app(stack, Session) for stack in ("before", "after")}
+
+    print(f"{'scenario':<20} {'before req/s':>13} {'after req/s':>12} {'speedup':>8}")
+    for name, method, path, headers in scenarios:
+        before = await run_scenario(apps["before"], method, path, headers, args.requests, args.concurrency)
+        after = await run_scenario(apps["after"], method, path, headers, args.requests, args.concurrency)
+        print(f"{name:<20} {before:13.0f} {after:12.0f} {after / before:7.2f}x")
+    engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Micro-benchmark serialize response JSON cho danh sách dịch vụ, bài đăng in ấn và đơn hàng
+
+Chạy: python scripts/bench_serialization.py [--items 100] [--repeat 200]
+So sánh trên cùng dữ liệu (object ORM đã nạp sẵn, không tính thời gian query):
+- fastapi: đường mặc định response_model -> serialize_response -> JSONResponse (json.dumps)
+- orjson: cùng đường validate như trên nhưng render bằng ORJSONResponse
+- adapter: TypeAdapter cache sẵn, validate from_attributes rồi dump_json thẳng ra bytes
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, selectinload
+from sqlalchemy.pool import StaticPool
+from config.database import Base
+from models.models import Image, Order, Printing, PrintingImage, Service, User, UserRole
+from schemas.printing import PrintingListResponse
+from schemas.schemas import OrderListResponse, ServiceOut
+from utils.serialization import dump_json
+
+def seed(db, items: int):
+    user = User(username="admin", email="admin@phulong.vn", hashed_password="x", role=UserRole.ADMIN, is_active=True)
+    db.add(user)
+    db.flush()
+    now = datetime.utcnow()
+    images = []
+    for i in range(items):
+        image = Image(filename=f"anh-{i}.jpg", file_path=f"static/images/uploads/anh-{i}.jpg",
+                      url=f"/static/images/uploads/anh-{i}.jpg", alt_text=f"Ảnh {i}", file_size=120000,
+                      mime_type="image/jpeg", width=1200, height=800, is_visible=True, category="service",
+                      uploaded_by=user.id, created_at=now, updated_at=now)
+        images.append(image)
+    db.add_all(images)
+    db.flush()
+    for i in range(items):
+        db.add(Service(name=f"In ấn dịch vụ {i}", description="Mô tả dịch vụ in ấn chất lượng cao. " * 20,
+                       price=150000 + i, image_id=images[i].id, category="in-an", is_active=True,
+                       featured=i % 3 == 0, created_at=now, updated_at=now))
+        printing = Printing(title=f"Bài đăng in ấn {i}", time="1-2 ngày",
+                            content=f"Nội dung bài đăng [image:{images[i].id}] " + "lorem ipsum " * 150,
+                            is_visible=True, created_by=user.id, created_at=now, updated_at=now)
+        printing.images = [PrintingImage(image_id=images[(i + k) % items].id, order=k + 1, created_at=now)
+                           for k in range(3)]
+        db.add(printing)
+    db.flush()
+    for i in range(items):
+        db.add(Order(customer_name=f"Khách hàng {i}", customer_email=f"khach{i}@example.com",
+                     customer_phone="0901234567", service_id=(i % items) + 1, quantity=100 + i, size="A4",
+                     material="Couche 300", notes="Giao hàng trong giờ hành chính", total_price=1500000.0,
+                     status="pending", created_at=now, updated_at=now))
+    db.commit()
+
+def load_payloads(db):
+    services = db.query(Service).options(selectinload(Service.image).selectinload(Image.uploader)).all()
+    printings = db.query(Printing).options(
+        selectinload(Printing.creator),
+        selectinload(Printing.images).selectinload(PrintingImage.image).selectinload(Image.uploader)
+    ).all()
+    for printing in printings:
+        printing.content_html = printing.content
+    orders = db.query(Order).options(
+        selectinload(Order.service).selectinload(Service.image).selectinload(Image.uploader)
+    ).all()
+    return [
+        ("services", List[ServiceOut], services),
+        ("printings", PrintingListResponse, {"items": printings, "total": len(printings)}),
+        ("orders", OrderListResponse, {"items": orders, "total": len(orders)}),
+    ]
+
+def timeit(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, args.items)
+    loop = asyncio.new_event_loop()
+
+    print(f"{'payload':<10} {'KB':>7} {'fastapi ms':>11} {'orjson ms':>10} {'adapter ms':>11} {'speedup':>8}")
+    for name, tp, data in load_payloads(db):
+        field = create_response_field(name=f"bench_{name}", type_=tp)
+
+        def default_path(response_class):
+            content = loop.run_until_complete(serialize_response(field=field, response_content=data))
+            return response_class(content).body
+
+        body = dump_json(tp, data)
+        fastapi_ms = timeit(lambda: default_path(JSONResponse), args.repeat)
+        orjson_ms = timeit(lambda: default_path(ORJSONResponse), args.repeat)
+        adapter_ms = timeit(lambda: dump_json(tp, data), args.repeat)
+        print(f"{name:<10} {len(body) / 1024:7.1f} {fastapi_ms:11.2f} {orjson_ms:10.2f} {adapter_ms:11.2f} "
+              f"{fastapi_ms / adapter_ms:7.1f}x")
+
+if __name__ == "__main__":
+    main()
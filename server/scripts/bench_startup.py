@@ -0,0 +1,96 @@
+"""
+Benchmark thời gian khởi động (import main) và RAM mỗi worker
+
+Chạy: python scripts/bench_startup.py [--runs 5] [--max-import-ms 2500] [--max-rss-mb 130]
+- Đo bằng `python -X importtime -c "import main"` trong process con (mỗi lần một process mới)
+- In các module import chậm nhất để biết cần lazy-load cái gì
+- Thoát với mã 1 khi vượt ngân sách hoặc khi module nặng (pandas...) bị import lúc khởi động
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_PARTY = {"main", "config", "models", "schemas", "routers", "middlewares", "utils"}
+
+# Module chỉ được import khi dùng tới, không được có mặt sau khi import main
+LAZY_MODULES = ["pandas", "numpy", "PIL", "boto3", "css_inline"]
+
+PROBE = (
+    "import resource, sys, main; "
+    "print('RSS_KB', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss); "
+    "print('LOADED', ','.join(m for m in {lazy!r} if m in sys.modules))"
+)
+
+def run_once():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(lazy=LAZY_MODULES)],
+        cwd=SERVER_DIR, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": SERVER_DIR, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-2000:])
+        raise SystemExit("import main thất bại")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+        if cumulative_us.isdigit():
+            modules.append((int(cumulative_us), int(self_us), name))
+    total_us = next((cumulative for cumulative, _, name in modules if name == "main"), 0)
+
+    rss_kb, loaded = 0, []
+    for line in result.stdout.splitlines():
+        if line.startswith("RSS_KB"):
+            rss_kb = int(line.split()[1])
+        elif line.startswith("LOADED"):
+            loaded = [name for name in line[len("LOADED"):].strip().split(",") if name]
+    return total_us / 1000, rss_kb / 1024, loaded, modules
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=float(os.getenv("STARTUP_MAX_IMPORT_MS", "2500")))
+    parser.add_argument("--max-rss-mb", type=float, default=float(os.getenv("STARTUP_MAX_RSS_MB", "130")))
+    parser.add_argument("--top", type=int, default=15, help="Số module chậm nhất cần in")
+    args = parser.parse_args()
+
+    # Lần đầu có thể phải compile .pyc, không tính vào kết quả
+    run_once()
+    import_ms, rss_mb = [], []
+    loaded, modules = [], []
+    for _ in range(args.runs):
+        ms, mb, loaded, modules = run_once()
+        import_ms.append(ms)
+        rss_mb.append(mb)
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    top_level = [entry for entry in modules if "." not in entry[2] or entry[2].split(".")[0] in FIRST_PARTY]
+    for cumulative, self_us, name in sorted(top_level, reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+
+    median_ms = statistics.median(import_ms)
+    median_mb = statistics.median(rss_mb)
+    print(f"\nimport main: median {median_ms:.0f} ms (min {min(import_ms):.0f}, max {max(import_ms):.0f}), "
+          f"ngân sách {args.max_import_ms:.0f} ms")
+    print(f"RSS sau import: median {median_mb:.1f} MB, ngân sách {args.max_rss_mb:.0f} MB")
+
+    failures = []
+    if median_ms > args.max_import_ms:
+        failures.append(f"thời gian import {median_ms:.0f} ms > {args.max_import_ms:.0f} ms")
+    if median_mb > args.max_rss_mb:
+        failures.append(f"RSS {median_mb:.1f} MB > {args.max_rss_mb:.0f} MB")
+    if loaded:
+        failures.append(f"module nặng bị import lúc khởi động: {', '.join(loaded)}")
+    if failures:
+        print("\nFAIL: " + "; ".join(failures))
+        raise SystemExit(1)
+    print("\nOK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Index advisor: đọc thống kê của PostgreSQL để tìm chỗ thiếu / thừa index
+
+Chạy: python scripts/index_advisor.py [--min-rows 1000] [--top 15] [--json]
+- Bảng bị seq scan nhiều (pg_stat_user_tables): seq scan nhiều hơn index scan trên bảng đủ lớn
+- Index không dùng tới (pg_stat_user_indexes): idx_scan = 0, không phải unique / khóa chính
+- Index INVALID (CREATE INDEX CONCURRENTLY lỗi giữa chừng): cần chạy lại migration
+- Câu SQL tốn thời gian nhất (pg_stat_statements, nếu đã bật extension)
+Số liệu tính từ lần reset thống kê gần nhất (pg_stat_reset), nên chạy sau khi hệ thống chạy thật một thời gian
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from config.database import DATABASE_URL
+
+SEQ_SCAN_SQL = """
+    SELECT relname AS table, seq_scan, seq_tup_read, COALESCE(idx_scan, 0) AS idx_scan, n_live_tup
+    FROM pg_stat_user_tables
+    WHERE n_live_tup >= :min_rows AND seq_scan > COALESCE(idx_scan, 0)
+    ORDER BY seq_tup_read DESC
+    LIMIT :top
+"""
+
+UNUSED_INDEX_SQL = """
+    SELECT s.relname AS table, s.indexrelname AS index, pg_relation_size(s.indexrelid) AS size_bytes
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+    WHERE s.idx_scan = 0 AND NOT i.indisunique AND NOT i.indisprimary
+    ORDER BY pg_relation_size(s.indexrelid) DESC
+    LIMIT :top
+"""
+
+INVALID_INDEX_SQL = """
+    SELECT c.relname AS index, t.relname AS table
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    JOIN pg_class t ON t.oid = i.indrelid
+    WHERE NOT i.indisvalid
+"""
+
+# PostgreSQL 13 đổi total_time / mean_time thành total_exec_time / mean_exec_time
+STATEMENTS_SQL = """
+    SELECT query, calls, {total} AS total_ms, {mean} AS mean_ms, rows, shared_blks_hit, shared_blks_read
+    FROM pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+    ORDER BY {total} DESC
+    LIMIT :top
+"""
+
+def fetch(conn, sql: str, **params):
+    return [dict(row._mapping) for row in conn.execute(text(sql), params)]
+
+def top_statements(conn, top: int):
+    has_extension = conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")).first()
+    if not has_extension:
+        return None
+    columns = {row[0] for row in conn.execute(text(
+        "SELECT attname FROM pg_attribute WHERE attrelid = 'pg_stat_statements'::regclass"
+    ))}
+    total, mean = ("total_exec_time", "mean_exec_time") if "total_exec_time" in columns else ("total_time", "mean_time")
+    return fetch(conn, STATEMENTS_SQL.format(total=total, mean=mean), top=top)
+
+def build_report(conn, min_rows: int, top: int) -> dict:
+    seq_heavy = fetch(conn, SEQ_SCAN_SQL, min_rows=min_rows, top=top)
+    for row in seq_heavy:
+        # Số dòng trung bình mỗi lần seq scan: lớn tức là đang quét cả bảng cho truy vấn lẽ ra dùng index
+        row["avg_rows_per_seq_scan"] = row["seq_tup_read"] // max(row["seq_scan"], 1)
+    return {
+        "seq_scan_heavy_tables": seq_heavy,
+        "unused_indexes": fetch(conn, UNUSED_INDEX_SQL, top=top),
+        "invalid_indexes": fetch(conn, INVALID_INDEX_SQL),
+        "top_statements": top_statements(conn, top),
+    }
+
+def format_size(size_bytes: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size_bytes < 1024 or unit == "GB":
+            return f"{size_bytes:.0f}{unit}" if unit == "B" else f"{size_bytes:.1f}{unit}"
+        size_bytes /= 1024
+
+def print_report(report: dict):
+    print("Bảng bị seq scan nhiều (seq_scan > idx_scan):")
+    for row in report["seq_scan_heavy_tables"]:
+        print(f"  {row['table']:<32} seq_scan={row['seq_scan']:<8} idx_scan={row['idx_scan']:<8} "
+              f"rows={row['n_live_tup']:<10} ~{row['avg_rows_per_seq_scan']} dòng/lần quét")
+    if not report["seq_scan_heavy_tables"]:
+        print("  (không có)")
+
+    print("\nIndex chưa được dùng (idx_scan = 0):")
+    for row in report["unused_indexes"]:
+        print(f"  {row['index']:<40} {row['table']:<28} {format_size(row['size_bytes'])}")
+    if not report["unused_indexes"]:
+        print("  (không có)")
+
+    if report["invalid_indexes"]:
+        print("\nIndex INVALID (build CONCURRENTLY lỗi, chạy lại `alembic upgrade head`):")
+        for row in report["invalid_indexes"]:
+            print(f"  {row['index']} ON {row['table']}")
+
+    print("\nCâu SQL tốn thời gian nhất (pg_stat_statements):")
+    if report["top_statements"] is None:
+        print("  Chưa bật extension: thêm shared_preload_libraries = 'pg_stat_statements' "
+              "rồi CREATE EXTENSION pg_stat_statements")
+        return
+    for row in report["top_statements"]:
+        query = " ".join(row["query"].split())[:160]
+        read_ratio = row["shared_blks_read"] / max(row["shared_blks_hit"] + row["shared_blks_read"], 1)
+        print(f"  {row['total_ms']:>10.0f}ms tổng  {row['mean_ms']:>8.1f}ms/lần  {row['calls']:>8} lần  "
+              f"đọc đĩa {read_ratio:.0%}  {query}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Gợi ý index từ thống kê PostgreSQL")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--min-rows", type=int, default=1000, help="Bỏ qua bảng nhỏ hơn số dòng này")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true", help="In kết quả dạng JSON")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("Index advisor chỉ hỗ trợ PostgreSQL")
+    with engine.connect() as conn:
+        report = build_report(conn, args.min_rows, args.top)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()
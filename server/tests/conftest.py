@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from models.models import Base
+
+def create_test_engine():
+    """SQLite in-memory đủ mọi bảng; StaticPool để mọi session (kể cả thread của TestClient) dùng chung một kết nối"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine
+
+@pytest.fixture
+def db_engine():
+    engine = create_test_engine()
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session_factory(db_engine):
+    return sessionmaker(bind=db_engine)
+
+@pytest.fixture
+def make_session_factory():
+    """Tạo thêm database độc lập trong cùng một test (ví dụ so sánh hai lần seed)"""
+    engines = []
+
+    def make():
+        engines.append(create_test_engine())
+        return sessionmaker(bind=engines[-1])
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+@pytest.fixture
+def override_db(session_factory):
+    """Thay cho get_db: mỗi request một session trên database test"""
+    def override():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+    return override
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+from config.settings import settings
+from models.models import AdminAccessLog, User, UserRole, access_log_expiry
+from utils.tasks import _add_months, partition_name, purge_expired_access_logs
+
+def test_access_log_expiry_uses_retention_days():
+    expected = datetime.utcnow() + timedelta(days=settings.ACCESS_LOG_RETENTION_DAYS)
+    assert abs((access_log_expiry() - expected).total_seconds()) < 5
+
+def test_month_helpers_wrap_year():
+    assert _add_months(datetime(2026, 11, 15), 2) == datetime(2027, 1, 1)
+    assert _add_months(datetime(2026, 1, 1), -1) == datetime(2025, 12, 1)
+    assert partition_name(datetime(2026, 3, 1)) == "admin_access_logs_p202603"
+
+def test_purge_deletes_expired_rows_in_batches(monkeypatch, session_factory):
+    monkeypatch.setattr(settings, "ACCESS_LOG_DELETE_BATCH_SIZE", 3)
+    db = session_factory()
+    user = User(username="admin", email="a@phulong.vn", hashed_password="x", role=UserRole.ADMIN)
+    db.add(user)
+    db.commit()
+    now = datetime.utcnow()
+    for i in range(7):
+        db.add(AdminAccessLog(user_id=user.id, endpoint="/api/orders", method="GET", status_code=200,
+                              timestamp=now - timedelta(days=100), expires_at=now - timedelta(days=10)))
+    for i in range(2):
+        db.add(AdminAccessLog(user_id=user.id, endpoint="/api/orders", method="GET", status_code=200))
+    db.commit()
+
+    result = purge_expired_access_logs(db, now)
+
+    assert result["partitioned"] is False
+    assert result["rows_deleted"] == 7
+    assert db.query(AdminAccessLog).count() == 2
@@ -0,0 +1,74 @@
+import pytest
+from datetime import datetime, timedelta
+from config.settings import settings
+from models.models import AdminNotification, Contact, EmailOutbox, Order, Service
+from utils import admin_notifications
+from utils.admin_notifications import notify_new_order, notify_new_contact, flush_admin_digest
+
+@pytest.fixture
+def service(db):
+    service = Service(name="In tờ rơi", price=1000)
+    db.add(service)
+    db.commit()
+    return service
+
+def create_order(db, service, **fields):
+    order = Order(customer_name="Khách", customer_email="kh@phulong.vn", customer_phone="0900",
+                  service_id=service.id, quantity=fields.pop("quantity", 10), **fields)
+    db.add(order)
+    db.flush()
+    notify_new_order(db, order, service)
+    db.commit()
+    return order
+
+def admin_emails(db):
+    return db.query(EmailOutbox).filter(EmailOutbox.kind.in_(["order_admin", "contact_admin", "admin_digest"])).all()
+
+def test_orders_are_batched_until_max_events(db, service, monkeypatch):
+    """Đơn hàng thường không gửi email riêng, đủ ADMIN_DIGEST_MAX_EVENTS thì gộp thành một email"""
+    monkeypatch.setattr(settings, "ADMIN_DIGEST_MAX_EVENTS", 3)
+    monkeypatch.setattr(settings, "ADMIN_DIGEST_WINDOW_SECONDS", 3600)
+    for _ in range(2):
+        create_order(db, service)
+    assert flush_admin_digest(db) is None
+    assert admin_emails(db) == []
+
+    create_order(db, service)
+    digest = flush_admin_digest(db)
+    assert digest is not None and digest.kind == "admin_digest"
+    assert "3 đơn hàng mới" in digest.subject
+    assert db.query(AdminNotification).filter(AdminNotification.notified_at.is_(None)).count() == 0
+    assert len(admin_emails(db)) == 1
+
+def test_digest_sent_after_window(db, service, monkeypatch):
+    """Thông báo chờ quá cửa sổ thời gian được gửi dù chưa đủ số lượng"""
+    monkeypatch.setattr(settings, "ADMIN_DIGEST_MAX_EVENTS", 100)
+    create_order(db, service)
+    db.add(Contact(name="B", email="b@phulong.vn", phone="0911", subject="Hỏi giá", message="Xin báo giá"))
+    db.flush()
+    notify_new_contact(db, db.query(Contact).one())
+    db.commit()
+    assert flush_admin_digest(db) is None
+
+    db.query(AdminNotification).update({"created_at": datetime.utcnow() - timedelta(seconds=settings.ADMIN_DIGEST_WINDOW_SECONDS + 1)})
+    db.commit()
+    digest = flush_admin_digest(db)
+    assert "1 đơn hàng mới, 1 liên hệ mới" in digest.subject
+    assert "Xin báo giá" in digest.html_content and "Xin báo giá" in digest.text_content
+
+def test_high_priority_sent_immediately(db, service, monkeypatch):
+    """Đơn hàng số lượng lớn hoặc có từ khóa gấp được gửi email riêng ngay"""
+    monkeypatch.setattr(settings, "ADMIN_NOTIFY_IMMEDIATE_MIN_QUANTITY", 1000)
+    create_order(db, service, quantity=5000)
+    create_order(db, service, notes="Cần GẤP trong ngày")
+    create_order(db, service)
+
+    assert [email.kind for email in admin_emails(db)] == ["order_admin", "order_admin"]
+    priorities = [n.priority for n in db.query(AdminNotification).order_by(AdminNotification.id)]
+    assert priorities == ["high", "high", "normal"]
+
+def test_digest_disabled_sends_each_notification(db, service, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_DIGEST_ENABLED", False)
+    create_order(db, service)
+    assert [email.kind for email in admin_emails(db)] == ["order_admin"]
+    assert admin_notifications.digest_due(db) is False
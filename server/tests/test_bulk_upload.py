@@ -0,0 +1,64 @@
+import io
+from PIL import Image as PILImage
+from routers.images import inspect_image_bytes, compute_content_hash
+
+def _png(color) -> bytes:
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (3, 2), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def test_inspect_image_bytes():
+    """Lấy kích thước và hash của ảnh hợp lệ, trả về None với file hỏng"""
+    content = _png((255, 0, 0))
+    info = inspect_image_bytes(content)
+    assert info == {"width": 3, "height": 2, "content_hash": compute_content_hash(content)}
+    assert inspect_image_bytes(b"not an image") is None
+
+def test_content_hash_dedupe():
+    """Cùng nội dung cho cùng hash, khác nội dung cho hash khác"""
+    assert compute_content_hash(_png((1, 2, 3))) == compute_content_hash(_png((1, 2, 3)))
+    assert compute_content_hash(_png((1, 2, 3))) != compute_content_hash(_png((3, 2, 1)))
+
+def test_bulk_upload_dedupes_within_batch_and_same_category(tmp_path, monkeypatch, session_factory):
+    """Trùng trong cùng lần upload và với ảnh cùng category trong DB; ảnh category khác không được dùng lại"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from config.database import get_db
+    from middlewares.auth_middleware import get_admin_user
+    from models.models import Image, User, UserRole
+    from routers import images
+    from utils import storage as storage_module
+
+    monkeypatch.setattr(storage_module, "_storage", storage_module.LocalStorage(str(tmp_path)))
+    db = session_factory()
+    admin = User(username="admin", email="a@phulong.vn", hashed_password="x", role=UserRole.ADMIN, is_active=True)
+    red, green, blue = _png((255, 0, 0)), _png((0, 255, 0)), _png((0, 0, 255))
+    db.add_all([
+        admin,
+        Image(filename="red.png", file_path="static/images/uploads/red.png", url="/static/red.png",
+              content_hash=compute_content_hash(red), category="portfolio"),
+        # Ảnh service (được GC) trùng nội dung: không được dùng lại cho thư viện portfolio
+        Image(filename="green.png", file_path="static/images/uploads/green.png", url="/static/green.png",
+              content_hash=compute_content_hash(green), category="service"),
+    ])
+    db.commit()
+
+    app = FastAPI()
+    app.include_router(images.router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_admin_user] = lambda: admin
+    files = [("files", (name, content, "image/png")) for name, content in
+             (("red.png", red), ("green.png", green), ("blue.png", blue), ("blue-copy.png", blue))]
+    response = TestClient(app).post("/api/images/bulk-upload", data={"category": "portfolio"}, files=files)
+    assert response.status_code == 200, response.text
+
+    body = response.json()
+    assert (body["created"], body["duplicates"], body["rejected"]) == (2, 2, 0)
+    statuses = {result["filename"]: result for result in body["results"]}
+    assert statuses["red.png"]["status"] == "duplicate" and statuses["red.png"]["image"]["category"] == "portfolio"
+    assert statuses["green.png"]["status"] == "created" and statuses["green.png"]["image"]["category"] == "portfolio"
+    assert statuses["blue.png"]["status"] == "created"
+    assert statuses["blue-copy.png"]["status"] == "duplicate"
+    assert statuses["blue-copy.png"]["image"]["id"] == statuses["blue.png"]["image"]["id"]
+    assert len(list((tmp_path / "images" / "uploads").iterdir())) == 2
+    db.close()
@@ -0,0 +1,116 @@
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from middlewares.compression_middleware import CompressedBodyCache, CompressionMiddleware, choose_encoding
+
+BIG = {"items": [{"id": i, "content": "Nội dung bài đăng in ấn " * 5} for i in range(50)]}
+STREAM_TEXT = "".join(f"dòng {i}\n" * 100 for i in range(5))
+
+def make_client(cache: CompressedBodyCache) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/big")
+    def big():
+        return BIG
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/private")
+    def private():
+        return PlainTextResponse("x" * 5000, headers={"Cache-Control": "private"})
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((f"dòng {i}\n" * 100 for i in range(5)), media_type="text/plain")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, cache=cache)
+    return TestClient(app)
+
+def test_choose_encoding_prefers_brotli_and_respects_q0():
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+    assert choose_encoding("identity") is None
+
+def test_public_json_is_compressed_once_and_served_from_cache():
+    cache = CompressedBodyCache(1024 * 1024)
+    client = make_client(cache)
+
+    first = client.get("/big", headers={"Accept-Encoding": "br"})
+    assert first.headers["content-encoding"] == "br"
+    assert "Accept-Encoding" in first.headers["vary"]
+    assert first.json() == BIG
+    second = client.get("/big", headers={"Accept-Encoding": "br"})
+    assert second.json() == BIG
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    gzipped = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.json() == BIG
+
+    # Request có Authorization không dùng cache
+    client.get("/big", headers={"Accept-Encoding": "br", "Authorization": "Bearer x"})
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_small_private_and_streaming_responses():
+    cache = CompressedBodyCache(1024 * 1024)
+    client = make_client(cache)
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+
+    private = client.get("/private", headers={"Accept-Encoding": "gzip"})
+    assert private.headers["content-encoding"] == "gzip"
+    assert private.text == "x" * 5000
+    assert cache.misses == 0
+
+    streamed = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert streamed.headers["content-encoding"] == "gzip"
+    assert streamed.text == STREAM_TEXT
+
+def test_cache_evicts_least_recently_used_entries():
+    cache = CompressedBodyCache(10)
+    first, second = CompressedBodyCache.key(b"a", "br"), CompressedBodyCache.key(b"b", "br")
+    cache.set(first, b"12345")
+    cache.set(second, b"67890")
+    cache.get(first)
+    cache.set(CompressedBodyCache.key(b"c", "gzip"), b"abcde")
+    assert cache.get(second) is None
+    assert cache.get(first) == b"12345"
+
+def test_file_responses_keep_identity_etag_and_ranges(tmp_path):
+    """Response file (ETag + Accept-Ranges trên bytes gốc) không bị nén lại, Vary không bị lặp"""
+    import os
+    from fastapi import Request
+    from utils.static_files import build_file_response
+
+    svg = tmp_path / "logo.svg"
+    svg.write_text("<svg xmlns='http://www.w3.org/2000/svg'>" + "<rect/>" * 500 + "</svg>")
+    app = FastAPI()
+
+    @app.get("/download")
+    def download(request: Request):
+        return build_file_response(str(svg), os.stat(svg), request.headers, filename="logo.svg")
+
+    @app.get("/varied")
+    def varied():
+        return PlainTextResponse("x" * 5000, headers={"Vary": "Accept-Encoding"})
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, cache=CompressedBodyCache(1024 * 1024))
+    client = TestClient(app)
+
+    identity = client.get("/download", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/download", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in gzipped.headers
+    assert gzipped.headers["etag"] == identity.headers["etag"]
+    assert gzipped.headers["accept-ranges"] == "bytes"
+    assert gzipped.content == svg.read_bytes()
+
+    partial = client.get("/download", headers={"Accept-Encoding": "gzip", "Range": "bytes=0-3"})
+    assert partial.status_code == 206 and partial.content == b"<svg"
+
+    varied = client.get("/varied", headers={"Accept-Encoding": "gzip"})
+    assert varied.headers["content-encoding"] == "gzip"
+    assert varied.headers["vary"] == "Accept-Encoding"
@@ -0,0 +1,55 @@
+import pytest
+from datetime import datetime
+from config.settings import settings
+from models.models import EmailOutbox
+from utils import email_outbox
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory(expire_on_commit=False)
+    yield session
+    session.close()
+
+def test_sent_email_marked_sent(db, monkeypatch):
+    """Email gửi thành công được đánh dấu sent"""
+    sent = []
+    def deliver(messages):
+        sent.extend(message["To"] for message in messages)
+        return [None] * len(messages)
+    monkeypatch.setattr(email_outbox, "send_messages", deliver)
+    email_outbox.enqueue_email(db, "a@phulong.vn", "Xin chào", "<p>hi</p>", kind="test")
+    db.commit()
+
+    assert email_outbox.process_outbox_batch(db) == 1
+    email = db.query(EmailOutbox).one()
+    assert sent == ["a@phulong.vn"]
+    assert email.status == email_outbox.STATUS_SENT and email.attempts == 1
+
+def test_failed_email_retried_then_dead(db, monkeypatch):
+    """Email lỗi được hẹn gửi lại với backoff, hết số lần thử thì chuyển sang dead"""
+    def fail(messages):
+        return [ConnectionError("SMTP không phản hồi")] * len(messages)
+    monkeypatch.setattr(email_outbox, "send_messages", fail)
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 2)
+    email = email_outbox.enqueue_email(db, "a@phulong.vn", "Xin chào", "<p>hi</p>")
+    db.commit()
+
+    email_outbox.process_outbox_batch(db)
+    assert email.status == email_outbox.STATUS_PENDING
+    assert email.next_attempt_at > datetime.utcnow()
+    assert "SMTP" in email.last_error
+    # Chưa tới hạn gửi lại
+    assert email_outbox.process_outbox_batch(db) == 0
+
+    email.next_attempt_at = datetime.utcnow()
+    db.commit()
+    email_outbox.process_outbox_batch(db)
+    assert email.status == email_outbox.STATUS_DEAD and email.attempts == 2
+
+def test_backoff_grows_and_is_capped(monkeypatch):
+    """Thời gian chờ tăng theo cấp số nhân và không vượt quá giới hạn"""
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_BACKOFF_SECONDS", 10)
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", 100)
+    assert 8 <= email_outbox.backoff_delay(1).total_seconds() <= 12
+    assert 32 <= email_outbox.backoff_delay(3).total_seconds() <= 48
+    assert email_outbox.backoff_delay(10).total_seconds() <= 120
@@ -0,0 +1,72 @@
+from datetime import datetime
+from types import SimpleNamespace
+from config.settings import settings
+from utils.email import build_order_emails, build_contact_admin_email, build_admin_digest_email, build_message
+from utils.email_templates import html_to_text, load_email_templates
+
+def make_order(**overrides):
+    fields = dict(
+        id=42, customer_name="<b>Nguyễn Văn A</b>", customer_email="a@phulong.vn",
+        customer_phone="0900000000", quantity=100, size=None, material="Couche",
+        notes="Giao trước\nthứ 6", design_file_url=None, created_at=datetime(2026, 1, 2, 8, 30)
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+def test_all_templates_build():
+    """Mọi template trong templates/email đều build được"""
+    assert load_email_templates() >= 3
+
+def test_order_email_escapes_and_inlines_css():
+    """Dữ liệu khách hàng được escape, CSS đã inline (không còn thẻ <style>)"""
+    customer, admin = build_order_emails(make_order(), SimpleNamespace(name="In danh thiếp"))
+    for email in (customer, admin):
+        assert "<b>Nguyễn" not in email["html_content"]
+        assert "&lt;b&gt;Nguyễn Văn A&lt;/b&gt;" in email["html_content"]
+        assert "<style" not in email["html_content"]
+        assert 'style="' in email["html_content"]
+    assert "Không có" in customer["html_content"]
+
+def test_order_email_text_part(monkeypatch):
+    """Bản text thuần chứa các thông tin chính của đơn hàng"""
+    monkeypatch.setattr(settings, "BACKEND_URL", "api.phulong.vn")
+    customer, admin = build_order_emails(make_order(), SimpleNamespace(name="In danh thiếp"))
+    assert "#42" in customer["text_content"]
+    assert "In danh thiếp" in customer["text_content"]
+    assert "Kích thước: Không có" in customer["text_content"]
+    assert "(https://api.phulong.vn/api/orders/42)" in admin["text_content"]
+    assert "<" not in admin["text_content"].replace("<b>", "").replace("</b>", "")
+
+def test_admin_emails_go_to_admin_email(monkeypatch):
+    """Thông báo đơn hàng, liên hệ và email tổng hợp cùng gửi tới ADMIN_EMAIL"""
+    monkeypatch.setattr(settings, "ADMIN_EMAIL", "quantri@phulong.vn")
+    contact = SimpleNamespace(
+        name="Trần B", email="b@phulong.vn", phone="0911", subject="Báo giá",
+        message="Xin báo giá", created_at=datetime(2026, 3, 4, 9, 0)
+    )
+    _, order_admin = build_order_emails(make_order(), SimpleNamespace(name="In danh thiếp"))
+    digest = build_admin_digest_email(
+        [(make_order(), SimpleNamespace(name="In danh thiếp"))], [contact],
+        datetime(2026, 3, 4, 9, 0), datetime(2026, 3, 4, 9, 15)
+    )
+    recipients = {order_admin["to_email"], build_contact_admin_email(contact)["to_email"], digest["to_email"]}
+    assert recipients == {"quantri@phulong.vn"}
+
+def test_contact_email():
+    contact = SimpleNamespace(
+        name="Trần B", email="b@phulong.vn", phone="0911", subject="Báo giá",
+        message="Xin báo giá\n500 tờ rơi", created_at=datetime(2026, 3, 4, 9, 0)
+    )
+    email = build_contact_admin_email(contact)
+    assert "Báo giá" in email["html_content"]
+    assert "Thời gian: 04/03/2026 09:00:00" in email["text_content"]
+
+def test_message_has_text_and_html_parts():
+    """Email gửi đi là multipart/alternative: text trước, HTML sau"""
+    message = build_message("a@phulong.vn", "Xin chào", "<p>Xin chào</p>", "Xin chào")
+    parts = [part.get_content_type() for part in message.get_payload()]
+    assert parts == ["text/plain", "text/html"]
+
+def test_html_to_text_links_and_rows():
+    html = "<table><tr><th>Tên</th><td>A</td></tr></table><p><a href='https://x.vn'>Xem</a></p>"
+    assert html_to_text(html) == "Tên: A\n\nXem (https://x.vn)\n"
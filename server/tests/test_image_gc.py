@@ -0,0 +1,88 @@
+import os
+import time
+from datetime import datetime, timedelta
+import pytest
+import utils.image_gc
+from config.settings import settings
+from models.models import Image, Service, Printing, ImageReference
+from utils.image_gc import run_image_gc
+
+OLD = datetime.utcnow() - timedelta(days=3)
+
+@pytest.fixture
+def gc_env(tmp_path, monkeypatch, session_factory):
+    """Database test + thư mục static tạm (MANAGED_IMAGE_DIRS là đường dẫn tương đối)"""
+    monkeypatch.setattr(utils.image_gc, "SessionLocal", session_factory)
+    monkeypatch.chdir(tmp_path)
+    for directory in utils.image_gc.MANAGED_IMAGE_DIRS:
+        os.makedirs(directory)
+    os.makedirs("uploads")
+    monkeypatch.setattr(settings, "UPLOAD_DIR", "uploads")
+    monkeypatch.setattr(settings, "IMAGE_GC_GRACE_HOURS", 24)
+    monkeypatch.setattr(settings, "EXPORT_FILE_TTL_HOURS", 24)
+    monkeypatch.setattr(settings, "IMAGE_GC_CATEGORIES", "service,banner,printing")
+    return session_factory
+
+def write_file(path: str, size: int = 100, age: timedelta = timedelta(days=3)) -> str:
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    mtime = time.time() - age.total_seconds()
+    os.utime(path, (mtime, mtime))
+    return path
+
+def add_image(db, name: str, category: str = "service", created_at: datetime = OLD) -> Image:
+    path = write_file(os.path.join("static", "images", "uploads", name))
+    image = Image(filename=name, file_path=path, url=f"/static/images/uploads/{name}",
+                  category=category, created_at=created_at)
+    db.add(image)
+    db.flush()
+    return image
+
+def test_run_image_gc_removes_only_orphans(gc_env):
+    db = gc_env()
+    used_by_service = add_image(db, "service.jpg")
+    used_in_content = add_image(db, "content.jpg", category="printing")
+    in_grace = add_image(db, "fresh.jpg", created_at=datetime.utcnow() - timedelta(hours=1))
+    library = add_image(db, "library.jpg", category="portfolio")
+    orphan = add_image(db, "orphan.jpg")
+    db.add(Service(name="In name card", description="", price=1, image_id=used_by_service.id))
+    db.add(Printing(title="Bài in", time="1-2 ngày", content=f"Mẫu [image:{used_in_content.id}|mẫu]"))
+    # Chỉ mục tham chiếu lệch (trỏ tới ảnh mồ côi) không được giữ ảnh lại
+    db.add(ImageReference(image_id=orphan.id, ref_type="service", ref_id=999))
+    db.commit()
+    kept_ids = {used_by_service.id, used_in_content.id, in_grace.id, library.id}
+    orphan_id, orphan_path = orphan.id, orphan.file_path
+    db.close()
+
+    stray = write_file(os.path.join("static", "images", "banners", "stray.png"), size=50)
+    fresh_stray = write_file(os.path.join("static", "images", "uploads", "just-uploaded.png"), age=timedelta(minutes=5))
+    old_export = write_file(os.path.join("uploads", "orders_export_20260101.csv"), size=30)
+    orphan_design = write_file(os.path.join("uploads", "design-old.pdf"), size=20)
+
+    report = run_image_gc(dry_run=True)
+    assert report["orphan_images"] == [orphan_id]
+    assert sorted(report["stray_files"]) == sorted(os.path.normpath(p) for p in (stray, old_export, orphan_design))
+    assert os.path.exists(orphan_path) and os.path.exists(stray)
+
+    report = run_image_gc(dry_run=False)
+    assert report["deleted_images"] == 1
+    assert report["deleted_files"] == 4
+    assert report["freed_bytes"] == 100 + 50 + 30 + 20
+
+    db = gc_env()
+    assert {image.id for image in db.query(Image).all()} == kept_ids
+    # Chỉ mục được dựng lại từ dữ liệu thật
+    assert {(ref.image_id, ref.ref_type) for ref in db.query(ImageReference).all()} == {
+        (used_by_service.id, "service"), (used_in_content.id, "printing_content")
+    }
+    for image in db.query(Image).all():
+        assert os.path.exists(image.file_path)
+    db.close()
+
+    for path in (orphan_path, stray, old_export, orphan_design):
+        assert not os.path.exists(path)
+    assert os.path.exists(fresh_stray)
+
+    # Lần chạy tiếp theo không còn gì để dọn
+    report = run_image_gc(dry_run=False)
+    assert report["orphan_images"] == [] and report["stray_files"] == []
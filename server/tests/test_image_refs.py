@@ -0,0 +1,16 @@
+from utils.image_refs import extract_image_ids
+
+def test_extract_image_ids_basic():
+    """Kiểm tra lấy ID ảnh từ shortcode"""
+    content = "Giới thiệu [image:12] và [image:7|Logo Phú Long]"
+    assert extract_image_ids(content) == {12, 7}
+
+def test_extract_image_ids_ignores_invalid():
+    """Shortcode không phải số hoặc content rỗng không sinh tham chiếu"""
+    assert extract_image_ids("[image:abc] [image:] [img:3]") == set()
+    assert extract_image_ids("") == set()
+    assert extract_image_ids(None) == set()
+
+def test_extract_image_ids_deduplicates():
+    """Cùng một ảnh xuất hiện nhiều lần chỉ tính một lần"""
+    assert extract_image_ids("[image:5][image:5|a][image:5]") == {5}
@@ -0,0 +1,41 @@
+from datetime import datetime
+from models.models import ImageReference, Order, Printing, Service, User
+from loadtest.report import compare, percentile, summarize
+from loadtest.seed import LOADTEST_USERNAME, seed_database
+from utils.image_refs import extract_image_ids
+
+COUNTS = {"admins": 2, "services": 5, "printings": 4, "orders": 50, "reviews": 10,
+          "contacts": 5, "login_history": 20, "access_logs": 100}
+
+def seeded_rows(Session, seed: int):
+    db = Session()
+    inserted = seed_database(db, COUNTS, seed=seed, now=datetime(2026, 10, 1), progress=lambda *args: None)
+    orders = [(o.customer_name, o.service_id, o.status, o.created_at) for o in db.query(Order).order_by(Order.id)]
+    return db, inserted, orders
+
+def test_seed_is_reproducible_and_consistent(make_session_factory):
+    db, inserted, orders = seeded_rows(make_session_factory(), seed=7)
+    _, _, same_orders = seeded_rows(make_session_factory(), seed=7)
+    _, _, other_orders = seeded_rows(make_session_factory(), seed=8)
+    assert orders == same_orders and orders != other_orders
+    assert inserted["orders"] == 50 and inserted["admin_access_logs"] == 100
+    assert db.query(User).filter(User.username == LOADTEST_USERNAME).one().role == "root"
+
+    # Shortcode trong content trỏ tới ảnh có thật và đã có trong chỉ mục tham chiếu
+    service_ids = {row[0] for row in db.query(Service.id)}
+    assert all(service_id in service_ids for _, service_id, _, _ in orders)
+    referenced = {(row.ref_type, row.ref_id, row.image_id) for row in db.query(ImageReference)}
+    for printing in db.query(Printing):
+        image_ids = extract_image_ids(printing.content)
+        assert image_ids and all(("printing_content", printing.id, image_id) in referenced for image_id in image_ids)
+
+def test_report_percentiles_and_compare():
+    assert percentile([0.1, 0.2, 0.3, 0.4], 50) == 0.25
+    summary = summarize([0.01] * 99 + [1.0], elapsed=10, errors=1)
+    assert summary["requests"] == 100 and summary["rps"] == 10.0
+    assert summary["p50_ms"] == 10.0 and summary["max_ms"] == 1000.0
+
+    baseline = {"endpoints": {"GET /api/services/": {"p95_ms": 100.0, "rps": 50.0}}}
+    slower = {"endpoints": {"GET /api/services/": {"p95_ms": 130.0, "rps": 48.0}}}
+    assert compare(baseline, slower)[0]["regression"] is True
+    assert compare(baseline, baseline)[0]["regression"] is False
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from config.database import get_db
+from middlewares.auth_middleware import get_root_user
+from models.models import LoginHistory, User, UserRole
+from routers import auth
+from utils.tasks import delete_expired_login_history
+
+@pytest.fixture
+def client(session_factory, override_db):
+    db = session_factory()
+    root = User(username="root", email="r@phulong.vn", hashed_password="x", role=UserRole.ROOT)
+    admin = User(username="admin", email="a@phulong.vn", hashed_password="x", role=UserRole.ADMIN)
+    db.add_all([root, admin])
+    db.commit()
+    base = datetime(2026, 10, 1, 8, 0)
+    for i in range(5):
+        db.add(LoginHistory(user_id=admin.id, ip_address=f"10.0.0.{i % 2}", user_agent="ua",
+                            login_time=base + timedelta(hours=i * 12)))
+    # Hai bản ghi cùng thời điểm để kiểm tra cursor không bỏ sót / lặp
+    db.add(LoginHistory(user_id=root.id, ip_address="10.0.0.9", user_agent="ua", login_time=base))
+    db.commit()
+    db.close()
+
+    app = FastAPI()
+    app.include_router(auth.router)
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_root_user] = lambda: None
+    test_client = TestClient(app)
+    test_client.Session = session_factory
+    return test_client
+
+def test_keyset_pagination_walks_all_rows(client):
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/auth/login-history", params=params)
+        assert response.status_code == 200
+        seen.extend(row["id"] for row in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert sorted(seen) == list(range(1, 7))
+    assert len(seen) == len(set(seen))
+
+def test_filters_and_bad_cursor(client):
+    response = client.get("/api/auth/login-history", params={"ip_address": "10.0.0.1"})
+    assert len(response.json()) == 2
+    assert client.get("/api/auth/login-history", params={"cursor": "khong-hop-le"}).status_code == 400
+
+def test_summary_groups_in_sql(client):
+    response = client.get("/api/auth/login-history/summary", params={
+        "start_date": "2026-09-30T00:00:00", "end_date": "2026-10-05T00:00:00"
+    })
+    data = response.json()
+    assert data["total_logins"] == 6
+    assert data["distinct_ips"] == 3
+    admin = next(user for user in data["users"] if user["username"] == "admin")
+    assert admin["logins"] == 5 and admin["distinct_ips"] == 2
+    days = {(row["username"], row["day"]): row["logins"] for row in data["per_user_day"]}
+    assert days[("admin", "2026-10-01")] == 2
+    assert days[("root", "2026-10-01")] == 1
+
+def test_retention_deletes_old_login_history(client):
+    db = client.Session()
+    deleted = delete_expired_login_history(db, now=datetime(2026, 10, 2, 9, 0) + timedelta(days=90))
+    assert deleted == 4
+    assert db.query(LoginHistory).count() == 2
@@ -0,0 +1,81 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from config.database import get_db
+from models.models import AdminAccessLog, User, UserRole
+from middlewares.auth_middleware import get_current_user
+from middlewares.cors_middleware import CORSMiddleware
+from middlewares.logging_middleware import AdminLoggingMiddleware
+from utils.jwt import create_access_token
+
+@pytest.fixture
+def make_app(session_factory, override_db):
+    db = session_factory()
+    db.add(User(username="admin", email="admin@phulong.vn", hashed_password="x", role=UserRole.ADMIN, is_active=True))
+    db.commit()
+    db.close()
+
+    def make(allow_origins=("*",)):
+        app = FastAPI()
+
+        @app.get("/api/dashboard/stats")
+        def stats(user: User = Depends(get_current_user)):
+            return {"user": user.username}
+
+        @app.get("/api/blogs/export")
+        def export():
+            return StreamingResponse((f"dòng {i}\n" for i in range(3)), media_type="text/plain")
+
+        app.dependency_overrides[get_db] = override_db
+        app.add_middleware(CORSMiddleware, allow_origins=list(allow_origins), max_age=600)
+        app.add_middleware(AdminLoggingMiddleware, session_factory=session_factory)
+        return TestClient(app), session_factory
+    return make
+
+def auth(username):
+    return {"Authorization": f"Bearer {create_access_token({'sub': username, 'role': 'admin', 'ver': 0})}"}
+
+def test_preflight_answered_by_middleware_with_max_age(make_app):
+    client, _ = make_app()
+    response = client.options("/api/orders/", headers={
+        "Origin": "https://phulong.vn",
+        "Access-Control-Request-Method": "POST",
+        "Access-Control-Request-Headers": "authorization,content-type",
+    })
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == "*"
+    assert response.headers["access-control-allow-headers"] == "authorization,content-type"
+    assert response.headers["access-control-max-age"] == "600"
+
+def test_origin_list_echoes_allowed_origin_and_rejects_others(make_app):
+    client, _ = make_app(allow_origins=("https://phulong.vn",))
+    allowed = client.get("/api/blogs/export", headers={"Origin": "https://phulong.vn"})
+    assert allowed.headers["access-control-allow-origin"] == "https://phulong.vn"
+    assert "Origin" in allowed.headers["vary"]
+    other = client.get("/api/blogs/export", headers={"Origin": "https://evil.example"})
+    assert "access-control-allow-origin" not in other.headers
+    preflight = client.options("/api/orders/", headers={
+        "Origin": "https://evil.example", "Access-Control-Request-Method": "POST"
+    })
+    assert preflight.status_code == 400
+
+def test_admin_requests_logged_once_with_timing_header(make_app):
+    client, Session = make_app()
+    admin = client.get("/api/dashboard/stats", headers=auth("admin"))
+    assert admin.json() == {"user": "admin"}
+    assert float(admin.headers["x-process-time"]) >= 0
+    client.get("/api/dashboard/stats")
+    client.get("/api/dashboard/stats", headers={"Authorization": "Bearer invalid"})
+
+    db = Session()
+    logs = db.query(AdminAccessLog).all()
+    assert [(log.endpoint, log.method, log.status_code) for log in logs] == [("/api/dashboard/stats", "GET", 200)]
+    assert logs[0].user_id == db.query(User).filter(User.username == "admin").one().id
+
+def test_streaming_response_passes_through(make_app):
+    client, _ = make_app()
+    response = client.get("/api/blogs/export", headers={"Origin": "https://phulong.vn", **auth("admin")})
+    assert response.text == "dòng 0\ndòng 1\ndòng 2\n"
+    assert response.headers["access-control-allow-origin"] == "*"
+    assert "X-Process-Time" in response.headers["access-control-expose-headers"]
@@ -0,0 +1,55 @@
+import asyncio
+from passlib.hash import bcrypt
+from config.settings import settings
+from utils.passwords import verify_and_update, verify_and_update_async, hash_password_async, needs_rehash
+from utils.login_throttle import LoginThrottle
+
+def test_verify_and_rehash_on_cost_change():
+    """Hash với cost khác BCRYPT_ROUNDS được hash lại khi đăng nhập đúng"""
+    old_hash = bcrypt.using(rounds=4).hash("matkhau123")
+    assert needs_rehash(old_hash)
+
+    valid, new_hash = verify_and_update("matkhau123", old_hash)
+    assert valid
+    assert new_hash.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+    assert verify_and_update("matkhau123", new_hash) == (True, None)
+    assert verify_and_update("sai", old_hash) == (False, None)
+
+def test_unknown_user_still_runs_bcrypt():
+    assert verify_and_update("matkhau123", None) == (False, None)
+
+def test_async_helpers_run_off_loop():
+    async def run():
+        hashed = await hash_password_async("matkhau123")
+        return await asyncio.gather(*[verify_and_update_async("matkhau123", hashed) for _ in range(3)])
+    assert asyncio.run(run()) == [(True, None)] * 3
+
+def make_throttle(**overrides):
+    options = dict(ip_burst=3, ip_per_minute=60, user_burst=2, user_per_minute=6,
+                   lockout_threshold=3, lockout_base_seconds=10, lockout_max_seconds=40)
+    options.update(overrides)
+    return LoginThrottle(**options)
+
+def test_token_bucket_per_username_and_ip():
+    throttle = make_throttle()
+    assert throttle.acquire("1.1.1.1", "admin", now=0) == 0
+    assert throttle.acquire("1.1.1.1", "admin", now=0) == 0
+    # Hết token của username, hồi 1 token sau 10 giây (6 lượt/phút)
+    assert throttle.acquire("2.2.2.2", "Admin", now=0) == 10
+    assert throttle.acquire("2.2.2.2", "admin", now=10) == 0
+    # IP đã dùng 3 token
+    assert throttle.acquire("1.1.1.1", "khac", now=0) == 0
+    assert throttle.acquire("1.1.1.1", "khac2", now=0) == 1
+
+def test_lockout_backoff_doubles_and_resets():
+    throttle = make_throttle(user_burst=100, ip_burst=100)
+    assert throttle.record_failure("admin", now=0) == 0
+    assert throttle.record_failure("admin", now=0) == 0
+    assert throttle.record_failure("admin", now=0) == 10
+    assert throttle.acquire("1.1.1.1", "admin", now=5) == 5
+    assert throttle.record_failure("admin", now=10) == 20
+    assert throttle.record_failure("admin", now=30) == 40
+    assert throttle.record_failure("admin", now=70) == 40
+
+    throttle.record_success("admin")
+    assert throttle.acquire("1.1.1.1", "admin", now=71) == 0
@@ -0,0 +1,135 @@
+"""
+Test hiệu năng trong process (không cần server / mạng): gọi route qua TestClient trên SQLite tạm
+đã seed dữ liệu quy mô "tiny" của loadtest, mỗi endpoint có ngân sách:
+- số câu SQL tối đa mỗi request (bắt N+1 query)
+- p95 độ trễ tối đa qua PERF_REPEAT lần gọi (PERF_LATENCY_FACTOR để nới cho máy CI chậm)
+- bộ nhớ cấp phát đỉnh (tracemalloc) cho endpoint xuất file
+"""
+import os
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from config.database import Base, get_db
+from config.settings import settings
+from loadtest.report import percentile
+from loadtest.seed import LOADTEST_USERNAME, SCALES, printing_title, seed_database, service_name
+from models.models import Printing, Service
+from routers import dashboard, orders, printing, services
+from utils.jwt import create_access_token
+from utils.slug import create_slug
+
+PERF_REPEAT = int(os.getenv("PERF_REPEAT", "20"))
+PERF_LATENCY_FACTOR = float(os.getenv("PERF_LATENCY_FACTOR", "1"))
+
+@dataclass(frozen=True)
+class Budget:
+    path: str
+    max_queries: int
+    max_p95_ms: float
+    max_memory_mb: Optional[float] = None
+    admin: bool = False
+
+# Số câu SQL là số đo thực tế hiện tại (tăng lên là hồi quy); latency nới nhiều lần so với số đo
+BUDGETS = {
+    "service_slug": Budget("/api/services/{service_slug}", max_queries=3, max_p95_ms=50),
+    "printing_slug": Budget("/api/printing/{printing_slug}", max_queries=9, max_p95_ms=60),
+    "printing_list": Budget("/api/printing/?is_visible=true&limit=12", max_queries=7, max_p95_ms=80),
+    "dashboard_summary": Budget("/api/dashboard/summary", max_queries=4, max_p95_ms=60, admin=True),
+    "dashboard_revenue": Budget("/api/dashboard/revenue-by-date", max_queries=7, max_p95_ms=80, admin=True),
+    "dashboard_orders_by_service": Budget("/api/dashboard/orders-by-service", max_queries=6, max_p95_ms=60, admin=True),
+    "orders_list": Budget("/api/orders/?limit=20", max_queries=5, max_p95_ms=100, admin=True),
+    "orders_csv_export": Budget("/api/orders/export/csv", max_queries=1, max_p95_ms=800, max_memory_mb=16, admin=True),
+}
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+@pytest.fixture(scope="module")
+def perf_env(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("perf")
+    engine = create_engine(f"sqlite:///{workdir / 'perf.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    seed_database(db, SCALES["tiny"], seed=42, progress=lambda *args: None)
+    first_service = db.query(Service).order_by(Service.id).first()
+    first_printing = db.query(Printing).order_by(Printing.id).first()
+    db.close()
+
+    app = FastAPI(default_response_class=ORJSONResponse)
+    for module in (services, printing, dashboard, orders):
+        app.include_router(module.router)
+
+    def override_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+    app.dependency_overrides[get_db] = override_db
+
+    token = create_access_token({"sub": LOADTEST_USERNAME, "role": "root", "ver": 0})
+    upload_dir = settings.UPLOAD_DIR
+    settings.UPLOAD_DIR = str(workdir)
+    yield {
+        "client": TestClient(app),
+        "counter": QueryCounter(engine),
+        "headers": {"Authorization": f"Bearer {token}"},
+        "slugs": {
+            "service_slug": create_slug(first_service.name),
+            "printing_slug": create_slug(first_printing.title),
+        },
+    }
+    settings.UPLOAD_DIR = upload_dir
+    engine.dispose()
+
+def request(env, budget: Budget):
+    headers = env["headers"] if budget.admin else {}
+    response = env["client"].get(budget.path.format(**env["slugs"]), headers=headers)
+    assert response.status_code == 200, response.text[:500]
+    return response
+
+def test_seeded_names_match_generators(perf_env):
+    assert perf_env["slugs"]["service_slug"] == create_slug(service_name(0))
+    assert perf_env["slugs"]["printing_slug"] == create_slug(printing_title(0))
+
+@pytest.mark.parametrize("name", sorted(BUDGETS))
+def test_endpoint_within_budget(perf_env, name):
+    budget = BUDGETS[name]
+    counter = perf_env["counter"]
+
+    # Lần đầu làm nóng (cache TypeAdapter, import lười); đếm query ở lần thứ hai
+    request(perf_env, budget)
+    counter.count = 0
+    request(perf_env, budget)
+    assert counter.count <= budget.max_queries, f"{name}: {counter.count} câu SQL (ngân sách {budget.max_queries})"
+
+    timings = []
+    for _ in range(PERF_REPEAT):
+        start = time.perf_counter()
+        request(perf_env, budget)
+        timings.append(time.perf_counter() - start)
+    p95_ms = percentile(sorted(timings), 95) * 1000
+    max_p95_ms = budget.max_p95_ms * PERF_LATENCY_FACTOR
+    assert p95_ms <= max_p95_ms, f"{name}: p95 {p95_ms:.1f}ms (ngân sách {max_p95_ms:.0f}ms)"
+
+    if budget.max_memory_mb is not None:
+        tracemalloc.start()
+        try:
+            request(perf_env, budget)
+            peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        finally:
+            tracemalloc.stop()
+        assert peak_mb <= budget.max_memory_mb, f"{name}: bộ nhớ đỉnh {peak_mb:.1f}MB (ngân sách {budget.max_memory_mb}MB)"
@@ -0,0 +1,46 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from config.database import get_db
+from models.models import User, UserRole
+from middlewares.auth_middleware import get_current_user
+from utils.jwt import create_access_token
+from utils.principal_cache import PrincipalCache, principal_cache
+
+def test_cache_returns_detached_copies_and_invalidates():
+    cache = PrincipalCache(ttl=60)
+    cache.set(User(id=1, username="admin", email="a@phulong.vn", hashed_password="x", role=UserRole.ADMIN, is_active=True), version=0)
+
+    first, second = cache.get("admin"), cache.get("admin")
+    assert first.id == 1 and first.role == UserRole.ADMIN
+    assert first is not second
+    assert cache.get("admin", version=1) is None
+
+    cache.invalidate(user_id=1)
+    assert cache.get("admin") is None
+
+def test_current_user_resolved_without_db_round_trip(db_engine, session_factory, override_db):
+    """Request thứ hai với cùng token không query bảng users"""
+    db = session_factory()
+    db.add(User(username="admin", email="a@phulong.vn", hashed_password="x", role=UserRole.ADMIN, is_active=True))
+    db.commit()
+    db.close()
+
+    statements = []
+    event.listen(db_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    app = FastAPI()
+
+    @app.get("/me")
+    def me(user: User = Depends(get_current_user)):
+        return {"id": user.id, "username": user.username}
+
+    app.dependency_overrides[get_db] = override_db
+
+    principal_cache.clear()
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin', 'role': 'admin'})}"}
+    assert client.get("/me", headers=headers).json() == {"id": 1, "username": "admin"}
+    assert client.get("/me", headers=headers).json() == {"id": 1, "username": "admin"}
+    assert len([s for s in statements if "FROM users" in s]) == 1
+    assert client.get("/me", headers={"Authorization": "Bearer invalid"}).status_code == 401
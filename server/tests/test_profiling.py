@@ -0,0 +1,90 @@
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from middlewares.profiling_middleware import ProfilingMiddleware
+from models.models import User, UserRole
+from utils.jwt import create_access_token
+from utils.principal_cache import principal_cache
+from utils.profiles import ProfileStore
+
+@pytest.fixture(autouse=True)
+def users(session_factory):
+    principal_cache.clear()
+    db = session_factory()
+    db.add_all([
+        User(username="root", email="root@phulong.vn", hashed_password="x", role=UserRole.ROOT, is_active=True),
+        User(username="admin", email="admin@phulong.vn", hashed_password="x", role=UserRole.ADMIN, is_active=True),
+        # Đã đăng xuất toàn bộ (token_version tăng) và root bị khóa
+        User(username="revoked", email="revoked@phulong.vn", hashed_password="x", role=UserRole.ROOT,
+             is_active=True, token_version=1),
+        User(username="locked", email="locked@phulong.vn", hashed_password="x", role=UserRole.ROOT, is_active=False),
+    ])
+    db.commit()
+    db.close()
+    yield
+    principal_cache.clear()
+
+@pytest.fixture
+def make_app(tmp_path, session_factory):
+    def make(sample_every=0):
+        app = FastAPI()
+
+        @app.get("/api/services/{slug}")
+        def service(slug: str):
+            time.sleep(0.005)
+            return {"slug": slug}
+
+        store = ProfileStore(str(tmp_path), max_profiles=3)
+        app.add_middleware(ProfilingMiddleware, store=store, sample_every=sample_every, session_factory=session_factory)
+        return TestClient(app), store
+    return make
+
+def auth(username, role=None):
+    token = create_access_token({"sub": username, "role": role or username, "ver": 0})
+    return {"Authorization": f"Bearer {token}"}
+
+def test_root_request_is_profiled_and_stored(make_app):
+    client, store = make_app()
+    response = client.get("/api/services/in-an", headers={**auth("root"), "X-Profile": "1"})
+    assert response.status_code == 200 and response.json() == {"slug": "in-an"}
+
+    profile_id = response.headers["x-profile-id"]
+    [meta] = store.list()
+    assert meta["id"] == profile_id and meta["trigger"] == "requested"
+    assert meta["route"] == "GET /api/services/{slug}" and meta["status_code"] == 200
+    assert "<html" in store.get_html(profile_id).lower()
+
+def test_html_mode_returns_flame_graph(make_app):
+    client, store = make_app()
+    response = client.get("/api/services/in-an?__profile=html", headers=auth("root"))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/html")
+    assert response.headers["x-profile-status"] == "200"
+    assert store.list() == []
+
+def test_non_root_cannot_request_profile(make_app):
+    client, store = make_app()
+    for headers in ({"X-Profile": "1"}, {**auth("admin"), "X-Profile": "html"}):
+        response = client.get("/api/services/in-an", headers=headers)
+        assert response.json() == {"slug": "in-an"} and "x-profile-id" not in response.headers
+    assert store.list() == []
+
+def test_revoked_or_inactive_root_token_cannot_request_profile(make_app):
+    client, store = make_app()
+    # Token mang role root nhưng user đã tăng token_version, bị khóa, hoặc role thật trong DB không phải root
+    for username in ("revoked", "locked", "admin"):
+        for headers in ({"X-Profile": "1"}, {"X-Profile": "html"}):
+            response = client.get("/api/services/in-an", headers={**auth(username, "root"), **headers})
+            assert response.json() == {"slug": "in-an"} and "x-profile-id" not in response.headers
+    assert store.list() == []
+
+def test_sampling_per_route_and_pruning(make_app):
+    client, store = make_app(sample_every=2)
+    for i in range(10):
+        client.get(f"/api/services/dich-vu-{i}")
+    profiles = store.list()
+    # 5 request được lấy mẫu (mọi slug chung một route), chỉ giữ max_profiles=3 bản mới nhất
+    assert len(profiles) == 3
+    assert all(p["trigger"] == "sampled" and p["route"] == "GET /api/services/{slug}" for p in profiles)
+    assert store.clear() == 3 and store.list() == []
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from config.settings import settings
+from middlewares.rate_limit_middleware import RateLimitMiddleware
+from utils.rate_limit import MemoryRateLimitBackend, RateLimiter, RateLimitPolicy, parse_rate
+
+def test_parse_rate():
+    assert parse_rate("5/minute") == (5, 5 / 60)
+    assert parse_rate("10/second") == (10, 10.0)
+    assert parse_rate("0") == (0, 0.0)
+    with pytest.raises(ValueError):
+        parse_rate("5/week")
+
+def test_memory_bucket_refills():
+    backend = MemoryRateLimitBackend()
+    async def run():
+        results = [await backend.hit("k", 2, 1000.0) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        return results, await backend.hit("k", 2, 1000.0)
+    results, after_refill = asyncio.run(run())
+    assert [r.allowed for r in results] == [True, True, False]
+    assert results[2].retry_after > 0
+    assert after_refill.allowed
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    limiter = RateLimiter(
+        [RateLimitPolicy("contact", "POST", r"^/api/contact/submit/?$", "2/minute", "3/minute")],
+        MemoryRateLimitBackend()
+    )
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+    @app.post("/api/contact/submit")
+    def submit():
+        return {"ok": True}
+
+    @app.get("/api/contact/submit")
+    def read():
+        return {"ok": True}
+
+    app.state.limiter = limiter
+    return app
+
+def post(app, ip, forwarded_for=None):
+    """Gửi request với scope["client"] = ip (như sau khi server xử lý proxy headers)"""
+    async def with_client(scope, receive, send):
+        await app(dict(scope, client=(ip, 50000)), receive, send)
+    headers = {"X-Forwarded-For": forwarded_for} if forwarded_for else {}
+    return TestClient(with_client).post("/api/contact/submit", headers=headers)
+
+def test_per_ip_limit_returns_retry_after(app):
+    client = TestClient(app)
+    first, second, third = (post(app, "1.1.1.1") for _ in range(3))
+    assert first.status_code == 200 and first.headers["X-RateLimit-Remaining"] == "1"
+    assert second.status_code == 200
+    assert third.status_code == 429
+    assert int(third.headers["Retry-After"]) == 30
+    # Route / method không có chính sách thì không bị giới hạn
+    assert all(client.get("/api/contact/submit").status_code == 200 for _ in range(5))
+
+def test_forwarded_header_does_not_pick_the_bucket(app):
+    # X-Forwarded-For do client tự gửi không tạo được bucket mới để né giới hạn theo IP
+    codes = [post(app, "2.2.2.2", forwarded_for=f"9.9.9.{i}").status_code for i in range(3)]
+    assert codes == [200, 200, 429]
+
+def test_global_cap_across_ips(app):
+    codes = [post(app, f"10.0.0.{i}").status_code for i in range(5)]
+    assert codes == [200, 200, 200, 429, 429]
+    metrics = asyncio.run(app.state.limiter.get_metrics())["policies"][0]
+    assert (metrics["allowed"], metrics["limited_global"], metrics["limited_ip"]) == (3, 2, 0)
+
+def test_default_policies_cover_public_upload_endpoints():
+    from utils.rate_limit import default_policies
+    limiter = RateLimiter(default_policies(), MemoryRateLimitBackend())
+    expected = {
+        ("POST", "/api/uploads/"): "upload_create",
+        ("PATCH", "/api/uploads/0123abcd"): "upload_chunk",
+        ("POST", "/api/orders/presign-design"): "presign_design",
+        ("PUT", "/api/storage/upload/uploads/20261019_ab12cd34_a.pdf"): "storage_put",
+        ("POST", "/api/orders/"): "orders",
+    }
+    for (method, path), name in expected.items():
+        assert limiter.match(method, path).name == name
+    assert limiter.match("GET", "/api/uploads/0123abcd") is None
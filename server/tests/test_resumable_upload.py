@@ -0,0 +1,133 @@
+import asyncio
+import os
+import base64
+import hashlib
+from datetime import datetime
+import pytest
+from fastapi import HTTPException
+from config.settings import settings
+from models.models import ResumableUpload
+from utils import resumable_upload as ru
+
+@pytest.fixture
+def upload(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RESUMABLE_UPLOAD_TMP_DIR", str(tmp_path))
+    return ResumableUpload(
+        id="abc", filename="a.pdf", total_size=10, chunk_size=4,
+        status=ru.STATUS_UPLOADING, expires_at=datetime.utcnow()
+    )
+
+async def _body(data: bytes):
+    yield data
+
+def _write(upload, offset, data, checksum=None):
+    return asyncio.run(ru.write_chunk(upload, offset, _body(data), checksum))
+
+def test_out_of_order_chunks(upload):
+    """Chunk nhận song song/không theo thứ tự, offset chỉ tính phần liên tục"""
+    assert ru.chunk_count(upload) == 3
+    assert ru.chunk_length(upload, 2) == 2
+    _write(upload, 8, b"ij")
+    assert ru.current_offset(upload) == 0
+    assert ru.missing_chunks(upload) == [0, 1]
+    _write(upload, 0, b"abcd")
+    assert ru.current_offset(upload) == 4
+    _write(upload, 4, b"efgh")
+    assert ru.current_offset(upload) == 10
+    assert ru.missing_chunks(upload) == []
+
+def test_invalid_chunks_rejected(upload):
+    """Offset lệch, chunk thiếu/thừa dữ liệu và sai checksum đều bị từ chối"""
+    with pytest.raises(HTTPException) as exc:
+        _write(upload, 3, b"abcd")
+    assert exc.value.status_code == 409
+    with pytest.raises(HTTPException) as exc:
+        _write(upload, 0, b"abc")
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        _write(upload, 0, b"abcde")
+    assert exc.value.status_code == 413
+
+    bad = ru.parse_checksum("sha256 " + base64.b64encode(hashlib.sha256(b"xxxx").digest()).decode())
+    with pytest.raises(HTTPException) as exc:
+        _write(upload, 0, b"abcd", bad)
+    assert exc.value.status_code == ru.HTTP_460_CHECKSUM_MISMATCH
+    assert ru.received_chunks(upload) == set()
+
+    good = ru.parse_checksum("sha256 " + base64.b64encode(hashlib.sha256(b"abcd").digest()).decode())
+    assert _write(upload, 0, b"abcd", good) == 0
+
+@pytest.fixture
+def api(tmp_path, monkeypatch, session_factory, override_db):
+    """App với router uploads + orders trên SQLite in-memory, storage local trong tmp_path"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from config.database import get_db
+    from models.models import Service
+    from routers import orders, uploads
+    from utils import storage as storage_module
+
+    db = session_factory()
+    db.add(Service(name="In danh thiếp", description="In offset", price=100000))
+    db.commit()
+    db.close()
+
+    monkeypatch.setattr(settings, "RESUMABLE_UPLOAD_TMP_DIR", str(tmp_path / "chunks"))
+    monkeypatch.setattr(storage_module, "_storage", storage_module.LocalStorage(str(tmp_path / "storage")))
+    monkeypatch.setattr(orders, "kick_admin_notifications", lambda: None)
+
+    app = FastAPI()
+    app.include_router(uploads.router)
+    app.include_router(orders.router)
+    app.dependency_overrides[get_db] = override_db
+    return TestClient(app), session_factory, tmp_path / "storage"
+
+def _upload_file(client, data: bytes) -> dict:
+    created = client.post("/api/uploads/", json={"filename": "thiet-ke.pdf", "size": len(data),
+                                                 "content_type": "application/pdf", "chunk_size": ru.MIN_CHUNK_SIZE})
+    assert created.status_code == 201
+    upload = created.json()
+    headers = {"Content-Type": "application/offset+octet-stream"}
+    # Gửi chunk cuối trước: file chỉ được ghép khi chunk còn thiếu cuối cùng tới
+    for offset in sorted(range(0, len(data), upload["chunk_size"]), reverse=True):
+        chunk = data[offset:offset + upload["chunk_size"]]
+        response = client.patch(f"/api/uploads/{upload['id']}", content=chunk,
+                                headers={**headers, "Upload-Offset": str(offset)})
+        assert response.status_code == 204
+    return client.get(f"/api/uploads/{upload['id']}").json()
+
+ORDER_FORM = {"customer_name": "Khách", "customer_email": "khach@phulong.vn", "customer_phone": "0900000000",
+              "service_id": "1", "quantity": "10"}
+
+def test_final_chunk_assembles_file(api):
+    client, Session, storage_root = api
+    data = bytes(range(256)) * (ru.MIN_CHUNK_SIZE // 256) + b"phan-cuoi"
+    status_out = _upload_file(client, data)
+    assert status_out["status"] == ru.STATUS_COMPLETED and status_out["offset"] == len(data)
+
+    db = Session()
+    upload = db.get(ResumableUpload, status_out["id"])
+    assert (storage_root / upload.storage_key).read_bytes() == data
+    assert not os.path.exists(ru.chunk_dir(upload.id))
+    db.close()
+
+    response = client.post("/api/orders/", data={**ORDER_FORM, "upload_id": status_out["id"]})
+    assert response.status_code == 200
+    db = Session()
+    assert db.get(ResumableUpload, status_out["id"]).status == ru.STATUS_ATTACHED
+    db.close()
+
+def test_order_rejects_upload_id_with_other_design_source(api):
+    client, _, _ = api
+    upload_id = _upload_file(client, b"x" * (ru.MIN_CHUNK_SIZE + 1))["id"]
+
+    with_file = client.post("/api/orders/", data={**ORDER_FORM, "upload_id": upload_id},
+                            files={"design_file": ("a.pdf", b"%PDF", "application/pdf")})
+    assert with_file.status_code == 400
+
+    with_key = client.post("/api/orders/", data={**ORDER_FORM, "upload_id": upload_id,
+                                                 "design_file_key": "uploads/a.pdf"})
+    assert with_key.status_code == 400
+
+    # Phiên upload không bị gắn bởi các request lỗi, vẫn dùng được
+    assert client.post("/api/orders/", data={**ORDER_FORM, "upload_id": upload_id}).status_code == 200
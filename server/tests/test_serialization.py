@@ -0,0 +1,61 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import List
+import pytest
+from fastapi import FastAPI
+from fastapi.routing import serialize_response
+from fastapi.testclient import TestClient
+from fastapi.utils import create_response_field
+from config.database import get_db
+from models.models import Image, Service, ServiceReview, User, UserRole
+from routers import services
+from schemas.schemas import ServiceOut
+from utils.serialization import dump_json, get_type_adapter
+
+@pytest.fixture(autouse=True)
+def catalog(session_factory):
+    db = session_factory()
+    now = datetime(2026, 10, 1, 8, 30, 15, 123456)
+    user = User(username="admin", email="admin@phulong.vn", hashed_password="x", role=UserRole.ADMIN,
+                is_active=True, created_at=now)
+    db.add(user)
+    db.flush()
+    image = Image(filename="a.jpg", file_path="static/a.jpg", url="/static/a.jpg", is_visible=True,
+                  uploaded_by=user.id, created_at=now, updated_at=now)
+    db.add(image)
+    db.flush()
+    service = Service(name="In name card", description="Mô tả", price=150000, image_id=image.id,
+                      is_active=True, featured=True, created_at=now, updated_at=now)
+    db.add(service)
+    db.flush()
+    db.add(ServiceReview(service_id=service.id, rating=5, content="Tốt", author_name="Lan",
+                         is_anonymous=False, created_at=now))
+    db.commit()
+    db.close()
+
+def test_dump_json_matches_fastapi_default_serialization(session_factory):
+    db = session_factory()
+    data = db.query(Service).all()
+    field = create_response_field(name="services", type_=List[ServiceOut])
+    expected = asyncio.run(serialize_response(field=field, response_content=data))
+    assert json.loads(dump_json(List[ServiceOut], data)) == expected
+    assert get_type_adapter(List[ServiceOut]) is get_type_adapter(List[ServiceOut])
+
+def test_list_endpoints_serialize_orm_objects_and_rows(override_db):
+    app = FastAPI()
+    app.include_router(services.router)
+    app.dependency_overrides[get_db] = override_db
+    client = TestClient(app)
+
+    response = client.get("/api/services/")
+    assert response.headers["content-type"] == "application/json"
+    item = response.json()[0]
+    assert item["name"] == "In name card"
+    assert item["image"]["uploader"]["username"] == "admin"
+
+    reviews = client.get("/api/services/in-name-card/reviews").json()
+    assert reviews == [{
+        "rating": 5, "content": "Tốt", "author_name": "Lan", "is_anonymous": False,
+        "id": 1, "created_at": "2026-10-01T08:30:15.123456"
+    }]
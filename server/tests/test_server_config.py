@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+from config import server
+from config.settings import settings
+
+def test_worker_count_scales_with_cpus_and_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 0)
+    monkeypatch.setattr(settings, "SERVER_WORKERS_PER_CPU", 2)
+    monkeypatch.setattr(settings, "SERVER_MAX_WORKERS", 8)
+    monkeypatch.setattr(server, "available_cpus", lambda: 3)
+    assert server.worker_count() == 6
+    monkeypatch.setattr(server, "available_cpus", lambda: 16)
+    assert server.worker_count() == 8
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 3)
+    assert server.worker_count() == 3
+
+def test_scheduler_lock_is_held_by_one_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "_scheduler_lock_file", None)
+    path = str(tmp_path / "scheduler.lock")
+    assert server.acquire_scheduler_lock(path) is True
+    other = subprocess.run(
+        [sys.executable, "-c", f"from config.server import acquire_scheduler_lock; print(acquire_scheduler_lock({path!r}))"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), capture_output=True, text=True
+    )
+    assert other.stdout.strip() == "False"
+    server._scheduler_lock_file.close()
@@ -0,0 +1,68 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from passlib.hash import bcrypt
+from config.database import get_db
+from config.settings import settings
+from models.models import User, UserRole, UserSession
+from routers import auth
+from utils.principal_cache import principal_cache
+
+@pytest.fixture
+def client(monkeypatch, session_factory, override_db):
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_ENABLED", False)
+    db = session_factory()
+    db.add(User(username="admin", email="a@phulong.vn", role=UserRole.ADMIN, is_active=True,
+                hashed_password=bcrypt.using(rounds=settings.BCRYPT_ROUNDS).hash("matkhau")))
+    db.commit()
+    db.close()
+
+    app = FastAPI()
+    app.include_router(auth.router)
+
+    app.dependency_overrides[get_db] = override_db
+    principal_cache.clear()
+
+    test_client = TestClient(app)
+    test_client.Session = session_factory
+    return test_client
+
+def login(client):
+    response = client.post("/api/auth/login-json", json={"username": "admin", "password": "matkhau"})
+    assert response.status_code == 200
+    return response.json()
+
+def test_refresh_rotates_token(client):
+    tokens = login(client)
+    assert tokens["refresh_token"] and tokens["expires_in"] == settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+    refreshed = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+    assert refreshed["refresh_token"] != tokens["refresh_token"]
+    headers = {"Authorization": f"Bearer {refreshed['access_token']}"}
+    sessions = client.get("/api/auth/sessions", headers=headers).json()
+    assert len(sessions) == 1 and sessions[0]["current"] is True
+
+def test_reused_refresh_token_revokes_session(client):
+    tokens = login(client)
+    rotated = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+
+    # Dùng lại token cũ: thu hồi phiên, token mới cũng hết hiệu lực
+    assert client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    assert client.post("/api/auth/refresh", json={"refresh_token": rotated["refresh_token"]}).status_code == 401
+    session = client.Session().query(UserSession).one()
+    assert session.revoked_reason == "reuse_detected"
+
+def test_logout_all_invalidates_access_tokens(client):
+    first, second = login(client), login(client)
+    headers = {"Authorization": f"Bearer {first['access_token']}"}
+    assert client.get("/api/auth/sessions", headers=headers).status_code == 200
+
+    assert client.post("/api/auth/logout-all", headers=headers).status_code == 204
+    assert client.get("/api/auth/sessions", headers=headers).status_code == 401
+    assert client.post("/api/auth/refresh", json={"refresh_token": second["refresh_token"]}).status_code == 401
+
+def test_logout_revokes_single_session(client):
+    first, second = login(client), login(client)
+    assert client.post("/api/auth/logout", json={"refresh_token": first["refresh_token"]}).status_code == 204
+    assert client.post("/api/auth/refresh", json={"refresh_token": first["refresh_token"]}).status_code == 401
+    assert client.post("/api/auth/refresh", json={"refresh_token": second["refresh_token"]}).status_code == 200
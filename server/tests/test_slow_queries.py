@@ -0,0 +1,93 @@
+import time
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from middlewares.slow_query_middleware import SlowQueryContextMiddleware
+from utils.slow_queries import SlowQueryLog, fingerprint, normalize_statement, parameter_shape
+
+def test_normalize_groups_literals_and_in_lists():
+    a = normalize_statement("SELECT * FROM orders WHERE id IN (%(id_1_1)s, %(id_1_2)s) AND status = 'pending'")
+    b = normalize_statement("SELECT *  FROM orders\nWHERE id IN (%(id_1_1)s) AND status = 'completed'")
+    assert a == b == "SELECT * FROM orders WHERE id IN (...) AND status = ?"
+    assert fingerprint(a) == fingerprint(b)
+    assert normalize_statement("SELECT col_1::text FROM t LIMIT 20") == "SELECT col_1::text FROM t LIMIT ?"
+
+def test_parameter_shape_hides_values():
+    assert parameter_shape({"email": "khach@phulong.vn", "limit": 20}) == {"email": "str(16)", "limit": "int"}
+    assert parameter_shape([{"a": 1}, {"a": 2}]) == {"rows": 2, "first": {"a": "int"}}
+
+def test_slow_statements_recorded_with_route(db_engine, session_factory):
+    log = SlowQueryLog(threshold_ms=20)
+    log.install(db_engine)
+    # Hàm SQL "chậm" để không phụ thuộc kích thước dữ liệu
+    with db_engine.connect() as conn:
+        conn.connection.dbapi_connection.create_function("slow", 1, lambda ms: time.sleep(ms / 1000) or ms)
+
+    app = FastAPI()
+
+    def get_session():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/api/orders/{order_id}")
+    def order(order_id: int, db: Session = Depends(get_session)):
+        db.execute(text("SELECT slow(:ms)"), {"ms": 30}).scalar()
+        db.execute(text("SELECT 1")).scalar()
+        return {"id": order_id}
+
+    app.add_middleware(SlowQueryContextMiddleware)
+    client = TestClient(app)
+    for order_id in (1, 2):
+        assert client.get(f"/api/orders/{order_id}").status_code == 200
+    with db_engine.connect() as conn:
+        conn.execute(text("SELECT slow(:ms)"), {"ms": 25})
+
+    [entry] = log.top()
+    assert entry["statement"] == "SELECT slow(?)" and entry["count"] == 3
+    assert entry["max_ms"] >= 25 and entry["explain"] is None
+    assert entry["routes"] == [{"route": "GET /api/orders/{order_id}", "count": 2},
+                               {"route": "(ngoài request)", "count": 1}]
+    # SQLite dùng tham số vị trí: chỉ ghi kiểu, không ghi giá trị
+    assert entry["parameters"] == ["int"]
+    log.uninstall()
+    assert log.reset() == 1
+
+def test_explain_sampled_first_and_every_nth(monkeypatch):
+    log = SlowQueryLog(threshold_ms=0, explain_every=2)
+    captured = []
+    monkeypatch.setattr(log, "_capture_explain", lambda key, statement, parameters, route: captured.append(statement))
+    for i in range(4):
+        log.record(f"SELECT * FROM printings WHERE content ILIKE '%{i}%'", {}, 50, explainable=True)
+    log.record("UPDATE orders SET status = 'completed'", {}, 50, explainable=True)
+    log._executor.shutdown(wait=True)
+    # Lần 1 và 3 của câu SELECT; không bao giờ EXPLAIN ANALYZE câu ghi dữ liệu
+    assert len(captured) == 2 and all(s.startswith("SELECT") for s in captured)
+    assert [e["count"] for e in log.top(sort="count")] == [4, 1]
+
+def test_failed_statement_does_not_leak_start_time(db_engine):
+    log = SlowQueryLog(threshold_ms=1000)
+    log.install(db_engine)
+    with db_engine.connect() as conn:
+        for _ in range(3):
+            try:
+                conn.execute(text("SELECT * FROM bang_khong_ton_tai"))
+            except Exception:
+                conn.rollback()
+        conn.execute(text("SELECT 1"))
+        assert conn.info["slow_query_start"] == []
+    log.uninstall()
+
+def test_row_locking_select_is_never_explained(monkeypatch):
+    log = SlowQueryLog(threshold_ms=0, explain_every=1)
+    captured = []
+    monkeypatch.setattr(log, "_capture_explain", lambda key, statement, parameters, route: captured.append(statement))
+    log.record("SELECT * FROM resumable_uploads WHERE id = %(id)s FOR UPDATE", {}, 50, explainable=True)
+    log.record("SELECT * FROM orders WHERE id = 1 FOR NO KEY UPDATE SKIP LOCKED", {}, 50, explainable=True)
+    log.record("select * from email_outbox for share", {}, 50, explainable=True)
+    log.record("SELECT * FROM orders WHERE notes = 'for update'", {}, 50, explainable=True)
+    log._executor.shutdown(wait=True)
+    assert captured == ["SELECT * FROM orders WHERE notes = 'for update'"]
@@ -0,0 +1,72 @@
+import socket
+import pytest
+from utils.smtp_pool import SMTPConnectionPool
+from utils.email import build_message
+
+aiosmtpd = pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+
+class _Collector:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.mail_from, envelope.rcpt_tos, session.peer))
+        return "250 OK"
+
+@pytest.fixture
+def smtp_server():
+    handler = _Collector()
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+def _pool(controller, **kwargs):
+    return SMTPConnectionPool(
+        controller.hostname, controller.port,
+        use_tls=False, sender="no-reply@phulong.vn", **kwargs
+    )
+
+def test_pool_reuses_connection(smtp_server):
+    """Nhiều email được gửi trên cùng một kết nối SMTP"""
+    controller, handler = smtp_server
+    pool = _pool(controller)
+    messages = [build_message(f"kh{i}@phulong.vn", "Xác nhận đơn hàng", "<p>Cảm ơn</p>") for i in range(5)]
+
+    assert pool.send_many(messages[:3]) == [None, None, None]
+    pool.send(messages[3])
+    pool.send(messages[4])
+
+    metrics = pool.get_metrics()
+    assert len(handler.messages) == 5
+    assert len({peer for _, _, peer in handler.messages}) == 1
+    assert metrics["sent"] == 5 and metrics["connections_opened"] == 1
+    assert metrics["idle_connections"] == 1 and metrics["throughput_per_minute"] == 5
+    assert handler.messages[0][0] == "no-reply@phulong.vn"
+    pool.close()
+
+def test_pool_reconnects_after_disconnect(smtp_server):
+    """Kết nối bị server ngắt được mở lại và email vẫn được gửi"""
+    controller, handler = smtp_server
+    pool = _pool(controller)
+    pool.send(build_message("a@phulong.vn", "1", "<p>1</p>"))
+
+    # Giả lập server đóng kết nối rảnh
+    pool._idle[0].server.close()
+    pool.send(build_message("b@phulong.vn", "2", "<p>2</p>"))
+
+    metrics = pool.get_metrics()
+    assert len(handler.messages) == 2
+    assert metrics["reconnects"] == 1 and metrics["failed"] == 0
+    pool.close()
+
+def test_pool_reports_connection_failure():
+    """Không kết nối được thì mọi email trong lô đều báo lỗi, không raise"""
+    pool = SMTPConnectionPool("127.0.0.1", 1, use_tls=False, timeout=1)
+    errors = pool.send_many([build_message("a@phulong.vn", "1", "<p>1</p>")] * 2)
+    assert len(errors) == 2 and all(isinstance(error, Exception) for error in errors)
+    assert pool.get_metrics()["failed"] == 2
@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_import_main_is_lazy_and_does_not_touch_database():
+    # DATABASE_PORT trỏ vào cổng không có server: import main không được kết nối DB
+    code = (
+        "import sys, main; "
+        "print(','.join(m for m in ('pandas', 'PIL', 'boto3') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=SERVER_DIR, capture_output=True, text=True, timeout=120,
+        env={**os.environ, "PYTHONPATH": SERVER_DIR, "DATABASE_PORT": "1"}
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip() == "", f"module nặng bị import lúc khởi động: {result.stdout.strip()}"
@@ -0,0 +1,170 @@
+import gzip
+import os
+import brotli
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+from utils.static_files import CachedStaticFiles, build_file_response, parse_range
+
+CSS = ("body { color: #123456; }\n" * 200).encode()
+IMAGE = bytes(range(256)) * 40
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "images" / "uploads").mkdir(parents=True)
+    (tmp_path / "css" / "site.css").write_bytes(CSS)
+    (tmp_path / "images" / "uploads" / "photo.bin").write_bytes(IMAGE)
+    return tmp_path
+
+@pytest.fixture
+def client(static_dir):
+    app = FastAPI()
+    app.mount("/static", CachedStaticFiles(directory=str(static_dir)), name="static")
+    return TestClient(app)
+
+def add_precompressed(static_dir):
+    """Tạo bản .br / .gz cạnh file gốc, mtime không cũ hơn file gốc"""
+    source = static_dir / "css" / "site.css"
+    (static_dir / "css" / "site.css.br").write_bytes(brotli.compress(CSS))
+    (static_dir / "css" / "site.css.gz").write_bytes(gzip.compress(CSS))
+    mtime = source.stat().st_mtime + 1
+    for suffix in (".br", ".gz"):
+        os.utime(str(source) + suffix, (mtime, mtime))
+
+def test_etag_and_if_none_match_return_304(client):
+    first = client.get("/static/css/site.css", headers={"Accept-Encoding": "identity"})
+    assert first.status_code == 200
+    assert first.content == CSS
+    assert first.headers["content-length"] == str(len(CSS))
+    assert first.headers["cache-control"].endswith("must-revalidate")
+    etag = first.headers["etag"]
+    assert etag.startswith('"')
+
+    cached = client.get("/static/css/site.css", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    # Weak ETag và danh sách nhiều ETag vẫn khớp (weak comparison)
+    weak = client.get("/static/css/site.css", headers={"Accept-Encoding": "identity", "If-None-Match": f'"other", W/{etag}'})
+    assert weak.status_code == 304
+
+    changed = client.get("/static/css/site.css", headers={"Accept-Encoding": "identity", "If-None-Match": '"other"'})
+    assert changed.status_code == 200
+    assert changed.content == CSS
+
+def test_if_modified_since_only_used_without_if_none_match(client):
+    first = client.get("/static/css/site.css", headers={"Accept-Encoding": "identity"})
+    last_modified = first.headers["last-modified"]
+
+    assert client.get("/static/css/site.css", headers={"If-Modified-Since": last_modified}).status_code == 304
+    # If-None-Match không khớp được ưu tiên hơn If-Modified-Since
+    response = client.get("/static/css/site.css", headers={"If-Modified-Since": last_modified, "If-None-Match": '"other"'})
+    assert response.status_code == 200
+
+def test_range_returns_206_and_416(client):
+    partial = client.get("/static/images/uploads/photo.bin", headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206
+    assert partial.content == IMAGE[100:200]
+    assert partial.headers["content-range"] == f"bytes 100-199/{len(IMAGE)}"
+    assert partial.headers["content-length"] == "100"
+    assert "immutable" in partial.headers["cache-control"]
+
+    suffix = client.get("/static/images/uploads/photo.bin", headers={"Range": "bytes=-50"})
+    assert suffix.status_code == 206
+    assert suffix.content == IMAGE[-50:]
+
+    unsatisfiable = client.get("/static/images/uploads/photo.bin", headers={"Range": f"bytes={len(IMAGE)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(IMAGE)}"
+
+    # Nhiều khoảng không được hỗ trợ: phục vụ cả file
+    multi = client.get("/static/images/uploads/photo.bin", headers={"Range": "bytes=0-1,5-6"})
+    assert multi.status_code == 200
+    assert multi.content == IMAGE
+
+def test_if_range_only_honoured_when_validator_matches(client):
+    etag = client.get("/static/images/uploads/photo.bin").headers["etag"]
+
+    matching = client.get("/static/images/uploads/photo.bin", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert matching.status_code == 206
+    assert matching.content == IMAGE[:10]
+
+    # File đã đổi (validator khác): trả toàn bộ file thay vì một phần
+    stale = client.get("/static/images/uploads/photo.bin", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.content == IMAGE
+
+def test_precompressed_sibling_selection(client, static_dir):
+    add_precompressed(static_dir)
+
+    br = client.get("/static/css/site.css", headers={"Accept-Encoding": "gzip, br"})
+    assert br.headers["content-encoding"] == "br"
+    assert br.headers["vary"] == "Accept-Encoding"
+    assert br.content == CSS
+
+    gz = client.get("/static/css/site.css", headers={"Accept-Encoding": "gzip, br;q=0"})
+    assert gz.headers["content-encoding"] == "gzip"
+    assert gz.content == CSS
+    # Mỗi encoding có ETag riêng
+    assert len({br.headers["etag"], gz.headers["etag"]}) == 2
+
+    identity = client.get("/static/css/site.css", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["vary"] == "Accept-Encoding"
+    assert identity.content == CSS
+
+    # Range luôn tính trên bản gốc, không dùng bản nén
+    ranged = client.get("/static/css/site.css", headers={"Accept-Encoding": "br", "Range": "bytes=0-3"})
+    assert ranged.status_code == 206
+    assert "content-encoding" not in ranged.headers
+    assert ranged.content == CSS[:4]
+
+def test_stale_precompressed_sibling_is_ignored(client, static_dir):
+    add_precompressed(static_dir)
+    source = static_dir / "css" / "site.css"
+    mtime = source.stat().st_mtime + 10
+    os.utime(source, (mtime, mtime))
+
+    response = client.get("/static/css/site.css", headers={"Accept-Encoding": "br"})
+    assert "content-encoding" not in response.headers
+    assert response.content == CSS
+
+def test_binary_files_have_no_vary_or_encoding(client, static_dir):
+    (static_dir / "images" / "uploads" / "photo.bin.gz").write_bytes(gzip.compress(IMAGE))
+    response = client.get("/static/images/uploads/photo.bin", headers={"Accept-Encoding": "gzip"})
+    assert "vary" not in response.headers
+    assert "content-encoding" not in response.headers
+    assert response.content == IMAGE
+
+def test_head_sends_headers_without_body(client, static_dir):
+    add_precompressed(static_dir)
+    response = client.head("/static/css/site.css", headers={"Accept-Encoding": "br"})
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["content-length"] == str((static_dir / "css" / "site.css.br").stat().st_size)
+    assert "etag" in response.headers
+
+def test_build_file_response_content_disposition(static_dir):
+    path = str(static_dir / "css" / "site.css")
+    response = build_file_response(path, os.stat(path), Headers(), filename="bản in.css")
+    assert response.headers["content-disposition"] == "attachment; filename*=utf-8''b%E1%BA%A3n%20in.css"
+    assert response.media_type == "text/css"
+
+    plain = build_file_response(path, os.stat(path), Headers(), filename="site.css", content_disposition_type="inline")
+    assert plain.headers["content-disposition"] == 'inline; filename="site.css"'
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=990-2000", 1000) == (990, 999)
+    assert parse_range("items=0-1", 1000) is None
+    assert parse_range("bytes=abc", 1000) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=1000-", 1000)
+    with pytest.raises(ValueError):
+        parse_range("bytes=5-1", 1000)
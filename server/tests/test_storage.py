@@ -0,0 +1,145 @@
+import time
+import pytest
+from utils.storage import LocalStorage, key_for_path
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorage(str(tmp_path))
+
+def test_save_and_delete(storage):
+    """Lưu, đọc kích thước và xóa file trên local storage"""
+    key = "images/uploads/test.png"
+    assert storage.save_bytes(key, b"12345", "image/png") == 5
+    assert storage.size(key) == 5
+    assert storage.read_head(key, 2) == b"12"
+    storage.delete(key)
+    assert storage.size(key) is None
+
+def test_path_traversal_blocked(storage):
+    """Key không được thoát ra ngoài thư mục gốc"""
+    with pytest.raises(ValueError):
+        storage.path_for("../../etc/passwd")
+
+def test_presign_signature(storage):
+    """Chữ ký upload trực tiếp gắn với key, content type, kích thước và thời hạn"""
+    expires = int(time.time()) + 60
+    signature = storage.sign("uploads/a.pdf", expires, "application/pdf", 100)
+    assert storage.verify_signature("uploads/a.pdf", expires, "application/pdf", 100, signature)
+    assert not storage.verify_signature("uploads/b.pdf", expires, "application/pdf", 100, signature)
+    assert not storage.verify_signature("uploads/a.pdf", expires, "application/pdf", 0, signature)
+    expired = int(time.time()) - 1
+    assert not storage.verify_signature(
+        "uploads/a.pdf", expired, "application/pdf", 100,
+        storage.sign("uploads/a.pdf", expired, "application/pdf", 100)
+    )
+
+def test_key_for_s3_path():
+    """Chuyển file_path dạng s3:// về key"""
+    assert key_for_path("s3://bucket/images/uploads/a.png") == "images/uploads/a.png"
+
+class StubS3Client:
+    """Client S3 giả: lưu object trong dict, đủ cho các hàm S3Storage gọi tới"""
+
+    def __init__(self):
+        self.objects = {}
+        self.extra_args = {}
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        self.objects[(bucket, key)] = fileobj.read()
+        self.extra_args[(bucket, key)] = ExtraArgs
+
+    def head_object(self, Bucket, Key):
+        from botocore.exceptions import ClientError
+        if (Bucket, Key) not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+@pytest.fixture
+def s3(monkeypatch):
+    from config.settings import settings
+    from utils.storage import S3Storage
+    monkeypatch.setattr(settings, "S3_BUCKET", "phulong")
+    monkeypatch.setattr(settings, "S3_ENDPOINT_URL", "http://minio:9000")
+    monkeypatch.setattr(settings, "S3_PUBLIC_URL", "")
+    monkeypatch.setattr(settings, "S3_ACCESS_KEY", "test-key")
+    monkeypatch.setattr(settings, "S3_SECRET_KEY", "test-secret")
+    return S3Storage()
+
+@pytest.fixture
+def stub_s3(s3):
+    s3.client = StubS3Client()
+    return s3
+
+def test_s3_presign_put(s3):
+    """Presigned PUT ký bằng SigV4, gắn Content-Type"""
+    presigned = s3.presign_put("uploads/a b.pdf", "application/pdf", 300)
+    assert presigned["method"] == "PUT"
+    assert presigned["url"].startswith("http://minio:9000/phulong/uploads/a%20b.pdf?")
+    assert "X-Amz-Signature=" in presigned["url"] and "X-Amz-Expires=300" in presigned["url"]
+    assert presigned["headers"] == {"Content-Type": "application/pdf"}
+
+def test_s3_save_size_delete_and_url(stub_s3, monkeypatch):
+    from config.settings import settings
+    s3 = stub_s3
+    assert s3.save_bytes("images/uploads/a.png", b"12345", "image/png") == 5
+    extra = s3.client.extra_args[("phulong", "images/uploads/a.png")]
+    assert extra["ContentType"] == "image/png" and "immutable" in extra["CacheControl"]
+    assert s3.path_for("images/uploads/a.png") == "s3://phulong/images/uploads/a.png"
+    s3.delete("images/uploads/a.png")
+    assert s3.size("images/uploads/a.png") is None
+
+    assert s3.url("images/a.png") == "http://minio:9000/phulong/images/a.png"
+    monkeypatch.setattr(settings, "S3_PUBLIC_URL", "https://cdn.phulong.vn/")
+    assert s3.url("images/a.png") == "https://cdn.phulong.vn/images/a.png"
+    monkeypatch.setattr(settings, "S3_PUBLIC_URL", "")
+    monkeypatch.setattr(settings, "S3_ENDPOINT_URL", "")
+    assert s3.url("images/a.png") == f"https://phulong.s3.{settings.S3_REGION}.amazonaws.com/images/a.png"
+
+def test_banner_and_service_uploads_go_through_storage(stub_s3, monkeypatch, session_factory):
+    """Ảnh banner / dịch vụ được lưu qua storage backend (S3), không ghi ra disk cục bộ"""
+    import asyncio
+    import io
+    from fastapi import FastAPI, UploadFile
+    from fastapi.testclient import TestClient
+    from PIL import Image as PILImage
+    from starlette.datastructures import Headers
+    from config.database import get_db
+    from middlewares.auth_middleware import get_admin_user
+    from models.models import Image, User, UserRole
+    from routers import banners, services
+    from utils import storage as storage_module
+
+    s3 = stub_s3
+    monkeypatch.setattr(storage_module, "_storage", s3)
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (4, 3), (255, 0, 0)).save(buffer, "PNG")
+    png = buffer.getvalue()
+
+    db = session_factory()
+    admin = User(username="admin", email="a@phulong.vn", hashed_password="x", role=UserRole.ADMIN, is_active=True)
+    db.add(admin)
+    db.commit()
+    admin_id = admin.id
+
+    app = FastAPI()
+    app.include_router(banners.router)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_admin_user] = lambda: db.get(User, admin_id)
+    response = TestClient(app).post("/api/banners/upload-with-banner", data={"title": "Khuyến mãi"},
+                                    files={"file": ("banner.png", png, "image/png")})
+    assert response.status_code == 200, response.text
+
+    upload = UploadFile(io.BytesIO(png), filename="dich-vu.png", headers=Headers({"content-type": "image/png"}))
+    asyncio.run(services.save_uploaded_image(upload, admin_id, db))
+
+    images = {image.category: image for image in db.query(Image)}
+    for category, prefix in (("banner", "images/banners/banner_"), ("service", "images/uploads/")):
+        key = images[category].file_path.split("/", 3)[3]
+        assert images[category].file_path.startswith("s3://phulong/") and key.startswith(prefix)
+        assert s3.client.objects[("phulong", key)] == png
+        assert images[category].url == f"http://minio:9000/phulong/{key}"
+        assert (images[category].width, images[category].height) == (4, 3)
+    db.close()
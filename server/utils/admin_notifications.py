@@ -0,0 +1,166 @@
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from models.models import AdminNotification, Order, Contact, EmailOutbox
+from config.settings import settings
+from config.database import SessionLocal
+from utils.email import build_order_admin_email, build_contact_admin_email, build_admin_digest_email
+from utils.email_outbox import enqueue_email, kick_email_outbox
+
+KIND_ORDER = "order"
+KIND_CONTACT = "contact"
+
+PRIORITY_NORMAL = "normal"
+PRIORITY_HIGH = "high"
+
+# Số thông báo tối đa trong một email tổng hợp (phần còn lại vào bản tiếp theo)
+MAX_DIGEST_ITEMS = 100
+
+def _setting_list(value: str) -> List[str]:
+    return [item.strip().lower() for item in value.split(",") if item.strip()]
+
+def is_high_priority(kind: str, quantity: Optional[int] = None, text: Optional[str] = None) -> bool:
+    """
+    Thông báo ưu tiên cao được gửi email riêng ngay thay vì chờ bản tổng hợp:
+    - Loại nằm trong ADMIN_NOTIFY_IMMEDIATE_KINDS
+    - Đơn hàng có số lượng >= ADMIN_NOTIFY_IMMEDIATE_MIN_QUANTITY (nếu > 0)
+    - Ghi chú / nội dung chứa từ khóa trong ADMIN_NOTIFY_IMMEDIATE_KEYWORDS
+    """
+    if kind in _setting_list(settings.ADMIN_NOTIFY_IMMEDIATE_KINDS):
+        return True
+    min_quantity = settings.ADMIN_NOTIFY_IMMEDIATE_MIN_QUANTITY
+    if min_quantity > 0 and quantity is not None and quantity >= min_quantity:
+        return True
+    if text:
+        lowered = text.lower()
+        return any(keyword in lowered for keyword in _setting_list(settings.ADMIN_NOTIFY_IMMEDIATE_KEYWORDS))
+    return False
+
+def _record(db: Session, kind: str, high_priority: bool, immediate_email: Optional[dict], **target) -> AdminNotification:
+    """
+    Ghi thông báo (không commit); nếu immediate_email được truyền vào thì đưa ngay vào outbox
+    và đánh dấu thông báo đã gửi
+    """
+    notification = AdminNotification(
+        kind=kind, priority=PRIORITY_HIGH if high_priority else PRIORITY_NORMAL, **target
+    )
+    if immediate_email is not None:
+        email = enqueue_email(db, **immediate_email)
+        db.flush()
+        notification.email_id = email.id
+        notification.notified_at = datetime.utcnow()
+    db.add(notification)
+    return notification
+
+def notify_new_order(db: Session, order, service) -> AdminNotification:
+    """Ghi thông báo đơn hàng mới cho admin trong transaction tạo đơn hàng (không commit)"""
+    high_priority = is_high_priority(KIND_ORDER, order.quantity, order.notes)
+    immediate = high_priority or not settings.ADMIN_DIGEST_ENABLED
+    email = build_order_admin_email(order, service) if immediate and service else None
+    return _record(db, KIND_ORDER, high_priority, email, order_id=order.id)
+
+def notify_new_contact(db: Session, contact) -> AdminNotification:
+    """Ghi thông báo liên hệ mới cho admin trong transaction lưu liên hệ (không commit)"""
+    text = " ".join(filter(None, [contact.subject, contact.message]))
+    high_priority = is_high_priority(KIND_CONTACT, text=text)
+    immediate = high_priority or not settings.ADMIN_DIGEST_ENABLED
+    email = build_contact_admin_email(contact) if immediate else None
+    return _record(db, KIND_CONTACT, high_priority, email, contact_id=contact.id)
+
+def digest_due(db: Session, now: Optional[datetime] = None) -> bool:
+    """Đến lúc gửi bản tổng hợp: đủ ADMIN_DIGEST_MAX_EVENTS thông báo hoặc thông báo cũ nhất đã chờ hết cửa sổ"""
+    now = now or datetime.utcnow()
+    count, oldest = db.query(func.count(AdminNotification.id), func.min(AdminNotification.created_at)).filter(
+        AdminNotification.notified_at.is_(None)
+    ).one()
+    if not count:
+        return False
+    return count >= settings.ADMIN_DIGEST_MAX_EVENTS or \
+        oldest <= now - timedelta(seconds=settings.ADMIN_DIGEST_WINDOW_SECONDS)
+
+def flush_admin_digest(db: Session, force: bool = False) -> Optional[EmailOutbox]:
+    """
+    Gom các thông báo đang chờ thành một email tổng hợp trong outbox và commit
+    FOR UPDATE SKIP LOCKED để nhiều worker / process không đưa một thông báo vào hai bản tổng hợp
+    Trả về email đã tạo (None nếu chưa đến hạn hoặc không có thông báo)
+    """
+    if not force and not digest_due(db):
+        return None
+
+    notifications = db.query(AdminNotification).filter(
+        AdminNotification.notified_at.is_(None)
+    ).order_by(AdminNotification.created_at).limit(MAX_DIGEST_ITEMS).with_for_update(skip_locked=True).all()
+    if not notifications:
+        db.rollback()
+        return None
+
+    order_ids = [n.order_id for n in notifications if n.kind == KIND_ORDER and n.order_id]
+    contact_ids = [n.contact_id for n in notifications if n.kind == KIND_CONTACT and n.contact_id]
+    orders = db.query(Order).options(joinedload(Order.service)).filter(
+        Order.id.in_(order_ids)
+    ).order_by(Order.id).all() if order_ids else []
+    contacts = db.query(Contact).filter(
+        Contact.id.in_(contact_ids)
+    ).order_by(Contact.id).all() if contact_ids else []
+
+    now = datetime.utcnow()
+    email = None
+    if orders or contacts:
+        email = enqueue_email(db, **build_admin_digest_email(
+            [(order, order.service) for order in orders],
+            contacts,
+            period_start=notifications[0].created_at,
+            period_end=now
+        ))
+        db.flush()
+
+    # Thông báo của đơn hàng / liên hệ đã bị xóa cũng được đánh dấu để không chờ mãi
+    for notification in notifications:
+        notification.notified_at = now
+        notification.email_id = email.id if email else None
+    db.commit()
+
+    if email:
+        logging.info(f"Đã tạo email tổng hợp #{email.id}: {len(orders)} đơn hàng, {len(contacts)} liên hệ")
+    return email
+
+def cleanup_notifications(db: Session) -> int:
+    """Xóa thông báo đã gửi quá EMAIL_OUTBOX_RETENTION_DAYS ngày"""
+    cutoff = datetime.utcnow() - timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)
+    count = db.query(AdminNotification).filter(
+        AdminNotification.notified_at < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+    return count
+
+def run_admin_digest(force: bool = False, cleanup: bool = True) -> int:
+    """
+    Gửi các bản tổng hợp đến hạn (được đăng ký định kỳ ở startup của main.py)
+    Trả về số email tổng hợp đã tạo
+    """
+    db = SessionLocal()
+    created = 0
+    try:
+        # Nhiều lô nếu tồn đọng vượt MAX_DIGEST_ITEMS
+        while flush_admin_digest(db, force=force) is not None:
+            created += 1
+            force = False
+        if cleanup:
+            cleanup_notifications(db)
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Lỗi khi tạo email tổng hợp cho admin: {str(e)}")
+    finally:
+        db.close()
+    return created
+
+def kick_admin_notifications():
+    """
+    Chạy sau khi response đã trả về: tạo bản tổng hợp nếu đã đủ số thông báo
+    rồi gửi ngay các email trong outbox (xác nhận cho khách, thông báo ưu tiên cao)
+    """
+    if settings.ADMIN_DIGEST_ENABLED:
+        run_admin_digest(cleanup=False)
+    kick_email_outbox()
@@ -0,0 +1,187 @@
+import random
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models.models import EmailOutbox
+from config.settings import settings
+from config.database import SessionLocal
+from utils.email import build_order_customer_email, build_message
+from utils.smtp_pool import send_messages
+
+# Trạng thái email trong outbox
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"  # Đã hết số lần thử, cần admin xử lý
+
+def enqueue_email(db: Session, to_email: str, subject: str, html_content: str,
+                  kind: Optional[str] = None, text_content: Optional[str] = None) -> EmailOutbox:
+    """
+    Ghi email vào outbox (không commit)
+    Caller commit chung với transaction ghi dữ liệu để email không bị mất hoặc gửi thừa
+    """
+    email = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        html_content=html_content,
+        text_content=text_content,
+        kind=kind,
+        status=STATUS_PENDING,
+        attempts=0,
+        max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.add(email)
+    return email
+
+def enqueue_order_confirmation(db: Session, order, service) -> Optional[EmailOutbox]:
+    """
+    Đưa email xác nhận đơn hàng cho khách hàng vào outbox
+    (thông báo cho admin đi qua utils/admin_notifications)
+    """
+    if not order.customer_email or not service:
+        logging.error(f"Không thể gửi email xác nhận cho đơn hàng #{order.id}: thiếu email khách hàng hoặc dịch vụ")
+        return None
+    return enqueue_email(db, **build_order_customer_email(order, service))
+
+def backoff_delay(attempts: int) -> timedelta:
+    """Exponential backoff có jitter: base * 2^(attempts-1), tối đa EMAIL_OUTBOX_MAX_BACKOFF_SECONDS"""
+    delay = settings.EMAIL_OUTBOX_BACKOFF_SECONDS * (2 ** max(attempts - 1, 0))
+    delay = min(delay, settings.EMAIL_OUTBOX_MAX_BACKOFF_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+def claim_batch(db: Session, limit: int) -> List[EmailOutbox]:
+    """
+    Nhận một lô email đến hạn gửi và đánh dấu 'sending'
+    FOR UPDATE SKIP LOCKED cho phép nhiều worker (kể cả nhiều process) chạy song song
+    mà không gửi trùng một email
+    """
+    now = datetime.utcnow()
+    emails = db.query(EmailOutbox).filter(
+        EmailOutbox.status == STATUS_PENDING,
+        EmailOutbox.next_attempt_at <= now
+    ).order_by(EmailOutbox.next_attempt_at).limit(limit).with_for_update(skip_locked=True).all()
+
+    for email in emails:
+        email.status = STATUS_SENDING
+        email.locked_at = now
+    db.commit()
+    return emails
+
+def mark_result(email: EmailOutbox, error: Optional[Exception] = None):
+    """Ghi nhận kết quả gửi: sent, hẹn gửi lại với backoff hoặc chuyển sang dead (không commit)"""
+    email.attempts = (email.attempts or 0) + 1
+    email.locked_at = None
+    if error is None:
+        email.status = STATUS_SENT
+        email.sent_at = datetime.utcnow()
+        email.last_error = None
+    elif email.attempts >= (email.max_attempts or settings.EMAIL_OUTBOX_MAX_ATTEMPTS):
+        email.status = STATUS_DEAD
+        email.last_error = str(error)
+        logging.error(f"Email outbox #{email.id} đến {email.to_email} thất bại sau {email.attempts} lần: {str(error)}")
+    else:
+        email.status = STATUS_PENDING
+        email.last_error = str(error)
+        email.next_attempt_at = datetime.utcnow() + backoff_delay(email.attempts)
+        logging.warning(f"Email outbox #{email.id} đến {email.to_email} lỗi lần {email.attempts}, sẽ thử lại lúc {email.next_attempt_at}")
+
+def release_stale_locks(db: Session) -> int:
+    """Trả các email kẹt ở trạng thái 'sending' (worker bị dừng giữa chừng) về hàng đợi"""
+    stale_before = datetime.utcnow() - timedelta(seconds=settings.EMAIL_OUTBOX_LOCK_TIMEOUT_SECONDS)
+    count = db.query(EmailOutbox).filter(
+        EmailOutbox.status == STATUS_SENDING,
+        EmailOutbox.locked_at < stale_before
+    ).update({"status": STATUS_PENDING, "locked_at": None}, synchronize_session=False)
+    db.commit()
+    return count
+
+def process_outbox_batch(db: Session, limit: Optional[int] = None) -> int:
+    """
+    Gửi một lô email đến hạn trên cùng một phiên SMTP và ghi nhận kết quả trong một commit
+    Trả về số email đã xử lý
+    """
+    emails = claim_batch(db, limit or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not emails:
+        return 0
+
+    messages = [build_message(email.to_email, email.subject, email.html_content, email.text_content) for email in emails]
+    errors = send_messages(messages)
+    for email, error in zip(emails, errors):
+        mark_result(email, error)
+    db.commit()
+    return len(emails)
+
+def drain_outbox(max_batches: int = 50) -> int:
+    """Worker: gửi liên tục cho tới khi hết email đến hạn (mỗi worker dùng session riêng)"""
+    # Không expire object sau commit để không phải SELECT lại từng email khi gửi
+    db = SessionLocal(expire_on_commit=False)
+    processed = 0
+    try:
+        for _ in range(max_batches):
+            count = process_outbox_batch(db)
+            processed += count
+            if count == 0:
+                break
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Lỗi khi xử lý email outbox: {str(e)}")
+    finally:
+        db.close()
+    return processed
+
+def kick_email_outbox():
+    """Gửi ngay các email vừa đưa vào outbox (chạy sau khi response đã trả về)"""
+    if settings.EMAIL_OUTBOX_ENABLED:
+        drain_outbox(max_batches=1)
+
+def cleanup_outbox(db: Session) -> int:
+    """Xóa email đã gửi quá EMAIL_OUTBOX_RETENTION_DAYS ngày"""
+    cutoff = datetime.utcnow() - timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)
+    count = db.query(EmailOutbox).filter(
+        EmailOutbox.status == STATUS_SENT,
+        EmailOutbox.sent_at < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+    return count
+
+def run_email_outbox():
+    """
+    Chạy các worker gửi email outbox định kỳ (được đăng ký ở startup của main.py)
+    Đồng thời trả email bị kẹt về hàng đợi và dọn email đã gửi quá hạn lưu trữ
+    """
+    db = SessionLocal()
+    try:
+        released = release_stale_locks(db)
+        if released:
+            logging.warning(f"Đã trả {released} email bị kẹt về hàng đợi outbox")
+        cleanup_outbox(db)
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Lỗi khi bảo trì email outbox: {str(e)}")
+    finally:
+        db.close()
+
+    workers = max(1, settings.EMAIL_OUTBOX_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="email-outbox") as executor:
+        processed = sum(executor.map(lambda _: drain_outbox(), range(workers)))
+    if processed:
+        logging.info(f"Email outbox: đã xử lý {processed} email")
+    return processed
+
+def get_outbox_stats(db: Session) -> dict:
+    """Số email theo trạng thái (cho trang quản trị)"""
+    counts = dict(db.query(EmailOutbox.status, func.count(EmailOutbox.id)).group_by(EmailOutbox.status).all())
+    oldest_pending = db.query(func.min(EmailOutbox.created_at)).filter(
+        EmailOutbox.status.in_([STATUS_PENDING, STATUS_SENDING])
+    ).scalar()
+    return {
+        "pending": counts.get(STATUS_PENDING, 0),
+        "sending": counts.get(STATUS_SENDING, 0),
+        "sent": counts.get(STATUS_SENT, 0),
+        "dead": counts.get(STATUS_DEAD, 0),
+        "oldest_pending_at": oldest_pending
+    }
@@ -0,0 +1,161 @@
+import os
+import re
+import logging
+import threading
+from html.parser import HTMLParser
+from typing import Dict, Tuple
+from jinja2 import Environment, Template
+
+# Thư mục chứa template email: <tên>.html và <tên>.css (cộng thêm base.css dùng chung)
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates", "email")
+BASE_CSS = "base.css"
+
+# Template HTML tự động escape dữ liệu người dùng, bản text thì không
+_html_env = Environment(autoescape=True)
+_text_env = Environment(autoescape=False, keep_trailing_newline=False)
+
+class _TextConverter(HTMLParser):
+    """
+    Chuyển HTML (nguồn template, giữ nguyên placeholder Jinja) sang văn bản thuần
+    - Thẻ khối xuống dòng, <br> xuống dòng, <th> và <td> cùng hàng nối bằng ": "
+    - Link được viết dạng "nội dung (url)"
+    """
+    BLOCK_TAGS = {"p", "div", "h1", "h2", "h3", "h4", "table", "tr", "li", "ul", "ol"}
+    SKIP_TAGS = {"head", "style", "script", "title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip = 0
+        self._href = None
+        self._link_text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip += 1
+        elif tag == "li":
+            self.parts.append("\n- ")
+        elif tag in self.BLOCK_TAGS or tag == "br":
+            self.parts.append("\n")
+        elif tag == "a":
+            self._href = dict(attrs).get("href")
+            self._link_text = []
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in ("h1", "h2", "h3", "h4"):
+            self.parts.append("\n\n")
+        elif tag in self.BLOCK_TAGS and tag != "tr":
+            self.parts.append("\n")
+        elif tag == "th":
+            self.parts.append(": ")
+        elif tag == "a" and self._href:
+            text = "".join(self._link_text).strip()
+            if self._href != text:
+                self.parts.append(f" ({self._href})")
+            self._href = None
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        # Khoảng trắng trong HTML nguồn (thụt lề, xuống dòng) không có ý nghĩa hiển thị
+        data = re.sub(r"\s+", " ", data)
+        if self._href is not None:
+            self._link_text.append(data)
+        self.parts.append(data)
+
+    def text(self) -> str:
+        raw = "".join(self.parts)
+        lines = [re.sub(r" {2,}", " ", line).strip() for line in raw.splitlines()]
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip() + "\n"
+
+def html_to_text(html: str) -> str:
+    """Tạo bản văn bản thuần từ HTML"""
+    converter = _TextConverter()
+    converter.feed(html)
+    converter.close()
+    return converter.text()
+
+def _inline_css(html: str, css: str) -> str:
+    """
+    Inline CSS vào thuộc tính style (css-inline); nếu chưa cài thư viện thì
+    giữ CSS trong thẻ <style> để email vẫn hiển thị đúng
+    """
+    try:
+        import css_inline
+    except ImportError:
+        logging.warning("Chưa cài css-inline, CSS email được giữ trong thẻ <style>")
+        return html.replace("</head>", f"<style>{css}</style></head>", 1)
+    return css_inline.CSSInliner(keep_style_tags=False, load_remote_stylesheets=False).inline(
+        html.replace("</head>", f"<style>{css}</style></head>", 1)
+    )
+
+def _minify(html: str) -> str:
+    """Bỏ thụt lề và dòng trống (khoảng trắng có xuống dòng thu về một ký tự xuống dòng)"""
+    return re.sub(r"\s*\n\s*", "\n", html).strip()
+
+def _read(filename: str) -> str:
+    with open(os.path.join(TEMPLATE_DIR, filename), encoding="utf-8") as file:
+        return file.read()
+
+def build_template(name: str) -> Tuple[Template, Template]:
+    """
+    Build một template email (chạy một lần khi khởi động)
+    1. Inline base.css + <tên>.css vào HTML nguồn (placeholder Jinja được giữ nguyên)
+    2. Rút gọn khoảng trắng
+    3. Sinh bản text từ HTML nguồn
+    4. Compile cả hai bằng Jinja2 (bản HTML bật autoescape)
+    """
+    source = _read(f"{name}.html")
+    css = _read(BASE_CSS)
+    if os.path.exists(os.path.join(TEMPLATE_DIR, f"{name}.css")):
+        css += "\n" + _read(f"{name}.css")
+    # Bỏ comment CSS trước khi inline
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+
+    html_source = _minify(_inline_css(source, css))
+    text_source = html_to_text(source)
+    return _html_env.from_string(html_source), _text_env.from_string(text_source)
+
+class EmailTemplates:
+    """Cache các template email đã build, dùng chung cho cả process"""
+
+    def __init__(self):
+        self._templates: Dict[str, Tuple[Template, Template]] = {}
+        self._lock = threading.Lock()
+
+    def load_all(self) -> int:
+        """Build toàn bộ template trong TEMPLATE_DIR, trả về số template đã build"""
+        names = sorted(
+            filename[:-5] for filename in os.listdir(TEMPLATE_DIR) if filename.endswith(".html")
+        )
+        built = {name: build_template(name) for name in names}
+        with self._lock:
+            self._templates.update(built)
+        logging.info(f"Đã build {len(built)} template email: {', '.join(names)}")
+        return len(built)
+
+    def get(self, name: str) -> Tuple[Template, Template]:
+        templates = self._templates.get(name)
+        if templates is None:
+            with self._lock:
+                templates = self._templates.get(name)
+                if templates is None:
+                    templates = self._templates[name] = build_template(name)
+        return templates
+
+    def render(self, name: str, **context) -> Tuple[str, str]:
+        """Render template, trả về (html, text)"""
+        html_template, text_template = self.get(name)
+        return html_template.render(**context), text_template.render(**context)
+
+email_templates = EmailTemplates()
+
+def load_email_templates() -> int:
+    """Build và cache toàn bộ template email (gọi ở startup của main.py)"""
+    return email_templates.load_all()
+
+def render_email(name: str, **context) -> Tuple[str, str]:
+    """Render email theo tên template, trả về (html, text)"""
+    return email_templates.render(name, **context)
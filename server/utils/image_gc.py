@@ -0,0 +1,173 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Set
+from urllib.parse import unquote
+from sqlalchemy.orm import Session
+from models.models import Image, Order, ResumableUpload
+from config.settings import settings
+from config.database import SessionLocal
+from utils.image_refs import collect_live_references, rebuild_image_references
+from utils.storage import delete_stored_file
+
+# Các thư mục chứa file upload do ứng dụng quản lý
+MANAGED_IMAGE_DIRS = ["static/images/uploads", "static/images/banners"]
+
+# Tiền tố file CSV xuất đơn hàng (xem routers/orders.export_orders_csv)
+EXPORT_FILE_PREFIX = "orders_export_"
+
+def _gc_categories() -> Set[str]:
+    """Các category ảnh chỉ tồn tại để gắn vào bản ghi khác (được phép GC)"""
+    return {c.strip() for c in settings.IMAGE_GC_CATEGORIES.split(",") if c.strip()}
+
+def _normalize(path: str) -> str:
+    return os.path.normpath(path)
+
+def _file_mtime(path: str) -> Optional[datetime]:
+    try:
+        return datetime.utcfromtimestamp(os.path.getmtime(path))
+    except OSError:
+        return None
+
+def _remove_file(path: str) -> int:
+    """Xóa file, trả về số byte đã giải phóng (0 nếu không xóa được)"""
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+    except OSError as e:
+        logging.warning(f"GC: không thể xóa file {path}: {str(e)}")
+        return 0
+
+def find_orphan_images(db: Session, cutoff: datetime):
+    """
+    Pha mark: tìm các ảnh không còn được tham chiếu
+    - Chỉ xét ảnh thuộc các category được phép GC (ảnh thư viện upload thủ công luôn được giữ)
+    - Bỏ qua ảnh mới upload trong khoảng grace period (ảnh content vừa upload chưa kịp lưu bài)
+    """
+    referenced = collect_live_references(db)
+
+    query = db.query(Image).filter(
+        Image.category.in_(_gc_categories()),
+        Image.created_at < cutoff
+    )
+    return [image for image in query.all() if image.id not in referenced]
+
+def find_stray_files(db: Session, cutoff: datetime, export_cutoff: datetime):
+    """
+    Tìm các file trên disk không thuộc về bản ghi nào
+    - File ảnh trong thư mục ảnh không có Image.file_path tương ứng
+    - File CSV export trong UPLOAD_DIR đã quá hạn
+    - File trong UPLOAD_DIR không được đơn hàng hay phiên upload nào tham chiếu
+    Chỉ quét file ở cấp đầu của mỗi thư mục.
+    """
+    known_paths = {_normalize(row[0]) for row in db.query(Image.file_path).all() if row[0]}
+    design_files = {
+        os.path.basename(unquote(row[0])) for row in db.query(Order.design_file_url)
+        .filter(Order.design_file_url.isnot(None)).all()
+    }
+    # File upload theo chunk đã ghép xong nhưng chưa gắn vào đơn hàng (được dọn khi hết hạn)
+    design_files.update(
+        os.path.basename(row[0]) for row in db.query(ResumableUpload.storage_key)
+        .filter(ResumableUpload.storage_key.isnot(None)).all()
+    )
+
+    stray = []
+
+    for directory in MANAGED_IMAGE_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            path = _normalize(entry.path)
+            mtime = _file_mtime(path)
+            if path not in known_paths and mtime and mtime < cutoff:
+                stray.append(path)
+
+    upload_dir = settings.UPLOAD_DIR
+    if os.path.isdir(upload_dir):
+        for entry in os.scandir(upload_dir):
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            path = _normalize(entry.path)
+            mtime = _file_mtime(path)
+            if not mtime:
+                continue
+            if entry.name.startswith(EXPORT_FILE_PREFIX) and entry.name.endswith(".csv"):
+                if mtime < export_cutoff:
+                    stray.append(path)
+            elif entry.name not in design_files and path not in known_paths and mtime < cutoff:
+                stray.append(path)
+
+    return stray
+
+def collect_garbage(db: Session, dry_run: bool = True, grace_hours: Optional[int] = None) -> dict:
+    """
+    GC mark-and-sweep cho ảnh và file upload
+    - dry_run=True: chỉ báo cáo, không xóa gì
+    - dry_run=False: xóa record Image mồ côi, file của chúng và các file lạc
+    Chỉ mục image_references được dựng lại khi chạy thật.
+    """
+    grace_hours = settings.IMAGE_GC_GRACE_HOURS if grace_hours is None else grace_hours
+    now = datetime.utcnow()
+    cutoff = now - timedelta(hours=grace_hours)
+    export_cutoff = now - timedelta(hours=settings.EXPORT_FILE_TTL_HOURS)
+
+    orphan_images = find_orphan_images(db, cutoff)
+    orphan_paths = {_normalize(image.file_path) for image in orphan_images if image.file_path}
+    stray_files = [path for path in find_stray_files(db, cutoff, export_cutoff) if path not in orphan_paths]
+
+    report = {
+        "dry_run": dry_run,
+        "orphan_images": [image.id for image in orphan_images],
+        "stray_files": stray_files,
+        "deleted_images": 0,
+        "deleted_files": 0,
+        "freed_bytes": 0
+    }
+
+    if dry_run:
+        return report
+
+    # Xóa record trước, commit xong mới xóa file để tránh record trỏ tới file đã mất
+    for image in orphan_images:
+        db.delete(image)
+        report["deleted_images"] += 1
+
+    rebuild_image_references(db)
+    db.commit()
+
+    for path in list(orphan_paths) + stray_files:
+        if path.startswith("s3://"):
+            if delete_stored_file(path):
+                report["deleted_files"] += 1
+            continue
+        if os.path.exists(path):
+            freed = _remove_file(path)
+            if not os.path.exists(path):
+                report["deleted_files"] += 1
+                report["freed_bytes"] += freed
+
+    return report
+
+def run_image_gc(dry_run: Optional[bool] = None):
+    """
+    Chạy GC ảnh định kỳ (được đăng ký ở startup của main.py)
+    """
+    dry_run = settings.IMAGE_GC_DRY_RUN if dry_run is None else dry_run
+    db = SessionLocal()
+    try:
+        report = collect_garbage(db, dry_run=dry_run)
+        logging.info(
+            f"GC ảnh ({'dry-run' if dry_run else 'thực thi'}): "
+            f"{len(report['orphan_images'])} ảnh mồ côi, {len(report['stray_files'])} file lạc, "
+            f"đã xóa {report['deleted_images']} ảnh / {report['deleted_files']} file, "
+            f"giải phóng {report['freed_bytes']} bytes"
+        )
+        return report
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Lỗi khi chạy GC ảnh: {str(e)}")
+    finally:
+        db.close()
@@ -0,0 +1,114 @@
+import re
+from typing import Iterable, List, Set
+from sqlalchemy.orm import Session
+from models.models import ImageReference, Image, Service, Banner, Printing, PrintingImage
+
+# Các loại tham chiếu ảnh
+REF_SERVICE = "service"
+REF_BANNER = "banner"
+REF_PRINTING = "printing"  # Ảnh đính kèm (PrintingImage)
+REF_PRINTING_CONTENT = "printing_content"  # Shortcode [image:N] trong content
+
+# Regex cho shortcode [image:123] hoặc [image:123|alt_text]
+SHORTCODE_PATTERN = re.compile(r'\[image:(\d+)(?:\|[^\]]*)?\]')
+
+def extract_image_ids(content: str) -> Set[int]:
+    """
+    Lấy danh sách ID ảnh được nhắc tới trong content qua shortcode
+    Ví dụ: "abc [image:12] xyz [image:7|Logo]" -> {12, 7}
+    """
+    if not content:
+        return set()
+    return {int(image_id) for image_id in SHORTCODE_PATTERN.findall(content)}
+
+def set_references(db: Session, ref_type: str, ref_id: int, image_ids: Iterable[int]):
+    """
+    Ghi đè toàn bộ tham chiếu của một bản ghi (ref_type, ref_id)
+    - Chỉ giữ các image_id thực sự tồn tại trong bảng images
+    - Không commit, để caller commit chung với transaction ghi dữ liệu
+    """
+    wanted = {image_id for image_id in image_ids if image_id is not None}
+
+    db.query(ImageReference).filter(
+        ImageReference.ref_type == ref_type,
+        ImageReference.ref_id == ref_id
+    ).delete(synchronize_session=False)
+
+    if not wanted:
+        return
+
+    existing_ids = {row[0] for row in db.query(Image.id).filter(Image.id.in_(wanted)).all()}
+    db.add_all([
+        ImageReference(image_id=image_id, ref_type=ref_type, ref_id=ref_id)
+        for image_id in sorted(existing_ids)
+    ])
+
+def clear_references(db: Session, ref_type: str, ref_id: int):
+    """Xóa toàn bộ tham chiếu của một bản ghi (khi bản ghi bị xóa)"""
+    set_references(db, ref_type, ref_id, [])
+
+def sync_service_references(db: Session, service: Service):
+    """Cập nhật tham chiếu ảnh của một dịch vụ"""
+    set_references(db, REF_SERVICE, service.id, [service.image_id])
+
+def sync_banner_references(db: Session, banner: Banner):
+    """Cập nhật tham chiếu ảnh của một banner"""
+    set_references(db, REF_BANNER, banner.id, [banner.image_id])
+
+def sync_printing_references(db: Session, printing: Printing):
+    """
+    Cập nhật tham chiếu ảnh của một bài đăng in ấn
+    - Ảnh đính kèm qua bảng printing_images
+    - Ảnh được chèn vào content qua shortcode
+    """
+    db.flush()
+    attached_ids = [
+        row[0] for row in db.query(PrintingImage.image_id)
+        .filter(PrintingImage.printing_id == printing.id).all()
+    ]
+    set_references(db, REF_PRINTING, printing.id, attached_ids)
+    set_references(db, REF_PRINTING_CONTENT, printing.id, extract_image_ids(printing.content))
+
+def clear_printing_references(db: Session, printing_id: int):
+    """Xóa tham chiếu ảnh của một bài đăng in ấn"""
+    clear_references(db, REF_PRINTING, printing_id)
+    clear_references(db, REF_PRINTING_CONTENT, printing_id)
+
+def get_image_references(db: Session, image_id: int) -> List[ImageReference]:
+    """Lấy danh sách nơi đang sử dụng một ảnh"""
+    return db.query(ImageReference).filter(ImageReference.image_id == image_id).all()
+
+def collect_live_references(db: Session) -> Set[int]:
+    """
+    Quét trực tiếp các bảng liên quan để lấy tập ID ảnh đang được dùng (pha mark của GC)
+    Không phụ thuộc vào chỉ mục image_references nên an toàn cả khi chỉ mục bị lệch
+    """
+    referenced: Set[int] = set()
+
+    referenced.update(row[0] for row in db.query(Service.image_id).filter(Service.image_id.isnot(None)))
+    referenced.update(row[0] for row in db.query(Banner.image_id).filter(Banner.image_id.isnot(None)))
+    referenced.update(row[0] for row in db.query(PrintingImage.image_id).filter(PrintingImage.image_id.isnot(None)))
+
+    for (content,) in db.query(Printing.content).yield_per(500):
+        referenced.update(extract_image_ids(content))
+
+    return referenced
+
+def rebuild_image_references(db: Session) -> int:
+    """
+    Dựng lại toàn bộ chỉ mục image_references từ dữ liệu hiện có
+    Dùng sau migration hoặc khi phát hiện chỉ mục bị lệch. Trả về số bản ghi đã tạo.
+    """
+    db.query(ImageReference).delete(synchronize_session=False)
+
+    for service in db.query(Service).filter(Service.image_id.isnot(None)).all():
+        sync_service_references(db, service)
+
+    for banner in db.query(Banner).all():
+        sync_banner_references(db, banner)
+
+    for printing in db.query(Printing).all():
+        sync_printing_references(db, printing)
+
+    db.flush()
+    return db.query(ImageReference).count()
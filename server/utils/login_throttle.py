@@ -0,0 +1,136 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
+from fastapi import HTTPException, Request, status
+from config.settings import settings
+
+class TokenBucket:
+    """Token bucket: tối đa `capacity` lượt liền nhau, hồi `refill_rate` lượt mỗi giây"""
+
+    __slots__ = ("capacity", "refill_rate", "tokens", "updated_at")
+
+    def __init__(self, capacity: float, refill_rate: float, now: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.updated_at = now
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self.updated_at = now
+
+    def consume(self, now: float) -> float:
+        """Lấy một token; trả về 0 nếu được phép, ngược lại số giây cần chờ"""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        if self.refill_rate <= 0:
+            return 3600.0
+        return (1 - self.tokens) / self.refill_rate
+
+class _FailureState:
+    __slots__ = ("failures", "locked_until")
+
+    def __init__(self):
+        self.failures = 0
+        self.locked_until = 0.0
+
+class LoginThrottle:
+    """
+    Giới hạn số lần đăng nhập theo IP và theo username (trong bộ nhớ của từng process)
+    - Mỗi lần thử đăng nhập lấy một token ở bucket của IP và của username
+    - Sai mật khẩu liên tiếp đủ `lockout_threshold` lần thì khóa username,
+      thời gian khóa tăng gấp đôi sau mỗi lần sai tiếp (tối đa `lockout_max_seconds`)
+    - Số key được giữ tối đa `max_keys` (bỏ key cũ nhất) để không tăng bộ nhớ vô hạn
+    """
+
+    def __init__(self, ip_burst: int, ip_per_minute: float, user_burst: int, user_per_minute: float,
+                 lockout_threshold: int, lockout_base_seconds: float, lockout_max_seconds: float,
+                 max_keys: int = 10000):
+        self.ip_burst = ip_burst
+        self.ip_rate = ip_per_minute / 60.0
+        self.user_burst = user_burst
+        self.user_rate = user_per_minute / 60.0
+        self.lockout_threshold = lockout_threshold
+        self.lockout_base_seconds = lockout_base_seconds
+        self.lockout_max_seconds = lockout_max_seconds
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._failures: "OrderedDict[str, _FailureState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: str, capacity: float, rate: float, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(capacity, rate, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def acquire(self, ip: str, username: str, now: Optional[float] = None) -> float:
+        """
+        Ghi nhận một lần thử đăng nhập
+        Trả về 0 nếu được phép, ngược lại số giây client phải chờ
+        """
+        now = time.monotonic() if now is None else now
+        username = (username or "").strip().lower()
+        with self._lock:
+            state = self._failures.get(username)
+            if state and state.locked_until > now:
+                return state.locked_until - now
+
+            wait_ip = self._bucket(f"ip:{ip}", self.ip_burst, self.ip_rate, now).consume(now)
+            if wait_ip:
+                return wait_ip
+            return self._bucket(f"user:{username}", self.user_burst, self.user_rate, now).consume(now)
+
+    def record_failure(self, username: str, now: Optional[float] = None) -> float:
+        """Ghi nhận đăng nhập sai, trả về số giây username bị khóa (0 nếu chưa khóa)"""
+        now = time.monotonic() if now is None else now
+        username = (username or "").strip().lower()
+        with self._lock:
+            state = self._failures.get(username)
+            if state is None:
+                state = self._failures[username] = _FailureState()
+                if len(self._failures) > self.max_keys:
+                    self._failures.popitem(last=False)
+            state.failures += 1
+            over = state.failures - self.lockout_threshold
+            if over < 0:
+                return 0.0
+            lock_seconds = min(self.lockout_base_seconds * (2 ** over), self.lockout_max_seconds)
+            state.locked_until = now + lock_seconds
+            return lock_seconds
+
+    def record_success(self, username: str):
+        """Đăng nhập thành công: xóa bộ đếm sai mật khẩu"""
+        with self._lock:
+            self._failures.pop((username or "").strip().lower(), None)
+
+login_throttle = LoginThrottle(
+    ip_burst=settings.LOGIN_IP_BURST,
+    ip_per_minute=settings.LOGIN_IP_PER_MINUTE,
+    user_burst=settings.LOGIN_USER_BURST,
+    user_per_minute=settings.LOGIN_USER_PER_MINUTE,
+    lockout_threshold=settings.LOGIN_LOCKOUT_THRESHOLD,
+    lockout_base_seconds=settings.LOGIN_LOCKOUT_BASE_SECONDS,
+    lockout_max_seconds=settings.LOGIN_LOCKOUT_MAX_SECONDS
+)
+
+def throttle_login(request: Request, username: str):
+    """Chặn đăng nhập (429 kèm Retry-After) khi IP hoặc username vượt giới hạn / đang bị khóa"""
+    if not settings.LOGIN_THROTTLE_ENABLED:
+        return
+    ip = request.client.host if request.client else "unknown"
+    wait = login_throttle.acquire(ip, username)
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Bạn đã thử đăng nhập quá nhiều lần, vui lòng thử lại sau",
+            headers={"Retry-After": str(max(1, int(wait + 0.999)))}
+        )
@@ -0,0 +1,20 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+from fastapi import HTTPException, status
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Cursor keyset (thời điểm, id) của bản ghi cuối trang, mã hóa base64 cho gọn trong URL"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, _, row_id = raw.partition("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor phân trang không hợp lệ"
+        )
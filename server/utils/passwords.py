@@ -0,0 +1,82 @@
+import re
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from config.settings import settings
+
+# Chi phí bcrypt cấu hình được; hash cũ với cost khác sẽ được hash lại khi đăng nhập thành công
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+_BCRYPT_ROUNDS_RE = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_dummy_hash: Optional[str] = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    """
+    Pool thread riêng, giới hạn PASSWORD_HASH_WORKERS, cho bcrypt
+    (bcrypt nhả GIL nên chạy song song được mà không chặn event loop,
+    và không chiếm thread pool mặc định mà các endpoint sync đang dùng)
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.PASSWORD_HASH_WORKERS),
+                thread_name_prefix="password-hash"
+            )
+        return _executor
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Hash dùng thuật toán cũ hoặc cost bcrypt khác BCRYPT_ROUNDS hiện tại"""
+    match = _BCRYPT_ROUNDS_RE.match(hashed_password or "")
+    if match and int(match.group(1)) != settings.BCRYPT_ROUNDS:
+        return True
+    return pwd_context.needs_update(hashed_password)
+
+def verify_and_update(password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Kiểm tra mật khẩu, trả về (đúng/sai, hash mới nếu cần hash lại với cấu hình hiện tại)
+    Khi user không tồn tại (hashed_password None) vẫn chạy bcrypt với hash giả để thời gian
+    phản hồi không lộ username nào có trong hệ thống
+    """
+    global _dummy_hash
+    if not hashed_password:
+        if _dummy_hash is None:
+            _dummy_hash = pwd_context.hash("phulong-dummy-password")
+        pwd_context.verify(password, _dummy_hash)
+        return False, None
+
+    try:
+        valid = pwd_context.verify(password, hashed_password)
+    except (ValueError, TypeError) as e:
+        logging.error(f"Hash mật khẩu không hợp lệ: {str(e)}")
+        return False, None
+    if valid and needs_rehash(hashed_password):
+        return True, pwd_context.hash(password)
+    return valid, None
+
+async def hash_password_async(password: str) -> str:
+    """Hash mật khẩu trong pool bcrypt, không chặn event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), hash_password, password)
+
+async def verify_and_update_async(password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """Kiểm tra mật khẩu trong pool bcrypt, không chặn event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), verify_and_update, password, hashed_password)
+
+def shutdown_password_pool():
+    """Dừng pool bcrypt (khi tắt ứng dụng)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
@@ -0,0 +1,73 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import make_transient_to_detached
+from models.models import User
+from config.settings import settings
+
+class PrincipalCache:
+    """
+    Cache ngắn hạn (TTL) thông tin user đã xác thực, key = (username, token version)
+    - Tránh query bảng users ở mỗi request có token
+    - Lưu giá trị các cột (không lưu object ORM) để mỗi request nhận một object User riêng
+    - Cache nằm trong bộ nhớ từng process: thay đổi ở process khác có hiệu lực sau tối đa TTL
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str, version: int = 0) -> Optional[User]:
+        if self.ttl <= 0:
+            return None
+        key = (username, version)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            values = entry[1]
+        return self._to_user(values)
+
+    def set(self, user: User, version: int = 0):
+        if self.ttl <= 0:
+            return
+        values = {attr.key: getattr(user, attr.key) for attr in sa_inspect(User).column_attrs}
+        with self._lock:
+            self._entries[(user.username, version)] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end((user.username, version))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: Optional[str] = None, user_id: Optional[int] = None):
+        """Xóa mọi phiên bản cache của một user (theo username hoặc id)"""
+        with self._lock:
+            for key in [
+                key for key, (_, values) in self._entries.items()
+                if (username is not None and key[0] == username) or (user_id is not None and values.get("id") == user_id)
+            ]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def _to_user(values: Dict) -> User:
+        """Tạo object User ở trạng thái detached (như vừa load từ DB rồi đóng session)"""
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+principal_cache = PrincipalCache(ttl=settings.AUTH_PRINCIPAL_CACHE_SECONDS)
@@ -0,0 +1,92 @@
+import json
+import os
+import re
+import threading
+import uuid
+from datetime import datetime
+from typing import List, Optional
+from config.settings import settings
+
+_PROFILE_ID = re.compile(r"^\d{8}T\d{12}-[0-9a-f]{8}$")
+
+class ProfileStore:
+    """
+    Lưu báo cáo profiling (HTML flame graph của pyinstrument + metadata JSON) trong một thư mục
+    Dùng chung giữa các worker; chỉ giữ max_profiles bản mới nhất (xóa bản cũ khi ghi thêm)
+    """
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def save(self, meta: dict, html: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        meta = {**meta, "id": profile_id}
+        with open(os.path.join(self.directory, f"{profile_id}.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+        with open(os.path.join(self.directory, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, default=str)
+        self.prune()
+        return profile_id
+
+    def _ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            (name[:-5] for name in os.listdir(self.directory) if name.endswith(".json") and _PROFILE_ID.match(name[:-5])),
+            reverse=True
+        )
+
+    def prune(self):
+        with self._lock:
+            for profile_id in self._ids()[self.max_profiles:]:
+                self.delete(profile_id)
+
+    def list(self, limit: Optional[int] = None) -> List[dict]:
+        """Metadata các profile, mới nhất trước"""
+        items = []
+        for profile_id in self._ids()[:limit]:
+            try:
+                with open(os.path.join(self.directory, f"{profile_id}.json"), encoding="utf-8") as f:
+                    items.append(json.load(f))
+            except (OSError, ValueError):
+                # Bản đang bị worker khác xóa / ghi dở
+                continue
+        return items
+
+    def get_html(self, profile_id: str) -> Optional[str]:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.html"), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def delete(self, profile_id: str) -> bool:
+        if not _PROFILE_ID.match(profile_id):
+            return False
+        deleted = False
+        for extension in (".json", ".html"):
+            try:
+                os.remove(os.path.join(self.directory, f"{profile_id}{extension}"))
+                deleted = True
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def clear(self) -> int:
+        ids = self._ids()
+        for profile_id in ids:
+            self.delete(profile_id)
+        return len(ids)
+
+_profile_store: Optional[ProfileStore] = None
+
+def get_profile_store() -> ProfileStore:
+    global _profile_store
+    if _profile_store is None:
+        _profile_store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+    return _profile_store
@@ -0,0 +1,236 @@
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from config.settings import settings
+from utils.login_throttle import TokenBucket
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+def parse_rate(spec: str) -> Tuple[int, float]:
+    """
+    Đọc cấu hình dạng "5/minute" → (5 lượt liền nhau tối đa, hồi 5 lượt mỗi phút)
+    Trả về (capacity, số token hồi mỗi giây); "0" hoặc chuỗi rỗng là không giới hạn
+    """
+    spec = (spec or "").strip().lower()
+    if not spec or spec == "0":
+        return 0, 0.0
+    count, _, period = spec.partition("/")
+    seconds = _PERIODS.get(period.strip() or "minute")
+    if seconds is None:
+        raise ValueError(f"Cấu hình rate limit không hợp lệ: {spec}")
+    return int(count), int(count) / seconds
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    remaining: int
+    retry_after: float = 0.0
+
+@dataclass
+class RateLimitPolicy:
+    """
+    Chính sách giới hạn cho một route: token bucket theo IP và một giới hạn chung (global)
+    cho mọi IP cộng lại, để botnet nhiều IP cũng không vắt kiệt DB / quota SMTP
+    """
+    name: str
+    method: str
+    path_regex: str
+    per_ip: str
+    global_limit: str = ""
+
+    def __post_init__(self):
+        self._pattern = re.compile(self.path_regex)
+        self.ip_capacity, self.ip_rate = parse_rate(self.per_ip)
+        self.global_capacity, self.global_rate = parse_rate(self.global_limit)
+
+    def matches(self, method: str, path: str) -> bool:
+        return method == self.method and self._pattern.match(path) is not None
+
+class MemoryRateLimitBackend:
+    """Token bucket (TokenBucket của login_throttle) trong bộ nhớ của process (mỗi worker giới hạn riêng)"""
+
+    def __init__(self, max_keys: int = 50000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, capacity: int, rate: float) -> RateLimitResult:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(float(capacity), rate, now)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            retry_after = bucket.consume(now)
+            if retry_after == 0:
+                return RateLimitResult(True, int(bucket.tokens))
+            return RateLimitResult(False, 0, retry_after)
+
+    async def incr(self, policy: str, counter: str):
+        with self._lock:
+            self._counters[policy][counter] += 1
+
+    async def counters(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {policy: dict(values) for policy, values in self._counters.items()}
+
+# Token bucket nguyên tử trên Redis: KEYS[1] = bucket, ARGV = capacity, rate (token/giây), now
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / math.max(rate, 0.001)) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+class RedisRateLimitBackend:
+    """
+    Token bucket dùng chung cho mọi worker / process qua Redis (RATE_LIMIT_BACKEND=redis)
+    Khi Redis lỗi thì cho request đi qua (fail-open) để không làm sập API
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit"):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis yêu cầu cài đặt redis")
+        self.prefix = prefix
+        self._redis = redis_asyncio.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._script = self._redis.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def hit(self, key: str, capacity: int, rate: float) -> RateLimitResult:
+        try:
+            allowed, tokens = await self._script(keys=[f"{self.prefix}:{key}"], args=[capacity, rate, time.time()])
+        except Exception as e:
+            logging.warning(f"Rate limit Redis lỗi, bỏ qua giới hạn: {str(e)}")
+            return RateLimitResult(True, capacity)
+        tokens = float(tokens)
+        if allowed:
+            return RateLimitResult(True, int(tokens))
+        return RateLimitResult(False, 0, (1 - tokens) / rate if rate > 0 else 60.0)
+
+    async def incr(self, policy: str, counter: str):
+        try:
+            await self._redis.hincrby(f"{self.prefix}:counters:{policy}", counter, 1)
+        except Exception:
+            pass
+
+    async def counters(self) -> Dict[str, Dict[str, int]]:
+        result = {}
+        try:
+            async for key in self._redis.scan_iter(match=f"{self.prefix}:counters:*"):
+                key = key.decode() if isinstance(key, bytes) else key
+                values = await self._redis.hgetall(key)
+                result[key.rsplit(":", 1)[-1]] = {
+                    (name.decode() if isinstance(name, bytes) else name): int(value) for name, value in values.items()
+                }
+        except Exception as e:
+            logging.warning(f"Không đọc được thống kê rate limit từ Redis: {str(e)}")
+        return result
+
+class RateLimiter:
+    """Chọn chính sách theo method + path và áp dụng giới hạn theo IP rồi giới hạn chung"""
+
+    def __init__(self, policies: List[RateLimitPolicy], backend):
+        self.policies = policies
+        self.backend = backend
+
+    def match(self, method: str, path: str) -> Optional[RateLimitPolicy]:
+        for policy in self.policies:
+            if policy.matches(method, path):
+                return policy
+        return None
+
+    async def check(self, policy: RateLimitPolicy, client_ip: str) -> Tuple[RateLimitResult, int]:
+        """Trả về (kết quả, giới hạn hiển thị trong header X-RateLimit-Limit)"""
+        result = RateLimitResult(True, policy.ip_capacity)
+        if policy.ip_capacity:
+            result = await self.backend.hit(f"{policy.name}:ip:{client_ip}", policy.ip_capacity, policy.ip_rate)
+            if not result.allowed:
+                await self.backend.incr(policy.name, "limited_ip")
+                return result, policy.ip_capacity
+        if policy.global_capacity:
+            global_result = await self.backend.hit(f"{policy.name}:global", policy.global_capacity, policy.global_rate)
+            if not global_result.allowed:
+                await self.backend.incr(policy.name, "limited_global")
+                return global_result, policy.ip_capacity
+        await self.backend.incr(policy.name, "allowed")
+        return result, policy.ip_capacity
+
+    async def get_metrics(self) -> dict:
+        counters = await self.backend.counters()
+        return {
+            "backend": type(self.backend).__name__,
+            "policies": [
+                {
+                    "name": policy.name,
+                    "method": policy.method,
+                    "path": policy.path_regex,
+                    "per_ip": policy.per_ip,
+                    "global": policy.global_limit,
+                    "allowed": counters.get(policy.name, {}).get("allowed", 0),
+                    "limited_ip": counters.get(policy.name, {}).get("limited_ip", 0),
+                    "limited_global": counters.get(policy.name, {}).get("limited_global", 0),
+                }
+                for policy in self.policies
+            ]
+        }
+
+def default_policies() -> List[RateLimitPolicy]:
+    """Các endpoint public có ghi DB / file / gửi email / ghi lên storage"""
+    return [
+        RateLimitPolicy("orders", "POST", r"^/api/orders/?$",
+                        settings.RATE_LIMIT_ORDERS, settings.RATE_LIMIT_ORDERS_GLOBAL),
+        RateLimitPolicy("contact", "POST", r"^/api/contact/submit/?$",
+                        settings.RATE_LIMIT_CONTACT, settings.RATE_LIMIT_CONTACT_GLOBAL),
+        RateLimitPolicy("reviews", "POST", r"^/api/services/[^/]+/reviews/?$",
+                        settings.RATE_LIMIT_REVIEWS, settings.RATE_LIMIT_REVIEWS_GLOBAL),
+        RateLimitPolicy("parse_content", "POST", r"^/api/printing/parse-content/?$",
+                        settings.RATE_LIMIT_PARSE_CONTENT, settings.RATE_LIMIT_PARSE_CONTENT_GLOBAL),
+        # Upload file thiết kế (ghi disk / storage): tạo phiên, gửi chunk, presign và PUT trực tiếp
+        RateLimitPolicy("upload_create", "POST", r"^/api/uploads/?$",
+                        settings.RATE_LIMIT_UPLOAD_CREATE, settings.RATE_LIMIT_UPLOAD_CREATE_GLOBAL),
+        RateLimitPolicy("upload_chunk", "PATCH", r"^/api/uploads/[^/]+/?$",
+                        settings.RATE_LIMIT_UPLOAD_CHUNK, settings.RATE_LIMIT_UPLOAD_CHUNK_GLOBAL),
+        RateLimitPolicy("presign_design", "POST", r"^/api/orders/presign-design/?$",
+                        settings.RATE_LIMIT_PRESIGN_DESIGN, settings.RATE_LIMIT_PRESIGN_DESIGN_GLOBAL),
+        RateLimitPolicy("storage_put", "PUT", r"^/api/storage/upload/.+$",
+                        settings.RATE_LIMIT_STORAGE_PUT, settings.RATE_LIMIT_STORAGE_PUT_GLOBAL),
+    ]
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """Rate limiter dùng chung theo cấu hình trong settings"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            if settings.RATE_LIMIT_BACKEND == "redis":
+                backend = RedisRateLimitBackend(settings.REDIS_URL)
+            else:
+                backend = MemoryRateLimitBackend()
+            _limiter = RateLimiter(default_policies(), backend)
+        return _limiter
@@ -0,0 +1,322 @@
+import os
+import io
+import base64
+import shutil
+import hashlib
+import logging
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Set, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+from models.models import ResumableUpload
+from config.settings import settings
+from config.database import SessionLocal
+from utils.storage import get_storage, make_design_file_key
+
+# Trạng thái phiên upload
+STATUS_UPLOADING = "uploading"
+STATUS_COMPLETED = "completed"
+STATUS_ATTACHED = "attached"
+STATUS_EXPIRED = "expired"
+
+# Giới hạn kích thước chunk client được chọn
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Thuật toán checksum hỗ trợ trong header Upload-Checksum (theo extension checksum của tus)
+CHECKSUM_ALGORITHMS = ("sha256", "sha1", "md5")
+
+# Status code khi checksum không khớp (tus: 460 Checksum Mismatch)
+HTTP_460_CHECKSUM_MISMATCH = 460
+
+def chunk_dir(upload_id: str) -> str:
+    """Thư mục tạm chứa các chunk của một phiên upload (không nằm trong /static)"""
+    return os.path.join(settings.RESUMABLE_UPLOAD_TMP_DIR, upload_id)
+
+def chunk_path(upload_id: str, index: int) -> str:
+    return os.path.join(chunk_dir(upload_id), f"{index}.part")
+
+def chunk_count(upload: ResumableUpload) -> int:
+    return max(1, -(-upload.total_size // upload.chunk_size))
+
+def chunk_length(upload: ResumableUpload, index: int) -> int:
+    """Kích thước mong đợi của chunk thứ `index` (chunk cuối có thể nhỏ hơn)"""
+    start = index * upload.chunk_size
+    return max(0, min(upload.chunk_size, upload.total_size - start))
+
+def received_chunks(upload: ResumableUpload) -> Set[int]:
+    """Các chunk đã nhận đủ (file .part tồn tại và đúng kích thước)"""
+    received = set()
+    directory = chunk_dir(upload.id)
+    if not os.path.isdir(directory):
+        return received
+    for entry in os.scandir(directory):
+        name, ext = os.path.splitext(entry.name)
+        if ext != ".part" or not name.isdigit():
+            continue
+        index = int(name)
+        if index < chunk_count(upload) and entry.stat().st_size == chunk_length(upload, index):
+            received.add(index)
+    return received
+
+def missing_chunks(upload: ResumableUpload, received: Optional[Set[int]] = None) -> List[int]:
+    received = received_chunks(upload) if received is None else received
+    return [index for index in range(chunk_count(upload)) if index not in received]
+
+def current_offset(upload: ResumableUpload, received: Optional[Set[int]] = None) -> int:
+    """
+    Offset liên tục tính từ đầu file (giá trị Upload-Offset trả về cho client)
+    Các chunk nhận song song phía sau một chỗ trống không được tính
+    """
+    if upload.status != STATUS_UPLOADING:
+        return upload.total_size
+    received = received_chunks(upload) if received is None else received
+    offset = 0
+    for index in range(chunk_count(upload)):
+        if index not in received:
+            break
+        offset += chunk_length(upload, index)
+    return offset
+
+def parse_checksum(header_value: Optional[str]) -> Optional[Tuple[str, bytes]]:
+    """
+    Parse header Upload-Checksum dạng "<thuật toán> <digest base64>"
+    Ví dụ: "sha256 47DEQpj8HBSa+/TImW+5JCeuQeRkm5NMpJWZG3hSuFU="
+    """
+    if not header_value:
+        return None
+    algorithm, _, encoded = header_value.strip().partition(" ")
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Thuật toán checksum không được hỗ trợ. Hỗ trợ: {', '.join(CHECKSUM_ALGORITHMS)}"
+        )
+    try:
+        return algorithm, base64.b64decode(encoded.strip(), validate=True)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Giá trị Upload-Checksum không hợp lệ"
+        )
+
+def create_upload(db: Session, filename: str, total_size: int, content_type: Optional[str] = None,
+                  chunk_size: Optional[int] = None) -> ResumableUpload:
+    """Tạo phiên upload mới (chưa commit)"""
+    if total_size <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Kích thước file không hợp lệ"
+        )
+    if total_size > settings.DESIGN_FILE_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File thiết kế quá lớn. Kích thước tối đa là {settings.DESIGN_FILE_MAX_SIZE // (1024*1024)}MB"
+        )
+
+    chunk_size = chunk_size or settings.RESUMABLE_CHUNK_SIZE
+    chunk_size = min(max(chunk_size, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+
+    upload = ResumableUpload(
+        id=uuid.uuid4().hex,
+        filename=os.path.basename(filename.replace("\\", "/")) or "design",
+        content_type=content_type,
+        total_size=total_size,
+        chunk_size=chunk_size,
+        status=STATUS_UPLOADING,
+        expires_at=datetime.utcnow() + timedelta(hours=settings.RESUMABLE_UPLOAD_EXPIRE_HOURS)
+    )
+    db.add(upload)
+    os.makedirs(chunk_dir(upload.id), exist_ok=True)
+    return upload
+
+def get_active_upload(db: Session, upload_id: str, lock: bool = False) -> ResumableUpload:
+    """Lấy phiên upload chưa hết hạn, 404 nếu không tồn tại, 410 nếu đã hết hạn"""
+    query = db.query(ResumableUpload).filter(ResumableUpload.id == upload_id)
+    if lock:
+        query = query.with_for_update()
+    upload = query.first()
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Không tìm thấy phiên upload"
+        )
+    if upload.status == STATUS_EXPIRED or (
+        upload.status == STATUS_UPLOADING and upload.expires_at < datetime.utcnow()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Phiên upload đã hết hạn"
+        )
+    return upload
+
+async def write_chunk(upload: ResumableUpload, offset: int, body: AsyncIterator[bytes],
+                      checksum: Optional[Tuple[str, bytes]] = None) -> int:
+    """
+    Ghi một chunk từ request body vào file .part
+    - offset phải là bội của chunk_size (mỗi chunk độc lập nên nhận song song được)
+    - Ghi ra file tạm, kiểm tra kích thước và checksum rồi mới rename thành .part
+    Trả về chỉ số chunk đã ghi
+    """
+    if upload.status != STATUS_UPLOADING:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Phiên upload đã hoàn tất"
+        )
+    if offset < 0 or offset >= upload.total_size or offset % upload.chunk_size != 0:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload-Offset phải là bội của {upload.chunk_size} và nhỏ hơn {upload.total_size}"
+        )
+
+    index = offset // upload.chunk_size
+    expected = chunk_length(upload, index)
+    directory = chunk_dir(upload.id)
+    os.makedirs(directory, exist_ok=True)
+
+    hasher = hashlib.new(checksum[0]) if checksum else None
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{index}-")
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            async for data in body:
+                written += len(data)
+                if written > expected:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Chunk vượt quá kích thước {expected} bytes"
+                    )
+                if hasher:
+                    hasher.update(data)
+                buffer.write(data)
+
+        if written != expected:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Chunk chưa đủ dữ liệu ({written}/{expected} bytes), vui lòng gửi lại"
+            )
+        if hasher and hasher.digest() != checksum[1]:
+            raise HTTPException(
+                status_code=HTTP_460_CHECKSUM_MISMATCH,
+                detail="Checksum của chunk không khớp, vui lòng gửi lại"
+            )
+        os.replace(tmp_path, chunk_path(upload.id, index))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return index
+
+class _ChunkReader(io.RawIOBase):
+    """File-like đọc tuần tự các file .part như một file liền mạch"""
+
+    def __init__(self, paths: List[str]):
+        self._paths = list(paths)
+        self._current = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while True:
+            if self._current is None:
+                if not self._paths:
+                    return 0
+                self._current = open(self._paths.pop(0), "rb")
+            count = self._current.readinto(buffer)
+            if count:
+                return count
+            self._current.close()
+            self._current = None
+
+    def close(self) -> None:
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+        super().close()
+
+def assemble_upload(db: Session, upload: ResumableUpload) -> bool:
+    """
+    Ghép các chunk thành file hoàn chỉnh khi đã nhận đủ
+    - Gọi với upload đã được khóa (with_for_update) để chỉ một request ghép file
+    - File được lưu qua storage backend với key duy nhất (timestamp + uuid + tên gốc)
+    Trả về True nếu đã ghép xong
+    """
+    if upload.status != STATUS_UPLOADING or missing_chunks(upload):
+        return False
+
+    key = make_design_file_key(upload.filename)
+    paths = [chunk_path(upload.id, index) for index in range(chunk_count(upload))]
+    reader = io.BufferedReader(_ChunkReader(paths), buffer_size=1024 * 1024)
+    try:
+        size = get_storage().save(key, reader, upload.content_type)
+    finally:
+        reader.close()
+
+    if size != upload.total_size:
+        get_storage().delete(key)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Kích thước file sau khi ghép không khớp"
+        )
+
+    upload.storage_key = key
+    upload.status = STATUS_COMPLETED
+    # File hoàn chỉnh được giữ tới hạn để gắn vào đơn hàng
+    upload.expires_at = datetime.utcnow() + timedelta(hours=settings.RESUMABLE_UPLOAD_EXPIRE_HOURS)
+    db.commit()
+
+    shutil.rmtree(chunk_dir(upload.id), ignore_errors=True)
+    logging.info(f"Đã ghép xong upload {upload.id} ({upload.total_size} bytes) -> {key}")
+    return True
+
+def remove_upload_files(upload: ResumableUpload):
+    """Xóa chunk tạm và file đã ghép (nếu chưa gắn vào đơn hàng)"""
+    shutil.rmtree(chunk_dir(upload.id), ignore_errors=True)
+    if upload.storage_key and upload.status == STATUS_COMPLETED:
+        try:
+            get_storage().delete(upload.storage_key)
+        except Exception as e:
+            logging.warning(f"Không thể xóa file upload {upload.storage_key}: {str(e)}")
+
+def cleanup_expired_uploads(db: Session) -> int:
+    """
+    Dọn các phiên upload bị bỏ dở hoặc hoàn tất nhưng không được gắn vào đơn hàng
+    Đồng thời xóa thư mục chunk không còn phiên upload tương ứng. Trả về số phiên đã dọn.
+    """
+    now = datetime.utcnow()
+    expired = db.query(ResumableUpload).filter(
+        ResumableUpload.status.in_([STATUS_UPLOADING, STATUS_COMPLETED]),
+        ResumableUpload.expires_at < now
+    ).all()
+
+    for upload in expired:
+        remove_upload_files(upload)
+        upload.status = STATUS_EXPIRED
+    db.commit()
+
+    tmp_dir = settings.RESUMABLE_UPLOAD_TMP_DIR
+    if os.path.isdir(tmp_dir):
+        active_ids = {
+            row[0] for row in db.query(ResumableUpload.id)
+            .filter(ResumableUpload.status == STATUS_UPLOADING).all()
+        }
+        for entry in os.scandir(tmp_dir):
+            if entry.is_dir() and entry.name not in active_ids:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    return len(expired)
+
+def run_upload_cleanup():
+    """Dọn upload hết hạn định kỳ (được đăng ký ở startup của main.py)"""
+    db = SessionLocal()
+    try:
+        count = cleanup_expired_uploads(db)
+        if count:
+            logging.info(f"Đã dọn {count} phiên upload hết hạn")
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Lỗi khi dọn upload hết hạn: {str(e)}")
+    finally:
+        db.close()
@@ -0,0 +1,31 @@
+from functools import lru_cache
+from typing import Any
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+class JSONBytesResponse(Response):
+    """Response cho body JSON đã được serialize sẵn thành bytes (không qua json.dumps lần nữa)"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content
+
+@lru_cache(maxsize=None)
+def get_type_adapter(tp: Any) -> TypeAdapter:
+    """
+    TypeAdapter build một lần cho mỗi kiểu response (build validator / serializer tốn vài ms),
+    các request sau dùng lại
+    """
+    return TypeAdapter(tp)
+
+def dump_json(tp: Any, data: Any) -> bytes:
+    """
+    Validate (from_attributes) rồi serialize thẳng ra JSON bytes bằng pydantic-core,
+    không tạo dict trung gian như đường response_model + json.dumps của FastAPI
+    Nhận object ORM, Row của SQLAlchemy (truy cập cột qua thuộc tính) hoặc model pydantic
+    """
+    adapter = get_type_adapter(tp)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+def json_response(tp: Any, data: Any, status_code: int = 200, headers: dict = None) -> JSONBytesResponse:
+    return JSONBytesResponse(dump_json(tp, data), status_code=status_code, headers=headers)
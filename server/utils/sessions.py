@@ -0,0 +1,145 @@
+import uuid
+import hmac
+import hashlib
+import logging
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request, status
+from sqlalchemy.orm import Session
+from models.models import User, UserSession
+from config.settings import settings
+from config.database import SessionLocal
+from utils.jwt import create_access_token
+
+# Lý do thu hồi phiên
+REVOKED_LOGOUT = "logout"
+REVOKED_REUSE = "reuse_detected"
+REVOKED_LOGOUT_ALL = "logout_all"
+REVOKED_PASSWORD_CHANGED = "password_changed"
+
+def _hash_secret(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+def _new_refresh_token(session: UserSession) -> str:
+    """Refresh token dạng "<session id>.<bí mật>", DB chỉ lưu hash của phần bí mật"""
+    secret = secrets.token_urlsafe(32)
+    session.refresh_token_hash = _hash_secret(secret)
+    session.expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    return f"{session.id}.{secret}"
+
+def _invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token không hợp lệ hoặc đã hết hạn"
+    )
+
+def issue_tokens(user: User, session: UserSession, refresh_token: str) -> dict:
+    """Tạo access token (kèm token version và id phiên) cùng refresh token"""
+    expires_in = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    access_token = create_access_token(
+        data={"sub": user.username, "role": user.role, "ver": user.token_version or 0, "sid": session.id},
+        expires_delta=timedelta(seconds=expires_in)
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": expires_in,
+        "refresh_token": refresh_token
+    }
+
+def create_session(db: Session, user: User, request: Request) -> Tuple[UserSession, str]:
+    """Tạo phiên mới khi đăng nhập bằng mật khẩu (không commit)"""
+    session = UserSession(
+        id=uuid.uuid4().hex,
+        user_id=user.id,
+        ip_address=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent", ""),
+        rotation_count=0
+    )
+    refresh_token = _new_refresh_token(session)
+    db.add(session)
+    return session, refresh_token
+
+def rotate_session(db: Session, refresh_token: str, request: Request) -> Tuple[User, UserSession, str]:
+    """
+    Đổi refresh token lấy refresh token mới (xoay vòng) và commit
+    - Token hợp lệ nhưng không phải token mới nhất của phiên (đã bị dùng) được coi là bị lộ:
+      thu hồi cả phiên, cả người giữ token cũ lẫn mới đều phải đăng nhập lại
+    """
+    session_id, _, secret = (refresh_token or "").partition(".")
+    if not session_id or not secret:
+        raise _invalid_refresh_token()
+
+    session = db.query(UserSession).filter(UserSession.id == session_id).with_for_update().first()
+    now = datetime.utcnow()
+    if not session or session.revoked_at is not None or session.expires_at <= now:
+        raise _invalid_refresh_token()
+
+    if not hmac.compare_digest(session.refresh_token_hash, _hash_secret(secret)):
+        session.revoked_at = now
+        session.revoked_reason = REVOKED_REUSE
+        db.commit()
+        logging.warning(f"Phát hiện dùng lại refresh token của phiên {session.id} (user #{session.user_id}), đã thu hồi phiên")
+        raise _invalid_refresh_token()
+
+    user = db.query(User).filter(User.id == session.user_id).first()
+    if not user or not user.is_active:
+        raise _invalid_refresh_token()
+
+    new_refresh_token = _new_refresh_token(session)
+    session.rotation_count = (session.rotation_count or 0) + 1
+    session.last_used_at = now
+    session.ip_address = request.client.host if request.client else session.ip_address
+    db.commit()
+    return user, session, new_refresh_token
+
+def revoke_session(db: Session, session: UserSession, reason: str = REVOKED_LOGOUT):
+    """Thu hồi một phiên (không commit); access token của phiên hết hiệu lực khi hết hạn"""
+    if session.revoked_at is None:
+        session.revoked_at = datetime.utcnow()
+        session.revoked_reason = reason
+
+def revoke_all_sessions(db: Session, user: User, reason: str = REVOKED_LOGOUT_ALL) -> int:
+    """
+    Thu hồi mọi phiên và tăng token_version để mọi access token đã cấp mất hiệu lực (không commit)
+    Caller phải gọi principal_cache.invalidate sau khi commit: xóa cache trước commit thì request đồng thời
+    có thể nạp lại user với token_version cũ. Worker khác thấy thay đổi sau tối đa AUTH_PRINCIPAL_CACHE_SECONDS
+    """
+    count = db.query(UserSession).filter(
+        UserSession.user_id == user.id,
+        UserSession.revoked_at.is_(None)
+    ).update({"revoked_at": datetime.utcnow(), "revoked_reason": reason}, synchronize_session=False)
+    user.token_version = (user.token_version or 0) + 1
+    return count
+
+def find_session_from_refresh_token(db: Session, refresh_token: str) -> Optional[UserSession]:
+    """Tìm phiên đang hoạt động ứng với refresh token (dùng khi đăng xuất)"""
+    session_id, _, secret = (refresh_token or "").partition(".")
+    session = db.query(UserSession).filter(UserSession.id == session_id).first() if session_id else None
+    if session and hmac.compare_digest(session.refresh_token_hash, _hash_secret(secret)):
+        return session
+    return None
+
+def cleanup_expired_sessions(db: Session) -> int:
+    """Xóa phiên đã hết hạn hoặc đã bị thu hồi quá REFRESH_TOKEN_EXPIRE_DAYS ngày"""
+    now = datetime.utcnow()
+    revoked_before = now - timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    count = db.query(UserSession).filter(
+        (UserSession.expires_at < now) | (UserSession.revoked_at < revoked_before)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return count
+
+def run_session_cleanup():
+    """Dọn phiên đăng nhập hết hạn (được đăng ký định kỳ ở startup của main.py)"""
+    db = SessionLocal()
+    try:
+        count = cleanup_expired_sessions(db)
+        if count:
+            logging.info(f"Đã xóa {count} phiên đăng nhập hết hạn")
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Lỗi khi dọn phiên đăng nhập: {str(e)}")
+    finally:
+        db.close()
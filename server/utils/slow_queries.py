@@ -0,0 +1,214 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import event
+from config.settings import settings
+
+logger = logging.getLogger("phulong-api")
+
+# Route của request hiện tại ("GET /api/services/{slug}"), do SlowQueryContextMiddleware đặt;
+# contextvar đi theo cả vào thread pool của endpoint sync
+current_route: ContextVar[Optional[Callable[[], str]]] = ContextVar("slow_query_route", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*\(.*?\)(?:\s*,\s*\(.*?\))*", re.IGNORECASE | re.DOTALL)
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+# SELECT ... FOR UPDATE / FOR SHARE: EXPLAIN ANALYZE sẽ khóa dòng thật và có thể chờ transaction khác
+_ROW_LOCKING = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+|KEY\s+)?(?:UPDATE|SHARE)\b", re.IGNORECASE)
+_MAX_STATEMENT_LENGTH = 4000
+
+def normalize_statement(statement: str) -> str:
+    """
+    Chuẩn hóa câu SQL để gom nhóm: literal / placeholder thành ?, danh sách IN (...) và VALUES
+    (số phần tử thay đổi theo dữ liệu) gộp thành một, khoảng trắng thu gọn
+    """
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _VALUES_LIST.sub("VALUES (...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+def _value_shape(value: Any) -> str:
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    if isinstance(value, (list, tuple, set)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+def parameter_shape(parameters: Any) -> Any:
+    """Kiểu + độ dài của tham số bind (không lưu giá trị thật vì có thể chứa dữ liệu khách hàng)"""
+    if isinstance(parameters, dict):
+        return {key: _value_shape(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: chỉ ghi số dòng + dạng của dòng đầu
+            return {"rows": len(parameters), "first": parameter_shape(parameters[0])}
+        return [_value_shape(value) for value in parameters]
+    return _value_shape(parameters) if parameters is not None else None
+
+class SlowQueryLog:
+    """
+    Ghi lại câu SQL chậm hơn threshold_ms qua event của SQLAlchemy engine, gom nhóm theo fingerprint
+    - Mỗi nhóm: số lần, tổng / trung bình / lớn nhất (ms), các route gây ra, dạng tham số lần gần nhất
+    - PostgreSQL: lấy EXPLAIN (ANALYZE, BUFFERS) cho lần đầu và mỗi explain_every lần của câu SELECT
+      (trừ SELECT ... FOR UPDATE / FOR SHARE),
+      chạy ở thread riêng trên kết nối khác (rollback sau đó) để không làm chậm thêm request
+    - Số liệu theo từng process (mỗi worker một bản), giữ tối đa max_fingerprints nhóm
+    """
+
+    def __init__(self, threshold_ms: float, explain_every: int = 0, max_fingerprints: int = 500,
+                 explain_timeout_ms: int = 5000):
+        self.threshold_ms = threshold_ms
+        self.explain_every = explain_every
+        self.max_fingerprints = max_fingerprints
+        self.explain_timeout_ms = explain_timeout_ms
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._explaining = threading.local()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._engine = None
+
+    def install(self, engine):
+        self._engine = engine
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def uninstall(self):
+        if self._engine is not None:
+            event.remove(self._engine, "before_cursor_execute", self._before_cursor_execute)
+            event.remove(self._engine, "after_cursor_execute", self._after_cursor_execute)
+            event.remove(self._engine, "handle_error", self._handle_error)
+            self._engine = None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["slow_query_start"].pop()
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < self.threshold_ms or getattr(self._explaining, "active", False):
+            return
+        route_getter = current_route.get()
+        self.record(statement, parameters, duration_ms, route_getter() if route_getter else None,
+                    explainable=conn.dialect.name == "postgresql" and not executemany)
+
+    def _handle_error(self, exception_context):
+        # Câu SQL lỗi không tới after_cursor_execute: bỏ thời điểm bắt đầu để conn.info không phình ra
+        conn = exception_context.connection
+        if conn is not None and exception_context.statement is not None and conn.info.get("slow_query_start"):
+            conn.info["slow_query_start"].pop()
+
+    def record(self, statement: str, parameters: Any, duration_ms: float, route: Optional[str] = None,
+               explainable: bool = False):
+        normalized = normalize_statement(statement)
+        key = fingerprint(normalized)
+        route = route or "(ngoài request)"
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                if len(self.entries) >= self.max_fingerprints:
+                    # Bỏ nhóm ít tốn thời gian nhất để nhường chỗ
+                    del self.entries[min(self.entries, key=lambda k: self.entries[k]["total_ms"])]
+                entry = self.entries[key] = {
+                    "fingerprint": key,
+                    "statement": normalized[:_MAX_STATEMENT_LENGTH],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "routes": Counter(),
+                    "explain": None,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["last_ms"] = duration_ms
+            entry["last_seen"] = datetime.utcnow()
+            entry["routes"][route] += 1
+            entry["parameters"] = parameter_shape(parameters)
+            explain = (explainable and self.explain_every > 0 and _EXPLAINABLE.match(statement)
+                       and not _ROW_LOCKING.search(normalized)
+                       and (entry["count"] - 1) % self.explain_every == 0)
+
+        logger.warning(f"Câu SQL chậm {duration_ms:.0f}ms [{key}] tại {route}: {normalized[:200]}")
+        if explain:
+            self._get_executor().submit(self._capture_explain, key, statement, parameters, route)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+            return self._executor
+
+    def _capture_explain(self, key: str, statement: str, parameters: Any, route: str):
+        self._explaining.active = True
+        try:
+            with self._engine.connect() as conn:
+                try:
+                    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(self.explain_timeout_ms)}")
+                    rows = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters).fetchall()
+                    explain = {"plan": "\n".join(row[0] for row in rows)}
+                finally:
+                    conn.rollback()
+        except Exception as e:
+            logger.error(f"Lỗi khi EXPLAIN câu SQL chậm [{key}]: {str(e)}")
+            explain = {"error": str(e)}
+        finally:
+            self._explaining.active = False
+        explain.update(route=route, captured_at=datetime.utcnow())
+        with self._lock:
+            if key in self.entries:
+                self.entries[key]["explain"] = explain
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> List[dict]:
+        """Các nhóm câu SQL chậm, sắp theo total_ms / max_ms / avg_ms / count giảm dần"""
+        with self._lock:
+            items = [
+                {
+                    **{k: v for k, v in entry.items() if k != "routes"},
+                    "total_ms": round(entry["total_ms"], 2),
+                    "max_ms": round(entry["max_ms"], 2),
+                    "last_ms": round(entry["last_ms"], 2),
+                    "avg_ms": round(entry["total_ms"] / entry["count"], 2),
+                    "routes": [{"route": route, "count": count} for route, count in entry["routes"].most_common(5)],
+                }
+                for entry in self.entries.values()
+            ]
+        items.sort(key=lambda item: item[sort], reverse=True)
+        return items[:limit]
+
+    def reset(self) -> int:
+        with self._lock:
+            count = len(self.entries)
+            self.entries.clear()
+        return count
+
+SORT_KEYS = ("total_ms", "max_ms", "avg_ms", "count")
+
+_slow_query_log: Optional[SlowQueryLog] = None
+
+def get_slow_query_log() -> SlowQueryLog:
+    global _slow_query_log
+    if _slow_query_log is None:
+        _slow_query_log = SlowQueryLog(
+            threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+            explain_every=settings.SLOW_QUERY_EXPLAIN_EVERY,
+            max_fingerprints=settings.SLOW_QUERY_MAX_FINGERPRINTS,
+            explain_timeout_ms=settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS,
+        )
+    return _slow_query_log
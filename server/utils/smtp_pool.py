@@ -0,0 +1,262 @@
+import time
+import smtplib
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from email.message import Message
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from config.settings import settings
+
+# Lỗi kết nối: bỏ connection hiện tại và thử lại với connection mới
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+# Lỗi riêng của từng email (người nhận / nội dung bị từ chối): kết nối vẫn dùng tiếp được
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+class SMTPMetrics:
+    """Thống kê gửi email: số lượng, độ trễ và thông lượng (thread-safe)"""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)  # (thời điểm gửi xong, độ trễ giây)
+        self.sent = 0
+        self.failed = 0
+        self.connections_opened = 0
+        self.reconnects = 0
+
+    def record(self, latency: float, success: bool, count: int = 1):
+        with self._lock:
+            if success:
+                self.sent += count
+                self._latencies.append((time.monotonic(), latency))
+            else:
+                self.failed += count
+
+    def connection_opened(self, reconnect: bool = False):
+        with self._lock:
+            self.connections_opened += 1
+            if reconnect:
+                self.reconnects += 1
+
+    def snapshot(self, active_connections: int = 0, idle_connections: int = 0) -> dict:
+        with self._lock:
+            samples = list(self._latencies)
+            result = {
+                "sent": self.sent,
+                "failed": self.failed,
+                "connections_opened": self.connections_opened,
+                "reconnects": self.reconnects,
+                "active_connections": active_connections,
+                "idle_connections": idle_connections,
+            }
+
+        latencies = sorted(latency for _, latency in samples)
+        if latencies:
+            result["latency_avg_ms"] = round(sum(latencies) / len(latencies) * 1000, 2)
+            result["latency_p50_ms"] = round(latencies[len(latencies) // 2] * 1000, 2)
+            result["latency_p95_ms"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2)
+            result["latency_max_ms"] = round(latencies[-1] * 1000, 2)
+        else:
+            result.update({"latency_avg_ms": 0, "latency_p50_ms": 0, "latency_p95_ms": 0, "latency_max_ms": 0})
+
+        # Thông lượng trong 60 giây gần nhất
+        now = time.monotonic()
+        recent = [stamp for stamp, _ in samples if now - stamp <= 60]
+        result["throughput_per_minute"] = len(recent)
+        return result
+
+class _PooledConnection:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.messages_sent = 0
+
+class SMTPConnectionPool:
+    """
+    Pool các kết nối SMTP đã STARTTLS + đăng nhập, dùng lại giữa các lần gửi
+    - Tối đa `max_size` kết nối đồng thời, lấy kết nối sẽ chờ nếu pool đầy
+    - Kết nối nghỉ quá `idle_timeout` được kiểm tra bằng NOOP trước khi dùng lại
+    - Kết nối được đóng sau `max_messages` email để tránh bị server ngắt
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 use_tls: bool = True, max_size: int = 2, idle_timeout: float = 60,
+                 max_messages: int = 100, timeout: float = 30, sender: Optional[str] = None):
+        self.host = host
+        self.sender = sender  # Địa chỉ gửi trong envelope (mặc định lấy từ header From)
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.metrics = SMTPMetrics()
+        self._idle: List[_PooledConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._active = 0
+
+    def _connect(self, reconnect: bool = False) -> _PooledConnection:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.metrics.connection_opened(reconnect)
+        logging.info(f"Mở kết nối SMTP mới tới {self.host}:{self.port}")
+        return _PooledConnection(server)
+
+    @staticmethod
+    def _close(connection: _PooledConnection):
+        try:
+            connection.server.quit()
+        except Exception:
+            connection.server.close()
+
+    def _is_alive(self, connection: _PooledConnection) -> bool:
+        if time.monotonic() - connection.last_used < self.idle_timeout:
+            return True
+        try:
+            return connection.server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _take_idle(self) -> Optional[_PooledConnection]:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection = self._idle.pop()
+            if self._is_alive(connection):
+                return connection
+            self._close(connection)
+
+    @contextmanager
+    def connection(self):
+        """Lấy một kết nối từ pool (mở mới nếu chưa có kết nối rảnh)"""
+        self._slots.acquire()
+        with self._lock:
+            self._active += 1
+        connection = None
+        try:
+            connection = self._take_idle() or self._connect()
+            yield connection
+        except Exception:
+            # Kết nối có thể ở trạng thái lỗi, không trả lại pool
+            if connection is not None:
+                self._close(connection)
+                connection = None
+            raise
+        finally:
+            if connection is not None:
+                connection.last_used = time.monotonic()
+                if connection.messages_sent >= self.max_messages:
+                    self._close(connection)
+                else:
+                    with self._lock:
+                        self._idle.append(connection)
+            with self._lock:
+                self._active -= 1
+            self._slots.release()
+
+    def _send_on(self, connection: _PooledConnection, message: Message) -> _PooledConnection:
+        """Gửi một email trên kết nối, tự kết nối lại một lần nếu server đã ngắt"""
+        from_addr = self.sender or message["From"]
+        to_addrs = [address.strip() for address in message["To"].split(",")]
+        payload = message.as_string()
+        started = time.perf_counter()
+        try:
+            connection.server.sendmail(from_addr, to_addrs, payload)
+        except RECONNECT_ERRORS:
+            self._close(connection)
+            replacement = self._connect(reconnect=True)
+            connection.server = replacement.server
+            connection.messages_sent = 0
+            started = time.perf_counter()
+            connection.server.sendmail(from_addr, to_addrs, payload)
+        connection.messages_sent += 1
+        self.metrics.record(time.perf_counter() - started, True)
+        return connection
+
+    def send(self, message: Message):
+        """Gửi một email, raise exception nếu thất bại"""
+        self.send_many([message], raise_on_error=True)
+
+    def send_many(self, messages: List[Message], raise_on_error: bool = False) -> List[Optional[Exception]]:
+        """
+        Gửi nhiều email trên cùng một phiên SMTP
+        Trả về danh sách lỗi tương ứng từng email (None nếu gửi thành công)
+        """
+        results: List[Optional[Exception]] = []
+        try:
+            with self.connection() as connection:
+                for message in messages:
+                    try:
+                        self._send_on(connection, message)
+                        results.append(None)
+                    except MESSAGE_ERRORS as e:
+                        self.metrics.record(0, False)
+                        if raise_on_error:
+                            raise
+                        results.append(e)
+                        connection.server.rset()
+        except Exception as e:
+            # Kết nối hỏng: các email chưa gửi được đánh dấu lỗi để thử lại sau
+            if raise_on_error:
+                raise
+            remaining = len(messages) - len(results)
+            if remaining:
+                self.metrics.record(0, False, remaining)
+            results.extend([e] * remaining)
+        return results
+
+    async def send_async(self, message: Message):
+        """Gửi email từ code async mà không chặn event loop"""
+        await run_in_threadpool(self.send, message)
+
+    def close(self):
+        """Đóng toàn bộ kết nối rảnh (khi tắt ứng dụng)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._close(connection)
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            active, idle = self._active, len(self._idle)
+        return self.metrics.snapshot(active_connections=active, idle_connections=idle)
+
+_pool: Optional[SMTPConnectionPool] = None
+_pool_lock = threading.Lock()
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """Lấy pool SMTP dùng chung theo cấu hình trong settings"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPConnectionPool(
+                host=settings.SMTP_SERVER,
+                port=settings.SMTP_PORT,
+                username=settings.SMTP_USERNAME,
+                password=settings.SMTP_PASSWORD,
+                use_tls=settings.SMTP_USE_TLS,
+                max_size=settings.SMTP_POOL_SIZE,
+                idle_timeout=settings.SMTP_POOL_IDLE_SECONDS,
+                max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+                timeout=settings.SMTP_TIMEOUT,
+                sender=settings.SMTP_USERNAME,
+            )
+        return _pool
+
+def send_messages(messages: List[Message]) -> List[Optional[Exception]]:
+    """Gửi một lô email qua pool, trả về lỗi tương ứng từng email (None nếu thành công)"""
+    return get_smtp_pool().send_many(messages)
@@ -0,0 +1,310 @@
+import os
+import stat
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from mimetypes import guess_type
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from config.settings import settings
+
+# Các đường dẫn (tương đối trong /static) có tên file duy nhất (uuid / timestamp),
+# nội dung không bao giờ thay đổi nên có thể cache vĩnh viễn
+IMMUTABLE_PREFIXES = ("images/uploads/", "images/banners/", "uploads/")
+
+# Các loại nội dung dạng text có thể phục vụ bản nén sẵn (.br / .gz)
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+}
+
+# Thứ tự ưu tiên encoding của file nén sẵn
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+def is_compressible(media_type: str) -> bool:
+    """Kiểm tra loại nội dung có nên phục vụ bản nén sẵn không"""
+    media_type = media_type.split(";")[0].strip().lower()
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+def make_etag(stat_result: os.stat_result, encoding: Optional[str] = None) -> str:
+    """Tạo strong ETag từ mtime (ns), kích thước và encoding của file"""
+    base = f"{stat_result.st_mtime_ns}-{stat_result.st_size}-{encoding or 'identity'}"
+    return '"' + hashlib.md5(base.encode(), usedforsecurity=False).hexdigest() + '"'
+
+def _accepts(request_headers: Headers, encoding: str) -> bool:
+    for part in request_headers.get("accept-encoding", "").split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() == encoding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+def _etag_matches(header_value: str, etag: str) -> bool:
+    """So khớp If-None-Match (weak comparison theo RFC 7232)"""
+    if header_value.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for tag in header_value.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == target:
+            return True
+    return False
+
+def _not_modified_since(header_value: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header_value).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(mtime) <= since
+
+def parse_range(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse header Range dạng 'bytes=start-end' (chỉ hỗ trợ một khoảng)
+    - Trả về (start, end) bao gồm cả end
+    - Trả về None nếu header không hợp lệ hoặc có nhiều khoảng (phục vụ toàn bộ file)
+    - Raise ValueError nếu khoảng không thỏa mãn được (416)
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_str, sep, end_str = ranges.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        start = int(start_str) if start_str else None
+        end = int(end_str) if end_str else None
+    except ValueError:
+        return None
+
+    if start is None:
+        # bytes=-500: 500 byte cuối
+        if end is None or end <= 0:
+            raise ValueError("Range không thỏa mãn được")
+        return max(file_size - end, 0), file_size - 1
+
+    if end is None:
+        end = file_size - 1
+    if start >= file_size or start > end:
+        raise ValueError("Range không thỏa mãn được")
+    return start, min(end, file_size - 1)
+
+def _if_range_allows(if_range: Optional[str], etag: str, mtime: float) -> bool:
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    try:
+        return int(mtime) <= parsedate_to_datetime(if_range).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+class OptimizedFileResponse(Response):
+    """
+    Phục vụ file với ETag/Last-Modified, 304, Range (206) và file nén sẵn.
+    Gửi nội dung qua extension zero-copy của ASGI server nếu được hỗ trợ
+    (http.response.zerocopysend / http.response.pathsend), ngược lại đọc theo chunk.
+    """
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        status_code: int = 200,
+        headers: Optional[dict] = None,
+        media_type: Optional[str] = None,
+        method: str = "GET",
+        content_range: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        self.path = path
+        self.stat_result = stat_result
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.send_header_only = method.upper() == "HEAD"
+        self.content_range = content_range
+        self.init_headers(headers)
+
+    @property
+    def body_range(self) -> Tuple[int, int]:
+        """(offset, count) của phần nội dung cần gửi"""
+        if self.content_range is None:
+            return 0, self.stat_result.st_size
+        start, end = self.content_range
+        return start, end - start + 1
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if self.send_header_only or self.status_code == 304:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        offset, count = self.body_range
+        extensions = scope.get("extensions") or {}
+
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": offset,
+                    "count": count,
+                    "more_body": False,
+                })
+            return
+
+        if "http.response.pathsend" in extensions and self.content_range is None:
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if offset:
+                await file.seek(offset)
+            remaining = count
+            while True:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                remaining -= len(chunk)
+                more_body = remaining > 0 and len(chunk) > 0
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                if not more_body:
+                    break
+
+def build_file_response(
+    path: str,
+    stat_result: os.stat_result,
+    request_headers: Headers,
+    method: str = "GET",
+    media_type: Optional[str] = None,
+    cache_control: Optional[str] = None,
+    filename: Optional[str] = None,
+    content_disposition_type: str = "attachment",
+) -> Response:
+    """
+    Tạo response cho một file trên disk
+    - Chọn bản nén sẵn (.br/.gz) nếu client hỗ trợ và file là dạng text
+    - Trả 304 nếu ETag/Last-Modified khớp
+    - Trả 206 nếu có header Range hợp lệ, 416 nếu không thỏa mãn được
+    """
+    if media_type is None:
+        media_type = guess_type(filename or path)[0] or "application/octet-stream"
+
+    headers = {"accept-ranges": "bytes"}
+    if cache_control:
+        headers["cache-control"] = cache_control
+    if filename is not None:
+        quoted = quote(filename)
+        if quoted != filename:
+            headers["content-disposition"] = f"{content_disposition_type}; filename*=utf-8''{quoted}"
+        else:
+            headers["content-disposition"] = f'{content_disposition_type}; filename="{filename}"'
+
+    range_header = request_headers.get("range")
+    serve_path, serve_stat, encoding = path, stat_result, None
+
+    if is_compressible(media_type):
+        headers["vary"] = "Accept-Encoding"
+        # Không phục vụ bản nén khi client yêu cầu Range (offset tính trên bản gốc)
+        if not range_header:
+            for candidate, suffix in PRECOMPRESSED_ENCODINGS:
+                if not _accepts(request_headers, candidate):
+                    continue
+                try:
+                    sibling_stat = os.stat(path + suffix)
+                except OSError:
+                    continue
+                if stat.S_ISREG(sibling_stat.st_mode) and sibling_stat.st_mtime >= stat_result.st_mtime:
+                    serve_path, serve_stat, encoding = path + suffix, sibling_stat, candidate
+                    headers["content-encoding"] = candidate
+                    break
+
+    etag = make_etag(serve_stat, encoding)
+    headers["etag"] = etag
+    headers["last-modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+
+    # Conditional GET: If-None-Match được ưu tiên hơn If-Modified-Since
+    if_none_match = request_headers.get("if-none-match")
+    if_modified_since = request_headers.get("if-modified-since")
+    if (if_none_match and _etag_matches(if_none_match, etag)) or (
+        not if_none_match and if_modified_since and _not_modified_since(if_modified_since, stat_result.st_mtime)
+    ):
+        headers.pop("content-disposition", None)
+        headers.pop("content-encoding", None)
+        return OptimizedFileResponse(serve_path, serve_stat, status_code=304, headers=headers, method=method)
+
+    file_size = serve_stat.st_size
+    content_range = None
+    status_code = 200
+
+    if range_header and encoding is None and _if_range_allows(request_headers.get("if-range"), etag, stat_result.st_mtime):
+        try:
+            content_range = parse_range(range_header, file_size)
+        except ValueError:
+            return Response(
+                status_code=416,
+                headers={"content-range": f"bytes */{file_size}", "accept-ranges": "bytes"},
+            )
+        if content_range is not None:
+            status_code = 206
+            start, end = content_range
+            headers["content-range"] = f"bytes {start}-{end}/{file_size}"
+
+    response = OptimizedFileResponse(
+        serve_path,
+        serve_stat,
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+        method=method,
+        content_range=content_range,
+    )
+    _, count = response.body_range
+    response.headers["content-length"] = str(count)
+    return response
+
+def cache_control_for(relative_path: str) -> str:
+    """Chính sách cache theo đường dẫn trong /static"""
+    relative_path = relative_path.lstrip("/").replace(os.sep, "/")
+    if relative_path.startswith(IMMUTABLE_PREFIXES):
+        return f"public, max-age={settings.STATIC_IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={settings.STATIC_DEFAULT_MAX_AGE}, must-revalidate"
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles với chính sách cache dài hạn cho file upload (tên file duy nhất),
+    strong ETag, 304, Range request, file nén sẵn và zero-copy send.
+    """
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        if status_code != 200:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        return build_file_response(
+            str(full_path),
+            stat_result,
+            Headers(scope=scope),
+            method=scope["method"],
+            cache_control=cache_control_for(self.get_path(scope)),
+        )
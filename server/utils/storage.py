@@ -0,0 +1,253 @@
+import os
+import io
+import hmac
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+from typing import BinaryIO, Optional
+from urllib.parse import quote, urlencode
+
+from config.settings import settings
+
+def get_backend_url() -> str:
+    """URL gốc của backend (luôn có protocol), rỗng nếu chưa cấu hình"""
+    backend_url = settings.BACKEND_URL
+    if backend_url and not backend_url.startswith("http"):
+        backend_url = f"https://{backend_url}"
+    return backend_url.rstrip("/") if backend_url else ""
+
+class StorageBackend:
+    """
+    Giao diện chung cho nơi lưu file upload (ảnh, file thiết kế)
+    - key: đường dẫn tương đối, ví dụ "images/uploads/<uuid>.png"
+    - path: giá trị lưu vào DB (Image.file_path), ví dụ "static/images/uploads/<uuid>.png"
+      hoặc "s3://bucket/images/uploads/<uuid>.png"
+    """
+    name = "base"
+
+    def path_for(self, key: str) -> str:
+        raise NotImplementedError
+
+    def url(self, key: str) -> str:
+        raise NotImplementedError
+
+    def save(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> int:
+        """Lưu nội dung file, trả về số byte đã ghi"""
+        raise NotImplementedError
+
+    def save_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> int:
+        return self.save(key, io.BytesIO(data), content_type)
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def size(self, key: str) -> Optional[int]:
+        """Kích thước file (bytes), None nếu không tồn tại"""
+        raise NotImplementedError
+
+    def read_head(self, key: str, length: int) -> bytes:
+        """Đọc `length` byte đầu của file (dùng để lấy kích thước ảnh)"""
+        raise NotImplementedError
+
+    def presign_put(self, key: str, content_type: str, expires_in: int, max_size: int = 0) -> dict:
+        """
+        Tạo URL để trình duyệt upload thẳng lên storage bằng PUT
+        - max_size: giới hạn kích thước (0 = không giới hạn), kiểm tra lại khi finalize
+        Trả về dict: url, method, headers
+        """
+        raise NotImplementedError
+
+class LocalStorage(StorageBackend):
+    """Lưu file trên filesystem cục bộ (thư mục static được mount ở /static)"""
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path_for(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        root = os.path.normpath(self.root)
+        if os.path.commonpath([os.path.abspath(path), os.path.abspath(root)]) != os.path.abspath(root):
+            raise ValueError(f"Key không hợp lệ: {key}")
+        return path
+
+    def url(self, key: str) -> str:
+        return f"{get_backend_url()}/static/{quote(key)}"
+
+    def save(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> int:
+        path = self.path_for(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Ghi ra file tạm rồi rename để không bao giờ phục vụ file ghi dở
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                shutil.copyfileobj(fileobj, buffer, 1024 * 1024)
+                written = buffer.tell()
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return written
+
+    def delete(self, key: str) -> None:
+        path = self.path_for(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self.path_for(key))
+        except OSError:
+            return None
+
+    def read_head(self, key: str, length: int) -> bytes:
+        with open(self.path_for(key), "rb") as file:
+            return file.read(length)
+
+    def sign(self, key: str, expires: int, content_type: str, max_size: int = 0) -> str:
+        message = f"{key}:{expires}:{content_type}:{max_size}".encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    def verify_signature(self, key: str, expires: int, content_type: str, max_size: int, signature: str) -> bool:
+        if expires < int(time.time()):
+            return False
+        return hmac.compare_digest(self.sign(key, expires, content_type, max_size), signature)
+
+    def presign_put(self, key: str, content_type: str, expires_in: int, max_size: int = 0) -> dict:
+        expires = int(time.time()) + expires_in
+        query = urlencode({
+            "expires": expires,
+            "max_size": max_size,
+            "signature": self.sign(key, expires, content_type, max_size)
+        })
+        return {
+            "url": f"{get_backend_url()}/api/storage/upload/{quote(key)}?{query}",
+            "method": "PUT",
+            "headers": {"Content-Type": content_type},
+        }
+
+class S3Storage(StorageBackend):
+    """
+    Lưu file trên S3 hoặc dịch vụ tương thích S3 (MinIO, R2, ...)
+    Cần cài boto3 khi dùng STORAGE_BACKEND=s3
+    """
+    name = "s3"
+
+    def __init__(self):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 yêu cầu cài đặt boto3")
+
+        s3_config = {"addressing_style": "path"} if settings.S3_ENDPOINT_URL else {}
+        self.bucket = settings.S3_BUCKET
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL or None,
+            region_name=settings.S3_REGION or None,
+            aws_access_key_id=settings.S3_ACCESS_KEY or None,
+            aws_secret_access_key=settings.S3_SECRET_KEY or None,
+            config=Config(signature_version="s3v4", s3=s3_config),
+        )
+
+    def path_for(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def url(self, key: str) -> str:
+        if settings.S3_PUBLIC_URL:
+            return f"{settings.S3_PUBLIC_URL.rstrip('/')}/{quote(key)}"
+        if settings.S3_ENDPOINT_URL:
+            return f"{settings.S3_ENDPOINT_URL.rstrip('/')}/{self.bucket}/{quote(key)}"
+        return f"https://{self.bucket}.s3.{settings.S3_REGION}.amazonaws.com/{quote(key)}"
+
+    def save(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> int:
+        extra_args = {"CacheControl": f"public, max-age={settings.STATIC_IMMUTABLE_MAX_AGE}, immutable"}
+        if content_type:
+            extra_args["ContentType"] = content_type
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs=extra_args)
+        return self.size(key) or 0
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def size(self, key: str) -> Optional[int]:
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)["ContentLength"]
+        except ClientError:
+            return None
+
+    def read_head(self, key: str, length: int) -> bytes:
+        response = self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes=0-{length - 1}")
+        return response["Body"].read()
+
+    def presign_put(self, key: str, content_type: str, expires_in: int, max_size: int = 0) -> dict:
+        # Presigned PUT của S3 không giới hạn được kích thước, finalize sẽ kiểm tra lại
+        url = self.client.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": self.bucket, "Key": key, "ContentType": content_type},
+            ExpiresIn=expires_in,
+        )
+        return {"url": url, "method": "PUT", "headers": {"Content-Type": content_type}}
+
+_storage: Optional[StorageBackend] = None
+
+def get_storage() -> StorageBackend:
+    """Lấy storage backend theo cấu hình STORAGE_BACKEND (local | s3)"""
+    global _storage
+    if _storage is None:
+        if settings.STORAGE_BACKEND == "s3":
+            _storage = S3Storage()
+        else:
+            _storage = LocalStorage(settings.STORAGE_LOCAL_ROOT)
+        logging.info(f"Sử dụng storage backend: {_storage.name}")
+    return _storage
+
+def key_for_path(path: str) -> Optional[str]:
+    """Chuyển giá trị file_path trong DB về key của storage hiện tại"""
+    if path.startswith("s3://"):
+        return path.split("/", 3)[3] if path.count("/") >= 3 else None
+    root = os.path.abspath(settings.STORAGE_LOCAL_ROOT)
+    absolute = os.path.abspath(path)
+    if os.path.commonpath([absolute, root]) != root:
+        return None
+    return os.path.relpath(absolute, root).replace(os.sep, "/")
+
+def delete_stored_file(path: str) -> bool:
+    """
+    Xóa file theo file_path lưu trong DB (local hoặc s3://)
+    Trả về True nếu đã xóa hoặc file không còn tồn tại
+    """
+    try:
+        if path.startswith("s3://"):
+            key = key_for_path(path)
+            if key:
+                get_storage().delete(key)
+            return True
+        if os.path.exists(path):
+            os.remove(path)
+        return True
+    except Exception as e:
+        logging.warning(f"Không thể xóa file {path}: {str(e)}")
+        return False
+
+def upload_key_prefix() -> str:
+    """Key prefix tương ứng với settings.UPLOAD_DIR (file thiết kế của khách hàng)"""
+    key = key_for_path(settings.UPLOAD_DIR)
+    return key if key and key != "." else "uploads"
+
+def make_design_file_key(original_filename: str) -> str:
+    """
+    Tạo key duy nhất cho file thiết kế: <timestamp>_<uuid>_<tên file gốc>
+    Chỉ giữ phần tên file để tránh path traversal
+    """
+    safe_name = os.path.basename(original_filename.replace("\\", "/")) or "design"
+    return f"{upload_key_prefix()}/{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}_{safe_name}"
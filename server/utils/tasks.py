@@ -1,35 +1,157 @@
-from datetime import datetime
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from models.models import AdminAccessLog
+from models.models import AdminAccessLog, LoginHistory
 import logging
-from config.database import get_db
+from config.database import SessionLocal
+from config.settings import settings
+
+ACCESS_LOG_TABLE = "admin_access_logs"
+ACCESS_LOG_DEFAULT_PARTITION = f"{ACCESS_LOG_TABLE}_default"
+_PARTITION_NAME = re.compile(rf"^{ACCESS_LOG_TABLE}_p(\d{{4}})(\d{{2}})$")
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+def _add_months(value: datetime, months: int) -> datetime:
+    month = value.month - 1 + months
+    return datetime(value.year + month // 12, month % 12 + 1, 1)
+
+def partition_name(month: datetime) -> str:
+    """Tên partition của tháng, ví dụ admin_access_logs_p202610"""
+    return f"{ACCESS_LOG_TABLE}_p{month.year:04d}{month.month:02d}"
+
+def is_access_log_partitioned(db: Session) -> bool:
+    """Bảng admin_access_logs có đang là bảng partition (PostgreSQL) hay không"""
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+    ), {"name": ACCESS_LOG_TABLE}).first() is not None
+
+def list_access_log_partitions(db: Session) -> List[str]:
+    return [row[0] for row in db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :name AND pg_table_is_visible(p.oid) ORDER BY c.relname"
+    ), {"name": ACCESS_LOG_TABLE})]
+
+def ensure_access_log_partitions(db: Session, now: Optional[datetime] = None, months_ahead: Optional[int] = None) -> List[str]:
+    """
+    Tạo trước partition cho tháng hiện tại và months_ahead tháng tiếp theo (không commit)
+    Partition tạo trước khi có dữ liệu nên không phải quét partition default
+    """
+    now = now or datetime.utcnow()
+    months_ahead = settings.ACCESS_LOG_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    existing = set(list_access_log_partitions(db))
+    created = []
+    for offset in range(months_ahead + 1):
+        start = _add_months(_month_start(now), offset)
+        name = partition_name(start)
+        if name in existing:
+            continue
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {ACCESS_LOG_TABLE} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{_add_months(start, 1).isoformat()}')"
+        ))
+        created.append(name)
+    return created
+
+def drop_expired_access_log_partitions(db: Session, cutoff: datetime) -> List[str]:
+    """
+    Tách (DETACH) rồi xóa các partition tháng mà mọi bản ghi đều cũ hơn cutoff (không commit)
+    Thao tác chỉ đụng tới metadata, không quét / xóa từng dòng như DELETE
+    """
+    dropped = []
+    for name in list_access_log_partitions(db):
+        match = _PARTITION_NAME.match(name)
+        if not match:
+            continue
+        month_end = _add_months(datetime(int(match.group(1)), int(match.group(2)), 1), 1)
+        if month_end <= cutoff:
+            db.execute(text(f"ALTER TABLE {ACCESS_LOG_TABLE} DETACH PARTITION {name}"))
+            db.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+def _delete_in_batches(db: Session, table, condition, batch_size: Optional[int] = None) -> int:
+    """
+    Xóa theo lô bằng DELETE ... WHERE id IN (SELECT ... LIMIT n), commit sau mỗi lô
+    để không giữ một transaction dài khóa cả bảng
+    """
+    batch_size = batch_size or settings.ACCESS_LOG_DELETE_BATCH_SIZE
+    total = 0
+    while True:
+        ids = [row[0] for row in db.execute(
+            table.select().with_only_columns(table.c.id).where(condition).limit(batch_size)
+        )]
+        if not ids:
+            break
+        total += db.execute(table.delete().where(table.c.id.in_(ids))).rowcount
+        db.commit()
+        if len(ids) < batch_size:
+            break
+    return total
+
+def delete_expired_access_logs(db: Session, now: datetime, batch_size: Optional[int] = None) -> int:
+    """Xóa access log hết hạn theo lô (dùng cho DB không partition)"""
+    table = AdminAccessLog.__table__
+    return _delete_in_batches(db, table, table.c.expires_at < now, batch_size)
+
+def delete_expired_login_history(db: Session, now: Optional[datetime] = None, batch_size: Optional[int] = None) -> int:
+    """Lịch sử đăng nhập dùng chung thời gian lưu với access log (ACCESS_LOG_RETENTION_DAYS)"""
+    now = now or datetime.utcnow()
+    table = LoginHistory.__table__
+    cutoff = now - timedelta(days=settings.ACCESS_LOG_RETENTION_DAYS)
+    return _delete_in_batches(db, table, table.c.login_time < cutoff, batch_size)
+
+def purge_expired_access_logs(db: Session, now: Optional[datetime] = None) -> dict:
+    """
+    Dọn access log hết hạn
+    - Bảng partition: tạo trước partition các tháng tới, drop partition tháng đã hết hạn toàn bộ
+      (bản ghi được giữ tối đa thêm một tháng, tới khi cả partition hết hạn),
+      partition default chỉ chứa dữ liệu lạc nên xóa theo dòng
+    - Bảng thường (SQLite, PostgreSQL chưa migrate): DELETE theo lô trên cột expires_at
+    """
+    now = now or datetime.utcnow()
+    if not is_access_log_partitioned(db):
+        return {"partitioned": False, "partitions_created": [], "partitions_dropped": [],
+                "rows_deleted": delete_expired_access_logs(db, now)}
+
+    created = ensure_access_log_partitions(db, now)
+    dropped = drop_expired_access_log_partitions(db, now - timedelta(days=settings.ACCESS_LOG_RETENTION_DAYS))
+    db.commit()
+    rows_deleted = 0
+    if ACCESS_LOG_DEFAULT_PARTITION in list_access_log_partitions(db):
+        rows_deleted = db.execute(
+            text(f"DELETE FROM {ACCESS_LOG_DEFAULT_PARTITION} WHERE expires_at < :now"), {"now": now}
+        ).rowcount
+        db.commit()
+    return {"partitioned": True, "partitions_created": created, "partitions_dropped": dropped,
+            "rows_deleted": rows_deleted}
 
 def cleanup_expired_access_logs():
     """
-    Hàm xóa các bản ghi access log đã hết hạn (> 3 tháng)
-    Hàm này được thiết kế để chạy định kỳ qua cron job
+    Hàm xóa các bản ghi access log và lịch sử đăng nhập đã hết hạn (> ACCESS_LOG_RETENTION_DAYS ngày)
+    Được đăng ký chạy định kỳ ở startup của main.py
     """
+    db = SessionLocal()
     try:
-        # Lấy thời gian hiện tại
-        now = datetime.utcnow()
-        
-        # Lấy DB session
-        db: Session = next(get_db())
-        
-        # Tìm và xóa các bản ghi đã hết hạn
-        expired_logs = db.query(AdminAccessLog).filter(AdminAccessLog.expires_at < now).all()
-        
-        if expired_logs:
-            count = len(expired_logs)
-            # Xóa các log hết hạn
-            for log in expired_logs:
-                db.delete(log)
-            
-            # Lưu thay đổi
-            db.commit()
-            logging.info(f"Đã xóa {count} bản ghi log admin hết hạn")
-        else:
-            logging.info("Không có bản ghi log admin nào hết hạn")
-            
+        result = purge_expired_access_logs(db)
+        if result["partitions_created"]:
+            logging.info(f"Đã tạo partition log admin: {', '.join(result['partitions_created'])}")
+        if result["partitions_dropped"]:
+            logging.info(f"Đã xóa partition log admin hết hạn: {', '.join(result['partitions_dropped'])}")
+        if result["rows_deleted"]:
+            logging.info(f"Đã xóa {result['rows_deleted']} bản ghi log admin hết hạn")
+        login_deleted = delete_expired_login_history(db)
+        if login_deleted:
+            logging.info(f"Đã xóa {login_deleted} bản ghi lịch sử đăng nhập hết hạn")
     except Exception as e:
-        logging.error(f"Lỗi khi xóa bản ghi log hết hạn: {str(e)}") 
\ No newline at end of file
+        db.rollback()
+        logging.error(f"Lỗi khi xóa bản ghi log hết hạn: {str(e)}")
+    finally:
+        db.close()